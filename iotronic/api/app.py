@@ -22,6 +22,8 @@ from iotronic.api import hooks
 from iotronic.api import middleware
 
 from iotronic.api.middleware import auth_token
+from iotronic.common import metrics
+from iotronic.common import tracing
 from oslo_config import cfg
 import oslo_middleware.cors as cors_middleware
 import pecan
@@ -65,6 +67,26 @@ api_opts = [
                      "host URL. If the API is operating behind a proxy, you "
                      "will want to change this to represent the proxy's URL. "
                      "Defaults to None.")),
+    cfg.IntOpt('stream_threshold',
+               default=200,
+               help=('Collection pages larger than this number of items are '
+                     'serialized and sent item by item, as they are read '
+                     'from the database. 0 disables the streaming.')),
+    cfg.BoolOpt('compression',
+                default=True,
+                help=('Compress the responses with gzip when the client '
+                      'accepts it.')),
+    cfg.IntOpt('compression_min_size',
+               default=1024,
+               help=('Responses smaller than this number of bytes are not '
+                     'compressed. Streamed responses are always compressed.'
+                     )),
+    cfg.IntOpt('compression_level',
+               default=6,
+               min=1,
+               max=9,
+               help=('gzip compression level, from 1 (fastest) to 9 '
+                     '(smallest).')),
     cfg.IntOpt('api_workers',
                help=('Number of workers for OpenStack Iotronic API service. '
                      'The default is equal to the number of CPUs available '
@@ -97,12 +119,21 @@ def get_pecan_config():
 
 def setup_app(config=None):
 
-    app_hooks = [hooks.ConfigHook(),
+    # the after hooks run in the reverse order: the stream is set last,
+    # no other hook reads its body
+    app_hooks = [hooks.StreamHook(),
+                 hooks.ConfigHook(),
                  hooks.DBHook(),
                  hooks.ContextHook(config.app.acl_public_routes),
                  hooks.RPCHook(),
                  hooks.NoExceptionTracebackHook(),
-                 hooks.PublicUrlHook()]
+                 hooks.PublicUrlHook(),
+                 hooks.NotModifiedHook()]
+    if CONF.metrics.enabled:
+        app_hooks.append(hooks.MetricsHook())
+    if CONF.tracing.enabled:
+        tracing.setup('iotronic-api')
+        app_hooks.insert(1, hooks.TracingHook())
 
     app_conf = dict(config.app)
 
@@ -114,11 +145,18 @@ def setup_app(config=None):
         **app_conf
     )
 
+    if CONF.api.compression:
+        app = middleware.GzipMiddleware(app)
+
     if CONF.auth_strategy == "keystone":
         app = auth_token.AuthTokenMiddleware(
             app, dict(cfg.CONF),
             public_api_routes=config.app.acl_public_routes)
 
+    if CONF.metrics.enabled:
+        # outside of the authentication, for the scrapers
+        app = metrics.MetricsMiddleware(app)
+
     # Create a CORS wrapper, and attach iotronic-specific defaults that must be
     # included in all CORS responses.
     app = cors_middleware.CORS(app, CONF)
@@ -33,6 +33,9 @@ from iotronic.api.controllers.v1 import plugin
 # from iotronic.api.controllers.v1 import utils
 
 from iotronic.api.controllers.v1 import board
+from iotronic.api.controllers.v1 import campaign
+from iotronic.api.controllers.v1 import group
+from iotronic.api.controllers.v1 import schedule
 
 from iotronic.api.controllers.v1 import versions
 from iotronic.api import expose
@@ -60,6 +63,15 @@ class V1(base.APIBase):
     boards = [link.Link]
     """Links to the boards resource"""
 
+    campaigns = [link.Link]
+    """Links to the injection campaigns resource"""
+
+    groups = [link.Link]
+    """Links to the groups of boards resource"""
+
+    schedules = [link.Link]
+    """Links to the schedules resource"""
+
     @staticmethod
     def convert():
         v1 = V1()
@@ -89,6 +101,30 @@ class V1(base.APIBase):
                                          bookmark=True)
                      ]
 
+        v1.campaigns = [link.Link.make_link('self', pecan.request.public_url,
+                                            'campaigns', ''),
+                        link.Link.make_link('bookmark',
+                                            pecan.request.public_url,
+                                            'campaigns', '',
+                                            bookmark=True)
+                        ]
+
+        v1.groups = [link.Link.make_link('self', pecan.request.public_url,
+                                         'groups', ''),
+                     link.Link.make_link('bookmark',
+                                         pecan.request.public_url,
+                                         'groups', '',
+                                         bookmark=True)
+                     ]
+
+        v1.schedules = [link.Link.make_link('self', pecan.request.public_url,
+                                            'schedules', ''),
+                        link.Link.make_link('bookmark',
+                                            pecan.request.public_url,
+                                            'schedules', '',
+                                            bookmark=True)
+                        ]
+
         return v1
 
 
@@ -97,6 +133,9 @@ class Controller(rest.RestController):
 
     boards = board.BoardsController()
     plugins = plugin.PluginsController()
+    campaigns = campaign.CampaignsController()
+    groups = group.GroupsController()
+    schedules = schedule.SchedulesController()
 
     @expose.expose(V1)
     def get(self):
@@ -10,6 +10,9 @@
 #  License for the specific language governing permissions and limitations
 #  under the License.
 
+import datetime
+import functools
+import json
 
 from iotronic.api.controllers import base
 from iotronic.api.controllers import link
@@ -18,9 +21,13 @@ from iotronic.api.controllers.v1 import location as loc
 from iotronic.api.controllers.v1 import types
 from iotronic.api.controllers.v1 import utils as api_utils
 from iotronic.api import expose
+from iotronic.common import events as events_api
 from iotronic.common import exception
+from iotronic.common.i18n import _
 from iotronic.common import policy
 from iotronic import objects
+from iotronic.telemetry import api as telemetry_api
+from oslo_utils import timeutils
 import pecan
 from pecan import rest
 import wsme
@@ -28,6 +35,30 @@ from wsme import types as wtypes
 
 _DEFAULT_RETURN_FIELDS = ('name', 'code', 'status', 'uuid', 'session', 'type')
 
+# the watcher has to list the boards again
+_SSE_RESET = b'event: reset\ndata: {}\n\n'
+
+
+def _sse(event):
+    return ('id: %d\nevent: %s\ndata: %s\n\n' % (
+        event['seq'], event['type'], json.dumps(event))).encode('utf-8')
+
+
+def _event_stream(sub, replay):
+    try:
+        if replay is None:
+            yield _SSE_RESET
+            replay = []
+        for event in replay:
+            yield _sse(event)
+        keepalive = events_api.CONF.events.keepalive_interval
+        # a watcher too slow is disconnected, it resumes from its last id
+        while not sub.overflowed:
+            event = sub.get(keepalive)
+            yield _sse(event) if event else b': keepalive\n\n'
+    finally:
+        events_api.HUB.unsubscribe(sub)
+
 
 class Board(base.APIBase):
     """API representation of a board.
@@ -72,19 +103,23 @@ class Board(base.APIBase):
         return board
 
     @classmethod
-    def convert_with_links(cls, rpc_board, fields=None):
+    def convert_with_links(cls, rpc_board, fields=None, context=None,
+                           url=None):
+        # context and url are given when the request is gone (streaming)
+        context = context or pecan.request.context
+        url = url or pecan.request.public_url
         board = Board(**rpc_board.as_dict())
 
         try:
             session = objects.SessionWP.get_session_by_board_uuid(
-                pecan.request.context, board.uuid)
+                context, board.uuid)
             board.session = session.session_id
         except Exception:
             board.session = None
 
         try:
             list_loc = objects.Location.list_by_board_uuid(
-                pecan.request.context, board.uuid)
+                context, board.uuid)
             board.location = loc.Location.convert_with_list(list_loc)
         except Exception:
             board.location = []
@@ -94,9 +129,7 @@ class Board(base.APIBase):
         # if fields is not None:
         #    api_utils.check_for_invalid_fields(fields, board_dict)
 
-        return cls._convert_with_links(board,
-                                       pecan.request.public_url,
-                                       fields=fields)
+        return cls._convert_with_links(board, url, fields=fields)
 
 
 class BoardCollection(collection.Collection):
@@ -282,17 +315,161 @@ class BoardPluginsController(rest.RestController):
                                                   rpc_board.uuid)
 
 
+class BoardTags(base.APIBase):
+    """The tags of a board."""
+
+    tags = [wtypes.text]
+
+    def __init__(self, **kwargs):
+        self.fields = ['tags']
+        self.tags = kwargs.get('tags', wtypes.Unset)
+
+
+def _validate_tag(tag):
+    # a tag is selected with ?tags=a,b: no comma
+    if not tag or len(tag) > 255 or ',' in tag:
+        raise exception.InvalidParameterValue(
+            ("Invalid tag %s: a tag is a non empty string of at most 255 "
+             "characters, without commas.") % tag)
+    return tag
+
+
+class BoardTagsController(rest.RestController):
+    """REST controller for the tags of a board."""
+
+    def __init__(self, board_ident):
+        self.board_ident = board_ident
+
+    def _authorize(self, rule):
+        cdict = pecan.request.context.to_policy_values()
+        policy.authorize(rule, cdict, cdict)
+        return api_utils.get_rpc_board(self.board_ident)
+
+    @expose.expose(BoardTags)
+    def get_all(self):
+        """Retrieve the tags of a board."""
+        rpc_board = self._authorize('iot:board:get')
+        return BoardTags(tags=rpc_board.get_tags())
+
+    @expose.expose(BoardTags, wtypes.text, body=BoardTags, status_code=200)
+    def put(self, tag=None, new_tags=None):
+        """Tag a board, or replace all its tags.
+
+        PUT /boards/<board>/tags/<tag> adds a tag; PUT /boards/<board>/tags
+        with a list of tags in the body replaces the tags of the board.
+
+        :param tag: the tag to add.
+        :param new_tags: the new tags within the request body.
+        """
+        rpc_board = self._authorize('iot:board:update')
+        if tag:
+            rpc_board.add_tag(_validate_tag(tag))
+            return BoardTags(tags=rpc_board.get_tags())
+
+        if not new_tags or new_tags.tags is wtypes.Unset:
+            raise exception.MissingParameterValue(
+                ("Tags are not specified."))
+        tags = rpc_board.set_tags([_validate_tag(t) for t in new_tags.tags])
+        return BoardTags(tags=tags)
+
+    @expose.expose(None, wtypes.text, status_code=204)
+    def delete(self, tag=None):
+        """Remove a tag from a board, or all its tags.
+
+        :param tag: the tag to remove, None to remove every tag.
+        """
+        rpc_board = self._authorize('iot:board:update')
+        if tag:
+            rpc_board.remove_tag(tag)
+        else:
+            rpc_board.set_tags([])
+
+
+class TelemetryReading(base.APIBase):
+    """API representation of a telemetry reading."""
+
+    metric = wsme.wsattr(wtypes.text)
+    value = types.jsontype
+    timestamp = datetime.datetime
+
+    def __init__(self, **kwargs):
+        self.fields = ['metric', 'value', 'timestamp']
+        for k in self.fields:
+            setattr(self, k, kwargs.get(k, wtypes.Unset))
+
+
+class TelemetryCollection(collection.Collection):
+    """API representation of the readings of a board."""
+
+    readings = [TelemetryReading]
+
+    def __init__(self, **kwargs):
+        self._type = 'readings'
+
+    @staticmethod
+    def convert(readings):
+        collection = TelemetryCollection()
+        collection.readings = [
+            TelemetryReading(metric=r.metric, value=r.value,
+                             timestamp=datetime.datetime.utcfromtimestamp(
+                                 r.timestamp))
+            for r in readings]
+        return collection
+
+
+def _to_epoch(dt):
+    if dt is None:
+        return None
+    return timeutils.delta_seconds(datetime.datetime(1970, 1, 1),
+                                   timeutils.normalize_time(dt))
+
+
+class BoardTelemetryController(rest.RestController):
+    def __init__(self, board_ident):
+        self.board_ident = board_ident
+
+    @expose.expose(TelemetryCollection, wtypes.text, datetime.datetime,
+                   datetime.datetime, int)
+    def get_all(self, metric=None, start=None, end=None, limit=None):
+        """Retrieve the readings published by a board.
+
+        :param metric: Optional, return only the readings of this metric.
+        :param start: Optional, ISO 8601 lower bound of the range.
+        :param end: Optional, ISO 8601 upper bound of the range.
+        :param limit: maximum number of readings to return.
+        """
+        rpc_board = api_utils.get_rpc_board(self.board_ident)
+
+        cdict = pecan.request.context.to_policy_values()
+        cdict['owner'] = rpc_board.owner
+        policy.authorize('iot:board_telemetry:get', cdict, cdict)
+
+        limit = api_utils.validate_limit(limit)
+        start = _to_epoch(start)
+        end = _to_epoch(end)
+        if start is not None and end is not None and start > end:
+            raise exception.InvalidParameterValue(
+                err=_("The start of the range is after its end."))
+
+        readings = telemetry_api.get_instance().get_readings(
+            rpc_board.uuid, metric=metric, start=start, end=end, limit=limit)
+        return TelemetryCollection.convert(readings)
+
+
 class BoardsController(rest.RestController):
     """REST controller for Boards."""
 
     _subcontroller_map = {
         'plugins': BoardPluginsController,
+        'telemetry': BoardTelemetryController,
+        'tags': BoardTagsController,
     }
 
     invalid_sort_key_list = ['extra', 'location']
 
     _custom_actions = {
         'detail': ['GET'],
+        'events': ['GET'],
     }
 
     @pecan.expose()
@@ -310,7 +487,7 @@ class BoardsController(rest.RestController):
 
     def _get_boards_collection(self, status, marker, limit,
                                sort_key, sort_dir,
-                               project=None,
+                               project=None, tags=None, group=None,
                                resource_url=None, fields=None):
 
         limit = api_utils.validate_limit(limit)
@@ -342,13 +519,34 @@ class BoardsController(rest.RestController):
 
         if status:
             filters['status'] = status
+        if tags:
+            filters['tags'] = sorted(set(tags))
+        if group:
+            filters['group'] = api_utils.get_rpc_board_group(group).uuid
+
+        # read before the listing: a change in between can only make the
+        # ETag stale, never the content
+        state = pecan.request.dbapi.get_board_list_state(filters)
+        api_utils.check_etag('boards', state, sorted(filters.items()))
+
+        parameters = {'sort_key': sort_key, 'sort_dir': sort_dir}
+
+        if api_utils.should_stream(limit):
+            context = pecan.request.context
+            boards = objects.Board.stream(context, limit, marker_obj,
+                                          sort_key=sort_key,
+                                          sort_dir=sort_dir,
+                                          filters=filters)
+            convert = functools.partial(Board.convert_with_links,
+                                        fields=fields, context=context,
+                                        url=pecan.request.public_url)
+            return BoardCollection.stream(boards, Board, convert, limit,
+                                          url=resource_url, **parameters)
 
         boards = objects.Board.list(pecan.request.context, limit, marker_obj,
                                     sort_key=sort_key, sort_dir=sort_dir,
                                     filters=filters)
 
-        parameters = {'sort_key': sort_key, 'sort_dir': sort_dir}
-
         return BoardCollection.convert_with_links(boards, limit,
                                                   url=resource_url,
                                                   fields=fields,
@@ -368,13 +566,17 @@ class BoardsController(rest.RestController):
 
         rpc_board = api_utils.get_rpc_board(board_ident)
 
+        # the revision covers the session and the location of the board
+        api_utils.check_etag('board', rpc_board.uuid, rpc_board.revision)
+
         return Board.convert_with_links(rpc_board, fields=fields)
 
     @expose.expose(BoardCollection, wtypes.text, types.uuid, int, wtypes.text,
-                   wtypes.text, types.listtype, wtypes.text)
+                   wtypes.text, types.listtype, wtypes.text, types.listtype,
+                   wtypes.text)
     def get_all(self, status=None, marker=None,
                 limit=None, sort_key='id', sort_dir='asc',
-                fields=None, project=None):
+                fields=None, project=None, tags=None, group=None):
         """Retrieve a list of boards.
 
         :param status: Optional string value to get only board in
@@ -388,6 +590,9 @@ class BoardsController(rest.RestController):
         :param sort_dir: direction to sort. "asc" or "desc". Default: asc.
         :param fields: Optional, a list with a specified set of fields
                        of the resource to be returned.
+        :param tags: Optional, a list of tags: only the boards having all
+                     of them.
+        :param group: Optional, UUID or name of a group: only its boards.
         """
         cdict = pecan.request.context.to_policy_values()
         policy.authorize('iot:board:get', cdict, cdict)
@@ -396,7 +601,8 @@ class BoardsController(rest.RestController):
             fields = _DEFAULT_RETURN_FIELDS
         return self._get_boards_collection(status, marker,
                                            limit, sort_key, sort_dir,
-                                           fields=fields, project=project)
+                                           fields=fields, project=project,
+                                           tags=tags, group=group)
 
     @expose.expose(Board, body=Board, status_code=201)
     def post(self, Board):
@@ -478,11 +684,68 @@ class BoardsController(rest.RestController):
             board)
         return Board.convert_with_links(updated_board)
 
+    @pecan.expose(content_type='text/event-stream')
+    def events(self, status=None, project=None, since=None):
+        """Stream the changes of the boards as Server-Sent Events.
+
+        The id of an event is its sequence number, the event field its
+        type (registration, status, session, injection or deleted) and
+        the data the change in JSON. A watcher resumes after the last id
+        it received with the Last-Event-ID header or since. A reset event
+        tells that the events in between are lost: the boards have to be
+        listed again, the events that follow apply on top.
+
+        :param status: Optional, only the events of the boards in that
+                       status.
+        :param project: Optional, the boards of this project; admin only.
+        :param since: Optional, resume after this event.
+        """
+        if not events_api.CONF.events.enabled:
+            pecan.abort(404)
+        if not events_api.can_stream():
+            # each watcher would hold a thread of mod_wsgi forever
+            pecan.abort(501, 'The board events are served only by '
+                             'iotronic-api.')
+
+        context = pecan.request.context
+        cdict = context.to_policy_values()
+        try:
+            policy.authorize('iot:board:get', cdict, cdict)
+        except exception.HTTPForbidden as e:
+            pecan.abort(403, e.args[0])
+
+        if project and not context.is_admin:
+            pecan.abort(400, 'Project parameter can be used only by the '
+                             'administrator.')
+        project = project or context.project_id
+
+        since = pecan.request.headers.get('Last-Event-ID', since)
+        if since is not None:
+            try:
+                since = int(since)
+            except ValueError:
+                pecan.abort(400, 'Invalid event id: %s' % since)
+
+        try:
+            sub, replay = events_api.HUB.subscribe(project=project,
+                                                   status=status,
+                                                   since=since)
+        except exception.TooManyWatchers as e:
+            # the other workers behind the socket may have room
+            pecan.abort(503, e.args[0],
+                        headers={'Retry-After': str(e.kwargs['retry_after'])})
+        pecan.response.headers['Cache-Control'] = 'no-cache'
+        # no buffering by a reverse proxy
+        pecan.response.headers['X-Accel-Buffering'] = 'no'
+        pecan.request.stream = _event_stream(sub, replay)
+        return ''
+
     @expose.expose(BoardCollection, wtypes.text, types.uuid, int, wtypes.text,
-                   wtypes.text, types.listtype, wtypes.text)
+                   wtypes.text, types.listtype, wtypes.text, types.listtype,
+                   wtypes.text)
     def detail(self, status=None, marker=None,
                limit=None, sort_key='id', sort_dir='asc',
-               fields=None, project=None):
+               fields=None, project=None, tags=None, group=None):
         """Retrieve a list of boards.
 
         :param status: Optional string value to get only board in
@@ -498,6 +761,9 @@ class BoardsController(rest.RestController):
                         of the project.
         :param fields: Optional, a list with a specified set of fields
                        of the resource to be returned.
+        :param tags: Optional, a list of tags: only the boards having all
+                     of them.
+        :param group: Optional, UUID or name of a group: only its boards.
         """
 
         cdict = pecan.request.context.to_policy_values()
@@ -511,4 +777,5 @@ class BoardsController(rest.RestController):
         return self._get_boards_collection(status, marker,
                                            limit, sort_key, sort_dir,
                                            project=project,
+                                           tags=tags, group=group,
                                            fields=fields)
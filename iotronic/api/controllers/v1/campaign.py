@@ -0,0 +1,287 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from iotronic.api.controllers import base
+from iotronic.api.controllers import link
+from iotronic.api.controllers.v1 import collection
+from iotronic.api.controllers.v1 import types
+from iotronic.api.controllers.v1 import utils as api_utils
+from iotronic.api import expose
+from iotronic.common import exception
+from iotronic.common import policy
+from iotronic import objects
+
+import pecan
+from pecan import rest
+import wsme
+from wsme import types as wtypes
+
+_DEFAULT_RETURN_FIELDS = ('uuid', 'plugin', 'status', 'total')
+
+_SELECTOR_KEYS = ('project', 'type', 'boards', 'tags', 'group')
+
+
+def check_selector(context, selector):
+    """Validate a board selector and bound it to the project of the user.
+
+    :returns: the selector to store.
+    """
+    selector = selector or {}
+    if not isinstance(selector, dict) or not selector:
+        raise exception.MissingParameterValue(
+            ("Selector is not specified."))
+    invalid = set(selector) - set(_SELECTOR_KEYS)
+    if invalid:
+        raise exception.InvalidParameterValue(
+            ("Invalid selector keys: %s") % ', '.join(sorted(invalid)))
+    if not context.is_admin:
+        if selector.get('project', context.project_id) != \
+                context.project_id:
+            msg = ("Project selector can be used only "
+                   "by the administrator.")
+            raise wsme.exc.ClientSideError(msg, status_code=400)
+        selector['project'] = context.project_id
+    if selector.get('tags'):
+        if not isinstance(selector['tags'], list):
+            raise exception.InvalidParameterValue(
+                ("Tags selector must be a list."))
+        selector['tags'] = sorted(set(selector['tags']))
+    if selector.get('group'):
+        # stored by uuid: a renamed group keeps its campaigns and schedules
+        selector['group'] = api_utils.get_rpc_board_group(
+            selector['group']).uuid
+    return selector
+
+
+class Campaign(base.APIBase):
+    """API representation of an injection campaign.
+
+    """
+    uuid = types.uuid
+    plugin = types.uuid_or_name
+    onboot = types.boolean
+    owner = types.uuid
+    project = types.uuid
+    status = wsme.wsattr(wtypes.text, readonly=True)
+    concurrency = int
+    selector = types.jsontype
+    total = wsme.wsattr(int, readonly=True)
+    progress = wsme.wsattr(types.jsontype, readonly=True)
+    links = wsme.wsattr([link.Link], readonly=True)
+
+    def __init__(self, **kwargs):
+        self.fields = []
+        fields = list(objects.InjectionCampaign.fields)
+        fields.append('progress')
+        for k in fields:
+            # Skip fields we do not expose.
+            if not hasattr(self, k):
+                continue
+            self.fields.append(k)
+            setattr(self, k, kwargs.get(k, wtypes.Unset))
+        self.fields.append('plugin')
+        setattr(self, 'plugin', kwargs.get('plugin_uuid', wtypes.Unset))
+
+    @staticmethod
+    def _convert_with_links(campaign, url, fields=None):
+        campaign_uuid = campaign.uuid
+        if fields is not None:
+            campaign.unset_fields_except(fields)
+
+        campaign.links = [link.Link.make_link('self', url, 'campaigns',
+                                              campaign_uuid),
+                          link.Link.make_link('bookmark', url, 'campaigns',
+                                              campaign_uuid, bookmark=True)
+                          ]
+        return campaign
+
+    @classmethod
+    def convert_with_links(cls, rpc_campaign, fields=None, progress=False):
+        values = rpc_campaign.as_dict()
+        if progress:
+            values['progress'] = rpc_campaign.progress()
+        campaign = Campaign(**values)
+
+        if fields is not None:
+            api_utils.check_for_invalid_fields(fields, campaign.as_dict())
+
+        return cls._convert_with_links(campaign, pecan.request.public_url,
+                                       fields=fields)
+
+
+class CampaignCollection(collection.Collection):
+    """API representation of a collection of injection campaigns."""
+
+    campaigns = [Campaign]
+    """A list containing campaigns objects"""
+
+    def __init__(self, **kwargs):
+        self._type = 'campaigns'
+
+    @staticmethod
+    def convert_with_links(campaigns, limit, url=None, fields=None,
+                           **kwargs):
+        collection = CampaignCollection()
+        collection.campaigns = [Campaign.convert_with_links(n, fields=fields)
+                                for n in campaigns]
+        collection.next = collection.get_next(limit, url=url, **kwargs)
+        return collection
+
+
+class CampaignsController(rest.RestController):
+    """REST controller for injection campaigns."""
+
+    invalid_sort_key_list = ['selector']
+
+    def _get_campaigns_collection(self, status, marker, limit,
+                                  sort_key, sort_dir, fields=None):
+
+        limit = api_utils.validate_limit(limit)
+        sort_dir = api_utils.validate_sort_dir(sort_dir)
+
+        marker_obj = None
+        if marker:
+            marker_obj = objects.InjectionCampaign.get_by_uuid(
+                pecan.request.context, marker)
+
+        if sort_key in self.invalid_sort_key_list:
+            raise exception.InvalidParameterValue(
+                ("The sort_key value %(key)s is an invalid field for "
+                 "sorting") % {'key': sort_key})
+
+        filters = {}
+        if not pecan.request.context.is_admin:
+            filters['owner'] = pecan.request.context.user_id
+        if status:
+            filters['status'] = status
+
+        campaigns = objects.InjectionCampaign.list(pecan.request.context,
+                                                   limit, marker_obj,
+                                                   sort_key=sort_key,
+                                                   sort_dir=sort_dir,
+                                                   filters=filters)
+
+        parameters = {'sort_key': sort_key, 'sort_dir': sort_dir}
+
+        return CampaignCollection.convert_with_links(campaigns, limit,
+                                                     fields=fields,
+                                                     **parameters)
+
+    @expose.expose(Campaign, types.uuid, types.listtype)
+    def get_one(self, campaign_uuid, fields=None):
+        """Retrieve an injection campaign and its progress.
+
+        :param campaign_uuid: UUID of a campaign.
+        :param fields: Optional, a list with a specified set of fields
+            of the resource to be returned.
+        """
+        rpc_campaign = objects.InjectionCampaign.get_by_uuid(
+            pecan.request.context, campaign_uuid)
+        cdict = pecan.request.context.to_policy_values()
+        cdict['owner'] = rpc_campaign.owner
+        policy.authorize('iot:campaign:get_one', cdict, cdict)
+
+        return Campaign.convert_with_links(rpc_campaign, fields=fields,
+                                           progress=True)
+
+    @expose.expose(CampaignCollection, wtypes.text, types.uuid, int,
+                   wtypes.text, wtypes.text, types.listtype)
+    def get_all(self, status=None, marker=None, limit=None, sort_key='id',
+                sort_dir='asc', fields=None):
+        """Retrieve a list of injection campaigns.
+
+        :param status: Optional, return only the campaigns in this status.
+        :param marker: pagination marker for large data sets.
+        :param limit: maximum number of resources to return in a single result.
+                      This value cannot be larger than the value of max_limit
+                      in the [api] section of the ironic configuration, or only
+                      max_limit resources will be returned.
+        :param sort_key: column to sort results by. Default: id.
+        :param sort_dir: direction to sort. "asc" or "desc". Default: asc.
+        :param fields: Optional, a list with a specified set of fields
+                       of the resource to be returned.
+        """
+        cdict = pecan.request.context.to_policy_values()
+        policy.authorize('iot:campaign:get', cdict, cdict)
+
+        if fields is None:
+            fields = _DEFAULT_RETURN_FIELDS
+        return self._get_campaigns_collection(status, marker, limit,
+                                              sort_key, sort_dir,
+                                              fields=fields)
+
+    @expose.expose(Campaign, body=Campaign, status_code=201)
+    def post(self, Campaign):
+        """Inject a plugin into every board matched by a selector.
+
+        The selector can contain a 'project', a board 'type', a list of
+        'boards' uuids, a list of 'tags' and a 'group' uuid or name; the
+        boards must match all of them. Only the administrator can select
+        the boards of another project.
+
+        :param Campaign: a Campaign within the request body.
+        """
+        context = pecan.request.context
+        cdict = context.to_policy_values()
+        policy.authorize('iot:campaign:create', cdict, cdict)
+
+        if not Campaign.plugin:
+            raise exception.MissingParameterValue(
+                ("Plugin is not specified."))
+
+        selector = check_selector(context, Campaign.selector)
+
+        if Campaign.concurrency is not wtypes.Unset and \
+                Campaign.concurrency is not None and Campaign.concurrency < 1:
+            raise exception.InvalidParameterValue(
+                ("Concurrency must be a positive integer."))
+
+        rpc_plugin = api_utils.get_rpc_plugin(Campaign.plugin)
+        if not rpc_plugin.public:
+            cdict['owner'] = rpc_plugin.owner
+            policy.authorize('iot:plugin_inject:put', cdict, cdict)
+
+        new_Campaign = objects.InjectionCampaign(context)
+        new_Campaign.plugin_uuid = rpc_plugin.uuid
+        new_Campaign.onboot = bool(Campaign.onboot)
+        new_Campaign.selector = selector
+        if Campaign.concurrency:
+            new_Campaign.concurrency = Campaign.concurrency
+        new_Campaign.owner = context.user_id
+        new_Campaign.project = context.project_id
+
+        new_Campaign = pecan.request.rpcapi.create_campaign(context,
+                                                            new_Campaign)
+
+        return Campaign.convert_with_links(new_Campaign)
+
+    @expose.expose(Campaign, types.uuid, status_code=200)
+    def delete(self, campaign_uuid):
+        """Cancel an injection campaign.
+
+        The injections in flight complete, the pending ones are cancelled.
+
+        :param campaign_uuid: UUID of a campaign.
+        """
+        context = pecan.request.context
+        rpc_campaign = objects.InjectionCampaign.get_by_uuid(context,
+                                                             campaign_uuid)
+        cdict = context.to_policy_values()
+        cdict['owner'] = rpc_campaign.owner
+        policy.authorize('iot:campaign:delete', cdict, cdict)
+
+        rpc_campaign = pecan.request.rpcapi.cancel_campaign(context,
+                                                            rpc_campaign.uuid)
+        return Campaign.convert_with_links(rpc_campaign, progress=True)
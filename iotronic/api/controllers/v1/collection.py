@@ -13,12 +13,18 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import json
+
+from oslo_log import log
 import pecan
+from wsme.rest import json as wsme_json
 from wsme import types as wtypes
 
 from iotronic.api.controllers import base
 from iotronic.api.controllers import link
 
+LOG = log.getLogger(__name__)
+
 
 class Collection(base.APIBase):
 
@@ -46,3 +52,46 @@ class Collection(base.APIBase):
 
         return link.Link.make_link('next', pecan.request.public_url,
                                    resource_url, next_args).href
+
+    @classmethod
+    def stream(cls, objs, item_type, convert, limit, url=None, **kwargs):
+        """Send the collection in the response body, item by item.
+
+        The items are converted and serialized one at a time while the
+        body is sent, instead of building the whole page first. The
+        request is gone by then: convert must not use pecan.request.
+
+        :param objs: an iterator over the objects of the page.
+        :param item_type: the API type of the items.
+        :param convert: a function returning the item of an object.
+        :returns: an empty collection, replaced by the stream.
+        """
+        collection = cls()
+        public_url = pecan.request.public_url
+        resource_url = url or collection._type
+        q_args = ''.join(['%s=%s&' % (key, kwargs[key]) for key in kwargs])
+
+        def body():
+            yield ('{"%s": [' % collection._type).encode('utf-8')
+            count = 0
+            marker = None
+            try:
+                for obj in objs:
+                    item = wsme_json.tojson(item_type, convert(obj))
+                    yield ((', ' if count else '') +
+                           json.dumps(item)).encode('utf-8')
+                    count += 1
+                    marker = obj.uuid
+            except Exception:
+                LOG.exception('Streaming of the %s failed', collection._type)
+                raise
+            tail = ']'
+            if count and count == limit:
+                next_args = '?%(args)slimit=%(limit)d&marker=%(marker)s' % {
+                    'args': q_args, 'limit': limit, 'marker': marker}
+                tail += ', "next": %s' % json.dumps(link.build_url(
+                    resource_url, next_args, base_url=public_url))
+            yield (tail + '}').encode('utf-8')
+
+        pecan.request.stream = body()
+        return collection
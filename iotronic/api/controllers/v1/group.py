@@ -0,0 +1,321 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from iotronic.api.controllers import base
+from iotronic.api.controllers import link
+from iotronic.api.controllers.v1 import collection
+from iotronic.api.controllers.v1 import types
+from iotronic.api.controllers.v1 import utils as api_utils
+from iotronic.api import expose
+from iotronic.common import exception
+from iotronic.common import policy
+from iotronic import objects
+
+import pecan
+from pecan import rest
+import wsme
+from wsme import types as wtypes
+
+_DEFAULT_RETURN_FIELDS = ('uuid', 'name', 'description')
+
+
+class BoardGroup(base.APIBase):
+    """API representation of a group of boards.
+
+    """
+    uuid = types.uuid
+    name = wsme.wsattr(wtypes.text)
+    description = wsme.wsattr(wtypes.text)
+    owner = types.uuid
+    project = types.uuid
+    extra = types.jsontype
+    links = wsme.wsattr([link.Link], readonly=True)
+
+    def __init__(self, **kwargs):
+        self.fields = []
+        fields = list(objects.BoardGroup.fields)
+        for k in fields:
+            # Skip fields we do not expose.
+            if not hasattr(self, k):
+                continue
+            self.fields.append(k)
+            setattr(self, k, kwargs.get(k, wtypes.Unset))
+
+    @staticmethod
+    def _convert_with_links(group, url, fields=None):
+        group_uuid = group.uuid
+        if fields is not None:
+            group.unset_fields_except(fields)
+
+        group.links = [link.Link.make_link('self', url, 'groups',
+                                           group_uuid),
+                       link.Link.make_link('bookmark', url, 'groups',
+                                           group_uuid, bookmark=True)
+                       ]
+        return group
+
+    @classmethod
+    def convert_with_links(cls, rpc_group, fields=None):
+        group = BoardGroup(**rpc_group.as_dict())
+
+        if fields is not None:
+            api_utils.check_for_invalid_fields(fields, group.as_dict())
+
+        return cls._convert_with_links(group, pecan.request.public_url,
+                                       fields=fields)
+
+
+class BoardGroupCollection(collection.Collection):
+    """API representation of a collection of groups of boards."""
+
+    groups = [BoardGroup]
+    """A list containing groups objects"""
+
+    def __init__(self, **kwargs):
+        self._type = 'groups'
+
+    @staticmethod
+    def convert_with_links(groups, limit, url=None, fields=None, **kwargs):
+        collection = BoardGroupCollection()
+        collection.groups = [BoardGroup.convert_with_links(n, fields=fields)
+                             for n in groups]
+        collection.next = collection.get_next(limit, url=url, **kwargs)
+        return collection
+
+
+class GroupBoards(base.APIBase):
+    """The uuids of the boards of a group."""
+
+    boards = [types.uuid]
+
+    def __init__(self, **kwargs):
+        self.fields = ['boards']
+        self.boards = kwargs.get('boards', wtypes.Unset)
+
+
+class GroupBoardsController(rest.RestController):
+    """REST controller for the boards of a group."""
+
+    def __init__(self, group_ident):
+        self.group_ident = group_ident
+
+    def _authorize(self, rule):
+        cdict = pecan.request.context.to_policy_values()
+        policy.authorize(rule, cdict, cdict)
+        return api_utils.get_rpc_board_group(self.group_ident)
+
+    @expose.expose(GroupBoards)
+    def get_all(self):
+        """Retrieve the uuids of the boards of the group."""
+        rpc_group = self._authorize('iot:group:get')
+        return GroupBoards(boards=rpc_group.board_uuids())
+
+    @expose.expose(GroupBoards, body=GroupBoards, status_code=200)
+    def post(self, GroupBoards):
+        """Add a set of boards to the group.
+
+        The boards of another project than the one of the group are
+        ignored.
+
+        :param GroupBoards: the uuids of the boards within the request body.
+        """
+        if not GroupBoards.boards:
+            raise exception.MissingParameterValue(
+                ("Boards are not specified."))
+
+        rpc_group = self._authorize('iot:group:update')
+        rpc_group.add_boards(GroupBoards.boards)
+        return GroupBoards(boards=rpc_group.board_uuids())
+
+    @expose.expose(None, types.listtype, status_code=204)
+    def delete(self, boards=None):
+        """Remove a set of boards from the group.
+
+        :param boards: a comma separated list of board uuids.
+        """
+        if not boards:
+            raise exception.MissingParameterValue(
+                ("Boards are not specified."))
+
+        rpc_group = self._authorize('iot:group:update')
+        rpc_group.remove_boards(boards)
+
+
+class GroupsController(rest.RestController):
+    """REST controller for groups of boards."""
+
+    _subcontroller_map = {
+        'boards': GroupBoardsController,
+    }
+
+    invalid_sort_key_list = ['extra']
+
+    @pecan.expose()
+    def _lookup(self, ident, *remainder):
+        if not remainder:
+            return
+
+        subcontroller = self._subcontroller_map.get(remainder[0])
+        if subcontroller:
+            return subcontroller(group_ident=ident), remainder[1:]
+
+    def _get_groups_collection(self, marker, limit, sort_key, sort_dir,
+                               project=None, fields=None):
+
+        limit = api_utils.validate_limit(limit)
+        sort_dir = api_utils.validate_sort_dir(sort_dir)
+
+        marker_obj = None
+        if marker:
+            marker_obj = objects.BoardGroup.get_by_uuid(
+                pecan.request.context, marker)
+
+        if sort_key in self.invalid_sort_key_list:
+            raise exception.InvalidParameterValue(
+                ("The sort_key value %(key)s is an invalid field for "
+                 "sorting") % {'key': sort_key})
+
+        filters = {}
+
+        # bounding the request to a project
+        if project:
+            if pecan.request.context.is_admin:
+                filters['project'] = project
+            else:
+                msg = ("Project parameter can be used only "
+                       "by the administrator.")
+                raise wsme.exc.ClientSideError(msg,
+                                               status_code=400)
+        else:
+            filters['project'] = pecan.request.context.project_id
+
+        groups = objects.BoardGroup.list(pecan.request.context, limit,
+                                         marker_obj, sort_key=sort_key,
+                                         sort_dir=sort_dir, filters=filters)
+
+        parameters = {'sort_key': sort_key, 'sort_dir': sort_dir}
+
+        return BoardGroupCollection.convert_with_links(groups, limit,
+                                                       fields=fields,
+                                                       **parameters)
+
+    @expose.expose(BoardGroup, types.uuid_or_name, types.listtype)
+    def get_one(self, group_ident, fields=None):
+        """Retrieve information about the given group.
+
+        :param group_ident: UUID or name of a group.
+        :param fields: Optional, a list with a specified set of fields
+            of the resource to be returned.
+        """
+        cdict = pecan.request.context.to_policy_values()
+        policy.authorize('iot:group:get', cdict, cdict)
+
+        rpc_group = api_utils.get_rpc_board_group(group_ident)
+        return BoardGroup.convert_with_links(rpc_group, fields=fields)
+
+    @expose.expose(BoardGroupCollection, types.uuid, int, wtypes.text,
+                   wtypes.text, types.listtype, wtypes.text)
+    def get_all(self, marker=None, limit=None, sort_key='id',
+                sort_dir='asc', fields=None, project=None):
+        """Retrieve a list of groups of boards.
+
+        :param marker: pagination marker for large data sets.
+        :param limit: maximum number of resources to return in a single result.
+                      This value cannot be larger than the value of max_limit
+                      in the [api] section of the ironic configuration, or only
+                      max_limit resources will be returned.
+        :param sort_key: column to sort results by. Default: id.
+        :param sort_dir: direction to sort. "asc" or "desc". Default: asc.
+        :param fields: Optional, a list with a specified set of fields
+                       of the resource to be returned.
+        :param project: Optional string value to get only the groups
+                        of the project.
+        """
+        cdict = pecan.request.context.to_policy_values()
+        policy.authorize('iot:group:get', cdict, cdict)
+
+        if fields is None:
+            fields = _DEFAULT_RETURN_FIELDS
+        return self._get_groups_collection(marker, limit, sort_key,
+                                           sort_dir, project=project,
+                                           fields=fields)
+
+    @expose.expose(BoardGroup, body=BoardGroup, status_code=201)
+    def post(self, BoardGroup):
+        """Create a new group of boards in the project of the request.
+
+        :param BoardGroup: a BoardGroup within the request body.
+        """
+        context = pecan.request.context
+        cdict = context.to_policy_values()
+        policy.authorize('iot:group:create', cdict, cdict)
+
+        if not BoardGroup.name:
+            raise exception.MissingParameterValue(
+                ("Name is not specified."))
+        if not api_utils.is_valid_board_name(BoardGroup.name):
+            msg = ("Cannot create group with invalid name %(name)s")
+            raise wsme.exc.ClientSideError(msg % {'name': BoardGroup.name},
+                                           status_code=400)
+
+        new_Group = objects.BoardGroup(context)
+        new_Group.name = BoardGroup.name
+        if BoardGroup.description:
+            new_Group.description = BoardGroup.description
+        new_Group.extra = BoardGroup.extra or {}
+        new_Group.owner = context.user_id
+        new_Group.project = context.project_id
+        new_Group.create()
+
+        return BoardGroup.convert_with_links(new_Group)
+
+    @expose.expose(None, types.uuid_or_name, status_code=204)
+    def delete(self, group_ident):
+        """Delete a group; its boards are left untouched.
+
+        :param group_ident: UUID or name of a group.
+        """
+        context = pecan.request.context
+        cdict = context.to_policy_values()
+        policy.authorize('iot:group:delete', cdict, cdict)
+
+        rpc_group = api_utils.get_rpc_board_group(group_ident)
+        rpc_group.destroy()
+
+    @expose.expose(BoardGroup, types.uuid_or_name, body=BoardGroup,
+                   status_code=200)
+    def patch(self, group_ident, val_Group):
+        """Update a group.
+
+        :param group_ident: UUID or name of a group.
+        :param val_Group: values to be changed: name, description, extra.
+        :return updated_group: updated_group
+        """
+        context = pecan.request.context
+        cdict = context.to_policy_values()
+        policy.authorize('iot:group:update', cdict, cdict)
+
+        rpc_group = api_utils.get_rpc_board_group(group_ident)
+        values = val_Group.as_dict()
+        if 'name' in values and \
+                not api_utils.is_valid_board_name(values['name']):
+            msg = ("Cannot update group with invalid name %(name)s")
+            raise wsme.exc.ClientSideError(msg % {'name': values['name']},
+                                           status_code=400)
+        for key in ('name', 'description', 'extra'):
+            if key in values:
+                rpc_group[key] = values[key]
+        rpc_group.save()
+        return BoardGroup.convert_with_links(rpc_group)
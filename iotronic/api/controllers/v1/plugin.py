@@ -21,6 +21,7 @@ from iotronic.common import exception
 from iotronic.common import policy
 from iotronic import objects
 
+import functools
 import pecan
 from pecan import rest
 import wsme
@@ -67,13 +68,15 @@ class Plugin(base.APIBase):
         return plugin
 
     @classmethod
-    def convert_with_links(cls, rpc_plugin, fields=None):
+    def convert_with_links(cls, rpc_plugin, fields=None, url=None):
         plugin = Plugin(**rpc_plugin.as_dict())
 
         if fields is not None:
             api_utils.check_for_invalid_fields(fields, plugin.as_dict())
 
-        return cls._convert_with_links(plugin, pecan.request.public_url,
+        # url is given when the request is gone (streaming)
+        return cls._convert_with_links(plugin,
+                                       url or pecan.request.public_url,
                                        fields=fields)
 
 
@@ -134,12 +137,28 @@ class PluginsController(rest.RestController):
                 if with_public:
                     filters['public'] = with_public
 
+        # read before the listing: a change in between can only make the
+        # ETag stale, never the content
+        state = pecan.request.dbapi.get_plugin_list_state(filters)
+        api_utils.check_etag('plugins', state, sorted(filters.items()))
+
+        parameters = {'sort_key': sort_key, 'sort_dir': sort_dir}
+
+        if api_utils.should_stream(limit):
+            plugins = objects.Plugin.stream(pecan.request.context, limit,
+                                            marker_obj, sort_key=sort_key,
+                                            sort_dir=sort_dir,
+                                            filters=filters)
+            convert = functools.partial(Plugin.convert_with_links,
+                                        fields=fields,
+                                        url=pecan.request.public_url)
+            return PluginCollection.stream(plugins, Plugin, convert, limit,
+                                           **parameters)
+
         plugins = objects.Plugin.list(pecan.request.context, limit, marker_obj,
                                       sort_key=sort_key, sort_dir=sort_dir,
                                       filters=filters)
 
-        parameters = {'sort_key': sort_key, 'sort_dir': sort_dir}
-
         return PluginCollection.convert_with_links(plugins, limit,
                                                    fields=fields,
                                                    **parameters)
@@ -159,6 +178,8 @@ class PluginsController(rest.RestController):
             cdict['owner'] = rpc_plugin.owner
             policy.authorize('iot:plugin:get_one', cdict, cdict)
 
+        api_utils.check_etag('plugin', rpc_plugin.uuid, rpc_plugin.revision)
+
         return Plugin.convert_with_links(rpc_plugin, fields=fields)
 
     @expose.expose(PluginCollection, types.uuid, int, wtypes.text,
@@ -0,0 +1,314 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+
+from iotronic.api.controllers import base
+from iotronic.api.controllers import link
+from iotronic.api.controllers.v1 import campaign
+from iotronic.api.controllers.v1 import collection
+from iotronic.api.controllers.v1 import types
+from iotronic.api.controllers.v1 import utils as api_utils
+from iotronic.api import expose
+from iotronic.common import cron
+from iotronic.common import exception
+from iotronic.common import policy
+from iotronic import objects
+from oslo_utils import timeutils
+
+import pecan
+from pecan import rest
+import wsme
+from wsme import types as wtypes
+
+_DEFAULT_RETURN_FIELDS = ('uuid', 'name', 'plugin', 'action', 'cron',
+                          'enabled', 'next_run')
+
+
+class Schedule(base.APIBase):
+    """API representation of a schedule.
+
+    """
+    uuid = types.uuid
+    name = wsme.wsattr(wtypes.text)
+    plugin = types.uuid_or_name
+    action = wsme.wsattr(wtypes.text)
+    parameters = types.jsontype
+    cron = wsme.wsattr(wtypes.text)
+    selector = types.jsontype
+    enabled = types.boolean
+    owner = types.uuid
+    project = types.uuid
+    next_run = wsme.wsattr(datetime.datetime, readonly=True)
+    last_run = wsme.wsattr(datetime.datetime, readonly=True)
+    last_result = wsme.wsattr(types.jsontype, readonly=True)
+    links = wsme.wsattr([link.Link], readonly=True)
+
+    def __init__(self, **kwargs):
+        self.fields = []
+        fields = list(objects.Schedule.fields)
+        for k in fields:
+            # Skip fields we do not expose.
+            if not hasattr(self, k):
+                continue
+            self.fields.append(k)
+            setattr(self, k, kwargs.get(k, wtypes.Unset))
+        self.fields.append('plugin')
+        setattr(self, 'plugin', kwargs.get('plugin_uuid', wtypes.Unset))
+
+    @staticmethod
+    def _convert_with_links(schedule, url, fields=None):
+        schedule_uuid = schedule.uuid
+        if fields is not None:
+            schedule.unset_fields_except(fields)
+
+        schedule.links = [link.Link.make_link('self', url, 'schedules',
+                                              schedule_uuid),
+                          link.Link.make_link('bookmark', url, 'schedules',
+                                              schedule_uuid, bookmark=True)
+                          ]
+        return schedule
+
+    @classmethod
+    def convert_with_links(cls, rpc_schedule, fields=None):
+        schedule = Schedule(**rpc_schedule.as_dict())
+
+        if fields is not None:
+            api_utils.check_for_invalid_fields(fields, schedule.as_dict())
+
+        return cls._convert_with_links(schedule, pecan.request.public_url,
+                                       fields=fields)
+
+
+class ScheduleCollection(collection.Collection):
+    """API representation of a collection of schedules."""
+
+    schedules = [Schedule]
+    """A list containing schedules objects"""
+
+    def __init__(self, **kwargs):
+        self._type = 'schedules'
+
+    @staticmethod
+    def convert_with_links(schedules, limit, url=None, fields=None,
+                           **kwargs):
+        collection = ScheduleCollection()
+        collection.schedules = [Schedule.convert_with_links(n, fields=fields)
+                                for n in schedules]
+        collection.next = collection.get_next(limit, url=url, **kwargs)
+        return collection
+
+
+def _check_cron(expr):
+    """The first run of a cron expression, from now."""
+    try:
+        return cron.parse(expr).next(timeutils.utcnow())
+    except exception.InvalidCronExpression as e:
+        raise exception.InvalidParameterValue(e.args[0])
+
+
+def _check_action(action):
+    try:
+        objects.plugin.is_valid_action(action)
+    except exception.InvalidPluginAction as e:
+        raise exception.InvalidParameterValue(e.args[0])
+
+
+def _authorize_plugin(cdict, plugin_ident):
+    rpc_plugin = api_utils.get_rpc_plugin(plugin_ident)
+    if not rpc_plugin.public:
+        cdict = dict(cdict, owner=rpc_plugin.owner)
+        policy.authorize('iot:plugin_action:post', cdict, cdict)
+    return rpc_plugin
+
+
+class SchedulesController(rest.RestController):
+    """REST controller for schedules."""
+
+    invalid_sort_key_list = ['parameters', 'selector', 'last_result']
+
+    def _get_schedules_collection(self, enabled, marker, limit,
+                                  sort_key, sort_dir, fields=None):
+
+        limit = api_utils.validate_limit(limit)
+        sort_dir = api_utils.validate_sort_dir(sort_dir)
+
+        marker_obj = None
+        if marker:
+            marker_obj = objects.Schedule.get_by_uuid(
+                pecan.request.context, marker)
+
+        if sort_key in self.invalid_sort_key_list:
+            raise exception.InvalidParameterValue(
+                ("The sort_key value %(key)s is an invalid field for "
+                 "sorting") % {'key': sort_key})
+
+        filters = {}
+        if not pecan.request.context.is_admin:
+            filters['owner'] = pecan.request.context.user_id
+        if enabled is not None:
+            filters['enabled'] = enabled
+
+        schedules = objects.Schedule.list(pecan.request.context,
+                                          limit, marker_obj,
+                                          sort_key=sort_key,
+                                          sort_dir=sort_dir,
+                                          filters=filters)
+
+        parameters = {'sort_key': sort_key, 'sort_dir': sort_dir}
+
+        return ScheduleCollection.convert_with_links(schedules, limit,
+                                                     fields=fields,
+                                                     **parameters)
+
+    def _get_schedule(self, schedule_uuid, rule):
+        rpc_schedule = objects.Schedule.get_by_uuid(pecan.request.context,
+                                                    schedule_uuid)
+        cdict = pecan.request.context.to_policy_values()
+        cdict['owner'] = rpc_schedule.owner
+        policy.authorize(rule, cdict, cdict)
+        return rpc_schedule
+
+    @expose.expose(Schedule, types.uuid, types.listtype)
+    def get_one(self, schedule_uuid, fields=None):
+        """Retrieve a schedule and the result of its last run.
+
+        :param schedule_uuid: UUID of a schedule.
+        :param fields: Optional, a list with a specified set of fields
+            of the resource to be returned.
+        """
+        rpc_schedule = self._get_schedule(schedule_uuid,
+                                          'iot:schedule:get_one')
+        return Schedule.convert_with_links(rpc_schedule, fields=fields)
+
+    @expose.expose(ScheduleCollection, types.boolean, types.uuid, int,
+                   wtypes.text, wtypes.text, types.listtype)
+    def get_all(self, enabled=None, marker=None, limit=None, sort_key='id',
+                sort_dir='asc', fields=None):
+        """Retrieve a list of schedules.
+
+        :param enabled: Optional, return only the enabled or disabled
+                        schedules.
+        :param marker: pagination marker for large data sets.
+        :param limit: maximum number of resources to return in a single result.
+                      This value cannot be larger than the value of max_limit
+                      in the [api] section of the ironic configuration, or only
+                      max_limit resources will be returned.
+        :param sort_key: column to sort results by. Default: id.
+        :param sort_dir: direction to sort. "asc" or "desc". Default: asc.
+        :param fields: Optional, a list with a specified set of fields
+                       of the resource to be returned.
+        """
+        cdict = pecan.request.context.to_policy_values()
+        policy.authorize('iot:schedule:get', cdict, cdict)
+
+        if fields is None:
+            fields = _DEFAULT_RETURN_FIELDS
+        return self._get_schedules_collection(enabled, marker, limit,
+                                              sort_key, sort_dir,
+                                              fields=fields)
+
+    @expose.expose(Schedule, body=Schedule, status_code=201)
+    def post(self, Schedule):
+        """Run a plugin action on a set of boards at the times of a cron
+        expression.
+
+        The boards are selected as by the injection campaigns; they are
+        selected again at every run. The times are UTC.
+
+        :param Schedule: a Schedule within the request body.
+        """
+        context = pecan.request.context
+        cdict = context.to_policy_values()
+        policy.authorize('iot:schedule:create', cdict, cdict)
+
+        if not Schedule.plugin:
+            raise exception.MissingParameterValue(
+                ("Plugin is not specified."))
+        if not Schedule.action:
+            raise exception.MissingParameterValue(
+                ("Action is not specified."))
+        if not Schedule.cron:
+            raise exception.MissingParameterValue(
+                ("Cron expression is not specified."))
+
+        _check_action(Schedule.action)
+        next_run = _check_cron(Schedule.cron)
+        selector = campaign.check_selector(context, Schedule.selector)
+        rpc_plugin = _authorize_plugin(cdict, Schedule.plugin)
+
+        new_Schedule = objects.Schedule(context)
+        if Schedule.name:
+            new_Schedule.name = Schedule.name
+        new_Schedule.plugin_uuid = rpc_plugin.uuid
+        new_Schedule.action = Schedule.action
+        new_Schedule.parameters = Schedule.parameters or {}
+        new_Schedule.cron = Schedule.cron
+        new_Schedule.selector = selector
+        new_Schedule.enabled = Schedule.enabled is not False
+        new_Schedule.next_run = next_run
+        new_Schedule.owner = context.user_id
+        new_Schedule.project = context.project_id
+        new_Schedule.create()
+
+        return Schedule.convert_with_links(new_Schedule)
+
+    @expose.expose(Schedule, types.uuid, body=Schedule, status_code=200)
+    def patch(self, schedule_uuid, val_Schedule):
+        """Update a schedule.
+
+        A change of the cron expression, or enabling the schedule again,
+        moves the next run after the current time.
+
+        :param schedule_uuid: UUID of a schedule.
+        :param val_Schedule: values to be changed: name, action, parameters,
+                             cron, selector, enabled.
+        """
+        context = pecan.request.context
+        rpc_schedule = self._get_schedule(schedule_uuid,
+                                          'iot:schedule:update')
+        values = val_Schedule.as_dict()
+
+        if 'action' in values:
+            _check_action(values['action'])
+            rpc_schedule.action = values['action']
+        if 'selector' in values:
+            rpc_schedule.selector = campaign.check_selector(
+                context, values['selector'])
+        for key in ('name', 'parameters'):
+            if key in values:
+                rpc_schedule[key] = values[key]
+        if 'cron' in values:
+            rpc_schedule.cron = values['cron']
+            rpc_schedule.next_run = _check_cron(values['cron'])
+        if 'enabled' in values and \
+                bool(values['enabled']) != rpc_schedule.enabled:
+            rpc_schedule.enabled = bool(values['enabled'])
+            if rpc_schedule.enabled:
+                # no catch-up of the runs missed while disabled
+                rpc_schedule.next_run = _check_cron(rpc_schedule.cron)
+
+        rpc_schedule.save()
+        return Schedule.convert_with_links(rpc_schedule)
+
+    @expose.expose(None, types.uuid, status_code=204)
+    def delete(self, schedule_uuid):
+        """Delete a schedule; a run in progress completes.
+
+        :param schedule_uuid: UUID of a schedule.
+        """
+        rpc_schedule = self._get_schedule(schedule_uuid,
+                                          'iot:schedule:delete')
+        rpc_schedule.destroy()
@@ -13,10 +13,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import hashlib
+
 import jsonpatch
 from oslo_config import cfg
 from oslo_utils import uuidutils
 import pecan
+import six
 import wsme
 
 from iotronic.common import exception
@@ -41,6 +44,12 @@ def validate_limit(limit):
     return min(CONF.api.max_limit, limit)
 
 
+def should_stream(limit):
+    """Whether a page of this size is streamed instead of rendered."""
+    threshold = CONF.api.stream_threshold
+    return bool(threshold) and limit > threshold
+
+
 def validate_sort_dir(sort_dir):
     if sort_dir not in ['asc', 'desc']:
         raise wsme.exc.ClientSideError(_("Invalid sort direction: %s. "
@@ -70,6 +79,21 @@ def allow_board_logical_names():
     return pecan.request.version.minor >= 5
 
 
+def check_etag(*parts):
+    """Set the ETag of the response from the parts of the resource state.
+
+    The public URL, the path and the query string are part of the ETag,
+    as the links and the fields of the representation depend on them.
+
+    :raises: NotModified if the client sent the same ETag in If-None-Match.
+    """
+    parts = parts + (pecan.request.public_url, pecan.request.path_qs)
+    etag = hashlib.sha1(six.text_type(parts).encode('utf-8')).hexdigest()
+    pecan.response.etag = etag
+    if etag in pecan.request.if_none_match:
+        raise exception.NotModified()
+
+
 def get_rpc_board(board_ident):
     """Get the RPC board from the board uuid or logical name.
 
@@ -120,6 +144,28 @@ def get_rpc_plugin(plugin_ident):
     raise exception.PluginNotFound(plugin=plugin_ident)
 
 
+def get_rpc_board_group(group_ident):
+    """Get the RPC group of boards from its uuid or name.
+
+    A name is looked up in the project of the request. The groups of
+    another project are only visible to the administrator.
+
+    :param group_ident: the UUID or name of a group of boards.
+
+    :returns: The RPC BoardGroup.
+    :raises: BoardGroupNotFound if the group is not found.
+    """
+    context = pecan.request.context
+    if uuidutils.is_uuid_like(group_ident):
+        group = objects.BoardGroup.get_by_uuid(context, group_ident)
+    else:
+        group = objects.BoardGroup.get_by_name(context, context.project_id,
+                                               group_ident)
+    if group.project != context.project_id and not context.is_admin:
+        raise exception.BoardGroupNotFound(group=group_ident)
+    return group
+
+
 def is_valid_board_name(name):
     """Determine if the provided name is a valid board name.
 
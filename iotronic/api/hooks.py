@@ -14,13 +14,17 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import time
+
 from oslo_config import cfg
 from oslo_log import log
 from pecan import hooks
 from six.moves import http_client
 
 from iotronic.common import context
+from iotronic.common import metrics
 from iotronic.common import policy
+from iotronic.common import tracing
 from iotronic.conductor import rpcapi
 from iotronic.db import api as dbapi
 
@@ -83,6 +87,25 @@ class ContextHook(hooks.PecanHook):
         state.response.headers['Openstack-Request-Id'] = request_id
 
 
+class NotModifiedHook(hooks.PecanHook):
+    """Send the 304 responses without a body."""
+
+    def after(self, state):
+        if state.response.status_int == 304:
+            state.response.body = b''
+            state.response.content_type = None
+
+
+class StreamHook(hooks.PecanHook):
+    """Send the body streamed by a collection instead of the rendered one."""
+
+    def after(self, state):
+        app_iter = getattr(state.request, 'stream', None)
+        if app_iter is not None and state.response.status_int == 200:
+            state.response.app_iter = app_iter
+            state.response.content_length = None
+
+
 class RPCHook(hooks.PecanHook):
     """Attach the rpcapi object to the request so controllers can get to it."""
 
@@ -143,3 +166,59 @@ class PublicUrlHook(hooks.PecanHook):
     def before(self, state):
         state.request.public_url = (cfg.CONF.api.public_endpoint or
                                     state.request.host_url)
+
+
+class MetricsHook(hooks.PecanHook):
+    """Count and time the API requests of each route."""
+
+    requests = metrics.counter('iotronic_api_requests_total',
+                               'API requests, by route and status.',
+                               ['method', 'route', 'status'])
+    duration = metrics.histogram('iotronic_api_request_duration_seconds',
+                                 'Time spent serving the API requests.',
+                                 ['method', 'route'])
+
+    def on_route(self, state):
+        state.request.environ['iotronic.start_time'] = time.time()
+
+    def after(self, state):
+        start = state.request.environ.get('iotronic.start_time')
+        if start is None:
+            return
+        # the controller, not the path: the uuids would make one route
+        # per resource
+        controller = getattr(state, 'controller', None)
+        if controller is None:
+            route = 'unknown'
+        else:
+            route = '%s.%s' % (
+                getattr(controller, '__self__', controller).__class__.__name__,
+                getattr(controller, '__name__', 'unknown'))
+        method = state.request.method
+        self.duration.observe(time.time() - start, method=method,
+                              route=route)
+        self.requests.inc(method=method, route=route,
+                          status=state.response.status_int)
+
+
+class TracingHook(hooks.PecanHook):
+    """Record a span for every API request.
+
+    The span continues the trace of the traceparent header, if any, and is
+    the parent of the spans of the conductor.
+    """
+
+    def on_route(self, state):
+        span = tracing.start_span(
+            'api %s' % state.request.method,
+            parent=state.request.headers.get('traceparent'),
+            path=state.request.path)
+        state.request.environ['iotronic.span'] = span
+
+    def after(self, state):
+        span = state.request.environ.pop('iotronic.span', None)
+        if span is None:
+            return
+        span.attributes['status'] = state.response.status_int
+        state.response.headers['traceparent'] = span.traceparent
+        tracing.finish_span(span)
@@ -13,11 +13,14 @@
 # under the License.
 
 from iotronic.api.middleware import auth_token
+from iotronic.api.middleware import compression
 from iotronic.api.middleware import parsable_error
 
 
 ParsableErrorMiddleware = parsable_error.ParsableErrorMiddleware
 AuthTokenMiddleware = auth_token.AuthTokenMiddleware
+GzipMiddleware = compression.GzipMiddleware
 
 __all__ = ('ParsableErrorMiddleware',
-           'AuthTokenMiddleware')
+           'AuthTokenMiddleware',
+           'GzipMiddleware')
@@ -12,17 +12,87 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import collections
 import re
+import threading
 
 from keystonemiddleware import auth_token
+from oslo_config import cfg
 from oslo_log import log
+from oslo_utils import timeutils
 
 from iotronic.common import exception
 from iotronic.common.i18n import _
+from iotronic.common import metrics
 from iotronic.common import utils
 
 LOG = log.getLogger(__name__)
 
+token_cache_opts = [
+    cfg.IntOpt('token_cache_size',
+               default=10000,
+               min=0,
+               help='Number of validated tokens kept in memory by each API '
+                    'worker when [keystone_authtoken] has neither '
+                    'memcached_servers nor cache set. They expire after '
+                    '[keystone_authtoken]token_cache_time. 0 disables the '
+                    'cache.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(token_cache_opts, 'api')
+
+# key of the cache in the WSGI environment, see the cache option of
+# keystonemiddleware
+ENV_CACHE_KEY = 'iotronic.token_cache'
+
+LOOKUPS = metrics.counter('iotronic_token_cache_lookups_total',
+                          'Lookups in the local token cache, by result.',
+                          ['result'])
+
+
+class TokenCache(object):
+    """In-process cache of the validated tokens, bounded in size.
+
+    Implements the part of the memcache client interface used by
+    keystonemiddleware. The least recently used tokens are dropped first.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = timeutils.utcnow_ts(microsecond=True)
+        with self._lock:
+            try:
+                expires, value = self._entries.pop(key)
+            except KeyError:
+                LOOKUPS.inc(result='miss')
+                return None
+            if expires and now >= expires:
+                LOOKUPS.inc(result='expired')
+                return None
+            self._entries[key] = (expires, value)
+        LOOKUPS.inc(result='hit')
+        return value
+
+    def set(self, key, value, time=0, min_compress_len=0):
+        expires = 0
+        if time:
+            expires = timeutils.utcnow_ts(microsecond=True) + time
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expires, value)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return True
+
+    def delete(self, key, time=0):
+        with self._lock:
+            self._entries.pop(key, None)
+
 
 class AuthTokenMiddleware(auth_token.AuthProtocol):
     """A wrapper on Keystone auth_token middleware.
@@ -36,16 +106,28 @@ class AuthTokenMiddleware(auth_token.AuthProtocol):
         self._iotronic_app = app
         # TODO(mrda): Remove .xml and ensure that doesn't result in a
         # 401 Authentication Required instead of 404 Not Found
-        route_pattern_tpl = '%s(\.json|\.xml)?$'
+        route_pattern_tpl = '(?:%s)(\.json|\.xml)?$'
+
+        # a single pattern matching any of the public routes
+        self.public_api_routes = None
+        if api_routes:
+            try:
+                self.public_api_routes = re.compile(
+                    route_pattern_tpl % '|'.join('(?:%s)' % route_tpl
+                                                 for route_tpl in api_routes))
+            except re.error as e:
+                msg = _('Cannot compile public API routes: %s') % e
 
-        try:
-            self.public_api_routes = [re.compile(route_pattern_tpl % route_tpl)
-                                      for route_tpl in api_routes]
-        except re.error as e:
-            msg = _('Cannot compile public API routes: %s') % e
+                LOG.error(msg)
+                raise exception.ConfigInvalid(error_msg=msg)
 
-            LOG.error(msg)
-            raise exception.ConfigInvalid(error_msg=msg)
+        self._token_cache = None
+        authtoken = CONF.keystone_authtoken
+        if (CONF.api.token_cache_size and
+                not (authtoken.memcached_servers or authtoken.cache)):
+            # without memcached, every token would be validated by keystone
+            self._token_cache = TokenCache(CONF.api.token_cache_size)
+            conf = dict(conf, cache=ENV_CACHE_KEY)
 
         super(AuthTokenMiddleware, self).__init__(app, conf)
 
@@ -55,10 +137,12 @@ class AuthTokenMiddleware(auth_token.AuthProtocol):
         # The information whether the API call is being performed against the
         # public API is required for some other components. Saving it to the
         # WSGI environment is reasonable thereby.
-        env['is_public_api'] = any(map(lambda pattern: re.match(pattern, path),
-                                       self.public_api_routes))
+        env['is_public_api'] = bool(self.public_api_routes and
+                                    self.public_api_routes.match(path))
 
         if env['is_public_api']:
             return self._iotronic_app(env, start_response)
 
+        if self._token_cache is not None:
+            env[ENV_CACHE_KEY] = self._token_cache
         return super(AuthTokenMiddleware, self).__call__(env, start_response)
@@ -0,0 +1,138 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""
+Middleware compressing the responses with gzip, as negotiated with the
+Accept-Encoding header of the request.
+
+The body is compressed chunk by chunk: a streamed response stays streamed.
+"""
+
+import zlib
+
+from oslo_config import cfg
+
+CONF = cfg.CONF
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/plain')
+
+
+def accepts_gzip(accept_encoding):
+    """Whether gzip is an acceptable content coding (RFC 7231 5.3.4)."""
+    for coding in (accept_encoding or '').split(','):
+        params = coding.split(';')
+        if params[0].strip().lower() not in ('gzip', 'x-gzip', '*'):
+            continue
+        for param in params[1:]:
+            name, _sep, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def _header(headers, name):
+    name = name.lower()
+    for h, v in headers:
+        if h.lower() == name:
+            return v
+    return None
+
+
+class GzipMiddleware(object):
+    """Compress the JSON responses when the client accepts gzip."""
+
+    def __init__(self, app, min_size=None, level=None):
+        self.app = app
+        self.min_size = (CONF.api.compression_min_size
+                         if min_size is None else min_size)
+        self.level = level or CONF.api.compression_level
+
+    def _compressible(self, status, headers):
+        if not status.startswith('200'):
+            return False
+        content_type = (_header(headers, 'Content-Type') or '').split(';')[0]
+        if content_type.strip() not in COMPRESSIBLE_TYPES:
+            return False
+        if _header(headers, 'Content-Encoding'):
+            return False
+        length = _header(headers, 'Content-Length')
+        # no length: a streamed body, likely large
+        return length is None or int(length) >= self.min_size
+
+    def __call__(self, environ, start_response):
+        if (environ['REQUEST_METHOD'] == 'HEAD' or
+                not accepts_gzip(environ.get('HTTP_ACCEPT_ENCODING'))):
+            return self.app(environ, start_response)
+
+        state = {}
+
+        def capture_start_response(status, headers, exc_info=None):
+            state['response'] = (status, headers, exc_info)
+
+        app_iter = self.app(environ, capture_start_response)
+        chunks = iter(app_iter)
+        first = b''
+        if 'response' not in state:
+            # start_response is called on the first iteration
+            first = next(chunks, b'')
+        status, headers, exc_info = state['response']
+
+        if not self._compressible(status, headers):
+            start_response(status, headers, exc_info)
+            return self._passthrough(first, chunks, app_iter)
+
+        headers = [(h, v) for (h, v) in headers
+                   if h.lower() not in ('content-length', 'etag')]
+        etag = _header(state['response'][1], 'ETag')
+        if etag:
+            # the compressed body is not byte-identical: weak validator,
+            # still good for If-None-Match
+            headers.append(('ETag', etag if etag.startswith('W/')
+                            else 'W/' + etag))
+        vary = _header(headers, 'Vary')
+        if vary is None:
+            headers.append(('Vary', 'Accept-Encoding'))
+        elif 'accept-encoding' not in vary.lower():
+            headers = [(h, v) for (h, v) in headers if h.lower() != 'vary']
+            headers.append(('Vary', vary + ', Accept-Encoding'))
+        headers.append(('Content-Encoding', 'gzip'))
+        start_response(status, headers, exc_info)
+        return self._compress(first, chunks, app_iter)
+
+    @staticmethod
+    def _passthrough(first, chunks, app_iter):
+        try:
+            if first:
+                yield first
+            for chunk in chunks:
+                yield chunk
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+    def _compress(self, first, chunks, app_iter):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED,
+                                      16 + zlib.MAX_WBITS)
+        try:
+            if first:
+                yield compressor.compress(first)
+            for chunk in chunks:
+                data = compressor.compress(chunk)
+                if data:
+                    yield data
+            yield compressor.flush()
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Iotronic API, served without Apache
+"""
+
+import eventlet
+
+eventlet.monkey_patch(os=False)
+
+import sys  # noqa
+
+from oslo_config import cfg  # noqa
+import oslo_i18n as i18n  # noqa
+
+from iotronic.common import service as iotronic_service  # noqa
+from iotronic.common import wsgi_service  # noqa
+from iotronic.openstack.common import service  # noqa
+
+CONF = cfg.CONF
+
+
+def main():
+    i18n.install('iotronic')
+    iotronic_service.prepare_service(sys.argv)
+
+    server = wsgi_service.WSGIService('iotronic_api',
+                                      CONF.api.enable_ssl_api)
+    launcher = service.launch(server, workers=server.workers)
+    launcher.wait()
@@ -16,13 +16,26 @@
 Iotronic Conductor
 """
 
-from oslo_config import cfg
+import eventlet
 
-from iotronic.conductor.manager import ConductorManager
-import socket
+eventlet.monkey_patch(os=False)
+
+import sys  # noqa
+
+from oslo_config import cfg  # noqa
+
+from iotronic.common import service as iotronic_service  # noqa
+from iotronic.openstack.common import service  # noqa
 
 CONF = cfg.CONF
 
 
 def main():
-    ConductorManager(socket.gethostname())
+    iotronic_service.prepare_service(sys.argv)
+
+    mgr = iotronic_service.RPCService(CONF.host,
+                                      'iotronic.conductor.manager',
+                                      'ConductorManager')
+    workers = iotronic_service.get_worker_count(CONF.conductor.workers)
+    launcher = service.launch(mgr, workers=workers)
+    launcher.wait()
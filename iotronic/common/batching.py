@@ -0,0 +1,91 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Items queued by the callers and sent in batches by a background thread.
+
+Shared by the board events, their notifications and the tracing spans.
+"""
+
+import collections
+import threading
+
+
+class Batcher(object):
+    """Send the queued items in batches, from a background thread.
+
+    The thread starts with the first item. It sends the pending items
+    every interval, or as soon as batch_size of them are pending. The
+    subclasses read both from their options, at every use, and send the
+    items.
+
+    :param max_pending: the oldest items are dropped beyond, None for no
+                        limit.
+    """
+
+    def __init__(self, max_pending=None):
+        self._pending = collections.deque(maxlen=max_pending)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.dropped = 0
+
+    def interval(self):
+        raise NotImplementedError()
+
+    def batch_size(self):
+        raise NotImplementedError()
+
+    def send(self, items):
+        """Send pending items, in the order they were queued."""
+        raise NotImplementedError()
+
+    def on_dropped(self, count):
+        """Called by flush with the number of items dropped since."""
+
+    def add(self, items):
+        with self._lock:
+            if self._pending.maxlen is not None:
+                overflow = (len(self._pending) + len(items) -
+                            self._pending.maxlen)
+                if overflow > 0:
+                    self.dropped += overflow
+            self._pending.extend(items)
+            full = len(self._pending) >= self.batch_size()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop)
+                self._thread.daemon = True
+                self._thread.start()
+        if full:
+            self._wakeup.set()
+
+    def _loop(self):
+        while True:
+            self._wakeup.wait(self.interval())
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Send the pending items now, e.g. before exiting."""
+        # one sender at a time keeps the items in order
+        with self._flush_lock:
+            with self._lock:
+                pending = list(self._pending)
+                self._pending.clear()
+                dropped, self.dropped = self.dropped, 0
+            if dropped:
+                self.on_dropped(dropped)
+            if pending:
+                self.send(pending)
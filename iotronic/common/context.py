@@ -14,22 +14,26 @@
 
 from oslo_context import context
 
+from iotronic.common import tracing
+
 
 class RequestContext(context.RequestContext):
     """Extends security contexts from the oslo.context library."""
 
     def __init__(self, is_public_api=False, user_id=None,
-                 project_id=None, **kwargs):
+                 project_id=None, trace=None, **kwargs):
         """Initialize the RequestContext
 
         :param is_public_api: Specifies whether the request should be processed
             without authentication.
+        :param trace: the traceparent of the request, if traced.
         :param kwargs: additional arguments passed to oslo.context.
         """
         super(RequestContext, self).__init__(**kwargs)
         self.is_public_api = is_public_api
         self.project_id = project_id
         self.user_id = user_id
+        self.trace = trace
 
     def to_policy_values(self):
         policy_values = super(RequestContext, self).to_policy_values()
@@ -60,12 +64,15 @@ class RequestContext(context.RequestContext):
                 'domain_name': self.user_domain_name,
                 'is_public_api': self.is_public_api,
                 'user_id': self.user_id,
-                'project_id': self.project_id
+                'project_id': self.project_id,
+                # the span in progress when the context is sent
+                'trace': tracing.current_traceparent() or self.trace
                 }
 
     @classmethod
     def from_dict(cls, values, **kwargs):
         kwargs.setdefault('is_public_api', values.get('is_public_api', False))
+        kwargs.setdefault('trace', values.get('trace'))
         if 'domain_id' in values:
             kwargs.setdefault('user_domain', values['domain_id'])
         return super(RequestContext, RequestContext).from_dict(values,
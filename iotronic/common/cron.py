@@ -0,0 +1,151 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Cron expressions of the schedules.
+
+The five standard fields: minute, hour, day of month, month and day of
+week, each one a '*', a value, a range 'a-b' or a list of them, with an
+optional step '/n'. The months and the days of the week can be named
+(jan, mon). When both the day of month and the day of week are
+restricted, a day matching either of them matches, as in cron. The
+shortcuts @yearly, @monthly, @weekly, @daily and @hourly are accepted.
+
+The times are UTC.
+"""
+
+import datetime
+
+from iotronic.common import exception
+
+_MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep',
+           'oct', 'nov', 'dec']
+_DAYS = ['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat']
+
+# name, min, max, names (the first one is min)
+_FIELDS = [('minute', 0, 59, None),
+           ('hour', 0, 23, None),
+           ('day of month', 1, 31, None),
+           ('month', 1, 12, _MONTHS),
+           ('day of week', 0, 7, _DAYS)]
+
+_SHORTCUTS = {'@yearly': '0 0 1 1 *',
+              '@annually': '0 0 1 1 *',
+              '@monthly': '0 0 1 * *',
+              '@weekly': '0 0 * * 0',
+              '@daily': '0 0 * * *',
+              '@midnight': '0 0 * * *',
+              '@hourly': '0 * * * *'}
+
+# a valid expression matches at least once in 4 years (Feb 29th)
+_MAX_DAYS = 366 * 4 + 1
+
+
+def _value(expr, text, low, names):
+    if names and text.lower() in names:
+        return names.index(text.lower()) + low
+    try:
+        return int(text)
+    except ValueError:
+        raise exception.InvalidCronExpression(expr=expr)
+
+
+def _parse_field(expr, text, low, high, names):
+    values = set()
+    for part in text.split(','):
+        rng, _sep, step = part.partition('/')
+        step = _value(expr, step, 0, None) if step else 1
+        if rng == '*':
+            start, end = low, high
+        elif '-' in rng:
+            start, end = [_value(expr, v, low, names)
+                          for v in rng.split('-', 1)]
+        else:
+            start = _value(expr, rng, low, names)
+            # a/n is a to the end with a step n
+            end = high if _sep else start
+        if step < 1 or not low <= start <= end <= high:
+            raise exception.InvalidCronExpression(expr=expr)
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronExpression(object):
+    """A parsed cron expression."""
+
+    def __init__(self, expr):
+        self.expr = expr
+        fields = _SHORTCUTS.get(expr.strip().lower(), expr).split()
+        if len(fields) != len(_FIELDS):
+            raise exception.InvalidCronExpression(expr=expr)
+        (self.minutes, self.hours, self.days, self.months,
+         weekdays) = [_parse_field(expr, text, low, high, names)
+                      for text, (_name, low, high, names)
+                      in zip(fields, _FIELDS)]
+        # sunday is 0 or 7; isoweekday() % 7 numbers the days as cron
+        self.weekdays = frozenset(d % 7 for d in weekdays)
+        self._any_day = fields[2].startswith('*')
+        self._any_weekday = fields[4].startswith('*')
+
+    def _day_matches(self, dt):
+        day = dt.day in self.days
+        weekday = dt.isoweekday() % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next(self, after):
+        """The first time matching the expression strictly after a time.
+
+        :param after: a naive UTC datetime.
+        :returns: a naive UTC datetime, on a whole minute.
+        :raises: InvalidCronExpression if the expression never matches,
+                 e.g. on February 30th.
+        """
+        dt = (after.replace(second=0, microsecond=0) +
+              datetime.timedelta(minutes=1))
+        limit = dt + datetime.timedelta(days=_MAX_DAYS)
+        while dt < limit:
+            if dt.month not in self.months:
+                # first day of the next month
+                dt = (dt.replace(day=1, hour=0, minute=0) +
+                      datetime.timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(dt):
+                dt = (dt.replace(hour=0, minute=0) +
+                      datetime.timedelta(days=1))
+            elif dt.hour not in self.hours:
+                dt = (dt.replace(minute=0) + datetime.timedelta(hours=1))
+            elif dt.minute not in self.minutes:
+                dt += datetime.timedelta(minutes=1)
+            else:
+                return dt
+        raise exception.InvalidCronExpression(expr=self.expr)
+
+
+def parse(expr):
+    """Parse and check a cron expression.
+
+    :raises: InvalidCronExpression
+    """
+    if not expr:
+        raise exception.InvalidCronExpression(expr=expr)
+    cron = CronExpression(expr)
+    # refuse the expressions that never match
+    cron.next(datetime.datetime(2000, 1, 1))
+    return cron
+
+
+def next_run(expr, after):
+    """The next run of a schedule, strictly after a time."""
+    return CronExpression(expr).next(after)
@@ -0,0 +1,363 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Board events, pushed to the watchers of the API.
+
+The wamp agents and the conductors publish the changes of the boards
+(registration, status, session, injected plugins) on a fanout topic;
+every API worker receives all of them, keeps the last ones in a ring
+buffer and sends them to its watchers.
+
+The same events are sent in batches through the notifier, see
+iotronic.common.notifications.
+
+The events are numbered by a sequence stored in the database, shared by
+all the publishers: a watcher resumes from the last number it received,
+whichever API worker it reconnects to. When the events in between are not
+in the buffer anymore, the watcher is told to list the boards again. A
+publisher sends its events in batches, numbered with one update of the
+sequence, so a reconnection storm does not queue on its row.
+
+The watchers are served only by iotronic-api, where each request runs in
+a green thread: under Apache/mod_wsgi every watcher would hold one of the
+few threads of the process. Even so a watcher holds one green thread of
+the pool of its worker: each worker serves at most max_watchers.
+"""
+
+import bisect
+import os
+import threading
+
+from oslo_config import cfg
+from oslo_log import log
+import oslo_messaging as messaging
+from oslo_utils import importutils
+from oslo_utils import timeutils
+from six.moves import queue
+
+from iotronic.common import batching
+from iotronic.common import context as iotronic_context
+from iotronic.common import exception
+from iotronic.common import metrics
+from iotronic.common import notifications
+from iotronic.common import rpc
+from iotronic.db import api as dbapi
+from iotronic import objects
+
+LOG = log.getLogger(__name__)
+
+eventlet = importutils.try_import('eventlet')
+
+events_opts = [
+    cfg.BoolOpt('enabled',
+                default=True,
+                help='Publish the board events and serve them on '
+                     '/v1/boards/events. They are served only by '
+                     'iotronic-api, not under Apache/mod_wsgi.'),
+    cfg.FloatOpt('publish_interval',
+                 default=0.2,
+                 help='Maximum time (in seconds) a board event waits to be '
+                      'published with the following ones. 0 publishes '
+                      'each change right away.'),
+    cfg.IntOpt('publish_batch_size',
+               default=500,
+               min=1,
+               help='Maximum number of board events published together.'),
+    cfg.IntOpt('buffer_size',
+               default=1000,
+               min=1,
+               help='Number of events kept by each API worker for the '
+                    'watchers resuming after a disconnection.'),
+    cfg.IntOpt('queue_size',
+               default=100,
+               min=1,
+               help='Number of events waiting to be sent to a watcher. A '
+                    'watcher falling further behind is disconnected.'),
+    cfg.IntOpt('keepalive_interval',
+               default=15,
+               help='Seconds between two keep-alive comments sent to an '
+                    'idle watcher.'),
+    cfg.IntOpt('max_watchers',
+               default=50,
+               min=1,
+               help='Maximum number of watchers of each API worker. Each '
+                    'one holds a green thread of [api]wsgi_pool_size for '
+                    'as long as it is connected: keep it well below, for '
+                    'the other requests. The watchers beyond get a 503.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(events_opts, 'events')
+
+# seconds a watcher refused by a full worker waits before retrying
+RETRY_AFTER = 5
+
+TOPIC = 'iotronic.events'
+SEQUENCE = 'events'
+
+# event types
+REGISTRATION = 'registration'
+STATUS = 'status'
+SESSION = 'session'
+INJECTION = 'injection'
+DELETED = 'deleted'
+
+PUBLISHED = metrics.counter('iotronic_events_published_total',
+                            'Board events published, by type.', ['type'])
+metrics.gauge('iotronic_events_watchers',
+              'Clients watching the board events.').set_function(
+    lambda: len(HUB))
+
+
+def board_event(type, board, **fields):
+    """Build an event about a board.
+
+    :param type: REGISTRATION, STATUS, SESSION, INJECTION or DELETED.
+    :param board: the Board object.
+    :param fields: the details of the event, e.g. session or plugin.
+    """
+    event = {'type': type,
+             'board': board.uuid,
+             'project': board.project,
+             'status': board.status}
+    event.update(fields)
+    return event
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _get_client():
+    global _client
+
+    with _client_lock:
+        if _client is None:
+            target = messaging.Target(topic=TOPIC, fanout=True)
+            _client = rpc.get_client(target)
+    return _client
+
+
+def _wanted():
+    return CONF.events.enabled or notifications.enabled()
+
+
+def _send(events):
+    if CONF.events.enabled:
+        try:
+            last = dbapi.get_instance().allocate_sequence(SEQUENCE,
+                                                          len(events))
+            for seq, event in enumerate(events, last - len(events) + 1):
+                event['seq'] = seq
+                PUBLISHED.inc(type=event['type'])
+            _get_client().cast(iotronic_context.get_admin_context(),
+                               'board_events', events=events)
+        except Exception:
+            LOG.exception('Unable to publish %d board events', len(events))
+    notifications.add(events)
+
+
+class Publisher(batching.Batcher):
+    """Publish the board events in batches, from a background thread."""
+
+    def interval(self):
+        return CONF.events.publish_interval
+
+    def batch_size(self):
+        return CONF.events.publish_batch_size
+
+    def send(self, pending):
+        size = self.batch_size()
+        for i in range(0, len(pending), size):
+            _send(pending[i:i + size])
+
+
+_publisher = None
+_publisher_lock = threading.Lock()
+
+
+def get_publisher():
+    global _publisher
+    with _publisher_lock:
+        if _publisher is None:
+            _publisher = Publisher()
+        return _publisher
+
+
+def publish(events):
+    """Number the events, send them to the API workers and notify them.
+
+    The events wait publish_interval at most, to be published with the
+    following ones. A failure is logged: the watchers are not worth
+    failing the change.
+    """
+    if not events or not _wanted():
+        return
+    now = timeutils.utcnow().isoformat()
+    for event in events:
+        event['time'] = now
+    if CONF.events.publish_interval > 0:
+        get_publisher().add(events)
+    else:
+        _send(events)
+
+
+def flush():
+    """Publish the pending events, e.g. before exiting."""
+    if _publisher is not None:
+        _publisher.flush()
+
+
+def can_stream():
+    """Whether this API process serves the watchers: under iotronic-api."""
+    return (eventlet is not None and
+            eventlet.patcher.is_monkey_patched('thread'))
+
+
+def publish_boards(context, type, board_uuids, **fields):
+    """Publish the same event about a set of boards, read in one query."""
+    if not board_uuids or not _wanted():
+        return
+    try:
+        boards = objects.Board.list(context,
+                                    filters={'uuids': list(board_uuids)})
+    except Exception:
+        LOG.exception('Unable to read the boards of the %s events', type)
+        return
+    publish([board_event(type, board, **fields) for board in boards])
+
+
+class Subscription(object):
+    """The events waiting to be sent to a watcher."""
+
+    def __init__(self, project=None, status=None):
+        self.project = project
+        self.status = status
+        self.overflowed = False
+        self.queue = queue.Queue(CONF.events.queue_size)
+
+    def matches(self, event):
+        return ((self.project is None or
+                 event.get('project') == self.project) and
+                (self.status is None or event.get('status') == self.status))
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # too slow: the watcher has to resume or list again
+            self.overflowed = True
+
+    def get(self, timeout):
+        """The next event, None after the timeout."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class _Endpoint(object):
+    """RPC endpoint of the fanout topic."""
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def board_events(self, ctx, events):
+        self.hub.add(events)
+
+
+class Hub(object):
+    """The events received by this API worker and its watchers."""
+
+    def __init__(self):
+        self._seqs = []
+        self._events = []
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._server = None
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def _start(self):
+        # in the worker, after the fork: one fanout queue per process
+        target = messaging.Target(topic=TOPIC,
+                                  server='%s.%d' % (CONF.host, os.getpid()))
+        # the threading executor runs with or without monkey patching
+        self._server = rpc.get_server(target, [_Endpoint(self)],
+                                      executor='threading')
+        self._server.start()
+        LOG.info('Listening to the board events on %s', TOPIC)
+
+    def add(self, events):
+        """Buffer the events and queue them for the watchers."""
+        with self._lock:
+            for event in events:
+                seq = event['seq']
+                if not self._seqs or seq > self._seqs[-1]:
+                    self._seqs.append(seq)
+                    self._events.append(event)
+                else:
+                    # the publishers race: keep the buffer in order
+                    i = bisect.bisect(self._seqs, seq)
+                    self._seqs.insert(i, seq)
+                    self._events.insert(i, event)
+            extra = len(self._seqs) - CONF.events.buffer_size
+            if extra > 0:
+                del self._seqs[:extra]
+                del self._events[:extra]
+            subscriptions = list(self._subscriptions)
+
+        for sub in subscriptions:
+            for event in events:
+                if sub.matches(event):
+                    sub.put(event)
+
+    def subscribe(self, project=None, status=None, since=None):
+        """Register a watcher.
+
+        :param since: the number of the last event received by the
+                      watcher, None to receive only the new events.
+        :returns: a tuple (subscription, events to replay); the events are
+                  None when the ones after since are lost.
+        :raises: TooManyWatchers when max_watchers are connected.
+        """
+        with self._lock:
+            if len(self._subscriptions) >= CONF.events.max_watchers:
+                raise exception.TooManyWatchers(retry_after=RETRY_AFTER)
+            if self._server is None:
+                self._start()
+            sub = Subscription(project=project, status=status)
+            self._subscriptions.add(sub)
+            if since is None:
+                return sub, []
+            first = self._seqs[0] if self._seqs else None
+            i = bisect.bisect(self._seqs, since)
+            replay = [e for e in self._events[i:] if sub.matches(e)]
+
+        if first is None or since < first - 1:
+            # not everything after since is buffered here, unless nothing
+            # has happened since then
+            last = dbapi.get_instance().get_generation(SEQUENCE)
+            if since < (last if first is None else first - 1):
+                return sub, None
+        return sub, replay
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscriptions.discard(sub)
+
+
+HUB = Hub()
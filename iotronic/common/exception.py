@@ -128,6 +128,11 @@ class TemporaryFailure(IotronicException):
     code = 503
 
 
+class NotModified(IotronicException):
+    message = _("Not modified.")
+    code = 304
+
+
 class NotAcceptable(IotronicException):
     # TODO(deva): We need to set response headers in the API for this exception
     message = _("Request not acceptable.")
@@ -593,3 +598,57 @@ class NeedParams(Invalid):
 
 class ErrorExecutionOnBoard(IotronicException):
     message = _("Error in the execution of %(call)s on %(board)s: %(error)s")
+
+
+class CampaignNotFound(NotFound):
+    message = _("Injection campaign %(campaign)s could not be found.")
+
+
+class CampaignAlreadyExists(Conflict):
+    message = _("An injection campaign with UUID %(uuid)s already exists.")
+
+
+class EmptyCampaign(Invalid):
+    message = _("No board matches the selector of the injection campaign.")
+
+
+class BoardTagNotFound(NotFound):
+    message = _("Board %(board)s has no tag %(tag)s.")
+
+
+class BoardGroupNotFound(NotFound):
+    message = _("Group of boards %(group)s could not be found.")
+
+
+class BoardGroupAlreadyExists(Conflict):
+    message = _("A group of boards with UUID %(uuid)s already exists.")
+
+
+class DuplicateBoardGroupName(Conflict):
+    message = _("A group of boards with name %(name)s already exists.")
+
+
+class InvalidCronExpression(Invalid):
+    message = _("Invalid cron expression: %(expr)s.")
+
+
+class ScheduleNotFound(NotFound):
+    message = _("Schedule %(schedule)s could not be found.")
+
+
+class ScheduleAlreadyExists(Conflict):
+    message = _("A schedule with UUID %(uuid)s already exists.")
+
+
+class AgentBusy(TemporaryFailure):
+    message = _("Wamp agent %(agent)s is busy, retry in %(retry_after)s "
+                "seconds.")
+
+
+class ProfilerAlreadyRunning(Conflict):
+    message = _("The %(mode)s profiler is already running.")
+
+
+class TooManyWatchers(TemporaryFailure):
+    message = _("This API worker serves too many watchers of the board "
+                "events, retry in %(retry_after)s seconds.")
@@ -0,0 +1,180 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Priority lanes for the RPC traffic.
+
+Every service listens on one topic per lane, each one with its own RPC
+server and its own pool of workers, so a bulk job cannot delay board
+registrations and connections. The control lane uses the historical topic.
+"""
+
+import contextlib
+import threading
+import time
+
+from oslo_config import cfg
+
+from iotronic.common import tracing
+
+CONTROL = 'control'
+INTERACTIVE = 'interactive'
+BULK = 'bulk'
+
+LANES = (CONTROL, INTERACTIVE, BULK)
+
+lane_opts = [
+    cfg.BoolOpt('enabled',
+                default=True,
+                help='Route the RPC calls to the interactive and bulk lanes. '
+                     'When disabled every call goes to the control lane, '
+                     'as with the services not listening on the lanes.'),
+    cfg.IntOpt('control_pool_size',
+               default=16,
+               help='Maximum number of concurrent calls in the control lane '
+                    '(board registrations and connections).'),
+    cfg.IntOpt('interactive_pool_size',
+               default=8,
+               help='Maximum number of concurrent calls in the interactive '
+                    'lane (actions on a single board).'),
+    cfg.IntOpt('bulk_pool_size',
+               default=4,
+               help='Maximum number of concurrent calls in the bulk lane '
+                    '(fleet-wide jobs).'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(lane_opts, 'lanes')
+
+_LANES = {}
+_LOCK = threading.Lock()
+# the lane running the current call
+_current = threading.local()
+
+
+def topic(base, lane):
+    """Return the topic of a lane."""
+    if lane == CONTROL or not CONF.lanes.enabled:
+        return base
+    return '%s.%s' % (base, lane)
+
+
+def get_lane(name):
+    """Return the lane of this process, created on first use."""
+    with _LOCK:
+        if name not in _LANES:
+            size = getattr(CONF.lanes, '%s_pool_size' % name)
+            _LANES[name] = Lane(name, size)
+        return _LANES[name]
+
+
+def sleep(delay):
+    """Sleep without holding the slot of the lane of the current call.
+
+    A call waiting for a busy wamp agent does not keep the other calls
+    of its lane waiting.
+    """
+    lane = getattr(_current, 'lane', None)
+    if lane is None:
+        time.sleep(delay)
+        return
+    with lane.released():
+        time.sleep(delay)
+
+
+def stats():
+    """Return the counters of the lanes of this process."""
+    with _LOCK:
+        lanes = list(_LANES.values())
+    return dict((lane.name, lane.stats()) for lane in lanes)
+
+
+class Lane(object):
+    """A bounded pool of workers with queue-depth counters."""
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.max_waiting = 0
+        self.running = 0
+        self.served = 0
+        self.wait_time = 0.0
+
+    def run(self, fn, *args, **kwargs):
+        queued_at = time.time()
+        with self._lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+        self._slots.acquire()
+        started_at = time.time()
+        with self._lock:
+            self.waiting -= 1
+            self.running += 1
+            self.wait_time += started_at - queued_at
+        tracing.record('lane %s wait' % self.name, queued_at, started_at)
+        outer, _current.lane = getattr(_current, 'lane', None), self
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.lane = outer
+            with self._lock:
+                self.running -= 1
+                self.served += 1
+            self._slots.release()
+
+    @contextlib.contextmanager
+    def released(self):
+        """Give the slot of the current call back while the block runs."""
+        with self._lock:
+            self.running -= 1
+        self._slots.release()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.waiting += 1
+            self._slots.acquire()
+            with self._lock:
+                self.waiting -= 1
+                self.running += 1
+
+    def stats(self):
+        with self._lock:
+            return {'size': self.size,
+                    'waiting': self.waiting,
+                    'max_waiting': self.max_waiting,
+                    'running': self.running,
+                    'served': self.served,
+                    'avg_wait': (self.wait_time / self.served
+                                 if self.served else 0.0)}
+
+
+class LaneEndpoint(object):
+    """Run the methods of an RPC endpoint in a lane."""
+
+    def __init__(self, endpoint, lane):
+        self._endpoint = endpoint
+        self._lane = lane
+
+    def __getattr__(self, name):
+        attr = getattr(self._endpoint, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        def run_in_lane(*args, **kwargs):
+            return self._lane.run(attr, *args, **kwargs)
+        return run_in_lane
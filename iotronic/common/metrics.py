@@ -0,0 +1,370 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Runtime metrics of the iotronic services.
+
+A process-wide registry of counters, gauges and histograms, rendered in the
+Prometheus text format: on /metrics by the API and by a small HTTP listener
+in the conductor and in the wamp agent. Each worker process has its own
+registry: the conductor workers, and the iotronic-api workers when
+[metrics]api_port is set, listen on consecutive ports.
+"""
+
+import contextlib
+import threading
+import time
+
+from oslo_config import cfg
+from oslo_log import log as logging
+import six
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+
+from iotronic.common import lanes
+
+LOG = logging.getLogger(__name__)
+
+metrics_opts = [
+    cfg.BoolOpt('enabled',
+                default=True,
+                help='Expose the metrics of the services.'),
+    cfg.StrOpt('host',
+               default='127.0.0.1',
+               help='Address of the metrics listener of the conductor and '
+                    'of the wamp agent.'),
+    cfg.PortOpt('conductor_port',
+                default=9191,
+                help='Port of the metrics listener of the conductor. '
+                     '0 disables the listener.'),
+    cfg.PortOpt('wamp_agent_port',
+                default=9192,
+                help='Port of the metrics listener of the wamp agent. '
+                     '0 disables the listener.'),
+    cfg.PortOpt('api_port',
+                default=0,
+                help='First port of the metrics listeners of the '
+                     'iotronic-api workers: each worker listens on '
+                     'api_port plus its index. /metrics on the API port '
+                     'only shows the metrics of the worker serving the '
+                     'scrape, so with several workers scrape these '
+                     'listeners instead. 0 disables the listeners.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(metrics_opts, 'metrics')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0)
+
+
+def _escape(value):
+    return (six.text_type(value).replace('\\', '\\\\')
+            .replace('\n', '\\n').replace('"', '\\"'))
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (n, _escape(v)) for n, v in pairs)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class _Metric(object):
+    type = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError('%s expects the labels %s' %
+                             (self.name, ', '.join(self.labels)))
+        return tuple(labels[name] for name in self.labels)
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in sorted(values):
+            yield self.name, _format_labels(self.labels, key), value
+
+    def render(self):
+        lines = ['# HELP %s %s' % (self.name, self.documentation),
+                 '# TYPE %s %s' % (self.name, self.type)]
+        for name, labels, value in self.samples():
+            lines.append('%s%s %s' % (name, labels, _format_value(value)))
+        return lines
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    type = 'gauge'
+
+    def __init__(self, name, documentation, labels=()):
+        super(Gauge, self).__init__(name, documentation, labels)
+        self._function = None
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function):
+        """Compute the gauge when it is rendered.
+
+        :param function: returns the value, or a dict of values keyed by
+                         the tuple of label values.
+        """
+        self._function = function
+
+    def samples(self):
+        if self._function is None:
+            for sample in super(Gauge, self).samples():
+                yield sample
+            return
+        try:
+            values = self._function()
+        except Exception as e:
+            LOG.debug('Unable to compute %s: %s', self.name, e)
+            return
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in sorted(values.items()):
+            yield self.name, _format_labels(self.labels, key), value
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labels=(),
+                 buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key,
+                                             ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.observe(time.time() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            values = [(k, (list(c), s)) for k, (c, s) in self._values.items()]
+        for key, (counts, total) in sorted(values):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield (self.name + '_bucket',
+                       _format_labels(self.labels, key,
+                                      ('le', _format_value(bound))),
+                       cumulative)
+            yield self.name + '_sum', _format_labels(self.labels, key), total
+            yield (self.name + '_count', _format_labels(self.labels, key),
+                   cumulative)
+
+
+class Registry(object):
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, documentation, labels, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, documentation, labels, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError('%s is already registered as a %s' %
+                                 (name, metric.type))
+            return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self._get(Counter, name, documentation, labels)
+
+    def gauge(self, name, documentation, labels=()):
+        return self._get(Gauge, name, documentation, labels)
+
+    def histogram(self, name, documentation, labels=(),
+                  buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, documentation, labels,
+                         buckets=buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for name, metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+render = REGISTRY.render
+
+
+RPC_REQUESTS = counter('iotronic_rpc_requests_total',
+                       'RPC calls served, by result.',
+                       ['service', 'method', 'result'])
+RPC_DURATION = histogram('iotronic_rpc_duration_seconds',
+                         'Time spent serving the RPC calls.',
+                         ['service', 'method'])
+
+
+def _lane_stat(stat):
+    def compute():
+        return dict(((name,), values[stat])
+                    for name, values in lanes.stats().items())
+    return compute
+
+
+gauge('iotronic_lane_waiting_calls', 'RPC calls waiting for a worker.',
+      ['lane']).set_function(_lane_stat('waiting'))
+gauge('iotronic_lane_running_calls', 'RPC calls being served.',
+      ['lane']).set_function(_lane_stat('running'))
+
+
+class InstrumentedEndpoint(object):
+    """Count and time the calls to the methods of an RPC endpoint."""
+
+    def __init__(self, endpoint, service):
+        self._endpoint = endpoint
+        self._service = service
+
+    def __getattr__(self, name):
+        attr = getattr(self._endpoint, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+        # agent methods are named <agent>.<method>
+        method = name.rsplit('.', 1)[-1]
+
+        def instrumented(*args, **kwargs):
+            result = 'error'
+            start = time.time()
+            try:
+                value = attr(*args, **kwargs)
+                result = 'success'
+                return value
+            finally:
+                RPC_DURATION.observe(time.time() - start,
+                                     service=self._service, method=method)
+                RPC_REQUESTS.inc(service=self._service, method=method,
+                                 result=result)
+        return instrumented
+
+
+class MetricsMiddleware(object):
+    """Serve GET /metrics, pass every other request to the application."""
+
+    def __init__(self, app, path='/metrics'):
+        self.app = app
+        self.path = path
+
+    def __call__(self, environ, start_response):
+        if (environ.get('PATH_INFO') != self.path or
+                environ.get('REQUEST_METHOD') != 'GET'):
+            return self.app(environ, start_response)
+        body = render().encode('utf-8')
+        start_response('200 OK', [('Content-Type', CONTENT_TYPE),
+                                  ('Content-Length', str(len(body)))])
+        return [body]
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+def serve(port, host=None):
+    """Start the metrics listener of a service in a daemon thread.
+
+    :returns: the server, or None when disabled or not started.
+    """
+    if not CONF.metrics.enabled or not port:
+        return None
+    host = host or CONF.metrics.host
+    try:
+        server = _Server((host, port), _Handler)
+    except Exception as e:
+        LOG.error('Unable to start the metrics listener on %(host)s:%(port)s'
+                  ': %(err)s', {'host': host, 'port': port, 'err': e})
+        return None
+    th = threading.Thread(target=server.serve_forever)
+    th.daemon = True
+    th.start()
+    LOG.info('Metrics available on http://%(host)s:%(port)s/metrics',
+             {'host': host, 'port': port})
+    return server
@@ -0,0 +1,142 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Notifications of the board changes, through the oslo.messaging notifier.
+
+The board events of iotronic.common.events are queued and sent in batches
+from a background thread: one notification per event type, every
+flush_interval seconds or as soon as batch_size events are pending. A
+reconnection storm of thousands of boards makes a few large notifications,
+e.g. board.status with the list of the changes in its payload.
+"""
+
+import collections
+import threading
+
+from oslo_config import cfg
+from oslo_log import log
+
+from iotronic.common import batching
+from iotronic.common import context as iotronic_context
+from iotronic.common import metrics
+from iotronic.common import rpc
+
+LOG = log.getLogger(__name__)
+
+notifications_opts = [
+    cfg.FloatOpt('flush_interval',
+                 default=5.0,
+                 help='Maximum time (in seconds) a board event waits '
+                      'before being notified.'),
+    cfg.IntOpt('batch_size',
+               default=500,
+               min=1,
+               help='Maximum number of board events in one notification.'),
+    cfg.IntOpt('max_pending',
+               default=20000,
+               min=1,
+               help='Maximum number of board events waiting to be notified; '
+                    'the oldest ones are dropped beyond.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(notifications_opts, 'notifications')
+
+SENT = metrics.counter('iotronic_notifications_sent_total',
+                       'Notifications of board events sent, by event type.',
+                       ['event_type'])
+DROPPED = metrics.counter('iotronic_notifications_dropped_total',
+                          'Board events not notified.')
+
+_service = 'iotronic'
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def setup(service):
+    """Name the publisher of the notifications of this process."""
+    global _service
+    _service = service
+
+
+def enabled():
+    """Whether a notification driver is configured."""
+    if rpc.NOTIFIER is None:
+        return False
+    try:
+        return bool(CONF.oslo_messaging_notifications.driver)
+    except cfg.NoSuchOptError:
+        return True
+
+
+class Batcher(batching.Batcher):
+    """Send the board events in batches, from a background thread."""
+
+    def __init__(self):
+        super(Batcher, self).__init__(
+            max_pending=CONF.notifications.max_pending)
+
+    def interval(self):
+        return CONF.notifications.flush_interval
+
+    def batch_size(self):
+        return CONF.notifications.batch_size
+
+    def on_dropped(self, count):
+        DROPPED.inc(count)
+        LOG.warning('Notification queue full: %d board events dropped',
+                    count)
+
+    def send(self, pending):
+        by_type = collections.OrderedDict()
+        for event in pending:
+            by_type.setdefault(event['type'], []).append(event)
+
+        notifier = rpc.get_notifier(service=_service)
+        ctx = iotronic_context.get_admin_context()
+        size = self.batch_size()
+        for type, events in by_type.items():
+            event_type = 'board.%s' % type
+            for i in range(0, len(events), size):
+                chunk = events[i:i + size]
+                try:
+                    notifier.info(ctx, event_type,
+                                  {'events': chunk, 'count': len(chunk)})
+                    SENT.inc(event_type=event_type)
+                except Exception as e:
+                    LOG.warning('Unable to notify %(count)d %(type)s '
+                                'events: %(err)s',
+                                {'count': len(chunk), 'type': event_type,
+                                 'err': e})
+
+
+def get_batcher():
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = Batcher()
+        return _batcher
+
+
+def add(events):
+    """Queue the notification of board events."""
+    if events and enabled():
+        get_batcher().add(events)
+
+
+def flush():
+    """Send the pending notifications, e.g. before exiting."""
+    if _batcher is not None:
+        _batcher.flush()
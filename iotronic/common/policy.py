@@ -15,7 +15,10 @@
 
 """Policy Engine For Ironic."""
 
+import collections
+import re
 import sys
+import threading
 
 from oslo_concurrency import lockutils
 from oslo_config import cfg
@@ -24,11 +27,28 @@ from oslo_policy import policy
 
 from iotronic.common import exception
 from iotronic.common.i18n import _LW
+from iotronic.common import metrics
 
 _ENFORCER = None
+_CACHE = None
 CONF = cfg.CONF
 LOG = log.getLogger(__name__)
 
+policy_cache_opts = [
+    cfg.IntOpt('policy_cache_size',
+               default=1024,
+               min=0,
+               help='Number of policy decisions kept in memory, by rule, '
+                    'credentials and target. The decisions are dropped '
+                    'when the policy file changes. 0 disables the cache.'),
+]
+
+CONF.register_opts(policy_cache_opts, 'api')
+
+DECISIONS = metrics.counter('iotronic_policy_decisions_total',
+                            'Policy decisions, by cache result.',
+                            ['result'])
+
 default_policies = [
     # Legacy setting, don't remove. Likely to be overridden by operators who
     # forget to update their policy.json configuration file.
@@ -85,6 +105,9 @@ board_policies = [
                        'rule:is_admin or rule:is_admin_iot_project '
                        'or rule:is_manager_iot_project',
                        description='Update Board records'),
+    policy.RuleDefault('iot:board_telemetry:get',
+                       'rule:admin_or_owner',
+                       description='Retrieve the telemetry of a Board'),
 
 ]
 
@@ -121,11 +144,65 @@ injection_plugin_policies = [
 ]
 
 
+campaign_policies = [
+    policy.RuleDefault('iot:campaign:get',
+                       'rule:is_admin or rule:is_iot_member',
+                       description='Retrieve Injection Campaign records'),
+    policy.RuleDefault('iot:campaign:get_one', 'rule:admin_or_owner',
+                       description='Retrieve an Injection Campaign record'),
+    policy.RuleDefault('iot:campaign:create',
+                       'rule:is_iot_member',
+                       description='Create Injection Campaign records'),
+    policy.RuleDefault('iot:campaign:delete', 'rule:admin_or_owner',
+                       description='Cancel Injection Campaign records'),
+
+]
+
+group_policies = [
+    policy.RuleDefault('iot:group:get',
+                       'rule:is_admin or rule:is_iot_member',
+                       description='Retrieve Board Group records'),
+    policy.RuleDefault('iot:group:create',
+                       'rule:is_admin or rule:is_admin_iot_project '
+                       'or rule:is_manager_iot_project',
+                       description='Create Board Group records'),
+    policy.RuleDefault('iot:group:delete',
+                       'rule:is_admin or rule:is_admin_iot_project '
+                       'or rule:is_manager_iot_project',
+                       description='Delete Board Group records'),
+    policy.RuleDefault('iot:group:update',
+                       'rule:is_admin or rule:is_admin_iot_project '
+                       'or rule:is_manager_iot_project',
+                       description='Update Board Group records and their '
+                                   'boards'),
+
+]
+
+schedule_policies = [
+    policy.RuleDefault('iot:schedule:get',
+                       'rule:is_admin or rule:is_iot_member',
+                       description='Retrieve Schedule records'),
+    policy.RuleDefault('iot:schedule:get_one', 'rule:admin_or_owner',
+                       description='Retrieve a Schedule record'),
+    policy.RuleDefault('iot:schedule:create',
+                       'rule:is_iot_member',
+                       description='Create Schedule records'),
+    policy.RuleDefault('iot:schedule:update', 'rule:admin_or_owner',
+                       description='Update Schedule records'),
+    policy.RuleDefault('iot:schedule:delete', 'rule:admin_or_owner',
+                       description='Delete Schedule records'),
+
+]
+
+
 def list_policies():
     policies = (default_policies
                 + board_policies
                 + plugin_policies
                 + injection_plugin_policies
+                + campaign_policies
+                + group_policies
+                + schedule_policies
                 )
     return policies
 
@@ -171,6 +248,134 @@ def get_enforcer():
     return _ENFORCER
 
 
+# references of a rule to the target and to the other rules
+_TARGET_REF = re.compile(r'%\(([^)]+)\)s')
+_RULE_REF = re.compile(r'rule:([^\s()]+)')
+_HTTP_REF = re.compile(r'\bhttps?:')
+
+
+def _freeze(value):
+    """A hashable equivalent of a dict of credentials or of a target."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(sorted(_freeze(v) for v in value))
+    return value
+
+
+class DecisionCache(object):
+    """Bounded LRU cache of the policy decisions.
+
+    A decision is keyed by the rule, the credentials and the attributes of
+    the target the rule refers to. The enforcer replaces its rules when the
+    policy file is reloaded: the cache is emptied at that moment.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._decisions = collections.OrderedDict()
+        self._target_keys = {}
+        self._rules = None
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._decisions.clear()
+            self._target_keys.clear()
+
+    def _check_rules(self, enforcer):
+        # stats the policy file and loads it again when it changed, as
+        # enforce() does
+        enforcer.load_rules()
+        if enforcer.rules is not self._rules:
+            self.clear()
+            self._rules = enforcer.rules
+
+    def _collect(self, rules, name, keys, seen):
+        if name in seen:
+            return True
+        seen.add(name)
+        check = str(rules.get(name, ''))
+        if _HTTP_REF.search(check):
+            # remote checks are sent the whole target
+            return False
+        keys.update(ref.split('.')[0] for ref in _TARGET_REF.findall(check))
+        return all(self._collect(rules, ref, keys, seen)
+                   for ref in _RULE_REF.findall(check))
+
+    def target_keys(self, enforcer, rule):
+        """The attributes of the target used by the rule, None if unknown."""
+        try:
+            return self._target_keys[rule]
+        except KeyError:
+            pass
+        keys = set()
+        if rule in enforcer.rules and self._collect(enforcer.rules, rule,
+                                                    keys, set()):
+            keys = frozenset(keys)
+        else:
+            keys = None
+        self._target_keys[rule] = keys
+        return keys
+
+    def _key(self, enforcer, method, rule, target, creds):
+        if target is creds:
+            # the relevant attributes of the target are in the credentials
+            relevant = None
+        else:
+            keys = self.target_keys(enforcer, rule)
+            if keys is None:
+                relevant = _freeze(target)
+            else:
+                relevant = _freeze(dict((k, target.get(k)) for k in keys))
+        key = (method, rule, _freeze(creds), relevant)
+        hash(key)
+        return key
+
+    def decide(self, enforcer, method, rule, target, creds, evaluate):
+        """Return the cached decision, or evaluate and cache it."""
+        self._check_rules(enforcer)
+        try:
+            key = self._key(enforcer, method, rule, target, creds)
+        except TypeError:
+            # credentials or target not hashable
+            return evaluate()
+
+        with self._lock:
+            try:
+                result = self._decisions.pop(key)
+            except KeyError:
+                pass
+            else:
+                self._decisions[key] = result
+                DECISIONS.inc(result='hit')
+                return result
+
+        result = evaluate()
+        DECISIONS.inc(result='miss')
+        with self._lock:
+            self._decisions[key] = result
+            while len(self._decisions) > self.size:
+                self._decisions.popitem(last=False)
+        return result
+
+
+def get_cache():
+    """The decision cache, None when disabled."""
+    global _CACHE
+
+    if _CACHE is None and CONF.api.policy_cache_size:
+        _CACHE = DecisionCache(CONF.api.policy_cache_size)
+    return _CACHE
+
+
+def reset_cache():
+    """Drop the cached decisions, e.g. after the rules changed in place."""
+    global _CACHE
+
+    _CACHE = None
+
+
 def get_oslo_policy_enforcer():
     # This method is for use by oslopolicy CLI scripts. Those scripts need the
     # 'output-file' and 'namespace' options, but having those in sys.argv means
@@ -210,12 +415,21 @@ def authorize(rule, target, creds, *args, **kwargs):
     if CONF.auth_strategy == 'noauth':
         return True
     enforcer = get_enforcer()
-
-    try:
-        return enforcer.authorize(rule, target, creds, do_raise=True,
-                                  *args, **kwargs)
-    except policy.PolicyNotAuthorized:
+    cache = get_cache()
+
+    if cache is None or args or kwargs:
+        try:
+            return enforcer.authorize(rule, target, creds, do_raise=True,
+                                      *args, **kwargs)
+        except policy.PolicyNotAuthorized:
+            raise exception.HTTPForbidden(resource=rule)
+
+    result = cache.decide(
+        enforcer, 'authorize', rule, target, creds,
+        lambda: enforcer.authorize(rule, target, creds, do_raise=False))
+    if not result:
         raise exception.HTTPForbidden(resource=rule)
+    return result
 
 
 def check(rule, target, creds, *args, **kwargs):
@@ -225,7 +439,11 @@ def check(rule, target, creds, *args, **kwargs):
     and returns True or False.
     """
     enforcer = get_enforcer()
-    return enforcer.enforce(rule, target, creds, *args, **kwargs)
+    cache = get_cache()
+    if cache is None or args or kwargs:
+        return enforcer.enforce(rule, target, creds, *args, **kwargs)
+    return cache.decide(enforcer, 'check', rule, target, creds,
+                        lambda: enforcer.enforce(rule, target, creds))
 
 
 def enforce(rule, target, creds, do_raise=False, exc=None, *args, **kwargs):
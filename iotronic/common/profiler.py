@@ -0,0 +1,342 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""On-demand profiling of a running service.
+
+Profiling is started and stopped with SIGUSR2 or with the profiler RPC of
+the conductor. Two profilers are available:
+
+- cprofile: every call to an RPC endpoint method runs under cProfile, the
+  profiles are dumped per method in the pstats format;
+- sampling: a thread samples the stacks of every thread, the samples are
+  dumped as folded stacks, ready for flamegraph.pl. In the services
+  monkey patched by eventlet the sampler is an OS thread and samples the
+  stacks of the green threads too.
+
+Memory snapshots are taken with tracemalloc, each one compared with the
+previous one; on Python 2 they need pytracemalloc, which only runs on a
+patched interpreter. All the results are written in [profiler]output_dir.
+"""
+
+import collections
+import cProfile
+import gc
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+import weakref
+
+from oslo_config import cfg
+from oslo_log import log as logging
+from oslo_utils import importutils
+
+from iotronic.common import exception
+from iotronic.common import paths
+
+eventlet = importutils.try_import('eventlet')
+greenlet = importutils.try_import('greenlet')
+tracemalloc = importutils.try_import('tracemalloc')
+
+LOG = logging.getLogger(__name__)
+
+CPROFILE = 'cprofile'
+SAMPLING = 'sampling'
+
+profiler_opts = [
+    cfg.StrOpt('output_dir',
+               default=paths.state_path_def('profiles'),
+               help='Directory the profiles and memory snapshots are '
+                    'written to.'),
+    cfg.StrOpt('signal_mode',
+               default=CPROFILE,
+               choices=[CPROFILE, SAMPLING],
+               help='Profiler toggled by SIGUSR2.'),
+    cfg.FloatOpt('sampling_interval',
+                 default=0.005,
+                 help='Time (in seconds) between two samples of the '
+                      'sampling profiler.'),
+    cfg.IntOpt('tracemalloc_frames',
+               default=10,
+               help='Number of frames stored for each memory allocation. '
+                    'Memory snapshots need tracemalloc, which is missing '
+                    'on Python 2 unless pytracemalloc is installed.'),
+    cfg.IntOpt('tracemalloc_top',
+               default=50,
+               help='Number of lines written in a memory snapshot report.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(profiler_opts, 'profiler')
+
+
+# seconds between two searches of the green threads by the sampler
+GREENLET_SCAN_INTERVAL = 1.0
+
+
+def _green():
+    return (eventlet is not None and
+            eventlet.patcher.is_monkey_patched('thread'))
+
+
+class _Sampler(object):
+    def __init__(self, interval):
+        self.interval = interval
+        self.samples = collections.Counter()
+        self._green = _green() and greenlet is not None
+        # a green sampler would only ever see itself running
+        threads = (eventlet.patcher.original('threading') if self._green
+                   else threading)
+        self._stop_event = threads.Event()
+        self._thread = threads.Thread(target=self.run,
+                                      name='profiler-sampler')
+        self._thread.daemon = True
+        self._greenlets = []
+        self._scanned_at = 0
+
+    def start(self):
+        self._thread.start()
+
+    def _frames(self):
+        me = self._thread.ident
+        for ident, frame in sys._current_frames().items():
+            if ident != me:
+                yield frame
+        if not self._green:
+            return
+        # the green threads switched out; the running one is the current
+        # frame of its OS thread
+        now = time.time()
+        if now - self._scanned_at >= GREENLET_SCAN_INTERVAL:
+            self._greenlets = [weakref.ref(obj) for obj in gc.get_objects()
+                               if isinstance(obj, greenlet.greenlet)]
+            self._scanned_at = now
+        for ref in self._greenlets:
+            green = ref()
+            if green is not None and green.gr_frame is not None:
+                yield green.gr_frame
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            for frame in self._frames():
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append('%s:%s' % (os.path.basename(
+                        code.co_filename), code.co_name))
+                    frame = frame.f_back
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join()
+
+
+class Profiler(object):
+    """Profiler of a service, shared by its endpoints."""
+
+    def __init__(self, service='iotronic'):
+        self.service = service
+        self.mode = None
+        self.started_at = None
+        self._profiles = {}
+        self._sampler = None
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def _path(self, *parts):
+        directory = CONF.profiler.output_dir
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        name = '-'.join((self.service,) + parts +
+                        (time.strftime('%Y%m%d-%H%M%S'),))
+        return os.path.join(directory, name)
+
+    def start(self, mode=CPROFILE):
+        with self._lock:
+            if self.mode is not None:
+                raise exception.ProfilerAlreadyRunning(mode=self.mode)
+            if mode == SAMPLING:
+                self._sampler = _Sampler(CONF.profiler.sampling_interval)
+                self._sampler.start()
+            elif mode != CPROFILE:
+                raise exception.InvalidParameterValue(
+                    err='Invalid profiler mode %s' % mode)
+            self.mode = mode
+            self.started_at = time.time()
+        LOG.info('Profiler %s started', mode)
+        return self.status()
+
+    def stop(self):
+        """Stop the profiler and dump the results.
+
+        :returns: the list of files written.
+        """
+        with self._lock:
+            mode, self.mode = self.mode, None
+            profiles, self._profiles = self._profiles, {}
+            sampler, self._sampler = self._sampler, None
+        if mode is None:
+            return []
+
+        files = []
+        if mode == CPROFILE:
+            for method, stats in sorted(profiles.items()):
+                path = self._path(method) + '.pstats'
+                stats.dump_stats(path)
+                files.append(path)
+        else:
+            sampler.stop()
+            path = self._path('sampling') + '.folded'
+            with open(path, 'w') as f:
+                for stack, count in sampler.samples.most_common():
+                    f.write('%s %d\n' % (stack, count))
+            files.append(path)
+        LOG.info('Profiler %(mode)s stopped, results in %(files)s',
+                 {'mode': mode, 'files': ', '.join(files)})
+        return files
+
+    def toggle(self, mode=None):
+        if self.mode is None:
+            return self.start(mode or CONF.profiler.signal_mode)
+        return self.stop()
+
+    def status(self):
+        return {'service': self.service,
+                'mode': self.mode,
+                'running_for': (time.time() - self.started_at
+                                if self.mode else None),
+                'tracemalloc': bool(tracemalloc and
+                                    tracemalloc.is_tracing())}
+
+    def run(self, method, fn, *args, **kwargs):
+        """Call fn, under cProfile if the cprofile mode is active."""
+        if self.mode != CPROFILE:
+            return fn(*args, **kwargs)
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(fn, *args, **kwargs)
+        finally:
+            with self._lock:
+                if self.mode == CPROFILE:
+                    if method in self._profiles:
+                        self._profiles[method].add(profile)
+                    else:
+                        self._profiles[method] = pstats.Stats(profile)
+
+    def snapshot(self):
+        """Take a tracemalloc snapshot and compare it with the previous.
+
+        The first call starts tracemalloc: the allocations made before it
+        are not traced.
+
+        :returns: the list of files written.
+        """
+        if tracemalloc is None:
+            raise exception.InvalidParameterValue(
+                err='tracemalloc is not available; on Python 2 it needs '
+                    'pytracemalloc')
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(CONF.profiler.tracemalloc_frames)
+            LOG.info('tracemalloc started')
+        snapshot = tracemalloc.take_snapshot()
+        path = self._path('memory')
+        snapshot.dump(path + '.snapshot')
+
+        top = CONF.profiler.tracemalloc_top
+        with open(path + '.txt', 'w') as f:
+            current, peak = tracemalloc.get_traced_memory()
+            f.write('traced: %d bytes, peak: %d bytes\n\n' % (current, peak))
+            if self._snapshot is not None:
+                f.write('growth since the previous snapshot:\n')
+                for stat in snapshot.compare_to(self._snapshot,
+                                                'lineno')[:top]:
+                    f.write('%s\n' % stat)
+                f.write('\n')
+            f.write('largest allocations:\n')
+            for stat in snapshot.statistics('lineno')[:top]:
+                f.write('%s\n' % stat)
+        self._snapshot = snapshot
+        return [path + '.snapshot', path + '.txt']
+
+    def control(self, action, mode=None):
+        """Entry point of the profiler RPC."""
+        if action == 'start':
+            return self.start(mode or CPROFILE)
+        elif action == 'stop':
+            return {'files': self.stop()}
+        elif action == 'snapshot':
+            return {'files': self.snapshot()}
+        elif action == 'status':
+            return self.status()
+        raise exception.InvalidParameterValue(
+            err='Invalid profiler action %s' % action)
+
+
+class ProfiledEndpoint(object):
+    """Profile the calls to the methods of an RPC endpoint."""
+
+    def __init__(self, endpoint, profiler):
+        self._endpoint = endpoint
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        attr = getattr(self._endpoint, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+        method = name.rsplit('.', 1)[-1]
+
+        def profiled(*args, **kwargs):
+            return self._profiler.run(method, attr, *args, **kwargs)
+        return profiled
+
+
+_profiler = None
+
+
+def setup(service):
+    """Create the profiler of the process and bind it to SIGUSR2."""
+    global _profiler
+    _profiler = Profiler(service)
+    requested = threading.Event()
+
+    def toggler():
+        # the handler may interrupt a thread holding the profiler lock,
+        # so the toggle happens here
+        while True:
+            requested.wait()
+            requested.clear()
+            try:
+                _profiler.toggle()
+            except Exception as e:
+                LOG.error('Profiler toggle failed: %s', e)
+
+    def handler(signum, frame):
+        requested.set()
+
+    thread = threading.Thread(target=toggler, name='profiler-toggle')
+    thread.daemon = True
+    thread.start()
+    signal.signal(signal.SIGUSR2, handler)
+    return _profiler
+
+
+def get_profiler():
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler()
+    return _profiler
@@ -131,13 +131,13 @@ def get_client(target, version_cap=None, serializer=None):
                                serializer=serializer)
 
 
-def get_server(target, endpoints, serializer=None):
+def get_server(target, endpoints, serializer=None, executor='eventlet'):
     assert TRANSPORT is not None
     serializer = RequestContextSerializer(serializer)
     return messaging.get_rpc_server(TRANSPORT,
                                     target,
                                     endpoints,
-                                    executor='eventlet',
+                                    executor=executor,
                                     serializer=serializer)
 
 
@@ -14,16 +14,20 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import contextlib
+import fcntl
+import os
 import signal
 import socket
 
+from oslo_concurrency import processutils
 from oslo_config import cfg
-from oslo_context import context
 from oslo_log import log
 import oslo_messaging as messaging
 from oslo_utils import importutils
 
 from iotronic.common import config
+from iotronic.common import context as iotronic_context
 from iotronic.common.i18n import _LE
 from iotronic.common.i18n import _LI
 from iotronic.common import rpc
@@ -58,21 +62,26 @@ class RPCService(service.Service):
         manager_class = getattr(manager_module, manager_class)
         self.manager = manager_class(host, manager_module.MANAGER_TOPIC)
         self.topic = self.manager.topic
-        self.rpcserver = None
+        self.rpcservers = []
         self.deregister = True
 
     def start(self):
         super(RPCService, self).start()
-        admin_context = context.RequestContext('admin', 'admin', is_admin=True)
+        admin_context = iotronic_context.get_admin_context()
 
-        target = messaging.Target(topic=self.topic, server=self.host)
-        endpoints = [self.manager]
-        serializer = objects_base.IotronicObjectSerializer()
-        self.rpcserver = rpc.get_server(target, endpoints, serializer)
-        self.rpcserver.start()
+        self.manager.init_host()
+        if hasattr(self.manager, 'get_rpc_servers'):
+            # the manager builds its own servers and endpoints
+            self.rpcservers = self.manager.get_rpc_servers()
+        else:
+            target = messaging.Target(topic=self.topic, server=self.host)
+            endpoints = [self.manager]
+            serializer = objects_base.IotronicObjectSerializer()
+            self.rpcservers = [rpc.get_server(target, endpoints, serializer)]
+        for server in self.rpcservers:
+            server.start()
 
         self.handle_signal()
-        self.manager.init_host()
         self.tg.add_dynamic_timer(
             self.manager.periodic_tasks,
             periodic_interval_max=cfg.CONF.periodic_interval,
@@ -84,8 +93,10 @@ class RPCService(service.Service):
 
     def stop(self):
         try:
-            self.rpcserver.stop()
-            self.rpcserver.wait()
+            for server in self.rpcservers:
+                server.stop()
+            for server in self.rpcservers:
+                server.wait()
         except Exception as e:
             LOG.exception(_LE('Service error occurred when stopping the '
                               'RPC server. Error: %s'), e)
@@ -115,6 +126,91 @@ class RPCService(service.Service):
         signal.signal(signal.SIGUSR1, self._handle_signal)
 
 
+def get_worker_count(workers):
+    """Return the number of workers, the number of CPUs if not set."""
+    return workers or processutils.get_worker_count()
+
+
+# files of the worker slots held by this process
+_slots = []
+
+
+def claim_worker_slot(name, workers):
+    """Return the index of this process among the workers of a service.
+
+    Each worker holds a lock on the file of its slot as long as it lives:
+    a worker respawned by the launcher takes the slot of the dead one.
+
+    :returns: the slot, from 0 to workers - 1, or None if all are taken.
+    """
+    directory = os.path.join(cfg.CONF.state_path, 'locks')
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    for slot in range(get_worker_count(workers)):
+        f = open(os.path.join(directory, '%s-%d.lock' % (name, slot)), 'a')
+        try:
+            fcntl.lockf(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except IOError:
+            f.close()
+            continue
+        _slots.append(f)
+        return slot
+    return None
+
+
+@contextlib.contextmanager
+def dead_worker_slot(name, slot):
+    """Hold the slot of a worker of a service, if no live process holds it.
+
+    While the block runs, a respawned worker cannot take the slot: the
+    work left by the dead worker can be taken over safely.
+
+    :returns: a context manager yielding True if the slot is free, False
+              if a live worker holds it.
+    """
+    path = os.path.join(cfg.CONF.state_path, 'locks',
+                        '%s-%d.lock' % (name, slot))
+    if any(f.name == path for f in _slots):
+        # closing another descriptor would drop the lock of this process
+        yield False
+        return
+    try:
+        f = open(path, 'a')
+    except IOError:
+        yield False
+        return
+    try:
+        try:
+            fcntl.lockf(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except IOError:
+            yield False
+        else:
+            yield True
+    finally:
+        f.close()
+
+
+def live_worker_slots(name):
+    """Return the slots of the workers of a service held by live processes.
+
+    This process counts as live; the slots never claimed are not listed.
+    """
+    directory = os.path.join(cfg.CONF.state_path, 'locks')
+    if not os.path.isdir(directory):
+        return []
+    prefix = '%s-' % name
+    slots = []
+    for filename in os.listdir(directory):
+        slot = filename[len(prefix):-len('.lock')]
+        if (not filename.startswith(prefix) or
+                not filename.endswith('.lock') or not slot.isdigit()):
+            continue
+        with dead_worker_slot(name, int(slot)) as dead:
+            if not dead:
+                slots.append(int(slot))
+    return sorted(slots)
+
+
 def prepare_service(argv=[]):
     log.register_options(cfg.CONF)
 
@@ -0,0 +1,124 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Coalescing of identical concurrent calls.
+
+Group runs a call once for all the callers asking for the same key at the
+same time; TTLCache keeps the results for a short while.
+"""
+
+import sys
+import threading
+import time
+
+import six
+
+
+class _Call(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exc_info = None
+        self.shared = 0
+
+
+class Group(object):
+    """Run one call per key at a time, shared by all the callers."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        """Call fn, or wait for the call in flight with the same key.
+
+        :returns: the result of the call; the exception it raised is
+                  raised to every caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.exc_info is not None:
+                six.reraise(*call.exc_info)
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception:
+            call.exc_info = sys.exc_info()
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+class TTLCache(object):
+    """A small cache whose entries expire after ttl seconds."""
+
+    def __init__(self, ttl, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (True, value) for a live entry, (False, None) otherwise."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] < time.time():
+                del self._entries[key]
+                return False, None
+            return True, entry[1]
+
+    def set(self, key, value):
+        if self.ttl <= 0:
+            return
+        now = time.time()
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._purge(now)
+            self._entries[key] = (now + self.ttl, value)
+
+    def invalidate(self, match):
+        """Drop the entries whose key satisfies match(key)."""
+        with self._lock:
+            for key in [k for k in self._entries if match(k)]:
+                del self._entries[key]
+
+    def _purge(self, now):
+        expired = [k for k, e in six.iteritems(self._entries) if e[0] < now]
+        for key in expired:
+            del self._entries[key]
+        if len(self._entries) >= self.max_entries:
+            # still full: drop the oldest entries
+            oldest = sorted(self._entries,
+                            key=lambda k: self._entries[k][0])
+            for key in oldest[:len(oldest) // 2 + 1]:
+                del self._entries[key]
@@ -20,3 +20,10 @@
 OFFLINE = 'offline'
 REGISTERED = 'registered'
 ONLINE = 'online'
+
+# injection campaigns and their boards
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
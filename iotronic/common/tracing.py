@@ -0,0 +1,339 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Request tracing across the API, the conductor, the agents and the boards.
+
+The trace context travels as a W3C traceparent string: in the traceparent
+header of the API requests, in the 'trace' key of the RPC contexts and,
+optionally, as a keyword argument of the calls to the boards. The spans
+of each process are exported in batches, as JSON lines to a file or in the
+OTLP/HTTP JSON format to a collector.
+"""
+
+import binascii
+import json
+import os
+import random
+import threading
+import time
+
+from oslo_config import cfg
+from oslo_log import log as logging
+from six.moves.urllib import request as urllib_request
+
+from iotronic.common import batching
+from iotronic.common import paths
+
+LOG = logging.getLogger(__name__)
+
+FILE = 'file'
+OTLP = 'otlp'
+
+tracing_opts = [
+    cfg.BoolOpt('enabled',
+                default=False,
+                help='Record the spans of the requests.'),
+    cfg.FloatOpt('sample_rate',
+                 default=1.0,
+                 min=0.0, max=1.0,
+                 help='Fraction of the traces started by this service that '
+                      'are recorded. The services downstream follow the '
+                      'decision.'),
+    cfg.StrOpt('exporter',
+               default=FILE,
+               choices=[FILE, OTLP],
+               help='Where the spans are exported.'),
+    cfg.StrOpt('file_path',
+               default=paths.state_path_def('traces.jsonl'),
+               help='File the spans are appended to by the file exporter.'),
+    cfg.StrOpt('otlp_endpoint',
+               default='http://localhost:4318/v1/traces',
+               help='OTLP/HTTP endpoint of the collector.'),
+    cfg.IntOpt('batch_size',
+               default=100,
+               help='Number of spans exported together.'),
+    cfg.FloatOpt('flush_interval',
+                 default=5.0,
+                 help='Maximum time (in seconds) a span waits to be '
+                      'exported.'),
+    cfg.BoolOpt('propagate_to_boards',
+                default=False,
+                help='Pass the trace context to the boards as the '
+                     'traceparent keyword argument of the calls. Only for '
+                     'boards able to accept it.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(tracing_opts, 'tracing')
+
+_local = threading.local()
+
+
+def _new_id(size):
+    return binascii.hexlify(os.urandom(size)).decode('ascii')
+
+
+def parse(traceparent):
+    """Return (trace_id, span_id, sampled) or None for an invalid value."""
+    try:
+        version, trace_id, span_id, flags = traceparent.split('-')
+        int(trace_id, 16), int(span_id, 16)
+        if len(trace_id) != 32 or len(span_id) != 16:
+            return None
+        return trace_id, span_id, bool(int(flags, 16) & 1)
+    except (AttributeError, ValueError):
+        return None
+
+
+class Span(object):
+    def __init__(self, name, trace_id, parent_id, sampled, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes = attributes
+        self.start = time.time()
+        self.end = None
+        self.error = None
+
+    @property
+    def traceparent(self):
+        return '00-%s-%s-%s' % (self.trace_id, self.span_id,
+                                '01' if self.sampled else '00')
+
+    def to_dict(self):
+        return {'name': self.name,
+                'trace_id': self.trace_id,
+                'span_id': self.span_id,
+                'parent_id': self.parent_id,
+                'start': self.start,
+                'end': self.end,
+                'service': _service,
+                'attributes': self.attributes,
+                'error': self.error}
+
+
+def _stack():
+    if not hasattr(_local, 'spans'):
+        _local.spans = []
+    return _local.spans
+
+
+def current():
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+def current_traceparent():
+    span = current()
+    return span.traceparent if span is not None else None
+
+
+def start_span(name, parent=None, **attributes):
+    """Start a span, child of parent or of the current span.
+
+    :param parent: a traceparent string, the current span if None.
+    :returns: the span, None when tracing is disabled.
+    """
+    if not CONF.tracing.enabled:
+        return None
+    context = parse(parent) if parent else None
+    if context is None and current() is not None:
+        span = current()
+        context = (span.trace_id, span.span_id, span.sampled)
+    if context is None:
+        context = (_new_id(16), None,
+                   random.random() < CONF.tracing.sample_rate)
+    span = Span(name, context[0], context[1], context[2], attributes)
+    _stack().append(span)
+    return span
+
+
+def finish_span(span, error=None):
+    if span is None:
+        return
+    span.end = time.time()
+    if error is not None:
+        span.error = str(error)
+    stack = _stack()
+    if span in stack:
+        stack.remove(span)
+    if span.sampled:
+        get_exporter().add(span)
+
+
+class span(object):
+    """Context manager recording a span around a block."""
+
+    def __init__(self, name, parent=None, **attributes):
+        self.name = name
+        self.parent = parent
+        self.attributes = attributes
+        self.span = None
+
+    def __enter__(self):
+        self.span = start_span(self.name, self.parent, **self.attributes)
+        return self.span
+
+    def __exit__(self, exc_type, exc_value, tb):
+        finish_span(self.span, exc_value)
+
+
+def record(name, start, end, **attributes):
+    """Record a span that already ended, child of the current span."""
+    parent = current()
+    if parent is None or not parent.sampled:
+        return
+    s = Span(name, parent.trace_id, parent.span_id, True, attributes)
+    s.start = start
+    s.end = end
+    get_exporter().add(s)
+
+
+def extract(ctx):
+    """Return the traceparent carried by an RPC context."""
+    if isinstance(ctx, dict):
+        return ctx.get('trace')
+    return getattr(ctx, 'trace', None)
+
+
+def inject(ctx):
+    """Store the current trace context in an RPC context."""
+    traceparent = current_traceparent()
+    if traceparent is None:
+        return ctx
+    if isinstance(ctx, dict):
+        ctx['trace'] = traceparent
+    else:
+        ctx.trace = traceparent
+    return ctx
+
+
+class TracedEndpoint(object):
+    """Record a span for every call to the methods of an RPC endpoint."""
+
+    def __init__(self, endpoint, service):
+        self._endpoint = endpoint
+        self._service = service
+
+    def __getattr__(self, name):
+        attr = getattr(self._endpoint, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+        method = '%s.%s' % (self._service, name.rsplit('.', 1)[-1])
+
+        def traced(ctx, *args, **kwargs):
+            with span(method, parent=extract(ctx)):
+                return attr(ctx, *args, **kwargs)
+        return traced
+
+
+class Exporter(batching.Batcher):
+    """Export the spans in batches, from a background thread."""
+
+    def interval(self):
+        return CONF.tracing.flush_interval
+
+    def batch_size(self):
+        return CONF.tracing.batch_size
+
+    def add(self, span):
+        super(Exporter, self).add([span.to_dict()])
+
+    def send(self, spans):
+        try:
+            self.export(spans)
+        except Exception as e:
+            LOG.warning('Unable to export %(count)d spans: %(err)s',
+                        {'count': len(spans), 'err': e})
+
+    def export(self, spans):
+        raise NotImplementedError()
+
+
+class FileExporter(Exporter):
+    def export(self, spans):
+        with open(CONF.tracing.file_path, 'a') as f:
+            for s in spans:
+                f.write(json.dumps(s) + '\n')
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def to_otlp(spans):
+    """Encode spans in the OTLP/HTTP JSON format."""
+    by_service = {}
+    for s in spans:
+        attributes = [{'key': k, 'value': _otlp_value(v)}
+                      for k, v in sorted(s['attributes'].items())]
+        otlp_span = {
+            'traceId': s['trace_id'],
+            'spanId': s['span_id'],
+            'name': s['name'],
+            'kind': 1,
+            'startTimeUnixNano': str(int(s['start'] * 1e9)),
+            'endTimeUnixNano': str(int(s['end'] * 1e9)),
+            'attributes': attributes,
+            'status': {'code': 2, 'message': s['error']}
+            if s['error'] else {'code': 1},
+        }
+        if s['parent_id']:
+            otlp_span['parentSpanId'] = s['parent_id']
+        by_service.setdefault(s['service'], []).append(otlp_span)
+    return {'resourceSpans': [
+        {'resource': {'attributes': [
+            {'key': 'service.name', 'value': {'stringValue': service}}]},
+         'scopeSpans': [{'scope': {'name': 'iotronic'}, 'spans': otlp}]}
+        for service, otlp in sorted(by_service.items())]}
+
+
+class OTLPExporter(Exporter):
+    def export(self, spans):
+        body = json.dumps(to_otlp(spans)).encode('utf-8')
+        req = urllib_request.Request(
+            CONF.tracing.otlp_endpoint, data=body,
+            headers={'Content-Type': 'application/json'})
+        urllib_request.urlopen(req, timeout=10).close()
+
+
+_service = 'iotronic'
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def setup(service):
+    """Name the spans of this process."""
+    global _service
+    _service = service
+
+
+def get_exporter():
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            if CONF.tracing.exporter == OTLP:
+                _exporter = OTLPExporter()
+            else:
+                _exporter = FileExporter()
+        return _exporter
@@ -0,0 +1,195 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Stand-alone WSGI server of the iotronic API.
+
+The listening socket is bound once by the parent process and shared by
+the forked workers, each one serving the requests with a pool of green
+threads. On SIGHUP the workers finish the requests in progress, reload
+the configuration and build the application again; the socket stays open.
+"""
+
+import errno
+import socket
+import ssl
+import time
+
+import eventlet
+import eventlet.wsgi
+from oslo_config import cfg
+from oslo_log import log
+
+from iotronic.api import app
+from iotronic.common import exception
+from iotronic.common.i18n import _
+from iotronic.common import metrics
+from iotronic.common import service as iotronic_service
+from iotronic.openstack.common import service
+
+LOG = log.getLogger(__name__)
+
+wsgi_opts = [
+    cfg.IntOpt('backlog',
+               default=4096,
+               help='Number of backlog requests to configure the socket '
+                    'with.'),
+    cfg.IntOpt('tcp_keepidle',
+               default=600,
+               help='Sets the value of TCP_KEEPIDLE in seconds for each '
+                    'server socket.'),
+    cfg.BoolOpt('wsgi_keep_alive',
+                default=True,
+                help='Keep the client connections open between two '
+                     'requests (HTTP keep-alive).'),
+    cfg.IntOpt('client_socket_timeout',
+               default=900,
+               help='Timeout (in seconds) of an idle client connection. '
+                    '0 means wait forever.'),
+    cfg.IntOpt('wsgi_pool_size',
+               default=100,
+               help='Number of green threads serving the requests in each '
+                    'worker.'),
+    cfg.IntOpt('graceful_shutdown_timeout',
+               default=60,
+               help='Maximum time (in seconds) a stopping or reloading '
+                    'worker waits for the requests in progress.'),
+    cfg.IntOpt('max_header_line',
+               default=16384,
+               help='Maximum line size of the message headers.'),
+]
+
+ssl_opts = [
+    cfg.StrOpt('cert_file',
+               help='Certificate file of the API when enable_ssl_api is '
+                    'set.'),
+    cfg.StrOpt('key_file',
+               help='Private key file of the API when enable_ssl_api is '
+                    'set.'),
+    cfg.StrOpt('ca_file',
+               help='CA certificate file used to verify the clients. When '
+                    'set, the clients must present a certificate.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(wsgi_opts, 'api')
+CONF.register_opts(ssl_opts, 'ssl')
+
+
+class _WritableLogger(object):
+    """File-like object writing the eventlet.wsgi log lines in LOG."""
+
+    def write(self, msg):
+        LOG.info(msg.rstrip('\n'))
+
+
+def _bind(host, port):
+    info = socket.getaddrinfo(host, port, socket.AF_UNSPEC,
+                              socket.SOCK_STREAM)[0]
+    # the previous process may still hold the port for a while
+    retry_until = time.time() + 30
+    while True:
+        try:
+            sock = eventlet.listen(info[-1], family=info[0],
+                                   backlog=CONF.api.backlog)
+            break
+        except socket.error as e:
+            if e.errno != errno.EADDRINUSE or time.time() > retry_until:
+                raise
+            eventlet.sleep(0.1)
+
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    if hasattr(socket, 'TCP_KEEPIDLE'):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE,
+                        CONF.api.tcp_keepidle)
+    return sock
+
+
+class WSGIService(service.Service):
+    """Serve the iotronic API in a worker of the service launcher."""
+
+    def __init__(self, name, use_ssl=False):
+        super(WSGIService, self).__init__()
+        self.name = name
+        self.use_ssl = use_ssl
+        self.workers = iotronic_service.get_worker_count(
+            CONF.api.api_workers)
+        if use_ssl and not (CONF.ssl.cert_file and CONF.ssl.key_file):
+            raise exception.ConfigInvalid(
+                error_msg=_('enable_ssl_api requires [ssl]cert_file and '
+                            '[ssl]key_file.'))
+        self._socket = _bind(CONF.api.host_ip, CONF.api.port)
+        self._server = None
+        self._pool = None
+        self._metrics = None
+        LOG.info('%(name)s listening on %(host)s:%(port)s',
+                 {'name': self.name, 'host': CONF.api.host_ip,
+                  'port': CONF.api.port})
+
+    def _wrap_ssl(self, sock):
+        return eventlet.wrap_ssl(
+            sock,
+            certfile=CONF.ssl.cert_file,
+            keyfile=CONF.ssl.key_file,
+            ca_certs=CONF.ssl.ca_file,
+            cert_reqs=(ssl.CERT_REQUIRED if CONF.ssl.ca_file
+                       else ssl.CERT_NONE),
+            server_side=True)
+
+    def _serve_metrics(self):
+        # once per worker, after the fork: the registry is per process
+        if self._metrics is not None or not CONF.metrics.api_port:
+            return
+        slot = iotronic_service.claim_worker_slot('iotronic-api',
+                                                  self.workers)
+        if slot is not None:
+            self._metrics = metrics.serve(CONF.metrics.api_port + slot)
+
+    def start(self):
+        self._serve_metrics()
+        # the application is built in the worker, after the fork and
+        # after every reload of the configuration
+        application = app.VersionSelectorApplication()
+        eventlet.wsgi.MAX_HEADER_LINE = CONF.api.max_header_line
+
+        # eventlet closes the socket it serves on: keep ours for the
+        # restarts
+        sock = self._socket.dup()
+        if self.use_ssl:
+            sock = self._wrap_ssl(sock)
+
+        self._pool = eventlet.GreenPool(CONF.api.wsgi_pool_size)
+        self._server = eventlet.spawn(
+            eventlet.wsgi.server, sock, application,
+            custom_pool=self._pool,
+            log=_WritableLogger(),
+            keepalive=CONF.api.wsgi_keep_alive,
+            socket_timeout=CONF.api.client_socket_timeout or None,
+            debug=False)
+
+    def stop(self, graceful=True):
+        """Stop accepting connections and finish the requests in progress."""
+        if self._server is not None:
+            self._server.kill()
+            self._server = None
+        if self._pool is not None and graceful:
+            # idle keep-alive connections do not hold the worker forever
+            with eventlet.Timeout(CONF.api.graceful_shutdown_timeout, False):
+                self._pool.waitall()
+        super(WSGIService, self).stop(graceful=graceful)
+
+    def wait(self):
+        try:
+            if self._server is not None:
+                self._server.wait()
+        except eventlet.greenlet.GreenletExit:
+            pass
+        super(WSGIService, self).wait()
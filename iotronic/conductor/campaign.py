@@ -0,0 +1,331 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Injection campaigns.
+
+A campaign injects a plugin into every board matched by a selector. The
+injections run in parallel, with a limit on the number of injections in
+flight on each wamp agent shared by all the campaigns of the conductor.
+The state of the boards is written in batches.
+"""
+
+import collections
+import threading
+import time
+
+from oslo_config import cfg
+from oslo_log import log as logging
+import six
+
+from iotronic.common import events
+from iotronic.common import lanes
+from iotronic.common import states
+from iotronic import objects
+
+LOG = logging.getLogger(__name__)
+
+campaign_opts = [
+    cfg.IntOpt('campaign_agent_concurrency',
+               default=10,
+               help='Maximum number of injections in flight on the boards '
+                    'of a wamp agent, for all the campaigns run by a '
+                    'conductor.'),
+    cfg.IntOpt('campaign_batch_size',
+               default=50,
+               help='Number of board results buffered before being '
+                    'written to the database.'),
+    cfg.FloatOpt('campaign_flush_interval',
+                 default=2.0,
+                 help='Maximum time (in seconds) a board result stays in '
+                      'the buffer. It is also the interval between two '
+                      'checks for a campaign cancellation.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(campaign_opts, 'conductor')
+
+
+def selector_filters(selector):
+    """Translate a campaign selector into board list filters."""
+    filters = {}
+    if selector.get('project'):
+        filters['project_id'] = selector['project']
+    if selector.get('type'):
+        filters['type'] = selector['type']
+    if selector.get('boards'):
+        filters['uuids'] = list(selector['boards'])
+    if selector.get('tags'):
+        filters['tags'] = list(selector['tags'])
+    if selector.get('group'):
+        filters['group'] = selector['group']
+    return filters
+
+
+class _Results(object):
+    """Board results of a campaign, written in batches."""
+
+    def __init__(self, campaign):
+        self.campaign = campaign
+        self._results = []
+        self._lock = threading.Lock()
+        self._last_flush = time.time()
+
+    def add(self, board_uuid, status, error=None):
+        with self._lock:
+            self._results.append((board_uuid, status, error))
+            due = len(self._results) >= CONF.conductor.campaign_batch_size
+        if due:
+            self.flush()
+
+    def flush(self, force=True):
+        with self._lock:
+            if not force and (time.time() - self._last_flush <
+                              CONF.conductor.campaign_flush_interval):
+                return
+            results, self._results = self._results, []
+            self._last_flush = time.time()
+        if not results:
+            return
+
+        groups = collections.defaultdict(list)
+        for board_uuid, status, error in results:
+            groups[(status, error)].append(board_uuid)
+        for (status, error), board_uuids in groups.items():
+            self.campaign.set_boards_status(board_uuids, status, error=error)
+
+        done = groups.get((states.DONE, None))
+        if done:
+            objects.InjectionPlugin.upsert(self.campaign._context,
+                                           self.campaign.plugin_uuid,
+                                           done, self.campaign.onboot)
+            events.publish_boards(self.campaign._context, events.INJECTION,
+                                  done, plugin=self.campaign.plugin_uuid,
+                                  injection='injected',
+                                  campaign=self.campaign.uuid)
+
+
+class CampaignRunner(object):
+    """Run the injection campaigns of a conductor."""
+
+    def __init__(self, endpoint):
+        # the conductor endpoint executes the injections
+        self.endpoint = endpoint
+        self._agents = {}
+        self._lock = threading.Lock()
+        # notified every time an injection slot is released
+        self._released = threading.Condition()
+        self._running = {}
+
+    def _agent_slots(self, agent):
+        with self._lock:
+            if agent not in self._agents:
+                self._agents[agent] = threading.BoundedSemaphore(
+                    CONF.conductor.campaign_agent_concurrency)
+            return self._agents[agent]
+
+    def start(self, ctx, campaign):
+        with self._lock:
+            if campaign.uuid in self._running:
+                return
+            th = threading.Thread(target=self._run, args=(ctx, campaign))
+            th.daemon = True
+            self._running[campaign.uuid] = th
+        th.start()
+
+    def _unfinished(self, ctx, filters=None):
+        for status in (states.PENDING, states.RUNNING):
+            for campaign in objects.InjectionCampaign.list(
+                    ctx, filters=dict(filters or {}, status=status)):
+                yield campaign
+
+    def _take_over(self, ctx, campaign, worker):
+        if not campaign.claim(worker):
+            # taken over by another worker meanwhile
+            return
+        # the injections in flight have been lost
+        campaign.set_boards_status(None, states.PENDING,
+                                   from_status=states.RUNNING)
+        LOG.info('Resuming injection campaign %s', campaign.uuid)
+        self.start(ctx, campaign)
+
+    def resume(self, ctx, worker):
+        """Restart the campaigns of the dead worker this one replaces.
+
+        :param worker: the name of the worker, "<host>.<slot>".
+        """
+        for campaign in self._unfinished(ctx, {'conductor': worker}):
+            self._take_over(ctx, campaign, worker)
+
+    def adopt(self, ctx, host, worker, dead_slot):
+        """Take over the campaigns of the workers of a host that are gone.
+
+        A campaign belongs to the worker running it. The campaigns of
+        the host itself were created by a worker unable to run them, or
+        before the workers were named.
+
+        :param host: the hostname of the conductor.
+        :param worker: the name of this worker.
+        :param dead_slot: a function returning a context manager, which
+                          holds the slot of a worker while the slot is
+                          tested; it yields True if the worker is gone.
+        """
+        for campaign in self._unfinished(ctx):
+            owner = campaign.conductor
+            if owner == worker or not owner:
+                continue
+            if owner == host:
+                self._take_over(ctx, campaign, worker)
+                continue
+            prefix, _sep, slot = owner.rpartition('.')
+            if prefix != host or not slot.isdigit():
+                continue
+            with dead_slot(int(slot)) as dead:
+                if dead:
+                    self._take_over(ctx, campaign, worker)
+
+    def _run(self, ctx, campaign):
+        try:
+            self._dispatch(ctx, campaign)
+        except Exception as e:
+            LOG.error('Injection campaign %(campaign)s failed: %(err)s',
+                      {'campaign': campaign.uuid, 'err': e})
+            campaign.status = states.FAILED
+            campaign.save()
+        finally:
+            with self._lock:
+                self._running.pop(campaign.uuid, None)
+
+    def _dispatch(self, ctx, campaign):
+        plugin = objects.Plugin.get_by_uuid(ctx, campaign.plugin_uuid)
+        campaign.status = states.RUNNING
+        campaign.save()
+
+        queues = collections.OrderedDict()
+        for board_uuid, agent in campaign.boards(states.PENDING):
+            queues.setdefault(agent, collections.deque()).append(board_uuid)
+        LOG.info('Injection campaign %(campaign)s: %(count)d boards on '
+                 '%(agents)d agents',
+                 {'campaign': campaign.uuid,
+                  'count': sum(len(q) for q in queues.values()),
+                  'agents': len(queues)})
+
+        results = _Results(campaign)
+        in_flight = collections.Counter()
+        last_check = time.time()
+        cancelled = False
+
+        while queues or sum(in_flight.values()):
+            dispatched = []
+            # one board per agent at a time, so a slow agent does not
+            # hold the others back
+            for agent in list(queues):
+                if (campaign.concurrency and
+                        in_flight[agent] >= campaign.concurrency):
+                    continue
+                slots = self._agent_slots(agent)
+                if not slots.acquire(False):
+                    continue
+                board_uuid = queues[agent].popleft()
+                if not queues[agent]:
+                    del queues[agent]
+                dispatched.append((agent, board_uuid))
+
+            if dispatched:
+                dispatched = self._claim(campaign, dispatched)
+                if dispatched is None:
+                    # cancelled by a conductor: its boards are not
+                    # pending anymore
+                    cancelled = True
+                    queues.clear()
+                    continue
+                for agent, board_uuid in dispatched:
+                    with self._released:
+                        in_flight[agent] += 1
+                    th = threading.Thread(target=self._inject,
+                                          args=(ctx, plugin, campaign, agent,
+                                                board_uuid, results,
+                                                in_flight))
+                    th.daemon = True
+                    th.start()
+                continue
+
+            with self._released:
+                self._released.wait(CONF.conductor.campaign_flush_interval)
+            results.flush(force=False)
+
+            if (queues and time.time() - last_check >=
+                    CONF.conductor.campaign_flush_interval):
+                last_check = time.time()
+                campaign.refresh()
+                if campaign.status == states.CANCELLED:
+                    cancelled = True
+                    queues.clear()
+
+        results.flush()
+        if cancelled:
+            campaign.set_boards_status(None, states.CANCELLED,
+                                       from_status=states.PENDING)
+            LOG.info('Injection campaign %s cancelled', campaign.uuid)
+            return
+
+        campaign.status = states.DONE
+        campaign.save()
+        LOG.info('Injection campaign %(campaign)s completed: %(progress)s',
+                 {'campaign': campaign.uuid,
+                  'progress': campaign.progress()})
+
+    def _claim(self, campaign, dispatched):
+        """Move the boards about to be injected from PENDING to RUNNING.
+
+        A conductor cancelling the campaign moves its PENDING boards to
+        CANCELLED: when some of the boards are not pending anymore, none
+        is injected.
+
+        :param dispatched: a list of (agent, board_uuid) tuples, whose
+                           agent slots are taken.
+        :returns: the dispatched tuples, None if the campaign has been
+                  cancelled.
+        """
+        board_uuids = [board_uuid for agent, board_uuid in dispatched]
+        claimed = campaign.set_boards_status(board_uuids, states.RUNNING,
+                                             from_status=states.PENDING)
+        if claimed == len(dispatched):
+            return dispatched
+
+        campaign.set_boards_status(board_uuids, states.CANCELLED,
+                                   from_status=states.RUNNING)
+        for agent, board_uuid in dispatched:
+            self._agent_slots(agent).release()
+        return None
+
+    def _inject(self, ctx, plugin, campaign, agent, board_uuid, results,
+                in_flight):
+        # the cached results of the read-only actions become stale
+        self.endpoint._forget_actions(board_uuid, plugin.uuid)
+        try:
+            self.endpoint.execute_on_board(ctx, board_uuid, 'PluginInject',
+                                           (plugin, campaign.onboot),
+                                           lane=lanes.BULK)
+            results.add(board_uuid, states.DONE)
+        except Exception as e:
+            LOG.debug('Injection of %(plugin)s into %(board)s failed: '
+                      '%(err)s', {'plugin': plugin.uuid,
+                                  'board': board_uuid, 'err': e})
+            results.add(board_uuid, states.FAILED, six.text_type(e))
+        finally:
+            self._agent_slots(agent).release()
+            with self._released:
+                in_flight[agent] -= 1
+                self._released.notify_all()
@@ -13,9 +13,17 @@
 #    under the License.
 
 import cPickle as cpickle
+from iotronic.common import events
 from iotronic.common import exception
+from iotronic.common import lanes
+from iotronic.common import profiler
+from iotronic.common import service
+from iotronic.common import singleflight
+from iotronic.common import tracing
 from iotronic.common import states
+from iotronic.conductor import campaign
 from iotronic.conductor.provisioner import Provisioner
+from iotronic.conductor import scheduler
 from iotronic import objects
 from iotronic.objects import base as objects_base
 from iotronic.wamp import wampmessage as wm
@@ -23,29 +31,109 @@ from oslo_config import cfg
 from oslo_log import log as logging
 import oslo_messaging
 
+import json
 import random
+import threading
+import time
 
 LOG = logging.getLogger(__name__)
 
+# topic of the calls to one worker process of a conductor, addressed by
+# its name "<host>.<slot>"
+WORKER_TOPIC = 'iotronic.conductor_worker'
+
+busy_opts = [
+    cfg.IntOpt('busy_retries',
+               default=3,
+               help='Number of times a call rejected by a busy wamp agent '
+                    'is retried.'),
+    cfg.FloatOpt('busy_retry_max_delay',
+                 default=10.0,
+                 help='Maximum delay (in seconds) before retrying a call '
+                      'rejected by a busy wamp agent.'),
+]
+
+action_opts = [
+    cfg.BoolOpt('coalesce_actions',
+                default=True,
+                help='Share one call to the board among the identical '
+                     'read-only plugin actions requested at the same time.'),
+    cfg.FloatOpt('action_cache_ttl',
+                 default=0.0,
+                 help='Time (in seconds) the result of a read-only plugin '
+                      'action is reused. 0 disables the cache.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(busy_opts, 'conductor')
+CONF.register_opts(action_opts, 'conductor')
+
 serializer = objects_base.IotronicObjectSerializer()
 
+# hostname: time until which the agent is considered overloaded
+_busy_agents = {}
+_busy_lock = threading.Lock()
+
+
+def mark_busy(agent, retry_after):
+    with _busy_lock:
+        until = time.time() + retry_after
+        _busy_agents[agent] = max(until, _busy_agents.get(agent, 0))
+
 
 def get_best_agent(ctx):
     agents = objects.WampAgent.list(ctx, filters={'online': True})
     LOG.debug('found %d Agent(s).', len(agents))
-    agent = random.choice(agents)
+    now = time.time()
+    with _busy_lock:
+        busy = dict((a.hostname, _busy_agents.get(a.hostname, 0))
+                    for a in agents)
+    available = [a for a in agents if busy[a.hostname] <= now]
+    if available:
+        agent = random.choice(available)
+    else:
+        # every agent is overloaded: the first one to recover
+        agent = min(agents, key=lambda a: busy[a.hostname])
     LOG.debug('Selected agent: %s', agent.hostname)
     return agent.hostname
 
 
+def _retry_delay(retry_after, attempt):
+    # full jitter on an exponential backoff, so the callers rejected
+    # together do not come back together
+    delay = min(CONF.conductor.busy_retry_max_delay,
+                retry_after * (2 ** attempt))
+    return random.uniform(retry_after, max(retry_after, delay))
+
+
+class WorkerEndpoint(object):
+    """The calls about the state of one worker process."""
+
+    def lane_stats(self, ctx):
+        return lanes.stats()
+
+    def profiler_control(self, ctx, action, mode=None):
+        return profiler.get_profiler().control(action, mode)
+
+
 class ConductorEndpoint(object):
-    def __init__(self, ragent):
+    def __init__(self, ragent, host=None, worker=None):
         transport = oslo_messaging.get_transport(cfg.CONF)
         self.target = oslo_messaging.Target()
         self.wamp_agent_client = oslo_messaging.RPCClient(transport,
                                                           self.target)
         self.wamp_agent_client.prepare(timeout=10)
+        self.worker_client = oslo_messaging.RPCClient(
+            transport, oslo_messaging.Target(topic=WORKER_TOPIC))
         self.ragent = ragent
+        self.host = host
+        # "<host>.<slot>", None for a worker without a slot
+        self.worker = worker
+        self.campaigns = campaign.CampaignRunner(self)
+        self.schedules = scheduler.ScheduleRunner(self)
+        self.actions = singleflight.Group()
+        self.action_results = singleflight.TTLCache(
+            CONF.conductor.action_cache_ttl)
 
     def echo(self, ctx, data):
         LOG.info("ECHO: %s" % data)
@@ -60,13 +148,13 @@ class ConductorEndpoint(object):
         except Exception as exc:
             msg = exc.message % {'board': code}
             LOG.error(msg)
-            return wm.WampError(msg).serialize()
+            return wm.WampError(msg).to_dict()
 
         if not board.status == states.REGISTERED:
             msg = "board with code %(board)s cannot " \
                   "be registered again." % {'board': code}
             LOG.error(msg)
-            return wm.WampError(msg).serialize()
+            return wm.WampError(msg).to_dict()
 
         try:
             old_ses = objects.SessionWP(ctx)
@@ -93,22 +181,25 @@ class ConductorEndpoint(object):
         prov.conf_main_agent(agent.wsurl)
         loc = objects.Location.list_by_board_uuid(ctx, board.uuid)[0]
         prov.conf_location(loc)
-        board.config = prov.get_config()
+        # only the per-board delta is stored, the rest is rendered
+        board.config = prov.get_delta()
+        config = prov.get_config()
 
         board.status = states.OFFLINE
         board.save()
+        events.publish([events.board_event(events.REGISTRATION, board)])
 
-        LOG.debug('sending this conf %s', board.config)
+        LOG.debug('sending this conf %s', config)
 
-        wmessage = wm.WampSuccess(board.config)
-        return wmessage.serialize()
+        wmessage = wm.WampSuccess(config)
+        return wmessage.to_dict()
 
     def destroy_board(self, ctx, board_id):
         LOG.info('Destroying board with id %s',
                  board_id)
         board = objects.Board.get_by_uuid(ctx, board_id)
         result = None
-        if board.is_online():
+        if self.board_presence(ctx, board.uuid)['connected']:
             prov = Provisioner()
             prov.conf_clean()
             p = prov.get_config()
@@ -121,6 +212,7 @@ class ConductorEndpoint(object):
             except exception:
                 return exception
         board.destroy()
+        events.publish([events.board_event(events.DELETED, board)])
         if result:
             LOG.debug(result)
             return result
@@ -129,7 +221,10 @@ class ConductorEndpoint(object):
     def update_board(self, ctx, board_obj):
         board = serializer.deserialize_entity(ctx, board_obj)
         LOG.debug('Updating board %s', board.name)
+        status_changed = 'status' in board.obj_what_changed()
         board.save()
+        if status_changed:
+            events.publish([events.board_event(events.STATUS, board)])
         return serializer.serialize_entity(ctx, board)
 
     def create_board(self, ctx, board_obj, location_obj):
@@ -140,30 +235,54 @@ class ConductorEndpoint(object):
         new_board.create()
         new_location.board_id = new_board.id
         new_location.create()
+        events.publish([events.board_event(events.STATUS, new_board)])
 
         return serializer.serialize_entity(ctx, new_board)
 
-    def execute_on_board(self, ctx, board_uuid, wamp_rpc_call, wamp_rpc_args):
+    def execute_on_board(self, ctx, board_uuid, wamp_rpc_call, wamp_rpc_args,
+                         lane=lanes.INTERACTIVE):
         LOG.debug('Executing \"%s\" on the board: %s',
                   wamp_rpc_call, board_uuid)
 
         board = objects.Board.get_by_uuid(ctx, board_uuid)
+        if not board.agent:
+            raise exception.BoardNotConnected(board=board.uuid)
 
         s4t_topic = 's4t_invoke_wamp'
         full_topic = board.agent + '.' + s4t_topic
-        self.target.topic = full_topic
+        # prepare() instead of changing the shared target: the endpoint
+        # serves concurrent calls
+        cctxt = self.wamp_agent_client.prepare(
+            topic=lanes.topic(full_topic, lane))
         full_wamp_call = 'iotronic.' + board.uuid + "." + wamp_rpc_call
 
-        # check the session; it rise an excpetion if session miss
-        if not board.is_online():
+        # the agent continues the trace from the current span
+        tracing.inject(ctx)
+        attempt = 0
+        while True:
+            res = cctxt.call(ctx, full_topic,
+                             wamp_rpc_call=full_wamp_call,
+                             data=wamp_rpc_args)
+            res = wm.deserialize(res)
+            if res.result != wm.BUSY:
+                break
+            retry_after = res.retry_after or 1.0
+            mark_busy(board.agent, retry_after)
+            if attempt >= CONF.conductor.busy_retries:
+                raise exception.AgentBusy(agent=board.agent,
+                                          retry_after=retry_after)
+            delay = _retry_delay(retry_after, attempt)
+            LOG.debug('Wamp agent %(agent)s busy, retrying %(call)s on '
+                      '%(board)s in %(delay).1fs',
+                      {'agent': board.agent, 'call': wamp_rpc_call,
+                       'board': board.uuid, 'delay': delay})
+            lanes.sleep(delay)
+            attempt += 1
+
+        # the agent checks the presence of the board
+        if res.result == wm.NOT_CONNECTED:
             raise exception.BoardNotConnected(board=board.uuid)
-
-        res = self.wamp_agent_client.call(ctx, full_topic,
-                                          wamp_rpc_call=full_wamp_call,
-                                          data=wamp_rpc_args)
-        res = wm.deserialize(res)
-
-        if res.result == wm.SUCCESS:
+        elif res.result == wm.SUCCESS:
             return res.message
         elif res.result == wm.WARNING:
             LOG.warning('Warning in the execution of %s on %s', wamp_rpc_call,
@@ -176,6 +295,76 @@ class ConductorEndpoint(object):
                                                   board=board.uuid,
                                                   error=res.message)
 
+    def execute_batch_on_agent(self, ctx, agent, calls, lane=lanes.BULK,
+                               timeout=None):
+        """Execute a set of calls on the boards of a wamp agent at once.
+
+        The calls rejected by a busy agent are sent again together, in a
+        single batch without the accepted ones, after the longest delay it
+        suggests, up to busy_retries times; the ones still rejected are
+        reported as BUSY.
+
+        :param agent: the hostname of the wamp agent.
+        :param calls: a list of (board_uuid, wamp_rpc_call, wamp_rpc_args).
+        :param timeout: time (in seconds) each batch has to complete.
+        :returns: a list of WampMessage, in the order of the calls.
+        """
+        for board_uuid, wamp_rpc_call, wamp_rpc_args in calls:
+            if not objects.plugin.is_read_only(wamp_rpc_call):
+                self._forget_actions(board_uuid, wamp_rpc_args[0])
+
+        full_topic = agent + '.s4t_invoke_wamp'
+        cctxt = self.wamp_agent_client.prepare(
+            topic=lanes.topic(full_topic, lane), timeout=timeout)
+        tracing.inject(ctx)
+        replies = [None] * len(calls)
+        pending = list(range(len(calls)))
+        attempt = 0
+        while True:
+            batch = cctxt.call(
+                ctx, agent + '.s4t_invoke_wamp_batch',
+                calls=[{'wamp_rpc_call': 'iotronic.%s.%s' % (calls[i][0],
+                                                             calls[i][1]),
+                        'data': calls[i][2]}
+                       for i in pending])
+            busy = []
+            retry_after = 0
+            for i, reply in zip(pending, batch):
+                replies[i] = reply = wm.deserialize(reply)
+                if reply.result == wm.BUSY:
+                    busy.append(i)
+                    retry_after = max(retry_after, reply.retry_after or 1.0)
+            if not busy:
+                break
+            mark_busy(agent, retry_after)
+            if attempt >= CONF.conductor.busy_retries:
+                break
+            delay = _retry_delay(retry_after, attempt)
+            LOG.debug('Wamp agent %(agent)s busy, retrying %(count)d of '
+                      '%(total)d calls in %(delay).1fs',
+                      {'agent': agent, 'count': len(busy),
+                       'total': len(calls), 'delay': delay})
+            lanes.sleep(delay)
+            pending = busy
+            attempt += 1
+        return replies
+
+    def board_presence(self, ctx, board_uuid):
+        board = objects.Board.get_by_uuid(ctx, board_uuid)
+        if not board.agent:
+            return {'board': board.uuid, 'connected': False, 'agent': None}
+
+        cctxt = self.wamp_agent_client.prepare(
+            topic=board.agent + '.s4t_invoke_wamp', timeout=10)
+        try:
+            res = cctxt.call(ctx, board.agent + '.s4t_presence',
+                             board_uuid=board.uuid)
+        except oslo_messaging.MessagingTimeout:
+            LOG.warning('Wamp agent %s did not answer', board.agent)
+            res = {'board': board.uuid, 'connected': False}
+        res['agent'] = board.agent
+        return res
+
     def destroy_plugin(self, ctx, plugin_id):
         LOG.info('Destroying plugin with id %s',
                  plugin_id)
@@ -202,6 +391,7 @@ class ConductorEndpoint(object):
                  plugin_uuid, board_uuid)
 
         plugin = objects.Plugin.get(ctx, plugin_uuid)
+        self._forget_actions(board_uuid, plugin.uuid)
         try:
             result = self.execute_on_board(ctx,
                                            board_uuid,
@@ -229,6 +419,9 @@ class ConductorEndpoint(object):
             }
             injection = objects.InjectionPlugin(ctx, **inj_data)
             injection.create()
+        events.publish_boards(ctx, events.INJECTION, [board_uuid],
+                              plugin=plugin.uuid,
+                              injection=injection.status)
 
         LOG.debug(result)
         return result
@@ -240,6 +433,7 @@ class ConductorEndpoint(object):
         plugin = objects.Plugin.get_by_uuid(ctx, plugin_uuid)
 
         injection = objects.InjectionPlugin.get(ctx, board_uuid, plugin_uuid)
+        self._forget_actions(board_uuid, plugin.uuid)
 
         try:
             result = self.execute_on_board(ctx, board_uuid, 'PluginRemove',
@@ -249,6 +443,8 @@ class ConductorEndpoint(object):
 
         LOG.debug(result)
         injection.destroy()
+        events.publish_boards(ctx, events.INJECTION, [board_uuid],
+                              plugin=plugin.uuid, injection='removed')
         return result
 
     def action_plugin(self, ctx, plugin_uuid, board_uuid, action, params):
@@ -257,15 +453,107 @@ class ConductorEndpoint(object):
         plugin = objects.Plugin.get(ctx, plugin_uuid)
         objects.plugin.is_valid_action(action)
 
+        if objects.plugin.want_params(action):
+            args = (plugin.uuid, params)
+        else:
+            args = (plugin.uuid,)
+
         try:
-            if objects.plugin.want_params(action):
-                result = self.execute_on_board(ctx, board_uuid, action,
-                                               (plugin.uuid, params))
+            if objects.plugin.is_read_only(action):
+                result = self._read_action(ctx, board_uuid, action, args)
             else:
-                result = self.execute_on_board(ctx, board_uuid, action,
-                                               (plugin.uuid,))
+                self._forget_actions(board_uuid, plugin.uuid)
+                result = self.execute_on_board(ctx, board_uuid, action, args)
         except exception:
             return exception
 
         LOG.debug(result)
         return result
+
+    def _read_action(self, ctx, board_uuid, action, args):
+        # identical concurrent reads share one call to the board
+        key = (board_uuid, action, args[0],
+               json.dumps(args[1:], sort_keys=True))
+        found, result = self.action_results.get(key)
+        if found:
+            LOG.debug('Result of %s on %s served from cache',
+                      action, board_uuid)
+            return result
+
+        if CONF.conductor.coalesce_actions:
+            result = self.actions.do(key, self.execute_on_board, ctx,
+                                     board_uuid, action, args)
+        else:
+            result = self.execute_on_board(ctx, board_uuid, action, args)
+        self.action_results.set(key, result)
+        return result
+
+    def _forget_actions(self, board_uuid, plugin_uuid):
+        self.action_results.invalidate(
+            lambda key: key[0] == board_uuid and key[2] == plugin_uuid)
+
+    def create_campaign(self, ctx, campaign_obj):
+        new_campaign = serializer.deserialize_entity(ctx, campaign_obj)
+        filters = campaign.selector_filters(new_campaign.selector or {})
+        boards = objects.Board.list_agents(ctx, filters=filters)
+        if not boards:
+            raise exception.EmptyCampaign()
+
+        LOG.info('Creating injection campaign of plugin %(plugin)s on '
+                 '%(count)d boards',
+                 {'plugin': new_campaign.plugin_uuid, 'count': len(boards)})
+        new_campaign.status = states.PENDING
+        # a worker without a slot cannot be resumed: the campaigns of the
+        # host are adopted by the first worker
+        new_campaign.conductor = self.worker or self.host
+        new_campaign.create(boards=boards)
+        if self.worker:
+            self.campaigns.start(ctx, new_campaign)
+        return serializer.serialize_entity(ctx, new_campaign)
+
+    def cancel_campaign(self, ctx, campaign_uuid):
+        LOG.info('Cancelling injection campaign %s', campaign_uuid)
+        cpg = objects.InjectionCampaign.get_by_uuid(ctx, campaign_uuid)
+        if cpg.status in (states.DONE, states.FAILED, states.CANCELLED):
+            return serializer.serialize_entity(ctx, cpg)
+        cpg.status = states.CANCELLED
+        cpg.save()
+        # wherever the campaign runs: its runner injects only the boards
+        # it moves from PENDING to RUNNING
+        cpg.set_boards_status(None, states.CANCELLED,
+                              from_status=states.PENDING)
+        return serializer.serialize_entity(ctx, cpg)
+
+    def _call_workers(self, ctx, method, **kwargs):
+        """Call a method on every live worker process of this conductor.
+
+        :returns: the results by worker name; the error for a worker which
+                  failed.
+        """
+        results = {}
+        for slot in service.live_worker_slots('iotronic-conductor'):
+            worker = '%s.%d' % (self.host, slot)
+            cctxt = self.worker_client.prepare(server=worker, timeout=10)
+            try:
+                results[worker] = cctxt.call(ctx, method, **kwargs)
+            except Exception as e:
+                LOG.warning('%(method)s failed on worker %(worker)s: %(e)s',
+                            {'method': method, 'worker': worker, 'e': e})
+                results[worker] = {'error': str(e)}
+        return results
+
+    def lane_stats(self, ctx, agent=None):
+        if agent is None:
+            return self._call_workers(ctx, 'lane_stats')
+        cctxt = self.wamp_agent_client.prepare(
+            topic=agent + '.s4t_invoke_wamp', timeout=10)
+        return cctxt.call(ctx, agent + '.s4t_lane_stats')
+
+    def profiler_control(self, ctx, action, mode=None, agent=None):
+        if agent is None:
+            return self._call_workers(ctx, 'profiler_control',
+                                      action=action, mode=mode)
+        cctxt = self.wamp_agent_client.prepare(
+            topic=agent + '.s4t_invoke_wamp', timeout=10)
+        return cctxt.call(ctx, agent + '.s4t_profiler', action=action,
+                          mode=mode)
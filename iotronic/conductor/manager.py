@@ -12,21 +12,30 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
+
+from iotronic.common import context
+from iotronic.common import events
 from iotronic.common import exception
 from iotronic.common.i18n import _LI
 from iotronic.common.i18n import _LW
+from iotronic.common import lanes
+from iotronic.common import metrics
+from iotronic.common import notifications
+from iotronic.common import profiler
+from iotronic.common import service
+from iotronic.common import tracing
 from iotronic.conductor import endpoints as endp
 from iotronic.db import api as dbapi
-import os
+from iotronic.openstack.common import periodic_task
 from oslo_config import cfg
 from oslo_log import log as logging
 import oslo_messaging
-import signal
-import time
 
 LOG = logging.getLogger(__name__)
 
 MANAGER_TOPIC = 'iotronic.conductor_manager'
+WORKER_TOPIC = endp.WORKER_TOPIC
 RAGENT = None
 
 conductor_opts = [
@@ -39,70 +48,159 @@ conductor_opts = [
                help='Maximum time (in seconds) since the last check-in '
                     'of a conductor. A conductor is considered inactive '
                     'when this time has been exceeded.'),
+    cfg.IntOpt('heartbeat_interval',
+               default=10,
+               help='Seconds between conductor heart beats.'),
+    cfg.IntOpt('workers',
+               min=1,
+               help='Number of conductor worker processes sharing the RPC '
+                    'topics. Defaults to the number of CPUs.'),
+    cfg.StrOpt('rpc_executor',
+               default='eventlet',
+               choices=['eventlet', 'threading'],
+               help='Executor of the RPC servers of each worker. Its pool '
+                    'size is executor_thread_pool_size.'),
 ]
 
 CONF = cfg.CONF
 CONF.register_opts(conductor_opts, 'conductor')
+CONF.import_opt('schedule_interval', 'iotronic.conductor.scheduler',
+                'conductor')
 
 
-class ConductorManager(object):
-    RPC_API_VERSION = '1.0'
-
-    def __init__(self, host):
-        logging.register_options(CONF)
-        CONF(project='iotronic')
-        logging.setup(CONF, "iotronic-conductor")
+class ConductorManager(periodic_task.PeriodicTasks):
+    """Conductor of one worker process, run by service.RPCService."""
 
-        signal.signal(signal.SIGINT, self.stop_handler)
+    RPC_API_VERSION = '1.0'
 
+    def __init__(self, host, topic):
+        super(ConductorManager, self).__init__()
         if not host:
             host = CONF.host
         self.host = host
-        self.topic = MANAGER_TOPIC
+        self.topic = topic
+        self.dbapi = None
+        self.endpoint = None
+        self.conductor = None
+        # the first worker registers the conductor and runs the periodic
+        # tasks, the others only serve the RPC calls
+        self.slot = None
+        self.worker = None
+        self.leader = False
+
+    def init_host(self):
+        self.slot = service.claim_worker_slot('iotronic-conductor',
+                                              CONF.conductor.workers)
+        # a process without a slot is an extra one, e.g. started while a
+        # dead worker still held its lock: it only serves the RPC calls
+        self.leader = self.slot == 0
+        if self.slot is not None:
+            self.worker = '%s.%d' % (self.host, self.slot)
+        tracing.setup("iotronic-conductor")
+        notifications.setup("iotronic-conductor")
+        self.profiler = profiler.setup("iotronic-conductor")
         self.dbapi = dbapi.get_instance()
 
-        try:
-            cdr = self.dbapi.register_conductor(
-                {'hostname': self.host})
-        except exception.ConductorAlreadyRegistered:
-            LOG.warn(_LW("A conductor with hostname %(hostname)s "
-                         "was previously registered. Updating registration"),
-                     {'hostname': self.host})
-
-            cdr = self.dbapi.register_conductor({'hostname': self.host},
-                                                update_existing=True)
-        self.conductor = cdr
+        if self.leader:
+            try:
+                cdr = self.dbapi.register_conductor(
+                    {'hostname': self.host})
+            except exception.ConductorAlreadyRegistered:
+                LOG.warn(_LW("A conductor with hostname %(hostname)s "
+                             "was previously registered. Updating "
+                             "registration"), {'hostname': self.host})
 
-        transport = oslo_messaging.get_transport(cfg.CONF)
-        target = oslo_messaging.Target(topic=self.topic, server=self.host,
-                                       version=self.RPC_API_VERSION)
+                cdr = self.dbapi.register_conductor({'hostname': self.host},
+                                                    update_existing=True)
+            self.conductor = cdr
 
         ragent = self.dbapi.get_registration_wampagent()
 
         LOG.info("Found registration agent: %s on %s",
                  ragent.hostname, ragent.wsurl)
 
-        endpoints = [
-            endp.ConductorEndpoint(ragent),
-        ]
-        self.server = oslo_messaging.get_rpc_server(transport,
-                                                    target,
-                                                    endpoints,
-                                                    executor='threading')
+        self.endpoint = endp.ConductorEndpoint(ragent, host=self.host,
+                                               worker=self.worker)
 
-        self.server.start()
+        if self.slot is not None:
+            metrics.serve(CONF.metrics.conductor_port and
+                          CONF.metrics.conductor_port + self.slot)
+            # the worker which held the slot before is dead
+            self.endpoint.campaigns.resume(context.get_admin_context(),
+                                           self.worker)
 
-        while True:
-            time.sleep(1)
+    def get_rpc_servers(self):
+        """Return the RPC servers of this worker, one per lane.
 
-    def stop_handler(self, signum, frame):
-        LOG.info("Stopping server")
-        self.server.stop()
-        self.server.wait()
-        self.del_host()
-        os._exit(0)
+        Every worker listens on the same topics: the calls are spread
+        among the workers by the message bus. A worker with a slot also
+        listens on the worker topic, for the calls about its own state.
+        """
+        transport = oslo_messaging.get_transport(cfg.CONF)
+        servers = []
+        for lane in lanes.LANES:
+            target = oslo_messaging.Target(topic=lanes.topic(self.topic,
+                                                             lane),
+                                           server=self.host,
+                                           version=self.RPC_API_VERSION)
+            endpoints = [
+                tracing.TracedEndpoint(
+                    lanes.LaneEndpoint(
+                        metrics.InstrumentedEndpoint(
+                            profiler.ProfiledEndpoint(self.endpoint,
+                                                      self.profiler),
+                            'conductor'),
+                        lanes.get_lane(lane)),
+                    'conductor'),
+            ]
+            servers.append(oslo_messaging.get_rpc_server(
+                transport, target, endpoints,
+                executor=CONF.conductor.rpc_executor))
+            if not CONF.lanes.enabled:
+                break
+        if self.worker is not None:
+            target = oslo_messaging.Target(topic=WORKER_TOPIC,
+                                           server=self.worker,
+                                           version=self.RPC_API_VERSION)
+            servers.append(oslo_messaging.get_rpc_server(
+                transport, target, [endp.WorkerEndpoint()],
+                executor=CONF.conductor.rpc_executor))
+        return servers
+
+    def periodic_tasks(self, context, raise_on_error=False):
+        """Periodic tasks are run at pre-specified interval."""
+        if not self.leader:
+            return periodic_task.DEFAULT_INTERVAL
+        return self.run_periodic_tasks(context, raise_on_error=raise_on_error)
+
+    @periodic_task.periodic_task(spacing=CONF.conductor.heartbeat_interval)
+    def _conductor_service_record_keepalive(self, context):
+        try:
+            self.dbapi.touch_conductor(self.host)
+        except exception.ConductorNotFound:
+            LOG.warn(_LW('Conductor %s not found, registering it again'),
+                     self.host)
+            self.dbapi.register_conductor({'hostname': self.host},
+                                          update_existing=True)
+
+    @periodic_task.periodic_task(spacing=CONF.conductor.heartbeat_interval)
+    def _adopt_campaigns(self, context):
+        self.endpoint.campaigns.adopt(
+            context, self.host, self.worker,
+            functools.partial(service.dead_worker_slot,
+                              'iotronic-conductor'))
+
+    @periodic_task.periodic_task(spacing=CONF.conductor.schedule_interval)
+    def _run_schedules(self, context):
+        self.endpoint.schedules.tick(context)
 
     def del_host(self, deregister=True):
+        if CONF.tracing.enabled:
+            tracing.get_exporter().flush()
+        events.flush()
+        notifications.flush()
+        if not self.leader:
+            return
         if deregister:
             try:
                 self.dbapi.unregister_conductor(self.host)
@@ -12,71 +12,84 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import threading
+
 from iotronic.objects import base as objects_base
 
 serializer = objects_base.IotronicObjectSerializer()
 
+DEFAULT_URL = "ws://<WAMP-SERVER>:<WAMP-PORT>/"
+DEFAULT_REALM = "s4t"
+
+# sections generated at every registration: they are not stored
+_GENERATED = ('wamp', 'board')
+
+# (url, realm) -> agent section, shared by every board of the agent
+_AGENT_SECTIONS = {}
+_LOCK = threading.Lock()
+
+
+def agent_section(url, realm):
+    """Return the precomputed config section of a wamp agent."""
+    key = (url, realm)
+    section = _AGENT_SECTIONS.get(key)
+    if section is None:
+        with _LOCK:
+            section = _AGENT_SECTIONS.setdefault(key, {'url': url,
+                                                       'realm': realm})
+    return section
+
+
+def _board_section(board):
+    section = board.as_dict()
+    section.pop('config', None)
+    section['created_at'] = board._attr_to_primitive('created_at')
+    section['updated_at'] = board._attr_to_primitive('updated_at')
+    return section
+
 
 class Provisioner(object):
+    """Build the configuration sent to a board.
+
+    The agent sections are shared by all the boards of an agent and the
+    board section is built from the board itself, so only the per-board
+    delta (the extra settings) is kept in boards.config: the full
+    configuration is rendered when it is sent.
+    """
+
     def __init__(self, board=None):
-        if not board:
-            self.config = {"iotronic": {"extra": {}}}
-        else:
-            self.config = board.config
-            if 'iotronic' not in self.config:
-                self.config = {"iotronic": {"extra": {}}}
-            if 'board' not in self.config['iotronic']:
-                self.config['iotronic']['board'] = {}
-            self.config['iotronic']['board'] = board.as_dict()
-            self.config['iotronic']['board']['created_at'] = \
-                board._attr_to_primitive('created_at')
-            self.config['iotronic']['board']['updated_at'] = \
-                board._attr_to_primitive('updated_at')
-
-            try:
-                del self.config['iotronic']['board']['config']
-            except Exception:
-                pass
+        self._wamp = {}
+        self._board = {}
+        self._custom = {"extra": {}}
+        if board:
+            stored = (board.config or {}).get('iotronic', {})
+            # boards registered before the delta also stored the
+            # generated sections
+            self._custom.update((k, v) for k, v in stored.items()
+                                if k not in _GENERATED)
+            self._board = _board_section(board)
 
     def get_config(self):
-        return self.config
-
-    def conf_registration_agent(self,
-                                url="ws://<WAMP-SERVER>:<WAMP-PORT>/",
-                                realm="s4t"):
-        if 'wamp' not in self.config['iotronic']:
-            self.config['iotronic']['wamp'] = {}
-        if "registration-agent" not in self.config['iotronic']['wamp']:
-            self.config['iotronic']['wamp']['registration-agent'] = {}
-        if 'url' not in self.config['iotronic']['wamp']['registration-agent']:
-            self.config['iotronic']['wamp']['registration-agent']['url'] = ""
-        if 'realm' not in \
-                self.config['iotronic']['wamp']['registration-agent']:
-            self.config['iotronic']['wamp']['registration-agent']['realm'] = ""
-        self.config['iotronic']['wamp']['registration-agent']['url'] = url
-        self.config['iotronic']['wamp']['registration-agent']['realm'] = realm
-
-    def conf_main_agent(self,
-                        url="ws://<WAMP-SERVER>:<WAMP-PORT>/",
-                        realm="s4t"):
-        if 'wamp' not in self.config['iotronic']:
-            self.config['iotronic']['wamp'] = {}
-        if "main-agent" not in self.config['iotronic']['wamp']:
-            self.config['iotronic']['wamp']['main-agent'] = {}
-        if 'url' not in self.config['iotronic']['wamp']['main-agent']:
-            self.config['iotronic']['wamp']['main-agent']['url'] = ""
-        if 'realm' not in self.config['iotronic']['wamp']['main-agent']:
-            self.config['iotronic']['wamp']['main-agent']['realm'] = ""
-        self.config['iotronic']['wamp']['main-agent']['url'] = url
-        self.config['iotronic']['wamp']['main-agent']['realm'] = realm
+        config = dict(self._custom)
+        if self._wamp:
+            config['wamp'] = dict(self._wamp)
+        if self._board:
+            config['board'] = self._board
+        return {"iotronic": config}
+
+    def get_delta(self):
+        """Return the per-board part of the configuration."""
+        return {"iotronic": dict(self._custom)}
+
+    def conf_registration_agent(self, url=DEFAULT_URL, realm=DEFAULT_REALM):
+        self._wamp['registration-agent'] = agent_section(url, realm)
+
+    def conf_main_agent(self, url=DEFAULT_URL, realm=DEFAULT_REALM):
+        self._wamp['main-agent'] = agent_section(url, realm)
 
     def conf_clean(self):
         self.conf_registration_agent()
-        if 'board' not in self.config['iotronic']:
-            self.config['iotronic']['board'] = {}
-        self.config['iotronic']['board']['token'] = "<REGISTRATION-TOKEN>"
+        self._board['token'] = "<REGISTRATION-TOKEN>"
 
     def conf_location(self, location):
-        if "location" not in self.config['iotronic']['board']:
-            self.config['iotronic']['board']['location'] = {}
-        self.config['iotronic']['board']['location'] = location.get_geo()
+        self._board['location'] = location.get_geo()
@@ -14,6 +14,7 @@
 """
 Client side of the conductor RPC API.
 """
+from iotronic.common import lanes
 from iotronic.common import rpc
 from iotronic.conductor import manager
 from iotronic.objects import base
@@ -29,6 +30,18 @@ class ConductorAPI(object):
 
     RPC_API_VERSION = '1.0'
 
+    # the methods not listed here go to the control lane
+    METHOD_LANES = {
+        'execute_on_board': lanes.INTERACTIVE,
+        'create_plugin': lanes.INTERACTIVE,
+        'update_plugin': lanes.INTERACTIVE,
+        'destroy_plugin': lanes.INTERACTIVE,
+        'inject_plugin': lanes.INTERACTIVE,
+        'remove_plugin': lanes.INTERACTIVE,
+        'action_plugin': lanes.INTERACTIVE,
+        'create_campaign': lanes.BULK,
+    }
+
     def __init__(self, topic=None):
         super(ConductorAPI, self).__init__()
         self.topic = topic
@@ -42,6 +55,12 @@ class ConductorAPI(object):
                                      version_cap=self.RPC_API_VERSION,
                                      serializer=serializer)
 
+    def _topic(self, method, topic=None):
+        if topic:
+            return topic
+        return lanes.topic(self.topic,
+                           self.METHOD_LANES.get(method, lanes.CONTROL))
+
     def echo(self, context, data, topic=None):
         """Test
 
@@ -49,7 +68,8 @@ class ConductorAPI(object):
         :param data: board id or uuid.
         :param topic: RPC topic. Defaults to self.topic.
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=self._topic('echo', topic), version='1.0')
         return cctxt.call(context, 'echo', data=data)
 
     def registration(self, context, code, session_num, topic=None):
@@ -60,7 +80,8 @@ class ConductorAPI(object):
         :param session_num: wamp session number
         :param topic: RPC topic. Defaults to self.topic.
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=self._topic('registration', topic), version='1.0')
         return cctxt.call(context, 'registration',
                           code=code, session_num=session_num)
 
@@ -72,7 +93,8 @@ class ConductorAPI(object):
         :param session_num: wamp session number
         :param topic: RPC topic. Defaults to self.topic.
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=self._topic('connection', topic), version='1.0')
         return cctxt.call(context, 'connection',
                           uuid=uuid, session_num=session_num)
 
@@ -85,7 +107,8 @@ class ConductorAPI(object):
         :returns: created board object
 
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=self._topic('create_board', topic), version='1.0')
         return cctxt.call(context, 'create_board',
                           board_obj=board_obj, location_obj=location_obj)
 
@@ -104,7 +127,8 @@ class ConductorAPI(object):
         :returns: updated board object, including all fields.
 
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=self._topic('update_board', topic), version='1.0')
         return cctxt.call(context, 'update_board', board_obj=board_obj)
 
     def destroy_board(self, context, board_id, topic=None):
@@ -118,16 +142,31 @@ class ConductorAPI(object):
         :raises: InvalidState if the board is in the wrong provision
             state to perform deletion.
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=self._topic('destroy_board', topic), version='1.0')
         return cctxt.call(context, 'destroy_board', board_id=board_id)
 
     def execute_on_board(self, context, board_uuid, wamp_rpc_call,
                          wamp_rpc_args=None, topic=None):
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=self._topic('execute_on_board', topic), version='1.0')
         return cctxt.call(context, 'execute_on_board', board_uuid=board_uuid,
                           wamp_rpc_call=wamp_rpc_call,
                           wamp_rpc_args=wamp_rpc_args)
 
+    def board_presence(self, context, board_uuid, topic=None):
+        """Ask the wamp agent of a board if the board is connected.
+
+        :param context: request context.
+        :param board_uuid: board uuid.
+        :param topic: RPC topic. Defaults to self.topic.
+        :returns: a dict with the 'connected' flag, the 'agent' of the board
+                  and, if connected, its wamp 'session'.
+        """
+        cctxt = self.client.prepare(
+            topic=self._topic('board_presence', topic), version='1.0')
+        return cctxt.call(context, 'board_presence', board_uuid=board_uuid)
+
     def create_plugin(self, context, plugin_obj, topic=None):
         """Add a plugin on the cloud
 
@@ -137,7 +176,8 @@ class ConductorAPI(object):
         :returns: created plugin object
 
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=self._topic('create_plugin', topic), version='1.0')
         return cctxt.call(context, 'create_plugin',
                           plugin_obj=plugin_obj)
 
@@ -153,7 +193,8 @@ class ConductorAPI(object):
         :returns: updated plugin object, including all fields.
 
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=self._topic('update_plugin', topic), version='1.0')
         return cctxt.call(context, 'update_plugin', plugin_obj=plugin_obj)
 
     def destroy_plugin(self, context, plugin_id, topic=None):
@@ -167,7 +208,8 @@ class ConductorAPI(object):
         :raises: InvalidState if the plugin is in the wrong provision
             state to perform deletion.
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=self._topic('destroy_plugin', topic), version='1.0')
         return cctxt.call(context, 'destroy_plugin', plugin_id=plugin_id)
 
     def inject_plugin(self, context, plugin_uuid,
@@ -179,7 +221,8 @@ class ConductorAPI(object):
         :param board_uuid: board id or uuid.
 
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=self._topic('inject_plugin', topic), version='1.0')
         return cctxt.call(context, 'inject_plugin', plugin_uuid=plugin_uuid,
                           board_uuid=board_uuid, onboot=onboot)
 
@@ -191,7 +234,8 @@ class ConductorAPI(object):
         :param board_uuid: board id or uuid.
 
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=self._topic('remove_plugin', topic), version='1.0')
         return cctxt.call(context, 'remove_plugin', plugin_uuid=plugin_uuid,
                           board_uuid=board_uuid)
 
@@ -204,6 +248,81 @@ class ConductorAPI(object):
         :param board_uuid: board id or uuid.
 
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=self._topic('action_plugin', topic), version='1.0')
         return cctxt.call(context, 'action_plugin', plugin_uuid=plugin_uuid,
                           board_uuid=board_uuid, action=action, params=params)
+
+    def create_campaign(self, context, campaign_obj, topic=None):
+        """Start the injection of a plugin into a set of boards.
+
+        :param context: request context.
+        :param campaign_obj: a changed (but not saved) campaign object.
+        :param topic: RPC topic. Defaults to self.topic.
+        :returns: created campaign object
+
+        """
+        cctxt = self.client.prepare(
+            topic=self._topic('create_campaign', topic), version='1.0')
+        return cctxt.call(context, 'create_campaign',
+                          campaign_obj=campaign_obj)
+
+    def cancel_campaign(self, context, campaign_uuid, topic=None):
+        """Stop an injection campaign.
+
+        The injections in flight complete, the pending ones are cancelled.
+
+        :param context: request context.
+        :param campaign_uuid: campaign uuid.
+        :param topic: RPC topic. Defaults to self.topic.
+        :returns: the cancelled campaign object
+
+        """
+        cctxt = self.client.prepare(
+            topic=self._topic('cancel_campaign', topic), version='1.0')
+        return cctxt.call(context, 'cancel_campaign',
+                          campaign_uuid=campaign_uuid)
+
+    def _worker_client(self, method, worker, topic=None):
+        if worker:
+            return self.client.prepare(topic=manager.WORKER_TOPIC,
+                                       server=worker, version='1.0')
+        return self.client.prepare(topic=self._topic(method, topic),
+                                   version='1.0')
+
+    def lane_stats(self, context, agent=None, worker=None, topic=None):
+        """Return the queue-depth counters of the RPC lanes.
+
+        :param context: request context.
+        :param agent: name of a wamp agent, None for the conductor.
+        :param worker: name of a conductor worker, "<host>.<slot>"; None
+                       for all the workers of a conductor.
+        :param topic: RPC topic. Defaults to self.topic.
+        :returns: a dict with the counters of each lane; for the
+                  conductor without a worker, a dict of them by worker.
+        """
+        cctxt = self._worker_client('lane_stats', worker, topic)
+        if worker:
+            return cctxt.call(context, 'lane_stats')
+        return cctxt.call(context, 'lane_stats', agent=agent)
+
+    def profiler_control(self, context, action, mode=None, agent=None,
+                         worker=None, topic=None):
+        """Control the profiler of a conductor or of a wamp agent.
+
+        :param context: request context.
+        :param action: 'start', 'stop', 'snapshot' or 'status'.
+        :param mode: 'cprofile' or 'sampling', for 'start'.
+        :param agent: name of a wamp agent, None for the conductor.
+        :param worker: name of a conductor worker, "<host>.<slot>"; None
+                       for all the workers of a conductor.
+        :param topic: RPC topic. Defaults to self.topic.
+        :returns: the profiler status or the files written; for the
+                  conductor without a worker, a dict of them by worker.
+        """
+        cctxt = self._worker_client('profiler_control', worker, topic)
+        if worker:
+            return cctxt.call(context, 'profiler_control', action=action,
+                              mode=mode)
+        return cctxt.call(context, 'profiler_control', action=action,
+                          mode=mode, agent=agent)
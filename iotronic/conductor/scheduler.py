@@ -0,0 +1,265 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Scheduled plugin actions.
+
+A schedule runs a plugin action on the boards matched by a selector, at
+the times of a cron expression. Every conductor checks the due schedules
+periodically; the schedules are spread among the conductors alive by a
+hash ring of their uuids, and a run is claimed in the database before
+being executed, so it is executed once even while the ring changes.
+
+The calls of all the runs due at the same time are grouped by wamp agent:
+each agent receives them in batches, with one RPC call per batch.
+"""
+
+import collections
+import threading
+
+from oslo_config import cfg
+from oslo_log import log as logging
+from oslo_utils import timeutils
+import six
+
+from iotronic.common import cron
+from iotronic.common import exception
+from iotronic.common import hash_ring
+from iotronic.common import lanes
+from iotronic.common import metrics
+from iotronic.conductor import campaign
+from iotronic.db import api as dbapi
+from iotronic import objects
+from iotronic.wamp import wampmessage as wm
+
+LOG = logging.getLogger(__name__)
+
+schedule_opts = [
+    cfg.IntOpt('schedule_interval',
+               default=30,
+               min=1,
+               help='Seconds between two checks of the due schedules.'),
+    cfg.IntOpt('schedule_batch_size',
+               default=100,
+               min=1,
+               help='Maximum number of scheduled plugin actions sent to a '
+                    'wamp agent with one call. Beyond the call_burst of '
+                    'the agent, the actions rejected are sent again after '
+                    'the delay the agent suggests.'),
+    cfg.IntOpt('schedule_call_timeout',
+               default=120,
+               help='Time (in seconds) a batch of scheduled plugin actions '
+                    'has to complete on a wamp agent.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(schedule_opts, 'conductor')
+
+# outcome of a scheduled action on a board
+DONE = 'done'
+FAILED = 'failed'
+NOT_CONNECTED = 'not_connected'
+BUSY = 'busy'
+
+_OUTCOMES = {wm.SUCCESS: DONE,
+             wm.WARNING: DONE,
+             wm.ERROR: FAILED,
+             wm.NOT_CONNECTED: NOT_CONNECTED,
+             wm.BUSY: BUSY}
+
+ACTIONS = metrics.counter('iotronic_scheduled_actions_total',
+                          'Plugin actions executed by the schedules, by '
+                          'outcome.', ['outcome'])
+
+
+def _action_args(plugin, action, parameters):
+    # the same arguments as an action requested through the API
+    if objects.plugin.want_params(action):
+        return (plugin.uuid, parameters or {})
+    return (plugin.uuid,)
+
+
+class _Run(object):
+    """A due run of a schedule and its outcome, board by board."""
+
+    def __init__(self, schedule):
+        self.schedule = schedule
+        self.counters = collections.Counter()
+        self.args = None
+        self.error = None
+
+    def result(self):
+        result = dict((outcome, 0) for outcome in
+                      (DONE, FAILED, NOT_CONNECTED, BUSY))
+        result.update(self.counters)
+        result['boards'] = sum(self.counters.values())
+        if self.error:
+            result['error'] = self.error
+        return result
+
+
+class ScheduleRunner(object):
+    """Run the schedules of a conductor."""
+
+    def __init__(self, endpoint):
+        # the conductor endpoint executes the actions
+        self.endpoint = endpoint
+        self._lock = threading.Lock()
+        self._busy = False
+
+    def _ring(self):
+        # heartbeat_timeout is registered by the conductor manager
+        hosts = dbapi.get_instance().get_active_conductors(
+            CONF.conductor.heartbeat_timeout)
+        if self.endpoint.host not in hosts:
+            hosts.append(self.endpoint.host)
+        return hash_ring.HashRing(hosts, replicas=1)
+
+    def claim_due(self, ctx, now=None):
+        """Claim the due runs of the schedules of this conductor.
+
+        A run missed, e.g. while every conductor was down, is executed
+        once; the next run follows the current time.
+
+        :returns: the list of the claimed schedules.
+        """
+        now = now or timeutils.utcnow()
+        due = objects.Schedule.list_due(ctx, now)
+        if not due:
+            return []
+
+        ring = self._ring()
+        claimed = []
+        for schedule in due:
+            if ring.get_hosts(schedule.uuid)[0] != self.endpoint.host:
+                continue
+            try:
+                next_run = cron.next_run(schedule.cron, now)
+            except exception.InvalidCronExpression as e:
+                LOG.error('Disabling schedule %(schedule)s: %(err)s',
+                          {'schedule': schedule.uuid, 'err': e})
+                schedule.enabled = False
+                schedule.save()
+                continue
+            if schedule.claim(next_run):
+                claimed.append(schedule)
+        return claimed
+
+    def tick(self, ctx):
+        """Start the due runs of this conductor, in the background.
+
+        Nothing is claimed while the runs of the previous tick are in
+        flight: they are executed at the next tick.
+        """
+        with self._lock:
+            if self._busy:
+                LOG.debug('Scheduled actions still running, skipping')
+                return
+            self._busy = True
+        try:
+            schedules = self.claim_due(ctx)
+        except Exception:
+            self._done()
+            raise
+        if not schedules:
+            self._done()
+            return
+
+        th = threading.Thread(target=self._run, args=(ctx, schedules))
+        th.daemon = True
+        th.start()
+
+    def _done(self):
+        with self._lock:
+            self._busy = False
+
+    def _run(self, ctx, schedules):
+        try:
+            self.execute(ctx, schedules)
+        except Exception:
+            LOG.exception('Unable to execute %d schedules', len(schedules))
+        finally:
+            self._done()
+
+    def execute(self, ctx, schedules):
+        """Execute a run of each schedule, batching the calls by agent."""
+        runs = [_Run(schedule) for schedule in schedules]
+        calls = collections.OrderedDict()
+        for run in runs:
+            schedule = run.schedule
+            try:
+                plugin = objects.Plugin.get_by_uuid(ctx, schedule.plugin_uuid)
+            except exception.PluginNotFound as e:
+                LOG.error('Schedule %(schedule)s: %(err)s',
+                          {'schedule': schedule.uuid, 'err': e})
+                run.error = six.text_type(e)
+                continue
+            run.args = _action_args(plugin, schedule.action,
+                                    schedule.parameters)
+            filters = campaign.selector_filters(schedule.selector or {})
+            for board_uuid, agent in objects.Board.list_agents(
+                    ctx, filters=filters):
+                if not agent:
+                    run.counters[NOT_CONNECTED] += 1
+                    continue
+                calls.setdefault(agent, []).append((run, board_uuid))
+
+        LOG.info('Executing %(runs)d schedules: %(count)d plugin actions on '
+                 '%(agents)d agents',
+                 {'runs': len(runs),
+                  'count': sum(len(c) for c in calls.values()),
+                  'agents': len(calls)})
+
+        lock = threading.Lock()
+        threads = []
+        for agent, agent_calls in calls.items():
+            th = threading.Thread(target=self._execute_on_agent,
+                                  args=(ctx, agent, agent_calls, lock))
+            th.daemon = True
+            th.start()
+            threads.append(th)
+        for th in threads:
+            th.join()
+
+        for run in runs:
+            run.schedule.last_result = run.result()
+            try:
+                run.schedule.save()
+            except exception.ScheduleNotFound:
+                # deleted meanwhile
+                pass
+
+    def _execute_on_agent(self, ctx, agent, agent_calls, lock):
+        size = CONF.conductor.schedule_batch_size
+        for i in range(0, len(agent_calls), size):
+            batch = agent_calls[i:i + size]
+            try:
+                replies = self.endpoint.execute_batch_on_agent(
+                    ctx, agent,
+                    [(board_uuid, run.schedule.action, run.args)
+                     for run, board_uuid in batch],
+                    lane=lanes.BULK,
+                    timeout=CONF.conductor.schedule_call_timeout)
+                outcomes = [_OUTCOMES.get(r.result, FAILED) for r in replies]
+            except Exception as e:
+                LOG.warning('Scheduled actions on the wamp agent %(agent)s '
+                            'failed: %(err)s',
+                            {'agent': agent, 'err': six.text_type(e)})
+                outcomes = [FAILED] * len(batch)
+
+            with lock:
+                for (run, board_uuid), outcome in zip(batch, outcomes):
+                    run.counters[outcome] += 1
+            for outcome in outcomes:
+                ACTIONS.inc(outcome=outcome)
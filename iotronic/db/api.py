@@ -61,6 +61,9 @@ class Connection(object):
                         :provisioned_before:
                             boards with provision_updated_at field before this
                             interval in seconds
+                        :tags: the boards having all these tags
+                        :tags_any: the boards having one of these tags
+                        :group: the boards in the group of this uuid
         :param limit: Maximum number of boards to return.
         :param marker: the last item of the previous page; we return the next
                        result set.
@@ -72,7 +75,7 @@ class Connection(object):
 
     @abc.abstractmethod
     def get_board_list(self, filters=None, limit=None, marker=None,
-                       sort_key=None, sort_dir=None):
+                       sort_key=None, sort_dir=None, stream=False):
         """Return a list of boards.
 
         :param filters: Filters to apply. Defaults to None.
@@ -84,12 +87,26 @@ class Connection(object):
                         :provisioned_before:
                             boards with provision_updated_at field before this
                             interval in seconds
+                        :tags: the boards having all these tags
+                        :tags_any: the boards having one of these tags
+                        :group: the boards in the group of this uuid
         :param limit: Maximum number of boards to return.
         :param marker: the last item of the previous page; we return the next
                        result set.
         :param sort_key: Attribute by which results should be sorted.
         :param sort_dir: direction in which results should be sorted.
                          (asc, desc)
+        :param stream: return an iterator fetching the boards in batches
+                       instead of a list.
+        """
+
+    @abc.abstractmethod
+    def get_board_list_state(self, filters=None):
+        """Return a value changed by every write to the listed boards.
+
+        :param filters: Filters to apply, as for get_board_list.
+        :returns: A tuple of aggregates of the boards matching the
+                  filters.
         """
 
     @abc.abstractmethod
@@ -171,6 +188,15 @@ class Connection(object):
         :raises: BoardNotFound
         """
 
+    @abc.abstractmethod
+    def update_boards_status(self, board_uuids, status):
+        """Set the status of a set of boards in a single update.
+
+        :param board_uuids: A list of board uuids.
+        :param status: The new status.
+        :returns: The number of updated boards.
+        """
+
     @abc.abstractmethod
     def get_conductor(self, hostname):
         """Retrieve a conductor's service record from the database.
@@ -196,6 +222,15 @@ class Connection(object):
         :raises: ConductorNotFound
         """
 
+    @abc.abstractmethod
+    def get_active_conductors(self, interval):
+        """Return the hostnames of the conductors alive.
+
+        :param interval: Seconds since the last heartbeat of a conductor
+                         alive.
+        :returns: A sorted list of hostnames.
+        """
+
     @abc.abstractmethod
     def create_session(self, values):
         """Create a new location.
@@ -212,6 +247,15 @@ class Connection(object):
         :returns: A session.
         """
 
+    @abc.abstractmethod
+    def invalidate_sessions(self, session_ids):
+        """Invalidate a set of sessions in a single transaction.
+
+        :param session_ids: A list of session ids.
+        :returns: The uuids of the boards whose valid session has been
+                  invalidated.
+        """
+
     @abc.abstractmethod
     def get_session_by_board_uuid(self, board_uuid, valid):
         """Return a Wamp session of a Board
@@ -342,6 +386,15 @@ class Connection(object):
         :returns: A plugin.
         """
 
+    @abc.abstractmethod
+    def get_plugin_list_state(self, filters=None):
+        """Return a value changed by every write to the listed plugins.
+
+        :param filters: Filters to apply, as for get_plugin_list.
+        :returns: A tuple of aggregates of the plugins matching the
+                  filters.
+        """
+
     @abc.abstractmethod
     def create_plugin(self, values):
         """Create a new plugin.
@@ -423,3 +476,326 @@ class Connection(object):
         :returns: A list of InjectionPlugins on the board.
 
         """
+
+    @abc.abstractmethod
+    def upsert_injection_plugins(self, plugin_uuid, board_uuids, onboot):
+        """Record the injection of a plugin into a set of boards.
+
+        Existing injections are marked as updated, the others are created,
+        with one statement each.
+
+        :param plugin_uuid: The uuid of a plugin.
+        :param board_uuids: A list of board uuids.
+        :param onboot: The onboot flag of the injections.
+        """
+
+    @abc.abstractmethod
+    def create_campaign(self, values, boards):
+        """Create a new injection campaign and its boards.
+
+        :param values: A dict containing several items used to identify
+                       and track the campaign.
+        :param boards: A list of (board_uuid, agent) tuples.
+        :returns: A campaign.
+        """
+
+    @abc.abstractmethod
+    def get_campaign_by_id(self, campaign_id):
+        """Return an injection campaign.
+
+        :param campaign_id: The id of a campaign.
+        :returns: A campaign.
+        """
+
+    @abc.abstractmethod
+    def get_campaign_by_uuid(self, campaign_uuid):
+        """Return an injection campaign.
+
+        :param campaign_uuid: The uuid of a campaign.
+        :returns: A campaign.
+        """
+
+    @abc.abstractmethod
+    def get_campaign_list(self, filters=None, limit=None, marker=None,
+                          sort_key=None, sort_dir=None):
+        """Return a list of injection campaigns.
+
+        :param filters: Filters to apply. Defaults to None.
+        :param limit: Maximum number of campaigns to return.
+        :param marker: the last item of the previous page; we return the next
+                       result set.
+        :param sort_key: Attribute by which results should be sorted.
+        :param sort_dir: direction in which results should be sorted.
+                         (asc, desc)
+        """
+
+    @abc.abstractmethod
+    def update_campaign(self, campaign_id, values):
+        """Update properties of an injection campaign.
+
+        :param campaign_id: The id or uuid of a campaign.
+        :param values: Dict of values to update.
+        :returns: A campaign.
+        """
+
+    @abc.abstractmethod
+    def destroy_campaign(self, campaign_id):
+        """Destroy an injection campaign and its boards.
+
+        :param campaign_id: The id or uuid of a campaign.
+        """
+
+    @abc.abstractmethod
+    def claim_campaign(self, campaign_id, conductor, new_conductor):
+        """Move an injection campaign to another conductor worker.
+
+        The campaign is moved only if it still belongs to its worker, so
+        a campaign is taken over once.
+
+        :param campaign_id: The id of a campaign.
+        :param conductor: The worker the campaign belongs to.
+        :param new_conductor: The worker taking the campaign over.
+        :returns: True if the campaign has been moved.
+        """
+
+    @abc.abstractmethod
+    def get_campaign_boards(self, campaign_id, status=None):
+        """Return the boards of an injection campaign.
+
+        :param campaign_id: The id of a campaign.
+        :param status: Return only the boards in this status.
+        :returns: A list of campaign boards.
+        """
+
+    @abc.abstractmethod
+    def update_campaign_boards(self, campaign_id, board_uuids, values,
+                               status=None):
+        """Update a set of boards of a campaign with a single statement.
+
+        :param campaign_id: The id of a campaign.
+        :param board_uuids: A list of board uuids, None for every board.
+        :param values: Dict of values to update.
+        :param status: Update only the boards in this status.
+        :returns: The number of updated boards.
+        """
+
+    @abc.abstractmethod
+    def get_campaign_progress(self, campaign_id):
+        """Count the boards of a campaign in each status.
+
+        :param campaign_id: The id of a campaign.
+        :returns: A dict of status: number of boards.
+        """
+
+    @abc.abstractmethod
+    def get_board_tags(self, board_id):
+        """Return the tags of a board.
+
+        :param board_id: The id of a board.
+        :returns: A sorted list of tags.
+        """
+
+    @abc.abstractmethod
+    def set_board_tags(self, board_id, tags):
+        """Replace the tags of a board.
+
+        :param board_id: The id of a board.
+        :param tags: A list of tags.
+        :returns: The sorted list of the new tags.
+        """
+
+    @abc.abstractmethod
+    def add_board_tag(self, board_id, tag):
+        """Tag a board; a tag the board already has is ignored.
+
+        :param board_id: The id of a board.
+        :param tag: The tag.
+        """
+
+    @abc.abstractmethod
+    def delete_board_tag(self, board_id, tag):
+        """Remove a tag from a board.
+
+        :param board_id: The id of a board.
+        :param tag: The tag.
+        :raises: BoardTagNotFound
+        """
+
+    @abc.abstractmethod
+    def create_board_group(self, values):
+        """Create a new group of boards.
+
+        :param values: A dict containing several items used to identify
+                       the group, e.g. name, project and owner.
+        :returns: A group.
+        """
+
+    @abc.abstractmethod
+    def get_board_group_by_id(self, group_id):
+        """Return a group of boards.
+
+        :param group_id: The id of a group.
+        :returns: A group.
+        """
+
+    @abc.abstractmethod
+    def get_board_group_by_uuid(self, group_uuid):
+        """Return a group of boards.
+
+        :param group_uuid: The uuid of a group.
+        :returns: A group.
+        """
+
+    @abc.abstractmethod
+    def get_board_group_by_name(self, project, group_name):
+        """Return a group of boards.
+
+        :param project: The project of the group.
+        :param group_name: The name of the group in the project.
+        :returns: A group.
+        """
+
+    @abc.abstractmethod
+    def get_board_group_list(self, filters=None, limit=None, marker=None,
+                             sort_key=None, sort_dir=None):
+        """Return a list of groups of boards.
+
+        :param filters: Filters to apply. Defaults to None.
+
+                        :project: the groups of this project
+                        :name: the groups of this name
+        :param limit: Maximum number of groups to return.
+        :param marker: the last item of the previous page; we return the next
+                       result set.
+        :param sort_key: Attribute by which results should be sorted.
+        :param sort_dir: direction in which results should be sorted.
+                         (asc, desc)
+        """
+
+    @abc.abstractmethod
+    def update_board_group(self, group_id, values):
+        """Update properties of a group of boards.
+
+        :param group_id: The id or uuid of a group.
+        :param values: Dict of values to update.
+        :returns: A group.
+        """
+
+    @abc.abstractmethod
+    def destroy_board_group(self, group_id):
+        """Destroy a group of boards; the boards are left untouched.
+
+        :param group_id: The id or uuid of a group.
+        """
+
+    @abc.abstractmethod
+    def add_board_group_members(self, group_id, board_uuids):
+        """Add a set of boards to a group, with a single insert.
+
+        :param group_id: The id of a group.
+        :param board_uuids: A list of board uuids; the unknown ones, the
+                            ones of another project and the members
+                            already are ignored.
+        :returns: The number of boards added.
+        """
+
+    @abc.abstractmethod
+    def remove_board_group_members(self, group_id, board_uuids):
+        """Remove a set of boards from a group, with a single statement.
+
+        :param group_id: The id of a group.
+        :param board_uuids: A list of board uuids.
+        :returns: The number of boards removed.
+        """
+
+    @abc.abstractmethod
+    def create_schedule(self, values):
+        """Create a new schedule.
+
+        :param values: A dict containing several items used to identify
+                       and run the schedule.
+        :returns: A schedule.
+        """
+
+    @abc.abstractmethod
+    def get_schedule_by_id(self, schedule_id):
+        """Return a schedule.
+
+        :param schedule_id: The id of a schedule.
+        :returns: A schedule.
+        """
+
+    @abc.abstractmethod
+    def get_schedule_by_uuid(self, schedule_uuid):
+        """Return a schedule.
+
+        :param schedule_uuid: The uuid of a schedule.
+        :returns: A schedule.
+        """
+
+    @abc.abstractmethod
+    def get_schedule_list(self, filters=None, limit=None, marker=None,
+                          sort_key=None, sort_dir=None):
+        """Return a list of schedules.
+
+        :param filters: Filters to apply. Defaults to None.
+
+                        :owner: the schedules of this user
+                        :project: the schedules of this project
+                        :enabled: True | False
+                        :due_before: the schedules to run at this time
+                                     or before
+        :param limit: Maximum number of schedules to return.
+        :param marker: the last item of the previous page; we return the next
+                       result set.
+        :param sort_key: Attribute by which results should be sorted.
+        :param sort_dir: direction in which results should be sorted.
+                         (asc, desc)
+        """
+
+    @abc.abstractmethod
+    def update_schedule(self, schedule_id, values):
+        """Update properties of a schedule.
+
+        :param schedule_id: The id or uuid of a schedule.
+        :param values: Dict of values to update.
+        :returns: A schedule.
+        """
+
+    @abc.abstractmethod
+    def destroy_schedule(self, schedule_id):
+        """Destroy a schedule.
+
+        :param schedule_id: The id or uuid of a schedule.
+        """
+
+    @abc.abstractmethod
+    def claim_schedule_run(self, schedule_id, next_run, new_next_run):
+        """Move a schedule to its next run, if nobody did it already.
+
+        A compare-and-set on next_run: of the conductors seeing a run
+        due, only one claims it.
+
+        :param schedule_id: The id of a schedule.
+        :param next_run: The run to claim, as read with the schedule.
+        :param new_next_run: The run after it.
+        :returns: True if the run has been claimed.
+        """
+
+    @abc.abstractmethod
+    def get_generation(self, kind):
+        """Return the last number allocated from a sequence.
+
+        :param kind: The name of the sequence, e.g. 'events'.
+        :returns: An integer, 0 if nothing was allocated yet.
+        """
+
+    @abc.abstractmethod
+    def allocate_sequence(self, kind, count=1):
+        """Reserve the next numbers of a sequence shared by the services.
+
+        :param kind: The name of the sequence, e.g. 'events'.
+        :param count: How many numbers to reserve.
+        :returns: The last number reserved; the first one is
+                  last - count + 1.
+        """
@@ -16,6 +16,9 @@
 
 """SQLAlchemy storage backend."""
 
+import datetime
+import time
+
 from oslo_config import cfg
 from oslo_db import exception as db_exc
 from oslo_db.sqlalchemy import session as db_session
@@ -23,12 +26,16 @@ from oslo_db.sqlalchemy import utils as db_utils
 from oslo_utils import strutils
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
+from sqlalchemy import event
+from sqlalchemy import func
 from sqlalchemy import or_
 from sqlalchemy.orm.exc import NoResultFound
 
 from iotronic.common import exception
 from iotronic.common.i18n import _
+from iotronic.common import metrics
 from iotronic.common import states
+from iotronic.common import tracing
 from iotronic.db import api
 from iotronic.db.sqlalchemy import models
 
@@ -39,11 +46,45 @@ CONF.import_opt('heartbeat_timeout',
 
 _FACADE = None
 
+# rows fetched at once by the streamed listings
+STREAM_BATCH_SIZE = 100
+
+QUERY_DURATION = metrics.histogram('iotronic_db_query_duration_seconds',
+                                   'Time spent executing database queries.')
+
+
+def _before_execute(conn, cursor, statement, parameters, context,
+                    executemany):
+    span = tracing.start_span('db %s' % statement.split(None, 1)[0].lower())
+    conn.info.setdefault('query_start', []).append((time.time(), span))
+
+
+def _after_execute(conn, cursor, statement, parameters, context,
+                   executemany):
+    start, span = conn.info['query_start'].pop()
+    tracing.finish_span(span)
+    QUERY_DURATION.observe(time.time() - start)
+
+
+def _handle_error(context):
+    # a failed statement never reaches after_cursor_execute
+    conn = context.connection
+    if conn is None or not conn.info.get('query_start'):
+        return
+    start, span = conn.info['query_start'].pop()
+    tracing.finish_span(span, context.original_exception)
+    QUERY_DURATION.observe(time.time() - start)
+
 
 def _create_facade_lazily():
     global _FACADE
     if _FACADE is None:
         _FACADE = db_session.EngineFacade.from_config(CONF)
+        if CONF.metrics.enabled or CONF.tracing.enabled:
+            engine = _FACADE.get_engine()
+            event.listen(engine, 'before_cursor_execute', _before_execute)
+            event.listen(engine, 'after_cursor_execute', _after_execute)
+            event.listen(engine, 'handle_error', _handle_error)
     return _FACADE
 
 
@@ -92,7 +133,7 @@ def add_identity_filter(query, value):
 
 
 def _paginate_query(model, limit=None, marker=None, sort_key=None,
-                    sort_dir=None, query=None):
+                    sort_dir=None, query=None, stream=False):
     if not query:
         query = model_query(model)
     sort_keys = ['id']
@@ -106,9 +147,36 @@ def _paginate_query(model, limit=None, marker=None, sort_key=None,
             _('The sort_key value "%(key)s" is an invalid field for sorting')
             % {'key': sort_key})
 
+    if stream:
+        # the rows are fetched in batches while the caller iterates
+        return query.yield_per(STREAM_BATCH_SIZE)
     return query.all()
 
 
+def _list_state(model, query):
+    """Aggregates of the rows of a listing, changed by any write to them.
+
+    Every write increments the revision and sets updated_at of the rows it
+    changes, a created row raises the newest created_at and a deleted one
+    lowers the count: the listing is derived from its own rows, no shared
+    counter is written with them.
+    """
+    query = query.with_entities(func.count(model.id),
+                                func.sum(model.revision),
+                                func.max(model.created_at),
+                                func.max(model.updated_at))
+    count, revisions, created, updated = query.one()
+    return (count, int(revisions or 0), created, updated)
+
+
+def _touch_boards(session, *criteria):
+    """Increment the revision of the boards matching the criteria."""
+    query = model_query(models.Board, session=session).filter(*criteria)
+    query.update({'revision': models.Board.revision + 1,
+                  'updated_at': timeutils.utcnow()},
+                 synchronize_session=False)
+
+
 class Connection(api.Connection):
     """SqlAlchemy connection."""
 
@@ -131,6 +199,78 @@ class Connection(api.Connection):
             query = query.filter(models.Board.project == filters['project_id'])
         if 'status' in filters:
             query = query.filter(models.Board.status == filters['status'])
+        if 'type' in filters:
+            query = query.filter(models.Board.type == filters['type'])
+        if 'uuids' in filters:
+            query = query.filter(models.Board.uuid.in_(filters['uuids']))
+        if 'tags' in filters and filters['tags']:
+            # the boards having all the tags, each row of the subquery
+            # read from the tag index
+            tags = set(filters['tags'])
+            tagged = model_query(models.BoardTag.board_id).filter(
+                models.BoardTag.tag.in_(tags)).group_by(
+                models.BoardTag.board_id).having(
+                func.count(models.BoardTag.tag) == len(tags))
+            query = query.filter(models.Board.id.in_(tagged.subquery()))
+        if 'tags_any' in filters and filters['tags_any']:
+            tagged = model_query(models.BoardTag.board_id).filter(
+                models.BoardTag.tag.in_(set(filters['tags_any'])))
+            query = query.filter(models.Board.id.in_(tagged.subquery()))
+        if 'group' in filters:
+            members = model_query(models.BoardGroupMember.board_id).join(
+                models.BoardGroup,
+                models.BoardGroupMember.group_id == models.BoardGroup.id
+            ).filter(models.BoardGroup.uuid == filters['group'])
+            query = query.filter(models.Board.id.in_(members.subquery()))
+
+        return query
+
+    def _add_board_groups_filters(self, query, filters):
+        if filters is None:
+            filters = []
+
+        if 'project' in filters:
+            query = query.filter(
+                models.BoardGroup.project == filters['project'])
+        if 'name' in filters:
+            query = query.filter(models.BoardGroup.name == filters['name'])
+
+        return query
+
+    def _add_campaigns_filters(self, query, filters):
+        if filters is None:
+            filters = []
+
+        if 'owner' in filters:
+            query = query.filter(
+                models.InjectionCampaign.owner == filters['owner'])
+        if 'project' in filters:
+            query = query.filter(
+                models.InjectionCampaign.project == filters['project'])
+        if 'status' in filters:
+            query = query.filter(
+                models.InjectionCampaign.status == filters['status'])
+        if 'conductor' in filters:
+            query = query.filter(
+                models.InjectionCampaign.conductor == filters['conductor'])
+
+        return query
+
+    def _add_schedules_filters(self, query, filters):
+        if filters is None:
+            filters = []
+
+        if 'owner' in filters:
+            query = query.filter(models.Schedule.owner == filters['owner'])
+        if 'project' in filters:
+            query = query.filter(
+                models.Schedule.project == filters['project'])
+        if 'enabled' in filters:
+            query = query.filter(
+                models.Schedule.enabled == filters['enabled'])
+        if 'due_before' in filters:
+            query = query.filter(
+                models.Schedule.next_run <= filters['due_before'])
 
         return query
 
@@ -179,6 +319,7 @@ class Connection(api.Connection):
                 raise exception.BoardNotFound(board=board_id)
 
             ref.update(values)
+            ref.revision = ref.revision + 1
         return ref
 
     def _do_update_plugin(self, plugin_id, values):
@@ -192,6 +333,7 @@ class Connection(api.Connection):
                 raise exception.PluginNotFound(plugin=plugin_id)
 
             ref.update(values)
+            ref.revision = ref.revision + 1
         return ref
 
     def _do_update_injection_plugin(self, injection_plugin_id, values):
@@ -225,11 +367,16 @@ class Connection(api.Connection):
                                sort_key, sort_dir, query)
 
     def get_board_list(self, filters=None, limit=None, marker=None,
-                       sort_key=None, sort_dir=None):
+                       sort_key=None, sort_dir=None, stream=False):
         query = model_query(models.Board)
         query = self._add_boards_filters(query, filters)
         return _paginate_query(models.Board, limit, marker,
-                               sort_key, sort_dir, query)
+                               sort_key, sort_dir, query, stream=stream)
+
+    def get_board_list_state(self, filters=None):
+        query = model_query(models.Board)
+        query = self._add_boards_filters(query, filters)
+        return _list_state(models.Board, query)
 
     def create_board(self, values):
         # ensure defaults are present for new boards
@@ -240,8 +387,10 @@ class Connection(api.Connection):
 
         board = models.Board()
         board.update(values)
+        session = get_session()
         try:
-            board.save()
+            with session.begin():
+                board.save(session)
         except db_exc.DBDuplicateEntry as exc:
             if 'code' in exc.columns:
                 raise exception.DuplicateCode(code=values['code'])
@@ -304,6 +453,10 @@ class Connection(api.Connection):
                 location_query, board_id)
             location_query.delete()
 
+            for model in (models.BoardTag, models.BoardGroupMember):
+                model_query(model, session=session).filter_by(
+                    board_id=board_id).delete()
+
             query.delete()
 
     def update_board(self, board_id, values):
@@ -322,6 +475,19 @@ class Connection(api.Connection):
             else:
                 raise e
 
+    def update_boards_status(self, board_uuids, status):
+        if not board_uuids:
+            return 0
+        session = get_session()
+        with session.begin():
+            query = model_query(models.Board, session=session)
+            query = query.filter(models.Board.uuid.in_(board_uuids))
+            count = query.update({'status': status,
+                                  'revision': models.Board.revision + 1,
+                                  'updated_at': timeutils.utcnow()},
+                                 synchronize_session=False)
+            return count
+
     # CONDUCTOR api
 
     def register_conductor(self, values, update_existing=False):
@@ -373,12 +539,21 @@ class Connection(api.Connection):
             if count == 0:
                 raise exception.ConductorNotFound(conductor=hostname)
 
+    def get_active_conductors(self, interval):
+        limit = timeutils.utcnow() - datetime.timedelta(seconds=interval)
+        query = model_query(models.Conductor.hostname).filter_by(
+            online=True).filter(models.Conductor.updated_at >= limit)
+        return sorted(hostname for (hostname,) in query)
+
     # LOCATION api
 
     def create_location(self, values):
         location = models.Location()
         location.update(values)
-        location.save()
+        session = get_session()
+        with session.begin():
+            location.save(session)
+            _touch_boards(session, models.Board.id == location.board_id)
         return location
 
     def update_location(self, location_id, values):
@@ -390,6 +565,7 @@ class Connection(api.Connection):
                 query = add_identity_filter(query, location_id)
                 ref = query.one()
                 ref.update(values)
+                _touch_boards(session, models.Board.id == ref.board_id)
         except NoResultFound:
             raise exception.LocationNotFound(location=location_id)
         return ref
@@ -399,9 +575,11 @@ class Connection(api.Connection):
         with session.begin():
             query = model_query(models.Location, session=session)
             query = add_identity_filter(query, location_id)
-            count = query.delete()
-            if count == 0:
+            ref = query.first()
+            if ref is None:
                 raise exception.LocationNotFound(location=location_id)
+            _touch_boards(session, models.Board.id == ref.board_id)
+            query.delete()
 
     def get_locations_by_board_id(self, board_id, limit=None, marker=None,
                                   sort_key=None, sort_dir=None):
@@ -413,10 +591,13 @@ class Connection(api.Connection):
     # SESSION api
 
     def create_session(self, values):
-        session = models.SessionWP()
-        session.update(values)
-        session.save()
-        return session
+        ses = models.SessionWP()
+        ses.update(values)
+        session = get_session()
+        with session.begin():
+            ses.save(session)
+            _touch_boards(session, models.Board.uuid == ses.board_uuid)
+        return ses
 
     def update_session(self, ses_id, values):
         # NOTE(dtantsur): this can lead to very strange errors
@@ -427,10 +608,27 @@ class Connection(api.Connection):
                 query = add_identity_filter(query, ses_id)
                 ref = query.one()
                 ref.update(values)
+                _touch_boards(session, models.Board.uuid == ref.board_uuid)
         except NoResultFound:
             raise exception.SessionWPNotFound(ses=ses_id)
         return ref
 
+    def invalidate_sessions(self, session_ids):
+        if not session_ids:
+            return []
+        session_ids = [str(s) for s in session_ids]
+        session = get_session()
+        with session.begin():
+            query = model_query(models.SessionWP, session=session)
+            query = query.filter(
+                models.SessionWP.session_id.in_(session_ids)).filter_by(
+                valid=True)
+            board_uuids = [ref.board_uuid for ref in query]
+            if board_uuids:
+                query.update({'valid': False}, synchronize_session=False)
+                _touch_boards(session, models.Board.uuid.in_(board_uuids))
+        return board_uuids
+
     def get_session_by_board_uuid(self, board_uuid, valid):
         query = model_query(
             models.SessionWP).filter_by(
@@ -581,18 +779,25 @@ class Connection(api.Connection):
             values['uuid'] = uuidutils.generate_uuid()
         plugin = models.Plugin()
         plugin.update(values)
+        session = get_session()
         try:
-            plugin.save()
+            with session.begin():
+                plugin.save(session)
         except db_exc.DBDuplicateEntry:
             raise exception.PluginAlreadyExists(uuid=values['uuid'])
         return plugin
 
     def get_plugin_list(self, filters=None, limit=None, marker=None,
-                        sort_key=None, sort_dir=None):
+                        sort_key=None, sort_dir=None, stream=False):
         query = model_query(models.Plugin)
         query = self._add_plugins_filters(query, filters)
         return _paginate_query(models.Plugin, limit, marker,
-                               sort_key, sort_dir, query)
+                               sort_key, sort_dir, query, stream=stream)
+
+    def get_plugin_list_state(self, filters=None):
+        query = model_query(models.Plugin)
+        query = self._add_plugins_filters(query, filters)
+        return _list_state(models.Plugin, query)
 
     # INJECTION PLUGIN api
 
@@ -661,3 +866,428 @@ class Connection(api.Connection):
             models.InjectionPlugin).filter_by(
             board_uuid=board_uuid)
         return query.all()
+
+    def upsert_injection_plugins(self, plugin_uuid, board_uuids, onboot):
+        if not board_uuids:
+            return
+        session = get_session()
+        with session.begin():
+            query = model_query(models.InjectionPlugin, session=session)
+            query = query.filter_by(plugin_uuid=plugin_uuid).filter(
+                models.InjectionPlugin.board_uuid.in_(board_uuids))
+            existing = set(ref.board_uuid for ref in query)
+            if existing:
+                query.update({'status': 'updated',
+                              'onboot': onboot,
+                              'updated_at': timeutils.utcnow()},
+                             synchronize_session=False)
+
+            now = timeutils.utcnow()
+            rows = [{'board_uuid': board_uuid,
+                     'plugin_uuid': plugin_uuid,
+                     'onboot': onboot,
+                     'status': 'injected',
+                     'created_at': now}
+                    for board_uuid in board_uuids
+                    if board_uuid not in existing]
+            if rows:
+                session.execute(models.InjectionPlugin.__table__.insert(),
+                                rows)
+
+    # CAMPAIGN api
+
+    def create_campaign(self, values, boards):
+        # ensure defaults are present for new campaigns
+        if 'uuid' not in values:
+            values['uuid'] = uuidutils.generate_uuid()
+        if 'status' not in values:
+            values['status'] = states.PENDING
+        values['total'] = len(boards)
+
+        campaign = models.InjectionCampaign()
+        campaign.update(values)
+        session = get_session()
+        try:
+            with session.begin():
+                campaign.save(session)
+                now = timeutils.utcnow()
+                rows = [{'campaign_id': campaign.id,
+                         'board_uuid': board_uuid,
+                         'agent': agent,
+                         'status': states.PENDING,
+                         'created_at': now}
+                        for board_uuid, agent in boards]
+                if rows:
+                    session.execute(models.CampaignBoard.__table__.insert(),
+                                    rows)
+        except db_exc.DBDuplicateEntry:
+            raise exception.CampaignAlreadyExists(uuid=values['uuid'])
+        return campaign
+
+    def get_campaign_by_id(self, campaign_id):
+        query = model_query(models.InjectionCampaign).filter_by(
+            id=campaign_id)
+        try:
+            return query.one()
+        except NoResultFound:
+            raise exception.CampaignNotFound(campaign=campaign_id)
+
+    def get_campaign_by_uuid(self, campaign_uuid):
+        query = model_query(models.InjectionCampaign).filter_by(
+            uuid=campaign_uuid)
+        try:
+            return query.one()
+        except NoResultFound:
+            raise exception.CampaignNotFound(campaign=campaign_uuid)
+
+    def get_campaign_list(self, filters=None, limit=None, marker=None,
+                          sort_key=None, sort_dir=None):
+        query = model_query(models.InjectionCampaign)
+        query = self._add_campaigns_filters(query, filters)
+        return _paginate_query(models.InjectionCampaign, limit, marker,
+                               sort_key, sort_dir, query)
+
+    def update_campaign(self, campaign_id, values):
+        if 'uuid' in values:
+            msg = _("Cannot overwrite UUID for an existing campaign.")
+            raise exception.InvalidParameterValue(err=msg)
+
+        session = get_session()
+        with session.begin():
+            query = model_query(models.InjectionCampaign, session=session)
+            query = add_identity_filter(query, campaign_id)
+            try:
+                ref = query.with_lockmode('update').one()
+            except NoResultFound:
+                raise exception.CampaignNotFound(campaign=campaign_id)
+
+            ref.update(values)
+        return ref
+
+    def destroy_campaign(self, campaign_id):
+        session = get_session()
+        with session.begin():
+            query = model_query(models.InjectionCampaign, session=session)
+            query = add_identity_filter(query, campaign_id)
+            try:
+                campaign_ref = query.one()
+            except NoResultFound:
+                raise exception.CampaignNotFound(campaign=campaign_id)
+
+            boards_query = model_query(models.CampaignBoard, session=session)
+            boards_query.filter_by(campaign_id=campaign_ref['id']).delete()
+
+            query.delete()
+
+    def claim_campaign(self, campaign_id, conductor, new_conductor):
+        session = get_session()
+        with session.begin():
+            query = model_query(models.InjectionCampaign,
+                                session=session).filter_by(
+                id=campaign_id, conductor=conductor)
+            count = query.update({'conductor': new_conductor},
+                                 synchronize_session=False)
+        return count == 1
+
+    def get_campaign_boards(self, campaign_id, status=None):
+        query = model_query(models.CampaignBoard).filter_by(
+            campaign_id=campaign_id)
+        if status is not None:
+            query = query.filter_by(status=status)
+        return query.all()
+
+    def update_campaign_boards(self, campaign_id, board_uuids, values,
+                               status=None):
+        if board_uuids is not None and not board_uuids:
+            return 0
+        values = dict(values, updated_at=timeutils.utcnow())
+        session = get_session()
+        with session.begin():
+            query = model_query(models.CampaignBoard, session=session)
+            query = query.filter_by(campaign_id=campaign_id)
+            if board_uuids is not None:
+                query = query.filter(
+                    models.CampaignBoard.board_uuid.in_(board_uuids))
+            if status is not None:
+                query = query.filter_by(status=status)
+            return query.update(values, synchronize_session=False)
+
+    def get_campaign_progress(self, campaign_id):
+        query = model_query(models.CampaignBoard.status,
+                            func.count(models.CampaignBoard.id))
+        query = query.filter(
+            models.CampaignBoard.campaign_id == campaign_id).group_by(
+            models.CampaignBoard.status)
+        return dict(query.all())
+
+    # BOARD TAG api
+
+    def get_board_tags(self, board_id):
+        query = model_query(models.BoardTag.tag).filter_by(
+            board_id=board_id).order_by(models.BoardTag.tag)
+        return [tag for (tag,) in query]
+
+    def set_board_tags(self, board_id, tags):
+        tags = sorted(set(tags))
+        session = get_session()
+        with session.begin():
+            model_query(models.BoardTag, session=session).filter_by(
+                board_id=board_id).delete()
+            if tags:
+                session.execute(models.BoardTag.__table__.insert(),
+                                [{'board_id': board_id, 'tag': tag,
+                                  'created_at': timeutils.utcnow()}
+                                 for tag in tags])
+            # the filtered listings change, not the boards
+            _touch_boards(session, models.Board.id == board_id)
+        return tags
+
+    def add_board_tag(self, board_id, tag):
+        tag_ref = models.BoardTag(board_id=board_id, tag=tag)
+        session = get_session()
+        try:
+            with session.begin():
+                tag_ref.save(session)
+                _touch_boards(session, models.Board.id == board_id)
+        except db_exc.DBDuplicateEntry:
+            # already tagged
+            pass
+
+    def delete_board_tag(self, board_id, tag):
+        session = get_session()
+        with session.begin():
+            query = model_query(models.BoardTag, session=session).filter_by(
+                board_id=board_id, tag=tag)
+            if not query.delete():
+                raise exception.BoardTagNotFound(board=board_id, tag=tag)
+            _touch_boards(session, models.Board.id == board_id)
+
+    # BOARD GROUP api
+
+    def create_board_group(self, values):
+        if 'uuid' not in values:
+            values['uuid'] = uuidutils.generate_uuid()
+
+        group = models.BoardGroup()
+        group.update(values)
+        session = get_session()
+        try:
+            with session.begin():
+                group.save(session)
+        except db_exc.DBDuplicateEntry as exc:
+            if 'name' in exc.columns:
+                raise exception.DuplicateBoardGroupName(name=values['name'])
+            raise exception.BoardGroupAlreadyExists(uuid=values['uuid'])
+        return group
+
+    def get_board_group_by_id(self, group_id):
+        query = model_query(models.BoardGroup).filter_by(id=group_id)
+        try:
+            return query.one()
+        except NoResultFound:
+            raise exception.BoardGroupNotFound(group=group_id)
+
+    def get_board_group_by_uuid(self, group_uuid):
+        query = model_query(models.BoardGroup).filter_by(uuid=group_uuid)
+        try:
+            return query.one()
+        except NoResultFound:
+            raise exception.BoardGroupNotFound(group=group_uuid)
+
+    def get_board_group_by_name(self, project, group_name):
+        query = model_query(models.BoardGroup).filter_by(
+            project=project, name=group_name)
+        try:
+            return query.one()
+        except NoResultFound:
+            raise exception.BoardGroupNotFound(group=group_name)
+
+    def get_board_group_list(self, filters=None, limit=None, marker=None,
+                             sort_key=None, sort_dir=None):
+        query = model_query(models.BoardGroup)
+        query = self._add_board_groups_filters(query, filters)
+        return _paginate_query(models.BoardGroup, limit, marker,
+                               sort_key, sort_dir, query)
+
+    def update_board_group(self, group_id, values):
+        if 'uuid' in values:
+            msg = _("Cannot overwrite UUID for an existing group.")
+            raise exception.InvalidParameterValue(err=msg)
+
+        session = get_session()
+        try:
+            with session.begin():
+                query = model_query(models.BoardGroup, session=session)
+                query = add_identity_filter(query, group_id)
+                try:
+                    ref = query.with_lockmode('update').one()
+                except NoResultFound:
+                    raise exception.BoardGroupNotFound(group=group_id)
+
+                ref.update(values)
+        except db_exc.DBDuplicateEntry:
+            raise exception.DuplicateBoardGroupName(name=values['name'])
+        return ref
+
+    def destroy_board_group(self, group_id):
+        session = get_session()
+        with session.begin():
+            query = model_query(models.BoardGroup, session=session)
+            query = add_identity_filter(query, group_id)
+            try:
+                group_ref = query.one()
+            except NoResultFound:
+                raise exception.BoardGroupNotFound(group=group_id)
+
+            members = model_query(models.BoardGroupMember, session=session)
+            members = members.filter_by(group_id=group_ref['id'])
+            board_ids = [m.board_id for m in members]
+            if board_ids:
+                members.delete(synchronize_session=False)
+                _touch_boards(session, models.Board.id.in_(board_ids))
+
+            query.delete()
+
+    def add_board_group_members(self, group_id, board_uuids):
+        if not board_uuids:
+            return 0
+        session = get_session()
+        with session.begin():
+            group = model_query(models.BoardGroup.project, session=session)
+            try:
+                (project,) = group.filter_by(id=group_id).one()
+            except NoResultFound:
+                raise exception.BoardGroupNotFound(group=group_id)
+            # a group holds the boards of its project only
+            board_ids = model_query(models.Board.id, session=session).filter(
+                models.Board.uuid.in_(set(board_uuids)),
+                models.Board.project == project)
+            current = model_query(models.BoardGroupMember.board_id,
+                                  session=session).filter_by(
+                group_id=group_id)
+            new = board_ids.filter(~models.Board.id.in_(current.subquery()))
+            now = timeutils.utcnow()
+            rows = [{'group_id': group_id, 'board_id': board_id,
+                     'created_at': now} for (board_id,) in new]
+            if rows:
+                session.execute(models.BoardGroupMember.__table__.insert(),
+                                rows)
+                _touch_boards(session, models.Board.id.in_(
+                    [row['board_id'] for row in rows]))
+        return len(rows)
+
+    def remove_board_group_members(self, group_id, board_uuids):
+        if not board_uuids:
+            return 0
+        session = get_session()
+        with session.begin():
+            board_ids = model_query(models.Board.id, session=session).filter(
+                models.Board.uuid.in_(set(board_uuids)))
+            query = model_query(models.BoardGroupMember, session=session)
+            count = query.filter(
+                models.BoardGroupMember.group_id == group_id,
+                models.BoardGroupMember.board_id.in_(board_ids.subquery())
+            ).delete(synchronize_session=False)
+            if count:
+                _touch_boards(session,
+                              models.Board.uuid.in_(set(board_uuids)))
+        return count
+
+    # SCHEDULE api
+
+    def create_schedule(self, values):
+        if 'uuid' not in values:
+            values['uuid'] = uuidutils.generate_uuid()
+
+        schedule = models.Schedule()
+        schedule.update(values)
+        session = get_session()
+        try:
+            with session.begin():
+                schedule.save(session)
+        except db_exc.DBDuplicateEntry:
+            raise exception.ScheduleAlreadyExists(uuid=values['uuid'])
+        return schedule
+
+    def get_schedule_by_id(self, schedule_id):
+        query = model_query(models.Schedule).filter_by(id=schedule_id)
+        try:
+            return query.one()
+        except NoResultFound:
+            raise exception.ScheduleNotFound(schedule=schedule_id)
+
+    def get_schedule_by_uuid(self, schedule_uuid):
+        query = model_query(models.Schedule).filter_by(uuid=schedule_uuid)
+        try:
+            return query.one()
+        except NoResultFound:
+            raise exception.ScheduleNotFound(schedule=schedule_uuid)
+
+    def get_schedule_list(self, filters=None, limit=None, marker=None,
+                          sort_key=None, sort_dir=None):
+        query = model_query(models.Schedule)
+        query = self._add_schedules_filters(query, filters)
+        return _paginate_query(models.Schedule, limit, marker,
+                               sort_key, sort_dir, query)
+
+    def update_schedule(self, schedule_id, values):
+        if 'uuid' in values:
+            msg = _("Cannot overwrite UUID for an existing schedule.")
+            raise exception.InvalidParameterValue(err=msg)
+
+        session = get_session()
+        with session.begin():
+            query = model_query(models.Schedule, session=session)
+            query = add_identity_filter(query, schedule_id)
+            try:
+                ref = query.with_lockmode('update').one()
+            except NoResultFound:
+                raise exception.ScheduleNotFound(schedule=schedule_id)
+
+            ref.update(values)
+        return ref
+
+    def destroy_schedule(self, schedule_id):
+        session = get_session()
+        with session.begin():
+            query = model_query(models.Schedule, session=session)
+            query = add_identity_filter(query, schedule_id)
+            if not query.delete():
+                raise exception.ScheduleNotFound(schedule=schedule_id)
+
+    def claim_schedule_run(self, schedule_id, next_run, new_next_run):
+        session = get_session()
+        with session.begin():
+            query = model_query(models.Schedule, session=session).filter_by(
+                id=schedule_id, enabled=True, next_run=next_run)
+            count = query.update({'next_run': new_next_run,
+                                  'last_run': next_run},
+                                 synchronize_session=False)
+        return count == 1
+
+    # SEQUENCE api
+
+    def get_generation(self, kind):
+        query = model_query(models.Generation.value).filter_by(kind=kind)
+        value = query.scalar()
+        return value or 0
+
+    def allocate_sequence(self, kind, count=1):
+        try:
+            return self._allocate_sequence(kind, count)
+        except db_exc.DBDuplicateEntry:
+            # the first allocation of another service created the row
+            return self._allocate_sequence(kind, count)
+
+    def _allocate_sequence(self, kind, count):
+        session = get_session()
+        with session.begin():
+            query = model_query(models.Generation, session=session).filter_by(
+                kind=kind)
+            ref = query.with_lockmode('update').first()
+            if ref is None:
+                ref = models.Generation(kind=kind, value=0)
+                session.add(ref)
+            value = (ref.value or 0) + count
+            ref.value = value
+        return value
@@ -26,7 +26,9 @@ from oslo_db.sqlalchemy import models
 import six.moves.urllib.parse as urlparse
 from sqlalchemy import Boolean
 from sqlalchemy import Column
+from sqlalchemy import DateTime
 from sqlalchemy import ForeignKey, Integer
+from sqlalchemy import Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import schema
 from sqlalchemy import String
@@ -159,6 +161,54 @@ class Board(Base):
     mobile = Column(Boolean, default=False)
     config = Column(JSONEncodedDict)
     extra = Column(JSONEncodedDict)
+    # incremented on every change of the board, its session or location
+    revision = Column(Integer, default=0, nullable=False)
+
+
+class BoardTag(Base):
+    """Represents a tag of a board."""
+
+    __tablename__ = 'board_tags'
+    __table_args__ = (
+        schema.UniqueConstraint('board_id', 'tag',
+                                name='uniq_board_tags0board_tag'),
+        Index('board_tags_tag_idx', 'tag'),
+        table_args())
+    id = Column(Integer, primary_key=True)
+    board_id = Column(Integer, ForeignKey('boards.id'))
+    tag = Column(String(255))
+
+
+class BoardGroup(Base):
+    """Represents a named group of boards."""
+
+    __tablename__ = 'board_groups'
+    __table_args__ = (
+        schema.UniqueConstraint('uuid', name='uniq_board_groups0uuid'),
+        schema.UniqueConstraint('project', 'name',
+                                name='uniq_board_groups0project_name'),
+        table_args())
+    id = Column(Integer, primary_key=True)
+    uuid = Column(String(36))
+    name = Column(String(255))
+    description = Column(String(255), nullable=True)
+    owner = Column(String(36))
+    project = Column(String(36))
+    extra = Column(JSONEncodedDict)
+
+
+class BoardGroupMember(Base):
+    """Represents the membership of a board in a group."""
+
+    __tablename__ = 'board_group_members'
+    __table_args__ = (
+        schema.UniqueConstraint('group_id', 'board_id',
+                                name='uniq_board_group_members0group_board'),
+        Index('board_group_members_board_idx', 'board_id'),
+        table_args())
+    id = Column(Integer, primary_key=True)
+    group_id = Column(Integer, ForeignKey('board_groups.id'))
+    board_id = Column(Integer, ForeignKey('boards.id'))
 
 
 class Location(Base):
@@ -209,6 +259,7 @@ class Plugin(Base):
     callable = Column(Boolean)
     parameters = Column(JSONEncodedDict)
     extra = Column(JSONEncodedDict)
+    revision = Column(Integer, default=0, nullable=False)
 
 
 class InjectionPlugin(Base):
@@ -222,3 +273,74 @@ class InjectionPlugin(Base):
     plugin_uuid = Column(String(36), ForeignKey('plugins.uuid'))
     onboot = Column(Boolean, default=False)
     status = Column(String(15))
+
+
+class InjectionCampaign(Base):
+    """Represents the injection of a plugin into a set of boards."""
+
+    __tablename__ = 'injection_campaigns'
+    __table_args__ = (
+        schema.UniqueConstraint('uuid', name='uniq_injection_campaigns0uuid'),
+        Index('injection_campaigns_status_idx', 'status', 'conductor'),
+        table_args())
+    id = Column(Integer, primary_key=True)
+    uuid = Column(String(36))
+    plugin_uuid = Column(String(36), ForeignKey('plugins.uuid'))
+    onboot = Column(Boolean, default=False)
+    owner = Column(String(36))
+    project = Column(String(36))
+    status = Column(String(15))
+    conductor = Column(String(255), nullable=True)
+    concurrency = Column(Integer, nullable=True)
+    selector = Column(JSONEncodedDict)
+    total = Column(Integer, default=0)
+
+
+class CampaignBoard(Base):
+    """Represents the state of a board in an injection campaign."""
+
+    __tablename__ = 'campaign_boards'
+    __table_args__ = (
+        schema.UniqueConstraint('campaign_id', 'board_uuid',
+                                name='uniq_campaign_boards0campaign_board'),
+        Index('campaign_boards_status_idx', 'campaign_id', 'status'),
+        table_args())
+    id = Column(Integer, primary_key=True)
+    campaign_id = Column(Integer, ForeignKey('injection_campaigns.id'))
+    board_uuid = Column(String(36))
+    agent = Column(String(255), nullable=True)
+    status = Column(String(15))
+    error = Column(TEXT, nullable=True)
+
+
+class Schedule(Base):
+    """Represents a recurring plugin action on a set of boards."""
+
+    __tablename__ = 'schedules'
+    __table_args__ = (
+        schema.UniqueConstraint('uuid', name='uniq_schedules0uuid'),
+        Index('schedules_next_run_idx', 'enabled', 'next_run'),
+        table_args())
+    id = Column(Integer, primary_key=True)
+    uuid = Column(String(36))
+    name = Column(String(255), nullable=True)
+    owner = Column(String(36))
+    project = Column(String(36))
+    plugin_uuid = Column(String(36), ForeignKey('plugins.uuid'))
+    action = Column(String(15))
+    parameters = Column(JSONEncodedDict)
+    cron = Column(String(255))
+    selector = Column(JSONEncodedDict)
+    enabled = Column(Boolean, default=True)
+    next_run = Column(DateTime, nullable=True)
+    last_run = Column(DateTime, nullable=True)
+    last_result = Column(JSONEncodedDict)
+
+
+class Generation(Base):
+    """Represents a sequence shared by the services."""
+
+    __tablename__ = 'generations'
+    __table_args__ = (table_args())
+    kind = Column(String(36), primary_key=True)
+    value = Column(Integer, default=0, nullable=False)
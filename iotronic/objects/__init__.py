@@ -13,27 +13,36 @@
 #    under the License.
 
 from iotronic.objects import board
+from iotronic.objects import board_group
+from iotronic.objects import campaign
 from iotronic.objects import conductor
 from iotronic.objects import injectionplugin
 from iotronic.objects import location
 from iotronic.objects import plugin
+from iotronic.objects import schedule
 from iotronic.objects import sessionwp
 from iotronic.objects import wampagent
 
 Conductor = conductor.Conductor
 Board = board.Board
+BoardGroup = board_group.BoardGroup
 Location = location.Location
 Plugin = plugin.Plugin
 InjectionPlugin = injectionplugin.InjectionPlugin
+InjectionCampaign = campaign.InjectionCampaign
+Schedule = schedule.Schedule
 SessionWP = sessionwp.SessionWP
 WampAgent = wampagent.WampAgent
 
 __all__ = (
     Conductor,
     Board,
+    BoardGroup,
     Location,
     SessionWP,
     WampAgent,
     Plugin,
     InjectionPlugin,
+    InjectionCampaign,
+    Schedule,
 )
@@ -42,6 +42,7 @@ class Board(base.IotronicObject):
         'mobile': bool,
         'config': obj_utils.dict_or_none,
         'extra': obj_utils.dict_or_none,
+        'revision': int,
     }
 
     def check_if_online(self):
@@ -138,6 +139,45 @@ class Board(base.IotronicObject):
                                              sort_dir=sort_dir)
         return [Board._from_db_object(cls(context), obj) for obj in db_boards]
 
+    @classmethod
+    def stream(cls, context, limit=None, marker=None, sort_key=None,
+               sort_dir=None, filters=None):
+        """Return a generator of Board objects, fetched in batches.
+
+        Same parameters as :meth:`list`.
+        """
+        db_boards = cls.dbapi.get_board_list(filters=filters, limit=limit,
+                                             marker=marker, sort_key=sort_key,
+                                             sort_dir=sort_dir, stream=True)
+        for obj in db_boards:
+            yield Board._from_db_object(cls(context), obj)
+
+    @base.remotable_classmethod
+    def list_agents(cls, context, filters=None):
+        """Return the wamp agent of every board matching the filters.
+
+        :param context: Security context.
+        :param filters: Filters to apply.
+        :returns: a list of (board_uuid, agent) tuples.
+
+        """
+        db_boards = cls.dbapi.get_boardinfo_list(columns=['uuid', 'agent'],
+                                                 filters=filters)
+        return [(b.uuid, b.agent) for b in db_boards]
+
+    @base.remotable_classmethod
+    def list_uuids(cls, context, filters=None):
+        """Resolve a selection of boards to their uuids, in one query.
+
+        :param context: Security context.
+        :param filters: Filters to apply, e.g. tags or group.
+        :returns: a list of board uuids.
+
+        """
+        db_boards = cls.dbapi.get_boardinfo_list(columns=['uuid'],
+                                                 filters=filters)
+        return [b.uuid for b in db_boards]
+
     @base.remotable_classmethod
     def reserve(cls, context, tag, board_id):
         """Get and reserve a board.
@@ -168,6 +208,18 @@ class Board(base.IotronicObject):
         """
         cls.dbapi.release_board(tag, board_id)
 
+    @base.remotable_classmethod
+    def update_status(cls, context, board_uuids, status):
+        """Set the status of a set of boards with a single update.
+
+        :param context: Security context.
+        :param board_uuids: A list of board uuids.
+        :param status: The new status.
+        :returns: The number of updated boards.
+
+        """
+        return cls.dbapi.update_boards_status(board_uuids, status)
+
     @base.remotable
     def create(self, context=None):
         """Create a Board record in the DB.
@@ -240,3 +292,26 @@ class Board(base.IotronicObject):
                     self, base.get_attrname(field))
                     and self[field] != current[field]):
                 self[field] = current[field]
+
+    def get_tags(self):
+        """Return the sorted list of the tags of the board."""
+        return self.dbapi.get_board_tags(self.id)
+
+    def set_tags(self, tags):
+        """Replace the tags of the board.
+
+        :param tags: a list of tags.
+        :returns: the sorted list of the new tags.
+        """
+        return self.dbapi.set_board_tags(self.id, tags)
+
+    def add_tag(self, tag):
+        """Tag the board; nothing changes if it has the tag already."""
+        self.dbapi.add_board_tag(self.id, tag)
+
+    def remove_tag(self, tag):
+        """Remove a tag from the board.
+
+        :raises: BoardTagNotFound if the board has not the tag.
+        """
+        self.dbapi.delete_board_tag(self.id, tag)
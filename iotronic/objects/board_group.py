@@ -0,0 +1,181 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_utils import strutils
+from oslo_utils import uuidutils
+
+from iotronic.common import exception
+from iotronic.db import api as db_api
+from iotronic.objects import base
+from iotronic.objects import utils as obj_utils
+
+
+class BoardGroup(base.IotronicObject):
+    # Version 1.0: Initial version
+    VERSION = '1.0'
+
+    dbapi = db_api.get_instance()
+
+    fields = {
+        'id': int,
+        'uuid': obj_utils.str_or_none,
+        'name': obj_utils.str_or_none,
+        'description': obj_utils.str_or_none,
+        'owner': obj_utils.str_or_none,
+        'project': obj_utils.str_or_none,
+        'extra': obj_utils.dict_or_none,
+    }
+
+    @staticmethod
+    def _from_db_object(group, db_group):
+        """Converts a database entity to a formal object."""
+        for field in group.fields:
+            group[field] = db_group[field]
+        group.obj_reset_changes()
+        return group
+
+    @base.remotable_classmethod
+    def get(cls, context, group_id):
+        """Find a group based on its id or uuid.
+
+        :param group_id: the id *or* uuid of a group.
+        :returns: a :class:`BoardGroup` object.
+        """
+        if strutils.is_int_like(group_id):
+            return cls.get_by_id(context, group_id)
+        elif uuidutils.is_uuid_like(group_id):
+            return cls.get_by_uuid(context, group_id)
+        else:
+            raise exception.InvalidIdentity(identity=group_id)
+
+    @base.remotable_classmethod
+    def get_by_id(cls, context, group_id):
+        """Find a group based on its integer id.
+
+        :param group_id: the id of a group.
+        :returns: a :class:`BoardGroup` object.
+        """
+        db_group = cls.dbapi.get_board_group_by_id(group_id)
+        return BoardGroup._from_db_object(cls(context), db_group)
+
+    @base.remotable_classmethod
+    def get_by_uuid(cls, context, uuid):
+        """Find a group based on uuid.
+
+        :param uuid: the uuid of a group.
+        :returns: a :class:`BoardGroup` object.
+        """
+        db_group = cls.dbapi.get_board_group_by_uuid(uuid)
+        return BoardGroup._from_db_object(cls(context), db_group)
+
+    @base.remotable_classmethod
+    def get_by_name(cls, context, project, name):
+        """Find a group based on its name in a project.
+
+        :param project: the project of the group.
+        :param name: the name of a group.
+        :returns: a :class:`BoardGroup` object.
+        """
+        db_group = cls.dbapi.get_board_group_by_name(project, name)
+        return BoardGroup._from_db_object(cls(context), db_group)
+
+    @base.remotable_classmethod
+    def list(cls, context, limit=None, marker=None, sort_key=None,
+             sort_dir=None, filters=None):
+        """Return a list of BoardGroup objects.
+
+        :param context: Security context.
+        :param limit: maximum number of resources to return in a single result.
+        :param marker: pagination marker for large data sets.
+        :param sort_key: column to sort results by.
+        :param sort_dir: direction to sort. "asc" or "desc".
+        :param filters: Filters to apply.
+        :returns: a list of :class:`BoardGroup` object.
+
+        """
+        db_groups = cls.dbapi.get_board_group_list(filters=filters,
+                                                   limit=limit,
+                                                   marker=marker,
+                                                   sort_key=sort_key,
+                                                   sort_dir=sort_dir)
+        return [BoardGroup._from_db_object(cls(context), obj)
+                for obj in db_groups]
+
+    @base.remotable
+    def create(self, context=None):
+        """Create a BoardGroup record in the DB.
+
+        :param context: Security context. NOTE: This should only
+                        be used internally by the indirection_api.
+                        Unfortunately, RPC requires context as the first
+                        argument, even though we don't use it.
+                        A context should be set when instantiating the
+                        object, e.g.: BoardGroup(context)
+
+        """
+        values = self.obj_get_changes()
+        db_group = self.dbapi.create_board_group(values)
+        self._from_db_object(self, db_group)
+
+    @base.remotable
+    def destroy(self, context=None):
+        """Delete the BoardGroup and its memberships from the DB.
+
+        :param context: Security context. NOTE: This should only
+                        be used internally by the indirection_api.
+                        Unfortunately, RPC requires context as the first
+                        argument, even though we don't use it.
+                        A context should be set when instantiating the
+                        object, e.g.: BoardGroup(context)
+        """
+        self.dbapi.destroy_board_group(self.uuid)
+        self.obj_reset_changes()
+
+    @base.remotable
+    def save(self, context=None):
+        """Save updates to this BoardGroup.
+
+        :param context: Security context. NOTE: This should only
+                        be used internally by the indirection_api.
+                        Unfortunately, RPC requires context as the first
+                        argument, even though we don't use it.
+                        A context should be set when instantiating the
+                        object, e.g.: BoardGroup(context)
+        """
+        updates = self.obj_get_changes()
+        self.dbapi.update_board_group(self.uuid, updates)
+        self.obj_reset_changes()
+
+    def board_uuids(self):
+        """Return the uuids of the boards of the group, in one query."""
+        db_boards = self.dbapi.get_boardinfo_list(columns=['uuid'],
+                                                  filters={'group': self.uuid})
+        return [b.uuid for b in db_boards]
+
+    def add_boards(self, board_uuids):
+        """Add a set of boards to the group.
+
+        :param board_uuids: a list of board uuids.
+        :returns: the number of boards added.
+        """
+        return self.dbapi.add_board_group_members(self.id, board_uuids)
+
+    def remove_boards(self, board_uuids):
+        """Remove a set of boards from the group.
+
+        :param board_uuids: a list of board uuids.
+        :returns: the number of boards removed.
+        """
+        return self.dbapi.remove_board_group_members(self.id, board_uuids)
@@ -0,0 +1,218 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_utils import strutils
+from oslo_utils import uuidutils
+
+from iotronic.common import exception
+from iotronic.common import states
+from iotronic.db import api as db_api
+from iotronic.objects import base
+from iotronic.objects import utils as obj_utils
+
+BOARD_STATES = [states.PENDING, states.RUNNING, states.DONE, states.FAILED,
+                states.CANCELLED]
+
+
+class InjectionCampaign(base.IotronicObject):
+    # Version 1.0: Initial version
+    VERSION = '1.0'
+
+    dbapi = db_api.get_instance()
+
+    fields = {
+        'id': int,
+        'uuid': obj_utils.str_or_none,
+        'plugin_uuid': obj_utils.str_or_none,
+        'onboot': bool,
+        'owner': obj_utils.str_or_none,
+        'project': obj_utils.str_or_none,
+        'status': obj_utils.str_or_none,
+        'conductor': obj_utils.str_or_none,
+        'concurrency': obj_utils.int_or_none,
+        'selector': obj_utils.dict_or_none,
+        'total': int,
+    }
+
+    @staticmethod
+    def _from_db_object(campaign, db_campaign):
+        """Converts a database entity to a formal object."""
+        for field in campaign.fields:
+            campaign[field] = db_campaign[field]
+        campaign.obj_reset_changes()
+        return campaign
+
+    @base.remotable_classmethod
+    def get(cls, context, campaign_id):
+        """Find a campaign based on its id or uuid.
+
+        :param campaign_id: the id *or* uuid of a campaign.
+        :returns: a :class:`InjectionCampaign` object.
+        """
+        if strutils.is_int_like(campaign_id):
+            return cls.get_by_id(context, campaign_id)
+        elif uuidutils.is_uuid_like(campaign_id):
+            return cls.get_by_uuid(context, campaign_id)
+        else:
+            raise exception.InvalidIdentity(identity=campaign_id)
+
+    @base.remotable_classmethod
+    def get_by_id(cls, context, campaign_id):
+        """Find a campaign based on its integer id.
+
+        :param campaign_id: the id of a campaign.
+        :returns: a :class:`InjectionCampaign` object.
+        """
+        db_campaign = cls.dbapi.get_campaign_by_id(campaign_id)
+        return InjectionCampaign._from_db_object(cls(context), db_campaign)
+
+    @base.remotable_classmethod
+    def get_by_uuid(cls, context, uuid):
+        """Find a campaign based on uuid.
+
+        :param uuid: the uuid of a campaign.
+        :returns: a :class:`InjectionCampaign` object.
+        """
+        db_campaign = cls.dbapi.get_campaign_by_uuid(uuid)
+        return InjectionCampaign._from_db_object(cls(context), db_campaign)
+
+    @base.remotable_classmethod
+    def list(cls, context, limit=None, marker=None, sort_key=None,
+             sort_dir=None, filters=None):
+        """Return a list of InjectionCampaign objects.
+
+        :param context: Security context.
+        :param limit: maximum number of resources to return in a single result.
+        :param marker: pagination marker for large data sets.
+        :param sort_key: column to sort results by.
+        :param sort_dir: direction to sort. "asc" or "desc".
+        :param filters: Filters to apply.
+        :returns: a list of :class:`InjectionCampaign` object.
+
+        """
+        db_campaigns = cls.dbapi.get_campaign_list(filters=filters,
+                                                   limit=limit,
+                                                   marker=marker,
+                                                   sort_key=sort_key,
+                                                   sort_dir=sort_dir)
+        return [InjectionCampaign._from_db_object(cls(context), obj)
+                for obj in db_campaigns]
+
+    @base.remotable
+    def create(self, context=None, boards=None):
+        """Create an InjectionCampaign record and its boards in the DB.
+
+        :param context: Security context. NOTE: This should only
+                        be used internally by the indirection_api.
+                        Unfortunately, RPC requires context as the first
+                        argument, even though we don't use it.
+                        A context should be set when instantiating the
+                        object, e.g.: InjectionCampaign(context)
+        :param boards: a list of (board_uuid, agent) tuples.
+
+        """
+        values = self.obj_get_changes()
+        db_campaign = self.dbapi.create_campaign(values, boards or [])
+        self._from_db_object(self, db_campaign)
+
+    @base.remotable
+    def destroy(self, context=None):
+        """Delete the InjectionCampaign and its boards from the DB.
+
+        :param context: Security context. NOTE: This should only
+                        be used internally by the indirection_api.
+                        Unfortunately, RPC requires context as the first
+                        argument, even though we don't use it.
+                        A context should be set when instantiating the
+                        object, e.g.: InjectionCampaign(context)
+        """
+        self.dbapi.destroy_campaign(self.uuid)
+        self.obj_reset_changes()
+
+    @base.remotable
+    def save(self, context=None):
+        """Save updates to this InjectionCampaign.
+
+        :param context: Security context. NOTE: This should only
+                        be used internally by the indirection_api.
+                        Unfortunately, RPC requires context as the first
+                        argument, even though we don't use it.
+                        A context should be set when instantiating the
+                        object, e.g.: InjectionCampaign(context)
+        """
+        updates = self.obj_get_changes()
+        self.dbapi.update_campaign(self.uuid, updates)
+        self.obj_reset_changes()
+
+    @base.remotable
+    def refresh(self, context=None):
+        """Refresh the object by re-fetching from the DB.
+
+        :param context: Security context. NOTE: This should only
+                        be used internally by the indirection_api.
+                        Unfortunately, RPC requires context as the first
+                        argument, even though we don't use it.
+                        A context should be set when instantiating the
+                        object, e.g.: InjectionCampaign(context)
+        """
+        current = self.__class__.get_by_uuid(self._context, self.uuid)
+        for field in self.fields:
+            if (hasattr(
+                    self, base.get_attrname(field))
+                    and self[field] != current[field]):
+                self[field] = current[field]
+
+    def claim(self, conductor):
+        """Take the campaign over from the worker it belongs to.
+
+        :param conductor: the worker taking the campaign over.
+        :returns: True if the campaign now belongs to the worker.
+        """
+        if not self.dbapi.claim_campaign(self.id, self.conductor,
+                                         conductor):
+            return False
+        self.conductor = conductor
+        self.obj_reset_changes(['conductor'])
+        return True
+
+    def boards(self, status=None):
+        """Return the boards of the campaign.
+
+        :param status: return only the boards in this status.
+        :returns: a list of (board_uuid, agent) tuples.
+        """
+        return [(b.board_uuid, b.agent)
+                for b in self.dbapi.get_campaign_boards(self.id, status)]
+
+    def set_boards_status(self, board_uuids, status, error=None,
+                          from_status=None):
+        """Move a set of boards of the campaign to a new status.
+
+        :param board_uuids: a list of board uuids, None for every board.
+        :param status: the new status.
+        :param error: the error to record, if any.
+        :param from_status: update only the boards in this status.
+        :returns: the number of updated boards.
+        """
+        return self.dbapi.update_campaign_boards(
+            self.id, board_uuids, {'status': status, 'error': error},
+            status=from_status)
+
+    def progress(self):
+        """Return the number of boards of the campaign in each status."""
+        counters = dict((state, 0) for state in BOARD_STATES)
+        counters.update(self.dbapi.get_campaign_progress(self.id))
+        counters['total'] = self.total
+        return counters
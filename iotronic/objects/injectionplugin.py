@@ -109,6 +109,18 @@ class InjectionPlugin(base.IotronicObject):
         return [InjectionPlugin._from_db_object(cls(context), obj)
                 for obj in db_injs]
 
+    @base.remotable_classmethod
+    def upsert(cls, context, plugin_uuid, board_uuids, onboot):
+        """Record the injection of a plugin into a set of boards.
+
+        :param context: Security context.
+        :param plugin_uuid: the uuid of a plugin.
+        :param board_uuids: a list of board uuids.
+        :param onboot: the onboot flag of the injections.
+
+        """
+        cls.dbapi.upsert_injection_plugins(plugin_uuid, board_uuids, onboot)
+
     @base.remotable
     def create(self, context=None):
         """Create a InjectionPlugin record in the DB.
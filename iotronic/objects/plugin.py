@@ -25,6 +25,8 @@ ACTIONS = ['PluginCall', 'PluginStop', 'PluginStart',
            'PluginStatus', 'PluginReboot']
 CUSTOM_PARAMS = ['PluginCall', 'PluginStart']
 NO_PARAMS = ['PluginStatus', 'PluginReboot']
+# actions without side effects on the board
+READ_ONLY = ['PluginStatus']
 
 
 def is_valid_action(action):
@@ -41,6 +43,10 @@ def want_params(action):
     return False if action in NO_PARAMS else True
 
 
+def is_read_only(action):
+    return action in READ_ONLY
+
+
 class Plugin(base.IotronicObject):
     # Version 1.0: Initial version
     VERSION = '1.0'
@@ -57,6 +63,7 @@ class Plugin(base.IotronicObject):
         'callable': bool,
         'parameters': obj_utils.dict_or_none,
         'extra': obj_utils.dict_or_none,
+        'revision': int,
     }
 
     @staticmethod
@@ -136,6 +143,22 @@ class Plugin(base.IotronicObject):
         return [Plugin._from_db_object(cls(context), obj)
                 for obj in db_plugins]
 
+    @classmethod
+    def stream(cls, context, limit=None, marker=None, sort_key=None,
+               sort_dir=None, filters=None):
+        """Return a generator of Plugin objects, fetched in batches.
+
+        Same parameters as :meth:`list`.
+        """
+        db_plugins = cls.dbapi.get_plugin_list(filters=filters,
+                                               limit=limit,
+                                               marker=marker,
+                                               sort_key=sort_key,
+                                               sort_dir=sort_dir,
+                                               stream=True)
+        for obj in db_plugins:
+            yield Plugin._from_db_object(cls(context), obj)
+
     @base.remotable
     def create(self, context=None):
         """Create a Plugin record in the DB.
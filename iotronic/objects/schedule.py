@@ -0,0 +1,187 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_utils import strutils
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
+
+from iotronic.common import exception
+from iotronic.db import api as db_api
+from iotronic.objects import base
+from iotronic.objects import utils as obj_utils
+
+
+class Schedule(base.IotronicObject):
+    # Version 1.0: Initial version
+    VERSION = '1.0'
+
+    dbapi = db_api.get_instance()
+
+    fields = {
+        'id': int,
+        'uuid': obj_utils.str_or_none,
+        'name': obj_utils.str_or_none,
+        'owner': obj_utils.str_or_none,
+        'project': obj_utils.str_or_none,
+        'plugin_uuid': obj_utils.str_or_none,
+        'action': obj_utils.str_or_none,
+        'parameters': obj_utils.dict_or_none,
+        'cron': obj_utils.str_or_none,
+        'selector': obj_utils.dict_or_none,
+        'enabled': bool,
+        'next_run': obj_utils.datetime_or_str_or_none,
+        'last_run': obj_utils.datetime_or_str_or_none,
+        'last_result': obj_utils.dict_or_none,
+    }
+
+    _attr_next_run_from_primitive = obj_utils.dt_deserializer
+    _attr_last_run_from_primitive = obj_utils.dt_deserializer
+    _attr_next_run_to_primitive = obj_utils.dt_serializer('next_run')
+    _attr_last_run_to_primitive = obj_utils.dt_serializer('last_run')
+
+    @staticmethod
+    def _from_db_object(schedule, db_schedule):
+        """Converts a database entity to a formal object."""
+        for field in schedule.fields:
+            schedule[field] = db_schedule[field]
+        schedule.obj_reset_changes()
+        return schedule
+
+    @base.remotable_classmethod
+    def get(cls, context, schedule_id):
+        """Find a schedule based on its id or uuid.
+
+        :param schedule_id: the id *or* uuid of a schedule.
+        :returns: a :class:`Schedule` object.
+        """
+        if strutils.is_int_like(schedule_id):
+            return cls.get_by_id(context, schedule_id)
+        elif uuidutils.is_uuid_like(schedule_id):
+            return cls.get_by_uuid(context, schedule_id)
+        else:
+            raise exception.InvalidIdentity(identity=schedule_id)
+
+    @base.remotable_classmethod
+    def get_by_id(cls, context, schedule_id):
+        """Find a schedule based on its integer id.
+
+        :param schedule_id: the id of a schedule.
+        :returns: a :class:`Schedule` object.
+        """
+        db_schedule = cls.dbapi.get_schedule_by_id(schedule_id)
+        return Schedule._from_db_object(cls(context), db_schedule)
+
+    @base.remotable_classmethod
+    def get_by_uuid(cls, context, uuid):
+        """Find a schedule based on uuid.
+
+        :param uuid: the uuid of a schedule.
+        :returns: a :class:`Schedule` object.
+        """
+        db_schedule = cls.dbapi.get_schedule_by_uuid(uuid)
+        return Schedule._from_db_object(cls(context), db_schedule)
+
+    @base.remotable_classmethod
+    def list(cls, context, limit=None, marker=None, sort_key=None,
+             sort_dir=None, filters=None):
+        """Return a list of Schedule objects.
+
+        :param context: Security context.
+        :param limit: maximum number of resources to return in a single result.
+        :param marker: pagination marker for large data sets.
+        :param sort_key: column to sort results by.
+        :param sort_dir: direction to sort. "asc" or "desc".
+        :param filters: Filters to apply.
+        :returns: a list of :class:`Schedule` object.
+
+        """
+        db_schedules = cls.dbapi.get_schedule_list(filters=filters,
+                                                   limit=limit,
+                                                   marker=marker,
+                                                   sort_key=sort_key,
+                                                   sort_dir=sort_dir)
+        return [Schedule._from_db_object(cls(context), obj)
+                for obj in db_schedules]
+
+    @base.remotable_classmethod
+    def list_due(cls, context, now):
+        """Return the enabled schedules with a run due at a time.
+
+        :param context: Security context.
+        :param now: a naive UTC datetime.
+        :returns: a list of :class:`Schedule` object.
+
+        """
+        return cls.list(context, sort_key='next_run', sort_dir='asc',
+                        filters={'enabled': True, 'due_before': now})
+
+    @base.remotable
+    def create(self, context=None):
+        """Create a Schedule record in the DB.
+
+        :param context: Security context. NOTE: This should only
+                        be used internally by the indirection_api.
+                        Unfortunately, RPC requires context as the first
+                        argument, even though we don't use it.
+                        A context should be set when instantiating the
+                        object, e.g.: Schedule(context)
+
+        """
+        values = self.obj_get_changes()
+        db_schedule = self.dbapi.create_schedule(values)
+        self._from_db_object(self, db_schedule)
+
+    @base.remotable
+    def destroy(self, context=None):
+        """Delete the Schedule from the DB.
+
+        :param context: Security context. NOTE: This should only
+                        be used internally by the indirection_api.
+                        Unfortunately, RPC requires context as the first
+                        argument, even though we don't use it.
+                        A context should be set when instantiating the
+                        object, e.g.: Schedule(context)
+        """
+        self.dbapi.destroy_schedule(self.uuid)
+        self.obj_reset_changes()
+
+    @base.remotable
+    def save(self, context=None):
+        """Save updates to this Schedule.
+
+        :param context: Security context. NOTE: This should only
+                        be used internally by the indirection_api.
+                        Unfortunately, RPC requires context as the first
+                        argument, even though we don't use it.
+                        A context should be set when instantiating the
+                        object, e.g.: Schedule(context)
+        """
+        updates = self.obj_get_changes()
+        self.dbapi.update_schedule(self.uuid, updates)
+        self.obj_reset_changes()
+
+    def claim(self, new_next_run):
+        """Claim the due run of the schedule and move it to the next one.
+
+        :param new_next_run: the run after the due one.
+        :returns: True if this caller has to execute the due run.
+        """
+        due = timeutils.normalize_time(self.next_run)
+        if not self.dbapi.claim_schedule_run(self.id, due, new_next_run):
+            return False
+        self.last_run = due
+        self.next_run = new_next_run
+        self.obj_reset_changes()
+        return True
@@ -92,6 +92,17 @@ class SessionWP(base.IotronicObject):
         db_list = cls.dbapi.get_valid_wpsessions_list()
         return [SessionWP._from_db_object(cls(context), x) for x in db_list]
 
+    @base.remotable_classmethod
+    def invalidate(cls, context, session_ids):
+        """Invalidate a set of sessions in a single transaction.
+
+        :param context: Security context
+        :param session_ids: A list of session ids.
+        :returns: the uuids of the boards whose valid session has been
+                  invalidated.
+        """
+        return cls.dbapi.invalidate_sessions(session_ids)
+
     @base.remotable
     def create(self, context=None):
         """Create a SessionWP record in the DB.
@@ -0,0 +1,110 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+Base classes for telemetry storage backends
+"""
+
+import abc
+import collections
+import threading
+
+from oslo_config import cfg
+from oslo_utils import importutils
+import six
+
+from iotronic.common import exception
+from iotronic.common import paths
+
+telemetry_opts = [
+    cfg.BoolOpt('enabled',
+                default=True,
+                help='Subscribe the wamp agent to the board telemetry '
+                     'topics.'),
+    cfg.StrOpt('backend',
+               default='sqlite',
+               help='Time-series backend used to store board readings.'),
+    cfg.StrOpt('sqlite_path',
+               default=paths.state_path_def('telemetry.sqlite'),
+               help='Path of the database used by the sqlite backend.'),
+    cfg.IntOpt('batch_size',
+               default=500,
+               help='Number of buffered readings that triggers a write to '
+                    'the backend.'),
+    cfg.FloatOpt('flush_interval',
+                 default=5.0,
+                 help='Maximum time (in seconds) a reading stays in the '
+                      'buffer before being written to the backend.'),
+    cfg.IntOpt('max_buffer_size',
+               default=100000,
+               help='Maximum number of readings kept in memory. When the '
+                    'backend cannot keep up the oldest readings are '
+                    'dropped.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(telemetry_opts, 'telemetry')
+
+_BACKEND_MAPPING = {'sqlite': 'iotronic.telemetry.sqlite.Connection'}
+_BACKEND = None
+_LOCK = threading.Lock()
+
+Reading = collections.namedtuple('Reading',
+                                 ['board_uuid', 'metric', 'timestamp',
+                                  'value'])
+
+
+def get_instance():
+    """Return the configured telemetry backend."""
+    global _BACKEND
+    if _BACKEND is None:
+        with _LOCK:
+            if _BACKEND is None:
+                name = CONF.telemetry.backend
+                try:
+                    path = _BACKEND_MAPPING[name]
+                except KeyError:
+                    raise exception.ConfigInvalid(
+                        error_msg='Unknown telemetry backend %s' % name)
+                _BACKEND = importutils.import_object(path)
+    return _BACKEND
+
+
+@six.add_metaclass(abc.ABCMeta)
+class Connection(object):
+    """Base class for telemetry storage connections."""
+
+    @abc.abstractmethod
+    def __init__(self):
+        """Constructor."""
+
+    @abc.abstractmethod
+    def write_batch(self, readings):
+        """Store a batch of readings in a single write.
+
+        :param readings: A list of :class:`Reading` tuples.
+        """
+
+    @abc.abstractmethod
+    def get_readings(self, board_uuid, metric=None, start=None, end=None,
+                     limit=None):
+        """Return the readings of a board in a time range.
+
+        :param board_uuid: The uuid of a board.
+        :param metric: Return only the readings of this metric.
+        :param start: Lower bound (epoch seconds, inclusive).
+        :param end: Upper bound (epoch seconds, inclusive).
+        :param limit: Maximum number of readings to return.
+        :returns: A list of :class:`Reading` sorted by timestamp.
+        """
@@ -0,0 +1,139 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import threading
+import time
+
+from oslo_config import cfg
+from oslo_log import log as logging
+import six
+
+from iotronic.telemetry import api
+
+LOG = logging.getLogger(__name__)
+
+CONF = cfg.CONF
+
+
+def parse_readings(board_uuid, payload):
+    """Normalize a published payload into a list of readings.
+
+    A board can publish a single reading or a list of readings, each one a
+    dict with 'metric', 'value' and an optional 'timestamp' (epoch seconds).
+    Malformed entries are skipped.
+    """
+    if isinstance(payload, dict):
+        payload = [payload]
+    if not isinstance(payload, (list, tuple)):
+        return []
+
+    now = time.time()
+    readings = []
+    for item in payload:
+        if not isinstance(item, dict) or 'metric' not in item:
+            LOG.debug('Dropping malformed reading from %s: %s',
+                      board_uuid, item)
+            continue
+        try:
+            ts = float(item.get('timestamp', now))
+        except (TypeError, ValueError):
+            ts = now
+        readings.append(api.Reading(board_uuid,
+                                    six.text_type(item['metric']),
+                                    ts,
+                                    item.get('value')))
+    return readings
+
+
+class TelemetryBuffer(object):
+    """In-memory buffer of readings written to the backend in batches.
+
+    A flush is due when batch_size readings are pending or when the oldest
+    pending reading is older than flush_interval seconds. The caller decides
+    where the flush runs, so the buffer can be fed from the reactor thread
+    while the write happens in a worker thread.
+    """
+
+    def __init__(self, backend=None, batch_size=None, flush_interval=None,
+                 max_size=None):
+        self._backend = backend
+        self.batch_size = batch_size or CONF.telemetry.batch_size
+        self.flush_interval = (flush_interval or
+                               CONF.telemetry.flush_interval)
+        max_size = max_size or CONF.telemetry.max_buffer_size
+        self._pending = collections.deque(maxlen=max_size)
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.dropped = 0
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = api.get_instance()
+        return self._backend
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, readings):
+        """Queue readings and return True if a flush is due."""
+        with self._lock:
+            overflow = (len(self._pending) + len(readings) -
+                        self._pending.maxlen)
+            if overflow > 0:
+                self.dropped += overflow
+            self._pending.extend(readings)
+            if self._oldest is None and self._pending:
+                self._oldest = time.time()
+            return len(self._pending) >= self.batch_size
+
+    def is_due(self):
+        with self._lock:
+            if not self._pending:
+                return False
+            return (len(self._pending) >= self.batch_size or
+                    time.time() - self._oldest >= self.flush_interval)
+
+    def flush(self):
+        """Write every pending reading to the backend.
+
+        :returns: the number of readings written.
+        """
+        # one writer at a time keeps the batches ordered
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._pending)
+                self._pending.clear()
+                self._oldest = None
+                dropped, self.dropped = self.dropped, 0
+            if dropped:
+                LOG.warning('Telemetry buffer full: %d readings dropped',
+                            dropped)
+            if not batch:
+                return 0
+            written = 0
+            for i in range(0, len(batch), self.batch_size):
+                chunk = batch[i:i + self.batch_size]
+                try:
+                    self.backend.write_batch(chunk)
+                    written += len(chunk)
+                except Exception as e:
+                    LOG.error('Unable to write %d readings: %s',
+                              len(chunk), e)
+            LOG.debug('%d readings written to the telemetry backend',
+                      written)
+            return written
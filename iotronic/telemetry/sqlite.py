@@ -0,0 +1,92 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""SQLite telemetry backend.
+
+Stand-in for a real time-series database: every batch is written with a
+single executemany inside one transaction.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+from oslo_config import cfg
+
+from iotronic.telemetry import api
+
+CONF = cfg.CONF
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS readings ('
+    'board_uuid VARCHAR(36) NOT NULL, '
+    'metric VARCHAR(255) NOT NULL, '
+    'ts REAL NOT NULL, '
+    'value TEXT)',
+    'CREATE INDEX IF NOT EXISTS readings_board_ts '
+    'ON readings (board_uuid, ts)',
+)
+
+
+class Connection(api.Connection):
+    """SQLite telemetry connection."""
+
+    def __init__(self, path=None):
+        self._path = path or CONF.telemetry.sqlite_path
+        directory = os.path.dirname(self._path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self._path, check_same_thread=False)
+        with self._lock:
+            for stmt in _SCHEMA:
+                self._conn.execute(stmt)
+            self._conn.commit()
+
+    def write_batch(self, readings):
+        if not readings:
+            return
+        rows = [(r.board_uuid, r.metric, r.timestamp, json.dumps(r.value))
+                for r in readings]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    'INSERT INTO readings (board_uuid, metric, ts, value) '
+                    'VALUES (?, ?, ?, ?)', rows)
+
+    def get_readings(self, board_uuid, metric=None, start=None, end=None,
+                     limit=None):
+        query = ('SELECT board_uuid, metric, ts, value FROM readings '
+                 'WHERE board_uuid = ?')
+        args = [board_uuid]
+        if metric:
+            query += ' AND metric = ?'
+            args.append(metric)
+        if start is not None:
+            query += ' AND ts >= ?'
+            args.append(start)
+        if end is not None:
+            query += ' AND ts <= ?'
+            args.append(end)
+        query += ' ORDER BY ts'
+        if limit:
+            query += ' LIMIT ?'
+            args.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(query, args).fetchall()
+        return [api.Reading(row[0], row[1], row[2], json.loads(row[3]))
+                for row in rows]
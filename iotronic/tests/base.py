@@ -0,0 +1,32 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Base classes for the unit tests."""
+
+from oslo_config import cfg
+from oslo_config import fixture as config_fixture
+from oslotest import base
+
+
+class TestCase(base.BaseTestCase):
+    """Test case with the configuration reset after each test."""
+
+    def setUp(self):
+        super(TestCase, self).setUp()
+        self.cfg_fixture = self.useFixture(config_fixture.Config(cfg.CONF))
+
+    def config(self, **kw):
+        """Override configuration values, e.g. group='conductor'."""
+        self.cfg_fixture.config(**kw)
@@ -0,0 +1,82 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from iotronic.common import batching
+from iotronic.tests import base
+
+
+class _Batcher(batching.Batcher):
+    def __init__(self, max_pending=None):
+        super(_Batcher, self).__init__(max_pending)
+        self.sent = []
+        self.dropped_counts = []
+
+    def interval(self):
+        return 60
+
+    def batch_size(self):
+        return 3
+
+    def send(self, items):
+        self.sent.append(items)
+
+    def on_dropped(self, count):
+        self.dropped_counts.append(count)
+
+
+class BatcherTestCase(base.TestCase):
+
+    def _batcher(self, max_pending=None):
+        batcher = _Batcher(max_pending)
+        # no background thread: the test flushes
+        batcher._thread = mock.Mock()
+        return batcher
+
+    def test_flush_in_order(self):
+        batcher = self._batcher()
+        batcher.add([1])
+        batcher.add([2])
+        self.assertFalse(batcher._wakeup.is_set())
+
+        batcher.flush()
+        batcher.flush()
+
+        self.assertEqual([[1, 2]], batcher.sent)
+
+    def test_wakeup_when_full(self):
+        batcher = self._batcher()
+        batcher.add([1, 2, 3])
+        self.assertTrue(batcher._wakeup.is_set())
+
+    def test_oldest_dropped(self):
+        batcher = self._batcher(max_pending=3)
+        batcher.add([1, 2])
+        batcher.add([3, 4, 5])
+
+        batcher.flush()
+
+        self.assertEqual([[3, 4, 5]], batcher.sent)
+        self.assertEqual([2], batcher.dropped_counts)
+
+    def test_thread_started_once(self):
+        batcher = _Batcher()
+        with mock.patch.object(batching.threading, 'Thread') as mock_thread:
+            batcher.add([1])
+            batcher.add([2])
+
+        mock_thread.assert_called_once_with(target=batcher._loop)
+        mock_thread.return_value.start.assert_called_once_with()
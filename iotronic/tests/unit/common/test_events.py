@@ -0,0 +1,80 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from iotronic.common import events
+from iotronic.common import exception
+from iotronic.tests import base
+
+
+@mock.patch.object(events.iotronic_context, 'get_admin_context',
+                   mock.Mock())
+@mock.patch.object(events.notifications, 'add')
+@mock.patch.object(events, '_get_client')
+@mock.patch.object(events.dbapi, 'get_instance')
+class PublisherTestCase(base.TestCase):
+
+    def setUp(self):
+        super(PublisherTestCase, self).setUp()
+        self.config(publish_batch_size=3, group='events')
+        self.publisher = events.Publisher()
+
+    def _events(self, count):
+        return [{'type': events.STATUS, 'board': 'board-%d' % i}
+                for i in range(count)]
+
+    def test_one_sequence_update_per_batch(self, mock_db, mock_client,
+                                           mock_notify):
+        allocate = mock_db.return_value.allocate_sequence
+        allocate.side_effect = [13, 15]
+        self.publisher._thread = mock.Mock()
+        for event in self._events(5):
+            self.publisher.add([event])
+
+        self.publisher.flush()
+
+        self.assertEqual([mock.call(events.SEQUENCE, 3),
+                          mock.call(events.SEQUENCE, 2)],
+                         allocate.call_args_list)
+        cast = mock_client.return_value.cast
+        sent = [c[1]['events'] for c in cast.call_args_list]
+        self.assertEqual([[11, 12, 13], [14, 15]],
+                         [[e['seq'] for e in batch] for batch in sent])
+        self.assertEqual(2, mock_notify.call_count)
+
+    def test_nothing_pending(self, mock_db, mock_client, mock_notify):
+        self.publisher.flush()
+        self.assertFalse(mock_db.return_value.allocate_sequence.called)
+        self.assertFalse(mock_notify.called)
+
+
+class HubTestCase(base.TestCase):
+
+    def setUp(self):
+        super(HubTestCase, self).setUp()
+        self.config(max_watchers=2, group='events')
+        self.hub = events.Hub()
+        self.hub._server = mock.Mock()
+
+    def test_max_watchers(self):
+        first, _ = self.hub.subscribe()
+        self.hub.subscribe()
+
+        self.assertRaises(exception.TooManyWatchers, self.hub.subscribe)
+
+        self.hub.unsubscribe(first)
+        self.hub.subscribe()
+        self.assertEqual(2, len(self.hub))
@@ -0,0 +1,48 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from iotronic.common import lanes
+from iotronic.tests import base
+
+
+@mock.patch.object(lanes.time, 'sleep')
+class SleepTestCase(base.TestCase):
+
+    def setUp(self):
+        super(SleepTestCase, self).setUp()
+        self.lane = lanes.Lane('test', 1)
+
+    def test_slot_released_while_sleeping(self, mock_sleep):
+        def sleep(delay):
+            # another call of the lane can run meanwhile
+            self.assertTrue(self.lane._slots.acquire(False))
+            self.lane._slots.release()
+            self.assertEqual(0, self.lane.stats()['running'])
+
+        mock_sleep.side_effect = sleep
+        self.lane.run(lanes.sleep, 1.0)
+
+        mock_sleep.assert_called_once_with(1.0)
+        stats = self.lane.stats()
+        self.assertEqual(0, stats['running'])
+        self.assertEqual(1, stats['served'])
+        # the slot is back to the lane
+        self.assertTrue(self.lane._slots.acquire(False))
+
+    def test_outside_a_lane(self, mock_sleep):
+        lanes.sleep(1.0)
+        mock_sleep.assert_called_once_with(1.0)
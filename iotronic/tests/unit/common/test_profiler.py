@@ -0,0 +1,69 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import signal
+import threading
+
+import greenlet
+import mock
+
+from iotronic.common import profiler
+from iotronic.tests import base
+
+
+@mock.patch.object(profiler.Profiler, 'toggle')
+class SignalTestCase(base.TestCase):
+
+    def setUp(self):
+        super(SignalTestCase, self).setUp()
+        self.addCleanup(signal.signal, signal.SIGUSR2,
+                        signal.getsignal(signal.SIGUSR2))
+
+    def test_toggled_out_of_the_handler(self, mock_toggle):
+        toggled = threading.Event()
+        threads = []
+
+        def toggle():
+            threads.append(threading.current_thread())
+            toggled.set()
+
+        mock_toggle.side_effect = toggle
+        p = profiler.setup('test')
+        handler = signal.getsignal(signal.SIGUSR2)
+
+        with p._lock:
+            # would deadlock if the handler toggled
+            handler(signal.SIGUSR2, None)
+        self.assertTrue(toggled.wait(5))
+
+        mock_toggle.assert_called_once_with()
+        self.assertIsNot(threading.current_thread(), threads[0])
+
+
+class SamplerTestCase(base.TestCase):
+
+    @mock.patch.object(profiler, '_green', return_value=True)
+    def test_samples_green_threads(self, mock_green):
+        def parked():
+            greenlet.getcurrent().parent.switch()
+
+        green = greenlet.greenlet(parked)
+        green.switch()
+        self.addCleanup(green.throw)
+        sampler = profiler._Sampler(0.001)
+
+        names = [frame.f_code.co_name for frame in sampler._frames()]
+
+        self.assertIn('parked', names)
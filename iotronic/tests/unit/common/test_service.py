@@ -0,0 +1,41 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+
+import fixtures
+
+from iotronic.common import service
+from iotronic.tests import base
+
+
+class LiveWorkerSlotsTestCase(base.TestCase):
+
+    def setUp(self):
+        super(LiveWorkerSlotsTestCase, self).setUp()
+        self.state_path = self.useFixture(fixtures.TempDir()).path
+        self.config(state_path=self.state_path)
+        self.useFixture(fixtures.MockPatchObject(service, '_slots', []))
+
+    def test_live_slots(self):
+        self.assertEqual([], service.live_worker_slots('test'))
+
+        self.assertEqual(0, service.claim_worker_slot('test', 2))
+        self.addCleanup(service._slots[0].close)
+        # left by a dead worker
+        open(os.path.join(self.state_path, 'locks', 'test-1.lock'),
+             'a').close()
+
+        self.assertEqual([0], service.live_worker_slots('test'))
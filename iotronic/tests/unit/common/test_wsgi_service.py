@@ -0,0 +1,47 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from iotronic.common import wsgi_service
+from iotronic.tests import base
+
+
+@mock.patch.object(wsgi_service.metrics, 'serve')
+@mock.patch.object(wsgi_service.iotronic_service, 'claim_worker_slot')
+class MetricsListenerTestCase(base.TestCase):
+
+    def setUp(self):
+        super(MetricsListenerTestCase, self).setUp()
+        with mock.patch.object(wsgi_service, '_bind'):
+            self.service = wsgi_service.WSGIService('iotronic-api')
+
+    def test_one_listener_per_worker(self, mock_claim, mock_serve):
+        self.config(api_port=9300, group='metrics')
+        mock_claim.return_value = 2
+
+        self.service._serve_metrics()
+        # a reload starts the worker again
+        self.service._serve_metrics()
+
+        mock_claim.assert_called_once_with('iotronic-api',
+                                           self.service.workers)
+        mock_serve.assert_called_once_with(9302)
+
+    def test_disabled(self, mock_claim, mock_serve):
+        self.service._serve_metrics()
+
+        self.assertFalse(mock_claim.called)
+        self.assertFalse(mock_serve.called)
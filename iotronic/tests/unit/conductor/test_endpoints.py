@@ -0,0 +1,140 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from iotronic.conductor import endpoints
+from iotronic.tests import base
+from iotronic.wamp import wampmessage as wm
+
+
+def _calls(count):
+    return [('board-%d' % i, 'PluginStart', ('plugin', {}))
+            for i in range(count)]
+
+
+def _success(i):
+    return wm.WampSuccess('ok %d' % i).to_dict()
+
+
+def _busy():
+    return wm.WampBusy('busy', 2.0).to_dict()
+
+
+@mock.patch.object(endpoints.time, 'sleep')
+@mock.patch.object(endpoints, 'mark_busy')
+class ExecuteBatchOnAgentTestCase(base.TestCase):
+
+    def setUp(self):
+        super(ExecuteBatchOnAgentTestCase, self).setUp()
+        with mock.patch.object(endpoints.oslo_messaging, 'get_transport'), \
+                mock.patch.object(endpoints.oslo_messaging, 'RPCClient'):
+            self.endpoint = endpoints.ConductorEndpoint(None, host='host')
+        self.cctxt = self.endpoint.wamp_agent_client.prepare.return_value
+        self.ctx = mock.Mock()
+        self.config(busy_retries=3, group='conductor')
+
+    def _sent(self, call):
+        return [c['wamp_rpc_call'].split('.')[1]
+                for c in call[1]['calls']]
+
+    def test_resend_busy_subset(self, mock_busy, mock_sleep):
+        # the agent admits its burst, the rest is rejected
+        self.cctxt.call.side_effect = [
+            [_success(0), _success(1), _busy(), _busy()],
+            [_success(2), _success(3)],
+        ]
+
+        replies = self.endpoint.execute_batch_on_agent(
+            self.ctx, 'agent', _calls(4))
+
+        self.assertEqual([wm.SUCCESS] * 4, [r.result for r in replies])
+        self.assertEqual(['ok 0', 'ok 1', 'ok 2', 'ok 3'],
+                         [r.message for r in replies])
+        first, second = self.cctxt.call.call_args_list
+        self.assertEqual(['board-0', 'board-1', 'board-2', 'board-3'],
+                         self._sent(first))
+        self.assertEqual(['board-2', 'board-3'], self._sent(second))
+        mock_busy.assert_called_once_with('agent', 2.0)
+        self.assertEqual(1, mock_sleep.call_count)
+        self.assertGreaterEqual(mock_sleep.call_args[0][0], 2.0)
+
+    def test_still_busy_after_retries(self, mock_busy, mock_sleep):
+        self.config(busy_retries=2, group='conductor')
+        self.cctxt.call.side_effect = [
+            [_success(0), _busy()],
+            [_busy()],
+            [_busy()],
+        ]
+
+        replies = self.endpoint.execute_batch_on_agent(
+            self.ctx, 'agent', _calls(2))
+
+        self.assertEqual([wm.SUCCESS, wm.BUSY], [r.result for r in replies])
+        self.assertEqual(3, self.cctxt.call.call_count)
+        self.assertEqual(2, mock_sleep.call_count)
+
+    def test_no_retry_without_busy(self, mock_busy, mock_sleep):
+        self.cctxt.call.return_value = [
+            _success(0),
+            wm.WampMessage('gone', wm.NOT_CONNECTED).to_dict(),
+        ]
+
+        replies = self.endpoint.execute_batch_on_agent(
+            self.ctx, 'agent', _calls(2))
+
+        self.assertEqual([wm.SUCCESS, wm.NOT_CONNECTED],
+                         [r.result for r in replies])
+        self.assertEqual(1, self.cctxt.call.call_count)
+        self.assertFalse(mock_busy.called)
+        self.assertFalse(mock_sleep.called)
+
+
+@mock.patch.object(endpoints.service, 'live_worker_slots')
+class CallWorkersTestCase(base.TestCase):
+
+    def setUp(self):
+        super(CallWorkersTestCase, self).setUp()
+        # one mock per client
+        with mock.patch.object(endpoints.oslo_messaging, 'get_transport'), \
+                mock.patch.object(endpoints.oslo_messaging, 'RPCClient',
+                                  side_effect=lambda *a: mock.Mock()):
+            self.endpoint = endpoints.ConductorEndpoint(None, host='host')
+        self.prepare = self.endpoint.worker_client.prepare
+        self.ctx = mock.Mock()
+
+    def test_profiler_control_each_worker(self, mock_slots):
+        mock_slots.return_value = [0, 2]
+        self.prepare.return_value.call.side_effect = [
+            {'mode': 'cprofile'}, Exception('timed out')]
+
+        results = self.endpoint.profiler_control(self.ctx, 'start',
+                                                 mode='cprofile')
+
+        self.assertEqual({'host.0': {'mode': 'cprofile'},
+                          'host.2': {'error': 'timed out'}}, results)
+        self.assertEqual([mock.call(server='host.0', timeout=10),
+                          mock.call(server='host.2', timeout=10)],
+                         self.prepare.call_args_list)
+        self.prepare.return_value.call.assert_called_with(
+            self.ctx, 'profiler_control', action='start', mode='cprofile')
+
+    def test_lane_stats_of_an_agent(self, mock_slots):
+        cctxt = self.endpoint.wamp_agent_client.prepare.return_value
+
+        self.endpoint.lane_stats(self.ctx, agent='agent')
+
+        cctxt.call.assert_called_once_with(self.ctx, 'agent.s4t_lane_stats')
+        self.assertFalse(mock_slots.called)
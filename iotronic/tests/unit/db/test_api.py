@@ -0,0 +1,116 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import fixtures
+import mock
+from oslo_db import exception as db_exc
+import sqlalchemy
+from sqlalchemy import event
+from sqlalchemy import exc
+
+from iotronic.common import tracing
+from iotronic.db.sqlalchemy import api as sqla_api
+from iotronic.db.sqlalchemy import models
+from iotronic.tests import base
+
+
+@mock.patch.object(tracing, 'get_exporter')
+class QuerySpanTestCase(base.TestCase):
+
+    def setUp(self):
+        super(QuerySpanTestCase, self).setUp()
+        self.config(enabled=True, sample_rate=1.0, group='tracing')
+        self.engine = sqlalchemy.create_engine('sqlite://')
+        event.listen(self.engine, 'before_cursor_execute',
+                     sqla_api._before_execute)
+        event.listen(self.engine, 'after_cursor_execute',
+                     sqla_api._after_execute)
+        event.listen(self.engine, 'handle_error', sqla_api._handle_error)
+        self.addCleanup(self.engine.dispose)
+
+    def test_span_finished(self, mock_exporter):
+        self.engine.execute('SELECT 1')
+
+        self.assertIsNone(tracing.current())
+        span = mock_exporter.return_value.add.call_args[0][0]
+        self.assertEqual('db select', span.name)
+        self.assertIsNone(span.error)
+
+    def test_span_finished_on_error(self, mock_exporter):
+        self.assertRaises(exc.DBAPIError, self.engine.execute,
+                          'SELECT * FROM missing')
+
+        self.assertIsNone(tracing.current())
+        span = mock_exporter.return_value.add.call_args[0][0]
+        self.assertEqual('db select', span.name)
+        self.assertIn('missing', span.error)
+
+
+class ListStateTestCase(base.TestCase):
+
+    def setUp(self):
+        super(ListStateTestCase, self).setUp()
+        self.config(connection='sqlite://', group='database')
+        self.config(enabled=False, group='metrics')
+        self.config(enabled=False, group='tracing')
+        self.useFixture(fixtures.MockPatchObject(sqla_api, '_FACADE', None))
+        models.Base.metadata.create_all(sqla_api.get_engine())
+        self.dbapi = sqla_api.get_backend()
+        self.board = self._create_board('first')
+
+    def _create_board(self, code):
+        return self.dbapi.create_board({'code': code, 'name': code,
+                                        'project': 'project'})
+
+    def _state(self, **filters):
+        return self.dbapi.get_board_list_state(dict(filters,
+                                                    project_id='project'))
+
+    def test_changed_by_update(self):
+        before = self._state()
+        self.dbapi.update_boards_status([self.board.uuid], 'online')
+        self.assertNotEqual(before, self._state())
+
+    def test_changed_by_create_and_destroy(self):
+        before = self._state()
+        board = self._create_board('second')
+        created = self._state()
+        self.assertNotEqual(before, created)
+        self.dbapi.destroy_board(board.id)
+        self.assertNotEqual(created, self._state())
+
+    def test_changed_by_tags(self):
+        before = self._state(tags=['red'])
+        self.dbapi.add_board_tag(self.board.id, 'red')
+        tagged = self._state(tags=['red'])
+        self.assertNotEqual(before, tagged)
+        self.dbapi.delete_board_tag(self.board.id, 'red')
+        self.assertNotEqual(tagged, self._state(tags=['red']))
+
+    def test_not_changed_by_other_projects(self):
+        before = self._state()
+        self.dbapi.create_board({'code': 'other', 'name': 'other',
+                                 'project': 'other'})
+        self.assertEqual(before, self._state())
+
+    def test_sequence_without_row(self):
+        self.assertEqual(0, self.dbapi.get_generation('events'))
+        self.assertEqual(3, self.dbapi.allocate_sequence('events', 3))
+        self.assertEqual(4, self.dbapi.allocate_sequence('events'))
+
+    def test_sequence_row_created_concurrently(self):
+        with mock.patch.object(self.dbapi, '_allocate_sequence',
+                               side_effect=[db_exc.DBDuplicateEntry(), 5]):
+            self.assertEqual(5, self.dbapi.allocate_sequence('events'))
@@ -0,0 +1,33 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+
+import fixtures
+
+from iotronic.telemetry import sqlite
+from iotronic.tests import base
+
+
+class ConnectionTestCase(base.TestCase):
+
+    def test_creates_directory(self):
+        tmpdir = self.useFixture(fixtures.TempDir()).path
+        path = os.path.join(tmpdir, 'state', 'telemetry.sqlite')
+        self.config(sqlite_path=path, group='telemetry')
+
+        sqlite.Connection()
+
+        self.assertTrue(os.path.isfile(path))
@@ -0,0 +1,53 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from iotronic.tests import base
+from iotronic.wamp import damping
+
+
+@mock.patch.object(damping.time, 'time')
+class LeaveCoalescerTestCase(base.TestCase):
+
+    def setUp(self):
+        super(LeaveCoalescerTestCase, self).setUp()
+        self.leaves = damping.LeaveCoalescer(grace_period=10.0,
+                                             flap_window=60.0)
+
+    def _flap(self, board):
+        self.leaves.leave('session-' + board, board)
+        self.leaves.rejoin(board)
+
+    def test_flap_counts(self, mock_time):
+        mock_time.return_value = 100.0
+        self._flap('board-1')
+        self._flap('board-1')
+        self.assertEqual({'board-1': {'flaps': 2, 'last_flap': 100.0}},
+                         self.leaves.flap_counts())
+
+    def test_flaps_aged_out(self, mock_time):
+        mock_time.return_value = 100.0
+        self._flap('board-1')
+        mock_time.return_value = 150.0
+        self._flap('board-2')
+
+        mock_time.return_value = 170.0
+        self.leaves.pop_expired()
+        self.assertEqual(['board-2'], list(self.leaves.flaps))
+        self.assertEqual(['board-2'], list(self.leaves.last_flap))
+
+        mock_time.return_value = 220.0
+        self.assertEqual({}, self.leaves.flap_counts())
@@ -0,0 +1,39 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import testtools
+
+from iotronic.tests import base
+from iotronic.wamp import wampmessage as wm
+
+
+class DeserializeTestCase(base.TestCase):
+
+    def _check(self, msg):
+        self.assertEqual(u'caf\xe9', msg.message)
+        self.assertEqual(wm.BUSY, msg.result)
+        self.assertEqual(2.0, msg.retry_after)
+
+    def test_dict(self):
+        self._check(wm.deserialize(wm.WampBusy(u'caf\xe9', 2.0).to_dict()))
+
+    def test_json(self):
+        self._check(wm.deserialize(
+            wm.WampBusy(u'caf\xe9', 2.0).serialize(wm.JSON)))
+
+    @testtools.skipIf(wm.msgpack is None, 'msgpack is not installed')
+    def test_msgpack(self):
+        self._check(wm.deserialize(
+            wm.WampBusy(u'caf\xe9', 2.0).serialize(wm.MSGPACK)))
@@ -0,0 +1,137 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Admission control for the wamp agent.
+
+The calls to the boards and the registrations go through a token bucket,
+the calls also through a limit on the number in flight. A request that is
+not admitted is answered right away with a BUSY message telling when to
+retry, instead of queueing on an agent that is already overloaded.
+"""
+
+import threading
+import time
+
+from oslo_config import cfg
+
+admission_opts = [
+    cfg.FloatOpt('call_rate',
+                 default=50.0,
+                 help='Calls to the boards admitted per second. 0 disables '
+                      'the rate limit.'),
+    cfg.IntOpt('call_burst',
+               default=100,
+               help='Calls to the boards admitted in a burst.'),
+    cfg.IntOpt('max_inflight_calls',
+               default=200,
+               help='Maximum number of calls to the boards in flight. '
+                    '0 means no limit.'),
+    cfg.FloatOpt('registration_rate',
+                 default=5.0,
+                 help='Board registrations admitted per second. 0 disables '
+                      'the rate limit.'),
+    cfg.IntOpt('registration_burst',
+               default=20,
+               help='Board registrations admitted in a burst.'),
+    cfg.FloatOpt('busy_retry_after',
+                 default=1.0,
+                 help='Minimum delay (in seconds) suggested to the callers '
+                      'of a busy agent.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(admission_opts, 'wamp')
+
+
+class TokenBucket(object):
+    """Thread-safe token bucket."""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._stamp = time.time()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._stamp
+        self._stamp = now
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+
+    def take(self):
+        """Take a token.
+
+        :returns: 0 if a token was taken, otherwise the time (in seconds)
+                  before the next one is available.
+        """
+        if self.rate <= 0:
+            return 0
+        with self._lock:
+            self._refill(time.time())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+
+class Admission(object):
+    """Admit a request if the bucket has a token and a slot is free."""
+
+    def __init__(self, rate, burst, max_inflight=0):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_inflight = max_inflight
+        self.inflight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Try to admit a request.
+
+        :returns: None if the request is admitted, and then release() must
+                  be called once it completes, otherwise the delay (in
+                  seconds) the caller should wait before retrying.
+        """
+        with self._lock:
+            if self.max_inflight and self.inflight >= self.max_inflight:
+                self.rejected += 1
+                return CONF.wamp.busy_retry_after
+            wait = self.bucket.take()
+            if wait:
+                self.rejected += 1
+                return max(wait, CONF.wamp.busy_retry_after)
+            self.inflight += 1
+            self.admitted += 1
+            return None
+
+    def release(self):
+        with self._lock:
+            self.inflight -= 1
+
+    def stats(self):
+        with self._lock:
+            return {'inflight': self.inflight,
+                    'admitted': self.admitted,
+                    'rejected': self.rejected}
+
+
+def calls():
+    return Admission(CONF.wamp.call_rate, CONF.wamp.call_burst,
+                     CONF.wamp.max_inflight_calls)
+
+
+def registrations():
+    return Admission(CONF.wamp.registration_rate,
+                     CONF.wamp.registration_burst)
@@ -14,20 +14,28 @@
 #    under the License.
 
 from autobahn.twisted import wamp
-from autobahn.twisted import websocket
 from autobahn.wamp import types
+from twisted.internet import defer
 from twisted.internet.defer import inlineCallbacks
+from twisted.internet import task
 
+from iotronic.common import events
 from iotronic.common import exception
 from iotronic.common.i18n import _LI
 from iotronic.common.i18n import _LW
+from iotronic.common import lanes
+from iotronic.common import metrics
+from iotronic.common import notifications
+from iotronic.common import profiler
+from iotronic.common import tracing
 from iotronic.db import api as dbapi
+from iotronic.wamp import transport
+from iotronic.wamp import wampmessage as wm
 from oslo_config import cfg
 from oslo_log import log as logging
 import oslo_messaging
 import threading
 from threading import Thread
-from twisted.internet.protocol import ReconnectingClientFactory
 from twisted.internet import reactor
 
 import os
@@ -56,10 +64,17 @@ wamp_opts = [
 
 CONF = cfg.CONF
 CONF.register_opts(wamp_opts, 'wamp')
+CONF.import_group('telemetry', 'iotronic.telemetry.api')
+CONF.import_opt('leave_grace_period', 'iotronic.wamp.damping', 'wamp')
+CONF.import_opt('presence_reconcile_interval', 'iotronic.wamp.presence',
+                'wamp')
 
 shared_result = {}
 wamp_session_caller = None
 AGENT_HOST = None
+telemetry_loop = None
+leave_loop = None
+presence_loop = None
 
 
 def wamp_request(e, kwarg, session):
@@ -68,38 +83,140 @@ def wamp_request(e, kwarg, session):
     shared_result[id]['result'] = None
 
     def success(d):
-        shared_result[id]['result'] = d
         LOG.debug("DEVICE sent: %s", str(d))
+        # decode the board reply once: from here to the API it travels
+        # as a native dict
+        try:
+            d = wm.deserialize(d).to_dict()
+        except (TypeError, ValueError) as err:
+            LOG.error("Invalid reply from the board: %s", err)
+            d = wm.WampError("invalid reply from the board").to_dict()
+        shared_result[id]['result'] = d
         e.set()
         return shared_result[id]['result']
 
     def fail(failure):
-        shared_result[id]['result'] = failure
         LOG.error("WAMP FAILURE: %s", str(failure))
+        shared_result[id]['result'] = wm.WampError(
+            str(failure.value)).to_dict()
         e.set()
         return shared_result[id]['result']
 
     LOG.debug("Calling %s...", kwarg['wamp_rpc_call'])
+    options = {}
+    if kwarg.get('traceparent'):
+        options['traceparent'] = kwarg['traceparent']
     d = session.wamp_session.call(wamp_session_caller,
-                                  kwarg['wamp_rpc_call'], *kwarg['data'])
+                                  kwarg['wamp_rpc_call'], *kwarg['data'],
+                                  **options)
     d.addCallback(success)
     d.addErrback(fail)
 
 
+def wamp_batch_request(calls, session):
+    """Call a set of boards at once, return their replies in order.
+
+    The calls are issued together from the reactor thread; the caller
+    waits for the last reply.
+    """
+    results = [None] * len(calls)
+    done = threading.Event()
+    pending = [len(calls)]
+    lock = threading.Lock()
+
+    def finish(result, i):
+        results[i] = result
+        with lock:
+            pending[0] -= 1
+            if not pending[0]:
+                done.set()
+
+    def success(d, i):
+        try:
+            d = wm.deserialize(d).to_dict()
+        except (TypeError, ValueError) as err:
+            LOG.error("Invalid reply from the board: %s", err)
+            d = wm.WampError("invalid reply from the board").to_dict()
+        finish(d, i)
+
+    def fail(failure, i):
+        LOG.error("WAMP FAILURE: %s", str(failure))
+        finish(wm.WampError(str(failure.value)).to_dict(), i)
+
+    def call_all():
+        for i, kwarg in enumerate(calls):
+            d = defer.maybeDeferred(session.wamp_session.call,
+                                    wamp_session_caller,
+                                    kwarg['wamp_rpc_call'], *kwarg['data'])
+            d.addCallbacks(success, fail, callbackArgs=(i,),
+                           errbackArgs=(i,))
+
+    if calls:
+        reactor.callFromThread(call_all)
+        done.wait()
+    return results
+
+
 # OSLO ENDPOINT
 class WampEndpoint(object):
     def __init__(self, wamp_session, agent_uuid):
         self.wamp_session = wamp_session
         setattr(self, agent_uuid + '.s4t_invoke_wamp', self.s4t_invoke_wamp)
+        setattr(self, agent_uuid + '.s4t_invoke_wamp_batch',
+                self.s4t_invoke_wamp_batch)
+        setattr(self, agent_uuid + '.s4t_presence', self.s4t_presence)
+        setattr(self, agent_uuid + '.s4t_lane_stats', self.s4t_lane_stats)
+        setattr(self, agent_uuid + '.s4t_profiler', self.s4t_profiler)
+
+    def s4t_presence(self, ctx, board_uuid=None):
+        import iotronic.wamp.functions as fun
+
+        if board_uuid is None:
+            return fun.connected.snapshot()
+        return fun.connected.get(board_uuid)
+
+    def s4t_lane_stats(self, ctx):
+        import iotronic.wamp.functions as fun
+
+        stats = lanes.stats()
+        stats['admission'] = {'calls': fun.calls.stats(),
+                              'registrations': fun.registrations.stats()}
+        stats['flaps'] = fun.leaves.flap_counts()
+        return stats
+
+    def s4t_profiler(self, ctx, action, mode=None):
+        return profiler.get_profiler().control(action, mode)
 
     def s4t_invoke_wamp(self, ctx, **kwarg):
-        e = threading.Event()
-        LOG.debug("CONDUCTOR sent me:", kwarg)
+        import iotronic.wamp.functions as fun
 
-        th = threading.Thread(target=wamp_request, args=(e, kwarg, self))
-        th.start()
+        LOG.debug("CONDUCTOR sent me: %s", kwarg)
+        # wamp_rpc_call: iotronic.<board_uuid>.<procedure>
+        board_uuid = kwarg['wamp_rpc_call'].split('.')[1]
+        if not fun.connected.is_connected(board_uuid):
+            return wm.WampMessage('board %s is not connected' % board_uuid,
+                                  wm.NOT_CONNECTED).to_dict()
 
-        e.wait()
+        retry_after = fun.calls.acquire()
+        if retry_after is not None:
+            LOG.debug("busy, call to %s rejected", board_uuid)
+            return wm.WampBusy('agent %s is busy' % AGENT_HOST,
+                               retry_after).to_dict()
+
+        procedure = kwarg['wamp_rpc_call'].rsplit('.', 1)[-1]
+        try:
+            with tracing.span('board %s' % procedure, board=board_uuid):
+                if CONF.tracing.propagate_to_boards:
+                    kwarg['traceparent'] = tracing.current_traceparent()
+                e = threading.Event()
+
+                th = threading.Thread(target=wamp_request,
+                                      args=(e, kwarg, self))
+                th.start()
+
+                e.wait()
+        finally:
+            fun.calls.release()
         LOG.debug("result received from wamp call: %s",
                   str(shared_result[th.ident]['result']))
 
@@ -107,11 +224,49 @@ class WampEndpoint(object):
         del shared_result[th.ident]['result']
         return result
 
+    def s4t_invoke_wamp_batch(self, ctx, calls):
+        """Execute a list of calls on the boards of this agent.
+
+        :param calls: a list of dicts with wamp_rpc_call and data, as the
+                      arguments of s4t_invoke_wamp.
+        :returns: the list of the replies, in the order of the calls.
+        """
+        import iotronic.wamp.functions as fun
+
+        LOG.debug("CONDUCTOR sent me a batch of %d calls", len(calls))
+        results = [None] * len(calls)
+        admitted = []
+        for i, kwarg in enumerate(calls):
+            board_uuid = kwarg['wamp_rpc_call'].split('.')[1]
+            if not fun.connected.is_connected(board_uuid):
+                results[i] = wm.WampMessage(
+                    'board %s is not connected' % board_uuid,
+                    wm.NOT_CONNECTED).to_dict()
+                continue
+            retry_after = fun.calls.acquire()
+            if retry_after is not None:
+                results[i] = wm.WampBusy('agent %s is busy' % AGENT_HOST,
+                                         retry_after).to_dict()
+                continue
+            admitted.append(i)
+
+        try:
+            with tracing.span('board batch', calls=len(admitted)):
+                replies = wamp_batch_request([calls[i] for i in admitted],
+                                             self)
+        finally:
+            for i in admitted:
+                fun.calls.release()
+        for i, reply in zip(admitted, replies):
+            results[i] = reply
+        return results
+
 
 class WampFrontend(wamp.ApplicationSession):
     @inlineCallbacks
     def onJoin(self, details):
-        global wamp_session_caller, AGENT_HOST
+        global wamp_session_caller, AGENT_HOST, telemetry_loop, leave_loop
+        global presence_loop
         wamp_session_caller = self
 
         import iotronic.wamp.functions as fun
@@ -119,6 +274,22 @@ class WampFrontend(wamp.ApplicationSession):
         self.subscribe(fun.board_on_leave, 'wamp.session.on_leave')
         self.subscribe(fun.board_on_join, 'wamp.session.on_join')
 
+        if CONF.wamp.leave_grace_period > 0 and leave_loop is None:
+            leave_loop = task.LoopingCall(fun.flush_leaves)
+            leave_loop.start(min(1.0, CONF.wamp.leave_grace_period),
+                             now=False)
+
+        if CONF.telemetry.enabled:
+            # one subscription for every board: iotronic.<uuid>.telemetry
+            self.subscribe(fun.telemetry, u'iotronic..telemetry',
+                           options=types.SubscribeOptions(
+                               match=u'wildcard', details_arg='details'))
+            if telemetry_loop is None:
+                telemetry_loop = task.LoopingCall(fun.flush_telemetry)
+                telemetry_loop.start(
+                    min(1.0, CONF.telemetry.flush_interval), now=False)
+            LOG.info("subscribed to board telemetry")
+
         try:
             if CONF.wamp.register_agent:
                 self.register(fun.registration, u'stack4things.register')
@@ -135,55 +306,77 @@ class WampFrontend(wamp.ApplicationSession):
 
         session_l = yield self.call(u'wamp.session.list')
         session_l.remove(details.session)
-        fun.update_sessions(session_l)
+        fun.update_sessions(session_l, AGENT_HOST)
 
-    def onDisconnect(self):
-        LOG.info("disconnected")
+        if CONF.wamp.presence_reconcile_interval > 0:
+            if presence_loop is not None and presence_loop.running:
+                presence_loop.stop()
+            self._router_state = (None, None)
+            presence_loop = task.LoopingCall(self.reconcile_presence)
+            presence_loop.start(CONF.wamp.presence_reconcile_interval,
+                                now=False)
 
+    @inlineCallbacks
+    def reconcile_presence(self):
+        import iotronic.wamp.functions as fun
 
-class WampClientFactory(websocket.WampWebSocketClientFactory,
-                        ReconnectingClientFactory):
-    maxDelay = 30
-
-    def clientConnectionFailed(self, connector, reason):
-        # print "reason:", reason
-        LOG.warning("Wamp Connection Failed.")
-        ReconnectingClientFactory.clientConnectionFailed(self,
-                                                         connector, reason)
+        try:
+            # the session list is only fetched when the number of sessions
+            # on the router or the local presence changed
+            count = yield self.call(u'wamp.session.count')
+            state = (count, fun.connected.generation)
+            if state == self._router_state:
+                return
+            session_l = yield self.call(u'wamp.session.list')
+            yield fun.reconcile_presence(session_l)
+            self._router_state = (count, fun.connected.generation)
+        except Exception as e:
+            LOG.warning("presence reconciliation failed: %s", e)
 
-    def clientConnectionLost(self, connector, reason):
-        # print "reason:", reason
-        LOG.warning("Wamp Connection Lost.")
-        ReconnectingClientFactory.clientConnectionLost(self,
-                                                       connector, reason)
+    def onDisconnect(self):
+        LOG.info("disconnected")
 
 
 class RPCServer(Thread):
     def __init__(self):
         global AGENT_HOST
 
-        # AMQP CONFIG
-        endpoints = [
-            WampEndpoint(WampFrontend, AGENT_HOST),
-        ]
-
         Thread.__init__(self)
         transport = oslo_messaging.get_transport(CONF)
-        target = oslo_messaging.Target(topic=AGENT_HOST + '.s4t_invoke_wamp',
-                                       server='server1')
 
-        self.server = oslo_messaging.get_rpc_server(transport,
-                                                    target,
-                                                    endpoints,
-                                                    executor='threading')
+        # AMQP CONFIG
+        # one server per lane: the presence requests are not queued
+        # behind the injections of a campaign
+        self.servers = []
+        for lane in lanes.LANES:
+            endpoint = metrics.InstrumentedEndpoint(
+                profiler.ProfiledEndpoint(
+                    WampEndpoint(WampFrontend, AGENT_HOST),
+                    profiler.get_profiler()),
+                'wamp-agent')
+            endpoints = [
+                tracing.TracedEndpoint(
+                    lanes.LaneEndpoint(endpoint, lanes.get_lane(lane)),
+                    'wamp-agent'),
+            ]
+            target = oslo_messaging.Target(
+                topic=lanes.topic(AGENT_HOST + '.s4t_invoke_wamp', lane),
+                server='server1')
+            self.servers.append(
+                oslo_messaging.get_rpc_server(transport, target, endpoints,
+                                              executor='threading'))
+            if not CONF.lanes.enabled:
+                break
 
     def run(self):
         LOG.info("Starting AMQP server... ")
-        self.server.start()
+        for server in self.servers:
+            server.start()
 
     def stop(self):
         LOG.info("Stopping AMQP server... ")
-        self.server.stop()
+        for server in self.servers:
+            server.stop()
         LOG.info("AMQP server stopped. ")
 
 
@@ -194,15 +387,12 @@ class WampManager(object):
         session_factory = wamp.ApplicationSessionFactory(
             config=component_config)
         session_factory.session = WampFrontend
-        transport_factory = WampClientFactory(session_factory,
-                                              url=CONF.wamp.wamp_transport_url)
-
-        transport_factory.autoPingInterval = CONF.wamp.autoPingInterval
-        transport_factory.autoPingTimeout = CONF.wamp.autoPingTimeout
+        transport_factory = transport.client_factory(session_factory)
 
-        LOG.debug("wamp url: %s wamp realm: %s",
-                  CONF.wamp.wamp_transport_url, CONF.wamp.wamp_realm)
-        websocket.connectWS(transport_factory)
+        LOG.debug("wamp transport: %s url: %s wamp realm: %s",
+                  CONF.wamp.transport, transport_factory.url,
+                  CONF.wamp.wamp_realm)
+        transport.connect(transport_factory)
 
     def start(self):
         LOG.info("Starting WAMP server...")
@@ -222,6 +412,9 @@ class WampAgent(object):
         logging.register_options(CONF)
         CONF(project='iotronic')
         logging.setup(CONF, "iotronic-wamp-agent")
+        tracing.setup("iotronic-wamp-agent")
+        notifications.setup("iotronic-wamp-agent")
+        profiler.setup("iotronic-wamp-agent")
 
         # to be removed asap
         self.host = host
@@ -249,6 +442,8 @@ class WampAgent(object):
         self.r = RPCServer()
         self.w = WampManager()
 
+        metrics.serve(CONF.metrics.wamp_agent_port)
+
         self.r.start()
         self.w.start()
 
@@ -269,5 +464,13 @@ class WampAgent(object):
     def stop_handler(self, signum, frame):
         self.w.stop()
         self.r.stop()
+        import iotronic.wamp.functions as fun
+        fun._put_offline(fun.leaves.pop_expired(force=True))
+        if CONF.tracing.enabled:
+            tracing.get_exporter().flush()
+        if CONF.telemetry.enabled:
+            fun.telemetry_buffer.flush()
+        events.flush()
+        notifications.flush()
         self.del_host()
         os._exit(0)
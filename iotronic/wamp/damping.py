@@ -0,0 +1,152 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Flap damping for board sessions.
+
+Boards on poor links leave and rejoin the router many times per minute.
+Leave events are held for a grace period: a board that comes back in time
+only gets its session id updated, the others are put offline in a batch.
+"""
+
+import collections
+import threading
+import time
+
+from oslo_config import cfg
+from oslo_log import log as logging
+
+LOG = logging.getLogger(__name__)
+
+damping_opts = [
+    cfg.FloatOpt('leave_grace_period',
+                 default=10.0,
+                 help='Time (in seconds) a board leave event is held before '
+                      'the board is put offline. A rejoin within this '
+                      'period only updates the session. 0 disables the '
+                      'damping.'),
+    cfg.IntOpt('flap_warning_threshold',
+               default=10,
+               help='Log a warning every time a board flaps this many '
+                    'times.'),
+    cfg.FloatOpt('flap_window',
+                 default=3600.0,
+                 help='Time (in seconds) the flap count of a board is kept '
+                      'after its last flap.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(damping_opts, 'wamp')
+
+
+class LeaveCoalescer(object):
+    """Hold board leave events and release them in batches.
+
+    The coalescer only keeps the state in memory, the caller applies it to
+    the database: pop_expired() returns the sessions to invalidate and
+    rejoin() tells whether a new session replaces a pending leave.
+    """
+
+    def __init__(self, grace_period=None, warning_threshold=None,
+                 flap_window=None):
+        if grace_period is None:
+            grace_period = CONF.wamp.leave_grace_period
+        self.grace_period = grace_period
+        self.warning_threshold = (warning_threshold or
+                                  CONF.wamp.flap_warning_threshold)
+        self.flap_window = flap_window or CONF.wamp.flap_window
+        # session_id -> (deadline, board_uuid)
+        self._pending = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.flaps = collections.Counter()
+        self.last_flap = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def leave(self, session_id, board_uuid=None):
+        """Hold a leave event.
+
+        :param session_id: the id of the session that left.
+        :param board_uuid: the board of the session, if known. Only the
+                           leaves of known boards can be cancelled by a
+                           rejoin.
+        :returns: True if the event has been queued, False if it has to be
+                  applied right away because the damping is disabled.
+        """
+        if self.grace_period <= 0:
+            return False
+        with self._lock:
+            self._pending[str(session_id)] = (time.time() + self.grace_period,
+                                              board_uuid)
+        return True
+
+    def rejoin(self, board_uuid):
+        """Cancel the pending leave of a board that came back.
+
+        :returns: the id of the session that left, or None if the board has
+                  no pending leave.
+        """
+        with self._lock:
+            for session_id, (deadline, uuid) in self._pending.items():
+                if uuid == board_uuid:
+                    break
+            else:
+                return None
+            del self._pending[session_id]
+            self.flaps[board_uuid] += 1
+            self.last_flap[board_uuid] = time.time()
+            count = self.flaps[board_uuid]
+
+        if count % self.warning_threshold == 0:
+            LOG.warning('Board %(board)s flapped %(count)d times',
+                        {'board': board_uuid, 'count': count})
+        return session_id
+
+    def _forget_flaps(self, now):
+        # called with the lock held
+        for board, last in list(self.last_flap.items()):
+            if now - last > self.flap_window:
+                del self.last_flap[board]
+                del self.flaps[board]
+
+    def pop_expired(self, force=False):
+        """Return the ids of the sessions whose grace period expired.
+
+        The boards that did not flap within the flap window are forgotten.
+
+        :param force: return every pending session.
+        """
+        now = time.time()
+        expired = []
+        with self._lock:
+            self._forget_flaps(now)
+            for session_id, (deadline, uuid) in list(self._pending.items()):
+                if not force and deadline > now:
+                    # ordered by deadline
+                    break
+                del self._pending[session_id]
+                expired.append(session_id)
+        return expired
+
+    def flap_counts(self):
+        """Return the flap count and the time of the last flap per board.
+
+        Only the boards that flapped within the flap window are returned.
+        """
+        with self._lock:
+            self._forget_flaps(time.time())
+            return dict((board, {'flaps': count,
+                                 'last_flap': self.last_flap.get(board)})
+                        for board, count in self.flaps.items())
@@ -13,13 +13,22 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from iotronic.common import events
+from iotronic.common import exception
+from iotronic.common import metrics
 from iotronic.common import rpc
 from iotronic.common import states
 from iotronic.conductor import rpcapi
 from iotronic import objects
+from iotronic.telemetry import buffer
+from iotronic.wamp import admission
+from iotronic.wamp import damping
+from iotronic.wamp import presence
 from iotronic.wamp import wampmessage as wm
 from oslo_config import cfg
 from oslo_log import log
+from oslo_utils import uuidutils
+from twisted.internet import threads
 
 LOG = log.getLogger(__name__)
 
@@ -39,66 +48,111 @@ class cont(object):
 
 ctxt = cont()
 
+telemetry_buffer = buffer.TelemetryBuffer()
+leaves = damping.LeaveCoalescer()
+connected = presence.Presence()
+calls = admission.calls()
+registrations = admission.registrations()
+
+EVENTS = metrics.counter('iotronic_wamp_events_total',
+                         'Board events handled by the wamp agent.', ['event'])
+metrics.gauge('iotronic_wamp_connected_boards',
+              'Boards connected to the wamp agent.').set_function(
+    lambda: len(connected))
+metrics.gauge('iotronic_wamp_pending_calls',
+              'Calls to the boards in flight.').set_function(
+    lambda: calls.inflight)
+metrics.gauge('iotronic_wamp_pending_leaves',
+              'Board leaves held for the grace period.').set_function(
+    lambda: len(leaves))
+metrics.gauge('iotronic_wamp_board_flaps',
+              'Flaps of the boards that flapped within the flap window.',
+              ['board']).set_function(
+    lambda: dict(((board, ), flap['flaps'])
+                 for board, flap in leaves.flap_counts().items()))
+
 
 def echo(data):
     LOG.info("ECHO: %s" % data)
     return data
 
 
-def update_sessions(session_list):
-    session_list = set(session_list)
+def update_sessions(session_list, agent_host):
+    session_list = set(str(elem) for elem in session_list)
     list_from_db = objects.SessionWP.valid_list(ctxt)
-    list_db = set([int(elem.session_id) for elem in list_from_db])
-
-    if session_list == list_db:
-        LOG.debug('Sessions on the database are updated.')
-        return
 
-    old_connected = list_db.difference(session_list)
-    for elem in old_connected:
-        old_session = objects.SessionWP.get(ctxt, elem)
-        old_session.valid = False
-        old_session.save()
-        LOG.debug('%s has been put offline.', old_session.board_uuid)
+    old_connected = [x.session_id for x in list_from_db
+                     if x.session_id not in session_list]
     if old_connected:
+        _put_offline(old_connected)
         LOG.warning('Some boards have been updated: status offline')
 
-    keep_connected = list_db.intersection(session_list)
-    for elem in keep_connected:
-        for x in list_from_db:
-            if x.session_id == str(elem):
-                LOG.debug('%s need to be restored.', x.board_uuid)
-                break
-    if keep_connected:
-        LOG.warning('Some boards need to be restored.')
-
-
-def board_on_leave(session_id):
-    LOG.debug('A board with %s disconnectd', session_id)
+    # restore the presence of the boards of this agent still connected
+    for x in list_from_db:
+        if x.session_id not in session_list:
+            continue
+        board = objects.Board.get_by_uuid(ctxt, x.board_uuid)
+        if board.agent == agent_host:
+            connected.add(x.board_uuid, x.session_id)
+            LOG.debug('%s has been restored.', x.board_uuid)
+    if connected:
+        LOG.info('%d boards restored.', len(connected))
+
+
+def reconcile_presence(session_list):
+    """Drop the boards whose session is not on the router anymore."""
+    stale = connected.reconcile(session_list)
+    if not stale:
+        return
+    for session_id, board_uuid in stale:
+        LOG.warning('Board %s lost its session %s', board_uuid, session_id)
+    # the leave events have been missed: no damping here
+    return threads.deferToThread(_put_offline,
+                                 [session_id for session_id, _ in stale])
 
-    try:
-        old_session = objects.SessionWP.get(ctxt, session_id)
-        old_session.valid = False
-        old_session.save()
-        LOG.debug('Session %s deleted', session_id)
-    except Exception:
-        LOG.debug('session %s not found', session_id)
 
-    board = objects.Board.get_by_uuid(ctxt, old_session.board_uuid)
-    board.status = states.OFFLINE
-    board.save()
-    LOG.debug('Board %s is now  %s', old_session.uuid, states.OFFLINE)
+def _put_offline(session_ids):
+    board_uuids = objects.SessionWP.invalidate(ctxt, session_ids)
+    if board_uuids:
+        objects.Board.update_status(ctxt, board_uuids, states.OFFLINE)
+        LOG.info('Boards %s are now %s', ', '.join(board_uuids),
+                 states.OFFLINE)
+        events.publish_boards(ctxt, events.STATUS, board_uuids)
+    return board_uuids
 
 
-def connection(uuid, session):
-    LOG.debug('Received registration from %s with session %s',
-              uuid, session)
-    try:
-        board = objects.Board.get_by_uuid(ctxt, uuid)
-    except Exception as exc:
-        msg = exc.message % {'board': uuid}
-        LOG.error(msg)
-        return wm.WampError(msg).serialize()
+def board_on_leave(session_id):
+    LOG.debug('A board with %s disconnectd', session_id)
+    EVENTS.inc(event='leave')
+    board_uuid = connected.remove(session_id)
+    # held for the grace period: a rejoin cancels it
+    if not leaves.leave(session_id, board_uuid):
+        threads.deferToThread(_put_offline, [session_id])
+
+
+def flush_leaves(force=False):
+    expired = leaves.pop_expired(force=force)
+    if expired:
+        return threads.deferToThread(_put_offline, expired)
+
+
+def _store_connection(board, session, rejoined):
+    if rejoined:
+        # the board left within the grace period: keep it online and only
+        # move its valid session to the new session id
+        try:
+            ses = objects.SessionWP.get_session_by_board_uuid(ctxt,
+                                                              board.uuid,
+                                                              valid=True)
+            ses.session_id = str(session)
+            ses.save()
+            LOG.debug('Board %s rejoined with session %s',
+                      board.uuid, session)
+            events.publish([events.board_event(events.SESSION, board,
+                                               session=str(session))])
+            return
+        except exception.BoardNotConnected:
+            LOG.debug('valid session for %s not found', board.uuid)
 
     try:
         old_ses = objects.SessionWP(ctxt)
@@ -119,12 +173,80 @@ def connection(uuid, session):
     board.save()
     LOG.info('Board %s (%s) is now  %s', board.uuid,
              board.name, states.ONLINE)
+    events.publish([events.board_event(events.STATUS, board),
+                    events.board_event(events.SESSION, board,
+                                       session=str(session.session_id))])
+
+
+def _log_failure(failure, msg):
+    LOG.error(msg, failure.getErrorMessage())
+
+
+def connection(uuid, session):
+    LOG.debug('Received registration from %s with session %s',
+              uuid, session)
+    EVENTS.inc(event='connection')
+    try:
+        board = objects.Board.get_by_uuid(ctxt, uuid)
+    except Exception as exc:
+        msg = exc.message % {'board': uuid}
+        LOG.error(msg)
+        return wm.WampError(msg).serialize()
+
+    connected.add(board.uuid, session)
+    rejoined = leaves.rejoin(board.uuid) is not None
+    # the presence is authoritative, the database is updated in background
+    d = threads.deferToThread(_store_connection, board, session, rejoined)
+    d.addErrback(_log_failure, 'Unable to store the connection: %s')
     return wm.WampSuccess('').serialize()
 
 
 def registration(code, session):
-    return c.registration(ctxt, code, session)
+    EVENTS.inc(event='registration')
+    retry_after = registrations.acquire()
+    if retry_after is not None:
+        LOG.warning('Registration of %(code)s rejected, retry in %(wait).1fs',
+                    {'code': code, 'wait': retry_after})
+        return wm.WampBusy('too many registrations',
+                           retry_after).serialize()
+    # out of the reactor thread, so registrations run concurrently up to
+    # the admission limit
+    d = threads.deferToThread(c.registration, ctxt, code, session)
+
+    def release(result):
+        registrations.release()
+        return result
+
+    d.addBoth(release)
+    # the conductor answers with a native envelope: encode it only once,
+    # for the board
+    d.addCallback(lambda res: wm.deserialize(res).serialize())
+    return d
 
 
 def board_on_join(session_id):
     LOG.debug('A board with %s joined', session_id['session'])
+    EVENTS.inc(event='join')
+
+
+def telemetry(*args, **kwargs):
+    details = kwargs.pop('details', None)
+    # topic: iotronic.<board_uuid>.telemetry
+    try:
+        board_uuid = details.topic.split('.')[1]
+    except (AttributeError, IndexError):
+        return
+    if not uuidutils.is_uuid_like(board_uuid):
+        LOG.debug('Telemetry received on invalid topic %s', details.topic)
+        return
+
+    EVENTS.inc(event='telemetry')
+    payload = args[0] if len(args) == 1 else list(args)
+    readings = buffer.parse_readings(board_uuid, payload)
+    if telemetry_buffer.add(readings):
+        threads.deferToThread(telemetry_buffer.flush)
+
+
+def flush_telemetry():
+    if telemetry_buffer.is_due():
+        return threads.deferToThread(telemetry_buffer.flush)
@@ -0,0 +1,119 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Presence of the boards connected to a wamp agent.
+
+The set of connected sessions is kept in memory from the board connections
+and the router session meta-events, and periodically reconciled with the
+router. It is the authoritative answer to "is this board connected": the
+database is only updated asynchronously.
+"""
+
+import threading
+import time
+
+from oslo_config import cfg
+
+presence_opts = [
+    cfg.FloatOpt('presence_reconcile_interval',
+                 default=60.0,
+                 help='Interval (in seconds) between two reconciliations of '
+                      'the connected boards with the sessions of the wamp '
+                      'router. 0 disables the reconciliation.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(presence_opts, 'wamp')
+
+
+class Presence(object):
+    """Map of the connected boards and their wamp sessions."""
+
+    def __init__(self):
+        # board_uuid -> (session_id, connected_at)
+        self._boards = {}
+        # session_id -> board_uuid
+        self._sessions = {}
+        self._lock = threading.Lock()
+        # bumped on every change, lets the reconciliation skip the session
+        # list when nothing happened
+        self.generation = 0
+
+    def __len__(self):
+        return len(self._boards)
+
+    def add(self, board_uuid, session_id):
+        session_id = str(session_id)
+        with self._lock:
+            old = self._boards.get(board_uuid)
+            if old is not None:
+                self._sessions.pop(old[0], None)
+            self._boards[board_uuid] = (session_id, time.time())
+            self._sessions[session_id] = board_uuid
+            self.generation += 1
+
+    def remove(self, session_id):
+        """Forget a session.
+
+        :returns: the uuid of the board of the session, or None if the
+                  session does not belong to a board.
+        """
+        with self._lock:
+            board_uuid = self._sessions.pop(str(session_id), None)
+            if board_uuid is not None:
+                del self._boards[board_uuid]
+                self.generation += 1
+            return board_uuid
+
+    def session_of(self, board_uuid):
+        """Return the session id of a connected board, or None."""
+        entry = self._boards.get(board_uuid)
+        return entry[0] if entry else None
+
+    def is_connected(self, board_uuid):
+        return board_uuid in self._boards
+
+    def get(self, board_uuid):
+        entry = self._boards.get(board_uuid)
+        if entry is None:
+            return {'board': board_uuid, 'connected': False}
+        return {'board': board_uuid,
+                'connected': True,
+                'session': entry[0],
+                'since': entry[1]}
+
+    def reconcile(self, session_ids):
+        """Drop the sessions the router does not know anymore.
+
+        :param session_ids: the ids of the sessions open on the router.
+        :returns: a list of (session_id, board_uuid) removed.
+        """
+        alive = set(str(s) for s in session_ids)
+        with self._lock:
+            stale = [(session_id, board_uuid)
+                     for session_id, board_uuid in self._sessions.items()
+                     if session_id not in alive]
+            for session_id, board_uuid in stale:
+                del self._sessions[session_id]
+                del self._boards[board_uuid]
+            if stale:
+                self.generation += 1
+        return stale
+
+    def snapshot(self):
+        with self._lock:
+            return dict((board_uuid, {'session': entry[0],
+                                      'since': entry[1]})
+                        for board_uuid, entry in self._boards.items())
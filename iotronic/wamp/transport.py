@@ -0,0 +1,172 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Transport of the link between the wamp agent and the router.
+
+The agent connects either with WebSocket, optionally compressed with
+permessage-deflate, or with RawSocket over TCP or a unix socket. The boards
+keep using wamp_transport_url: only the link of the agent changes.
+"""
+
+from autobahn.twisted import rawsocket
+from autobahn.twisted import websocket
+from autobahn.wamp import serializer
+from autobahn.websocket import compress
+from oslo_config import cfg
+from oslo_config import types
+from oslo_log import log as logging
+from six.moves.urllib import parse
+from twisted.internet.protocol import ReconnectingClientFactory
+from twisted.internet import reactor
+
+LOG = logging.getLogger(__name__)
+
+WEBSOCKET = 'websocket'
+RAWSOCKET = 'rawsocket'
+
+SERIALIZERS = {
+    'json': 'JsonSerializer',
+    'msgpack': 'MsgPackSerializer',
+    'cbor': 'CBORSerializer',
+    'ubjson': 'UBJSONSerializer',
+}
+
+transport_opts = [
+    cfg.StrOpt('transport',
+               default=WEBSOCKET,
+               choices=[WEBSOCKET, RAWSOCKET],
+               help='Transport of the link between the wamp agent and the '
+                    'router.'),
+    cfg.StrOpt('rawsocket_url',
+               default='tcp://localhost:8182',
+               help='Router address used with the rawsocket transport: '
+                    'tcp://<host>:<port> or unix://<path>.'),
+    cfg.ListOpt('serializers',
+                default=[],
+                item_type=types.String(choices=sorted(SERIALIZERS)),
+                help='Serializers offered to the router, in order of '
+                     'preference. Rawsocket only uses the first one. Empty '
+                     'means every serializer available.'),
+    cfg.BoolOpt('websocket_compression',
+                default=False,
+                help='Offer permessage-deflate compression on the '
+                     'websocket transport.'),
+    cfg.BoolOpt('compression_no_context_takeover',
+                default=False,
+                help='Reset the compression context after every message: '
+                     'less memory, worse ratio on similar messages.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(transport_opts, 'wamp')
+
+
+def get_serializers(names=None):
+    """Return the serializer instances for a list of names.
+
+    :param names: serializer names, defaults to [wamp]serializers.
+    :returns: a list of serializers, None for the autobahn defaults.
+    """
+    if names is None:
+        names = CONF.wamp.serializers
+    if not names:
+        return None
+    serializers = []
+    for name in names:
+        cls = getattr(serializer, SERIALIZERS[name], None)
+        if cls is None:
+            # autobahn only defines the serializers whose library is
+            # installed
+            LOG.warning("Serializer %s is not available", name)
+            continue
+        serializers.append(cls())
+    if not serializers:
+        raise ValueError('None of the serializers %s is available' %
+                         ', '.join(names))
+    return serializers
+
+
+class _Reconnecting(ReconnectingClientFactory):
+    maxDelay = 30
+
+    def clientConnectionFailed(self, connector, reason):
+        LOG.warning("Wamp Connection Failed.")
+        ReconnectingClientFactory.clientConnectionFailed(self,
+                                                         connector, reason)
+
+    def clientConnectionLost(self, connector, reason):
+        LOG.warning("Wamp Connection Lost.")
+        ReconnectingClientFactory.clientConnectionLost(self,
+                                                       connector, reason)
+
+
+class WebSocketClientFactory(_Reconnecting,
+                             websocket.WampWebSocketClientFactory):
+    pass
+
+
+class RawSocketClientFactory(_Reconnecting,
+                             rawsocket.WampRawSocketClientFactory):
+    pass
+
+
+def _accept_deflate(response):
+    if isinstance(response, compress.PerMessageDeflateResponse):
+        return compress.PerMessageDeflateResponseAccept(response)
+
+
+def client_factory(session_factory, url=None):
+    """Build the client factory of the configured transport.
+
+    :param session_factory: the wamp session factory.
+    :param url: router url, defaults to the one of the transport.
+    :returns: a reconnecting client factory.
+    """
+    serializers = get_serializers()
+    if CONF.wamp.transport == RAWSOCKET:
+        factory = RawSocketClientFactory(
+            session_factory,
+            serializer=serializers[0] if serializers else None)
+        factory.url = url or CONF.wamp.rawsocket_url
+        return factory
+
+    factory = WebSocketClientFactory(
+        session_factory, url=url or CONF.wamp.wamp_transport_url,
+        serializers=serializers)
+    options = {'autoPingInterval': CONF.wamp.autoPingInterval,
+               'autoPingTimeout': CONF.wamp.autoPingTimeout}
+    if CONF.wamp.websocket_compression:
+        no_takeover = CONF.wamp.compression_no_context_takeover
+        options['perMessageCompressionOffers'] = [
+            compress.PerMessageDeflateOffer(
+                accept_no_context_takeover=True,
+                accept_max_window_bits=True,
+                request_no_context_takeover=no_takeover)]
+        options['perMessageCompressionAccept'] = _accept_deflate
+    factory.setProtocolOptions(**options)
+    return factory
+
+
+def connect(factory):
+    """Connect a factory built by client_factory to the router."""
+    if isinstance(factory, WebSocketClientFactory):
+        return websocket.connectWS(factory)
+
+    url = parse.urlparse(factory.url)
+    if url.scheme == 'unix':
+        return reactor.connectUNIX(url.path, factory)
+    if url.scheme != 'tcp':
+        raise ValueError('Invalid rawsocket url %s' % factory.url)
+    return reactor.connectTCP(url.hostname, url.port, factory)
@@ -16,23 +16,75 @@
 
 import json
 
+from oslo_utils import importutils
+import six
+
+# optional; raw=False needs msgpack>=0.5.2
+msgpack = importutils.try_import('msgpack')
+
 SUCCESS = 'SUCCESS'
 ERROR = 'ERROR'
 WARNING = 'WARNING'
+# the target board has no session on the agent
+NOT_CONNECTED = 'NOT_CONNECTED'
+# the agent is overloaded, retry after the delay in retry_after
+BUSY = 'BUSY'
+
+JSON = 'json'
+MSGPACK = 'msgpack'
+
+
+def _is_msgpack_map(data):
+    # fixmap (0x80-0x8f), map16 (0xde) and map32 (0xdf)
+    first = six.indexbytes(data, 0)
+    return 0x80 <= first <= 0x8f or first in (0xde, 0xdf)
 
 
 def deserialize(received):
-    m = json.loads(received)
-    return WampMessage(**m)
+    """Build a WampMessage from whatever a board or an agent sent.
+
+    The envelope normally travels as a native dict, so no decoding is
+    needed. Boards still sending an encoded envelope are decoded here, once:
+    JSON text or, when msgpack is installed, a msgpack blob.
+    """
+    if isinstance(received, WampMessage):
+        return received
+    if isinstance(received, dict):
+        return WampMessage.from_dict(received)
+    if (msgpack is not None and isinstance(received, six.binary_type)
+            and received and _is_msgpack_map(received)):
+        values = msgpack.unpackb(received, raw=False)
+    else:
+        values = json.loads(received)
+    if not isinstance(values, dict):
+        raise ValueError('%s is not a WampMessage' % received)
+    return WampMessage.from_dict(values)
 
 
 class WampMessage(object):
-    def __init__(self, message=None, result=None):
+    def __init__(self, message=None, result=None, retry_after=None):
         self.message = message
         self.result = result
+        self.retry_after = retry_after
+
+    @classmethod
+    def from_dict(cls, values):
+        return cls(message=values.get('message'),
+                   result=values.get('result'),
+                   retry_after=values.get('retry_after'))
+
+    def to_dict(self):
+        """Native envelope, passed as-is through WAMP and oslo.messaging."""
+        values = {'message': self.message, 'result': self.result}
+        if self.retry_after is not None:
+            values['retry_after'] = self.retry_after
+        return values
 
-    def serialize(self):
-        return json.dumps(self, default=lambda o: o.__dict__)
+    def serialize(self, codec=JSON):
+        """Encode the envelope for peers that expect a string or a blob."""
+        if codec == MSGPACK and msgpack is not None:
+            return msgpack.packb(self.to_dict(), use_bin_type=True)
+        return json.dumps(self.to_dict(), default=lambda o: o.__dict__)
 
 
 class WampSuccess(WampMessage):
@@ -48,3 +100,8 @@ class WampError(WampMessage):
 class WampWarning(WampMessage):
     def __init__(self, msg=None):
         super(WampWarning, self).__init__(msg, WARNING)
+
+
+class WampBusy(WampMessage):
+    def __init__(self, msg=None, retry_after=None):
+        super(WampBusy, self).__init__(msg, BUSY, retry_after)
@@ -0,0 +1,314 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Throughput, latency and query count of the REST API read routes.
+
+Boots the API application in-process with auth_strategy=noauth and the
+fake RPC transport, on an SQLite database seeded with the requested number
+of boards, plugins, locations and injections, and measures every route for
+every page size.
+
+    python utils/benchmarks/api_bench.py --boards 10000 --plugins 200 \\
+        --injections 5 --page-sizes 50,200,1000 \\
+        --compare utils/benchmarks/api_baseline.json
+
+--save writes the results as the new baseline; --compare reports the
+routes slower than the baseline by more than --tolerance.
+
+--memory records the peak memory allocated by each request (tracemalloc,
+Python 3). Comparing the runs with --stream-threshold 0 (pages rendered
+at once) and the default (large pages streamed), with and without --gzip,
+gives the cost of each response path.
+"""
+
+from __future__ import print_function
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from oslo_config import cfg
+from oslo_messaging import conffixture
+from oslo_utils import uuidutils
+from sqlalchemy import event
+import webob
+
+from iotronic.api import app as api_app
+from iotronic.common import rpc
+from iotronic.db.sqlalchemy import api as sqla_api
+from iotronic.db.sqlalchemy import models
+
+CONF = cfg.CONF
+
+ADMIN_HEADERS = {
+    'X-User-Id': uuidutils.generate_uuid(dashed=False),
+    'X-Project-Id': uuidutils.generate_uuid(dashed=False),
+    'X-Roles': 'admin',
+}
+
+ROUTES = [
+    # name, path; %(limit)s is the page size, %(board)s a board uuid
+    ('boards', '/v1/boards?limit=%(limit)s'),
+    ('boards_detail', '/v1/boards/detail?limit=%(limit)s'),
+    ('plugins', '/v1/plugins?limit=%(limit)s'),
+    ('board_plugins', '/v1/boards/%(board)s/plugins'),
+    ('board', '/v1/boards/%(board)s'),
+]
+
+
+def configure(db_path, args):
+    CONF([], project='iotronic')
+    if args.stream_threshold is not None:
+        CONF.set_override('stream_threshold', args.stream_threshold, 'api')
+    CONF.set_override('compression', args.gzip, 'api')
+    CONF.set_override('auth_strategy', 'noauth')
+    CONF.set_override('connection', 'sqlite:///%s' % db_path, 'database')
+    # registers the transport options, which oslo.messaging otherwise
+    # does only when it builds the transport
+    messaging = conffixture.ConfFixture(CONF)
+    messaging.setUp()
+    messaging.transport_url = 'fake:/'
+    CONF.set_override('enabled', False, 'metrics')
+    rpc.init(CONF)
+
+
+def seed(args):
+    """Create the schema and the fixture, in bulk."""
+    engine = sqla_api.get_engine()
+    models.Base.metadata.create_all(engine)
+    rnd = random.Random(args.seed)
+    now = datetime.datetime.utcnow()
+    owner = ADMIN_HEADERS['X-User-Id']
+    project = ADMIN_HEADERS['X-Project-Id']
+
+    boards = [{'id': i + 1,
+               'uuid': uuidutils.generate_uuid(),
+               'code': 'bench-%d' % i,
+               'status': rnd.choice(['registered', 'offline', 'online']),
+               'name': 'bench-%d' % i,
+               'type': rnd.choice(['yun', 'server']),
+               'agent': 'agent-%d' % (i % 4),
+               'owner': owner,
+               'project': project,
+               'mobile': False,
+               'config': {'iotronic': {'extra': {}}},
+               'extra': {},
+               'created_at': now}
+              for i in range(args.boards)]
+    locations = [{'board_id': b['id'],
+                  'latitude': '38.2597708',
+                  'longitude': '15.5966863',
+                  'altitude': '70',
+                  'created_at': now}
+                 for b in boards for j in range(args.locations)]
+    plugins = [{'uuid': uuidutils.generate_uuid(),
+                'name': 'plugin-%d' % i,
+                'owner': owner,
+                'public': bool(i % 2),
+                'code': 'x' * args.plugin_size,
+                'callable': True,
+                'parameters': {},
+                'extra': {},
+                'created_at': now}
+               for i in range(args.plugins)]
+    injections = []
+    if plugins:
+        for b in boards:
+            for plugin in rnd.sample(plugins, min(args.injections,
+                                                  len(plugins))):
+                injections.append({'board_uuid': b['uuid'],
+                                   'plugin_uuid': plugin['uuid'],
+                                   'onboot': False,
+                                   'status': 'injected',
+                                   'created_at': now})
+
+    with engine.begin() as conn:
+        for model, rows in ((models.Board, boards),
+                            (models.Location, locations),
+                            (models.Plugin, plugins),
+                            (models.InjectionPlugin, injections)):
+            if rows:
+                conn.execute(model.__table__.insert(), rows)
+    return [b['uuid'] for b in boards]
+
+
+class QueryCounter(object):
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'after_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, len(values) * p // 100)]
+
+
+def measure(app, path, requests, counter, headers, memory=False):
+    latencies = []
+    queries = 0
+    peak = 0
+    for i in range(requests):
+        req = webob.Request.blank(path, headers=headers)
+        before = counter.count
+        if memory:
+            tracemalloc.start()
+        start = time.time()
+        resp = req.get_response(app)
+        # a streamed body is produced while it is read
+        body = resp.body
+        latencies.append(time.time() - start)
+        if memory:
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        queries += counter.count - before
+        if resp.status_int != 200:
+            raise Exception('%s: %s %s' % (path, resp.status, body[:200]))
+    total = sum(latencies)
+    return {'requests': requests,
+            'rps': requests / total,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p90_ms': percentile(latencies, 90) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'queries': float(queries) / requests,
+            'bytes': len(body),
+            'peak_kb': peak / 1024.0 if memory else None}
+
+
+def run(args, app, board_uuids, counter):
+    results = {}
+    rnd = random.Random(args.seed)
+    headers = dict(ADMIN_HEADERS)
+    if args.gzip:
+        headers['Accept-Encoding'] = 'gzip'
+    for name, template in ROUTES:
+        page_sizes = args.page_sizes if '%(limit)s' in template else [None]
+        for limit in page_sizes:
+            key = name if limit is None else '%s?limit=%d' % (name, limit)
+            path = template % {'limit': limit,
+                               'board': rnd.choice(board_uuids)}
+            measure(app, path, args.warmup, counter, headers)
+            results[key] = res = measure(app, path, args.requests, counter,
+                                         headers, memory=args.memory)
+            line = ('%-26s %8.1f req/s  p50 %7.2fms  p90 %7.2fms  '
+                    'p99 %7.2fms  %5.1f queries  %8d bytes'
+                    % (key, res['rps'], res['p50_ms'], res['p90_ms'],
+                       res['p99_ms'], res['queries'], res['bytes']))
+            if args.memory:
+                line += '  peak %8.1f KiB' % res['peak_kb']
+            print(line)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return the routes slower than the baseline."""
+    regressions = []
+    for key, res in sorted(results.items()):
+        base = baseline.get('results', {}).get(key)
+        if not base:
+            continue
+        if res['p50_ms'] > base['p50_ms'] * (1 + tolerance):
+            regressions.append('%s: p50 %.2fms, baseline %.2fms'
+                               % (key, res['p50_ms'], base['p50_ms']))
+        if res['queries'] > base['queries']:
+            regressions.append('%s: %.1f queries, baseline %.1f'
+                               % (key, res['queries'], base['queries']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--boards', type=int, default=1000)
+    parser.add_argument('--plugins', type=int, default=100)
+    parser.add_argument('--locations', type=int, default=1,
+                        help='locations per board')
+    parser.add_argument('--injections', type=int, default=3,
+                        help='plugins injected per board')
+    parser.add_argument('--plugin-size', type=int, default=2048,
+                        help='size of the plugin code in bytes')
+    parser.add_argument('--page-sizes', default='50,200,1000',
+                        type=lambda v: [int(x) for x in v.split(',')])
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', help='SQLite file, temporary by default')
+    parser.add_argument('--save', help='write the results to this file')
+    parser.add_argument('--compare', help='baseline to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--stream-threshold', type=int,
+                        help='[api]stream_threshold, 0 to never stream')
+    parser.add_argument('--gzip', action='store_true',
+                        help='send Accept-Encoding: gzip')
+    parser.add_argument('--memory', action='store_true',
+                        help='record the peak memory of each request')
+    args = parser.parse_args()
+    if args.memory and tracemalloc is None:
+        parser.error('--memory requires tracemalloc (Python 3)')
+
+    db_path = args.db or tempfile.mktemp(suffix='.sqlite')
+    if os.path.exists(db_path):
+        os.unlink(db_path)
+    configure(db_path, args)
+    start = time.time()
+    board_uuids = seed(args)
+    print('seeded %d boards, %d plugins in %.1fs'
+          % (args.boards, args.plugins, time.time() - start))
+
+    counter = QueryCounter(sqla_api.get_engine())
+    app = api_app.VersionSelectorApplication()
+    results = run(args, app, board_uuids, counter)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'fixture': {'boards': args.boards,
+                                   'plugins': args.plugins,
+                                   'locations': args.locations,
+                                   'injections': args.injections,
+                                   'plugin_size': args.plugin_size},
+                       'stream_threshold': CONF.api.stream_threshold,
+                       'gzip': args.gzip,
+                       'python': platform.python_version(),
+                       'results': results}, f, indent=2, sort_keys=True,
+                      separators=(',', ': '))
+            f.write('\n')
+
+    if not args.db:
+        os.unlink(db_path)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print('REGRESSION %s' % line)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Registration throughput of the Provisioner during an enrollment burst.
+
+Renders the configuration of N boards spread over a few wamp agents, the
+way ConductorEndpoint.registration does, without database nor RPC, and
+reports the registrations per second and the size of what is stored in
+boards.config compared with the full configuration.
+
+    python utils/benchmarks/provisioner_bench.py --boards 10000 --agents 4
+"""
+
+from __future__ import print_function
+
+import argparse
+import datetime
+import json
+import time
+
+from oslo_utils import uuidutils
+
+from iotronic.conductor import provisioner
+from iotronic import objects
+
+
+def make_boards(count):
+    now = datetime.datetime.utcnow()
+    boards = []
+    for i in range(count):
+        board = objects.Board()
+        board.id = i
+        board.uuid = uuidutils.generate_uuid()
+        board.code = 'code-%d' % i
+        board.status = 'registered'
+        board.name = 'board-%d' % i
+        board.type = 'yun'
+        board.agent = None
+        board.owner = uuidutils.generate_uuid(dashed=False)
+        board.project = uuidutils.generate_uuid(dashed=False)
+        board.mobile = False
+        board.config = {}
+        board.extra = {}
+        board.created_at = now
+        board.updated_at = None
+        boards.append(board)
+    return boards
+
+
+def make_location():
+    location = objects.Location()
+    location.longitude = '15.5966863'
+    location.latitude = '38.2597708'
+    location.altitude = '70'
+    location.created_at = datetime.datetime.utcnow()
+    location.updated_at = None
+    return location
+
+
+def run(boards, agents, location):
+    ragent = 'ws://registration:8181/'
+    stored = rendered = 0
+    start = time.time()
+    for i, board in enumerate(boards):
+        board.agent = agents[i % len(agents)]
+        prov = provisioner.Provisioner(board)
+        prov.conf_registration_agent(ragent)
+        prov.conf_main_agent('ws://%s:8181/' % board.agent)
+        prov.conf_location(location)
+        board.config = prov.get_delta()
+        config = prov.get_config()
+        # what goes to the database and to the board
+        stored += len(json.dumps(board.config))
+        rendered += len(json.dumps(config))
+    return time.time() - start, stored, rendered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--boards', type=int, default=10000)
+    parser.add_argument('--agents', type=int, default=4)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    agents = ['agent-%d' % i for i in range(args.agents)]
+    location = make_location()
+    for r in range(args.rounds):
+        boards = make_boards(args.boards)
+        elapsed, stored, rendered = run(boards, agents, location)
+        print('round %d: %d registrations in %.3fs (%.0f/s), '
+              'stored %d bytes/board, rendered %d bytes/board'
+              % (r + 1, args.boards, elapsed, args.boards / elapsed,
+                 stored // args.boards, rendered // args.boards))
+
+
+if __name__ == '__main__':
+    main()
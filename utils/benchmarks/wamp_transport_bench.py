@@ -0,0 +1,224 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Latency and throughput of the agent-router link for each transport.
+
+Starts a local router stand-in that answers every CALL with its arguments,
+connects to it with the client factory of the wamp agent for each
+transport, serializer and compression setting, and reports the call
+latency, the throughput and the bytes sent by the agent per call.
+
+    python utils/benchmarks/wamp_transport_bench.py --size 65536 --calls 500
+"""
+
+from __future__ import print_function
+
+import argparse
+import itertools
+import os
+import time
+
+from autobahn.twisted import rawsocket
+from autobahn.twisted import wamp
+from autobahn.twisted import websocket
+from autobahn.wamp import message
+from autobahn.wamp import role
+from autobahn.wamp import types
+from autobahn.websocket import compress
+from oslo_config import cfg
+from twisted.internet import defer
+from twisted.internet import reactor
+
+from iotronic.wamp import transport
+
+CONF = cfg.CONF
+CONF.import_opt('autoPingInterval', 'iotronic.wamp.agent', 'wamp')
+
+CONFIGS = [
+    # transport, serializer, compression
+    (transport.WEBSOCKET, 'json', False),
+    (transport.WEBSOCKET, 'json', True),
+    (transport.WEBSOCKET, 'msgpack', False),
+    (transport.WEBSOCKET, 'msgpack', True),
+    (transport.WEBSOCKET, 'cbor', False),
+    (transport.RAWSOCKET, 'json', False),
+    (transport.RAWSOCKET, 'msgpack', False),
+    (transport.RAWSOCKET, 'cbor', False),
+]
+
+
+class EchoRouter(object):
+    """Just enough of a router: every CALL gets its arguments back."""
+
+    _ids = itertools.count(1)
+
+    def onOpen(self, transport):
+        self._transport = transport
+
+    def onMessage(self, msg):
+        if isinstance(msg, message.Hello):
+            roles = {u'broker': role.RoleBrokerFeatures(),
+                     u'dealer': role.RoleDealerFeatures()}
+            self._transport.send(message.Welcome(next(self._ids), roles))
+        elif isinstance(msg, message.Call):
+            self._transport.send(message.Result(msg.request, args=msg.args,
+                                                kwargs=msg.kwargs))
+        elif isinstance(msg, message.Goodbye):
+            self._transport.send(message.Goodbye())
+            self._transport.close()
+
+    def onClose(self, wasClean):
+        pass
+
+
+def _counting(protocol, counter):
+    class Counting(protocol):
+        def dataReceived(self, data):
+            counter[0] += len(data)
+            protocol.dataReceived(self, data)
+    return Counting
+
+
+def _accept_deflate(offers):
+    for offer in offers:
+        if isinstance(offer, compress.PerMessageDeflateOffer):
+            return compress.PerMessageDeflateOfferAccept(offer)
+
+
+def listen(kind, counter):
+    serializers = transport.get_serializers(list(transport.SERIALIZERS))
+    if kind == transport.RAWSOCKET:
+        factory = rawsocket.WampRawSocketServerFactory(EchoRouter,
+                                                       serializers)
+    else:
+        factory = websocket.WampWebSocketServerFactory(
+            EchoRouter, serializers=serializers)
+        factory.setProtocolOptions(
+            perMessageCompressionAccept=_accept_deflate)
+    factory.protocol = _counting(factory.protocol, counter)
+    return reactor.listenTCP(0, factory, interface='127.0.0.1')
+
+
+class BenchSession(wamp.ApplicationSession):
+
+    @defer.inlineCallbacks
+    def onJoin(self, details):
+        extra = self.config.extra
+        try:
+            result = yield self.run(extra['payload'], extra['calls'],
+                                    extra['concurrency'])
+            extra['done'].callback(result)
+        except Exception as e:
+            extra['done'].errback(e)
+        self.leave()
+
+    @defer.inlineCallbacks
+    def run(self, payload, calls, concurrency):
+        # latency: one call at a time
+        latencies = []
+        for i in range(calls):
+            start = time.time()
+            yield self.call(u'bench.echo', payload)
+            latencies.append(time.time() - start)
+
+        # throughput: a window of calls in flight
+        start = time.time()
+        pending = iter(range(calls))
+
+        @defer.inlineCallbacks
+        def worker():
+            for i in pending:
+                yield self.call(u'bench.echo', payload)
+
+        yield defer.gatherResults([worker() for i in range(concurrency)])
+        elapsed = time.time() - start
+        latencies.sort()
+        defer.returnValue({
+            'p50': latencies[len(latencies) // 2],
+            'p99': latencies[int(len(latencies) * 0.99) - 1],
+            'rate': calls / elapsed,
+        })
+
+
+@defer.inlineCallbacks
+def bench(kind, name, compression, payload, args):
+    counter = [0]
+    port = listen(kind, counter)
+    address = port.getHost()
+    if kind == transport.RAWSOCKET:
+        url = 'tcp://127.0.0.1:%d' % address.port
+    else:
+        url = 'ws://127.0.0.1:%d/' % address.port
+
+    CONF.set_override('transport', kind, 'wamp')
+    CONF.set_override('serializers', [name], 'wamp')
+    CONF.set_override('websocket_compression', compression, 'wamp')
+
+    done = defer.Deferred()
+    config = types.ComponentConfig(
+        realm=u'bench', extra={'payload': payload, 'calls': args.calls,
+                               'concurrency': args.concurrency,
+                               'done': done})
+    session_factory = wamp.ApplicationSessionFactory(config=config)
+    session_factory.session = BenchSession
+    factory = transport.client_factory(session_factory, url=url)
+    transport.connect(factory)
+    try:
+        result = yield done
+    finally:
+        factory.stopTrying()
+        yield port.stopListening()
+    result['bytes'] = counter[0] // (2 * args.calls)
+    defer.returnValue(result)
+
+
+def make_payload(size):
+    # plugin code is text: use some python source
+    with open(os.path.abspath(__file__)) as f:
+        source = f.read()
+    return (source * (size // len(source) + 1))[:size]
+
+
+@defer.inlineCallbacks
+def main(args):
+    payload = make_payload(args.size)
+    print('%-10s %-8s %-5s %10s %10s %10s %12s'
+          % ('transport', 'serial', 'defl', 'p50 ms', 'p99 ms', 'calls/s',
+             'bytes/call'))
+    try:
+        for kind, name, compression in CONFIGS:
+            try:
+                res = yield bench(kind, name, compression, payload, args)
+            except ValueError as e:
+                print('%-10s %-8s %-5s skipped: %s'
+                      % (kind, name, compression, e))
+                continue
+            print('%-10s %-8s %-5s %10.3f %10.3f %10.0f %12d'
+                  % (kind, name, compression, res['p50'] * 1000,
+                     res['p99'] * 1000, res['rate'], res['bytes']))
+    finally:
+        reactor.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=4096,
+                        help='payload size in bytes')
+    parser.add_argument('--calls', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+    CONF([], project='iotronic')
+    reactor.callWhenRunning(main, args)
+    reactor.run()
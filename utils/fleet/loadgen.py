@@ -0,0 +1,375 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Simulated board fleet.
+
+Runs thousands of simulated boards in one Twisted reactor against a
+running iotronic (API, conductor, wamp agents) and a router, e.g. the
+stand-in in utils/fleet/router.py:
+
+    # create the boards sim-0 ... sim-9999
+    python utils/fleet/loadgen.py seed --api http://localhost:1288 \\
+        --count 10000
+    # register, connect, flap 20% of the boards, then call a plugin
+    python utils/fleet/loadgen.py run --count 10000 --flap 0.2 \\
+        --api http://localhost:1288 --plugin <plugin-uuid> --actions 2000
+
+The boards register with stack4things.register, connect to their agent
+with <agent>.stack4things.connection and answer the plugin procedures
+after --board-delay. The report gives the registration rate, the time to
+connect the whole fleet, the time to recover after the flap and the
+end-to-end latency percentiles of the plugin actions through the API.
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from autobahn.twisted import wamp
+from autobahn.twisted import websocket
+from autobahn.wamp import types
+import six
+from six.moves.urllib import request as urllib_request
+from twisted.internet import defer
+from twisted.internet import reactor
+from twisted.internet import task
+from twisted.internet import threads
+
+PROCEDURES = ('PluginInject', 'PluginRemove', 'PluginCall', 'PluginStart',
+              'PluginStop', 'PluginStatus', 'PluginReboot')
+
+
+def percentiles(values, points=(50, 90, 99)):
+    if not values:
+        return dict((p, None) for p in points)
+    values = sorted(values)
+    return dict((p, values[min(len(values) - 1, len(values) * p // 100)])
+                for p in points)
+
+
+class SimBoard(object):
+    def __init__(self, code, args):
+        self.code = code
+        self.args = args
+        self.uuid = None
+        self.agent = None
+        self.url = None
+        self.session = None
+        self.connected = None
+        self.calls = 0
+
+
+class Busy(Exception):
+    def __init__(self, retry_after):
+        super(Busy, self).__init__('busy, retry after %ss' % retry_after)
+        self.retry_after = retry_after
+
+
+def _decode(res):
+    # the agents answer with an encoded envelope
+    if isinstance(res, (six.binary_type, six.text_type)):
+        res = json.loads(res)
+    if res.get('result') == 'BUSY':
+        raise Busy(res.get('retry_after') or 1.0)
+    return res
+
+
+class RegistrationSession(wamp.ApplicationSession):
+
+    @defer.inlineCallbacks
+    def onJoin(self, details):
+        board, done = self.config.extra['board'], self.config.extra['done']
+        try:
+            res = _decode((yield self.call(u'stack4things.register',
+                                           board.code, details.session)))
+            if res.get('result') != 'SUCCESS':
+                raise Exception('%s: %s' % (res.get('result'),
+                                            res.get('message')))
+            config = res['message']['iotronic']
+            board.uuid = config['board']['uuid']
+            board.agent = config['board']['agent']
+            board.url = config['wamp']['main-agent']['url']
+            done.callback(board)
+        except Exception as e:
+            done.errback(e)
+        self.leave()
+
+    def onDisconnect(self):
+        done = self.config.extra['done']
+        if not done.called:
+            done.errback(Exception('disconnected'))
+
+
+class BoardSession(wamp.ApplicationSession):
+
+    @defer.inlineCallbacks
+    def onJoin(self, details):
+        board, done = self.config.extra['board'], self.config.extra['done']
+        board.session = self
+        try:
+            for name in PROCEDURES:
+                yield self.register(self._procedure(board, name),
+                                    u'iotronic.%s.%s' % (board.uuid, name))
+            res = _decode((yield self.call(
+                u'%s.stack4things.connection' % board.agent,
+                board.uuid, details.session)))
+            if res.get('result') != 'SUCCESS':
+                raise Exception(res.get('message'))
+            board.connected = time.time()
+            done.callback(board)
+        except Exception as e:
+            done.errback(e)
+
+    def _procedure(self, board, name):
+        def procedure(*args, **kwargs):
+            board.calls += 1
+            reply = {'message': '%s done' % name, 'result': 'SUCCESS'}
+            # a constrained device takes a while
+            return task.deferLater(reactor, board.args.board_delay,
+                                   lambda: reply)
+        return procedure
+
+    def onDisconnect(self):
+        board, done = self.config.extra['board'], self.config.extra['done']
+        board.session = None
+        board.connected = None
+        if not done.called:
+            done.errback(Exception('disconnected'))
+
+
+def _open(session_class, board, url, realm):
+    done = defer.Deferred()
+    config = types.ComponentConfig(realm=realm,
+                                   extra={'board': board, 'done': done})
+    session_factory = wamp.ApplicationSessionFactory(config=config)
+    session_factory.session = session_class
+    factory = websocket.WampWebSocketClientFactory(session_factory, url=url)
+    factory.setProtocolOptions(openHandshakeTimeout=board.args.timeout)
+    websocket.connectWS(factory, timeout=board.args.timeout)
+    return done
+
+
+@defer.inlineCallbacks
+def _with_retries(fn, board, stats):
+    for attempt in range(board.args.retries + 1):
+        try:
+            result = yield fn(board)
+            defer.returnValue(result)
+        except Busy as e:
+            stats['busy'] += 1
+            error = e
+            # as the conductor does: jitter on the delay of the agent
+            yield task.deferLater(reactor, random.uniform(1.0, 2.0) *
+                                  e.retry_after, lambda: None)
+        except Exception as e:
+            stats['errors'] += 1
+            error = e
+            yield task.deferLater(reactor, random.uniform(0.5, 2.0) *
+                                  (attempt + 1), lambda: None)
+    stats['failed'] += 1
+    stats.setdefault('last_error', str(error))
+
+
+@defer.inlineCallbacks
+def run_phase(name, boards, fn, concurrency, rate=0):
+    """Run fn on every board, with a concurrency and a rate limit."""
+    stats = {'errors': 0, 'busy': 0, 'failed': 0}
+    semaphore = defer.DeferredSemaphore(concurrency)
+    start = time.time()
+    pending = []
+    for i, board in enumerate(boards):
+        if rate:
+            delay = start + float(i) / rate - time.time()
+            if delay > 0:
+                yield task.deferLater(reactor, delay, lambda: None)
+        pending.append(semaphore.run(_with_retries, fn, board, stats))
+    yield defer.DeferredList(pending)
+    stats['elapsed'] = time.time() - start
+    stats['count'] = len(boards)
+    stats['rate'] = (len(boards) - stats['failed']) / stats['elapsed']
+    print('%-12s %6d boards in %8.2fs: %8.1f/s, %d errors, %d busy, '
+          '%d failed' % (name, len(boards), stats['elapsed'], stats['rate'],
+                         stats['errors'], stats['busy'], stats['failed']))
+    if 'last_error' in stats:
+        print('%-12s last error: %s' % ('', stats['last_error']))
+    defer.returnValue(stats)
+
+
+def _api_request(args, method, path, body=None):
+    headers = {'Content-Type': 'application/json'}
+    if args.token:
+        headers['X-Auth-Token'] = args.token
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    req = urllib_request.Request(args.api + path, data=data, headers=headers)
+    req.get_method = lambda: method
+    resp = urllib_request.urlopen(req, timeout=args.timeout)
+    try:
+        return resp.read()
+    finally:
+        resp.close()
+
+
+@defer.inlineCallbacks
+def run_actions(args, boards):
+    """Call a plugin action on random boards through the API."""
+    latencies = []
+    errors = [0]
+    semaphore = defer.DeferredSemaphore(args.action_concurrency)
+    path = '/v1/boards/%s/plugins/' + args.plugin
+    body = {'action': args.action, 'parameters': {}}
+
+    def call(board):
+        start = time.time()
+        _api_request(args, 'POST', path % board.uuid, body)
+        return time.time() - start
+
+    @defer.inlineCallbacks
+    def one():
+        board = random.choice(boards)
+        try:
+            latency = yield threads.deferToThread(call, board)
+            latencies.append(latency)
+        except Exception:
+            errors[0] += 1
+
+    reactor.suggestThreadPoolSize(args.action_concurrency)
+    start = time.time()
+    yield defer.DeferredList([semaphore.run(one)
+                              for i in range(args.actions)])
+    elapsed = time.time() - start
+    p = percentiles(latencies)
+    shown = dict((k, '%.1fms' % (v * 1000) if v is not None else '-')
+                 for k, v in p.items())
+    print('%-12s %6d calls in %8.2fs: %8.1f/s, %d errors, '
+          'p50 %s p90 %s p99 %s'
+          % ('actions', args.actions, elapsed, len(latencies) / elapsed,
+             errors[0], shown[50], shown[90], shown[99]))
+    defer.returnValue({'count': args.actions, 'errors': errors[0],
+                       'elapsed': elapsed, 'p50': p[50], 'p90': p[90],
+                       'p99': p[99]})
+
+
+@defer.inlineCallbacks
+def run(args):
+    boards = [SimBoard('%s-%d' % (args.prefix, i), args)
+              for i in range(args.start, args.start + args.count)]
+    report = {}
+
+    def register(board):
+        return _open(RegistrationSession, board, args.registration_url,
+                     args.realm)
+
+    def connect(board):
+        return _open(BoardSession, board, board.url, args.realm)
+
+    try:
+        report['registration'] = yield run_phase(
+            'register', boards, register, args.concurrency, args.rate)
+        registered = [b for b in boards if b.url]
+
+        # connection storm: every board at once
+        report['connection'] = yield run_phase(
+            'connect', registered, connect, args.concurrency)
+        connected = [b for b in registered if b.connected]
+
+        if args.flap and connected:
+            flapping = random.sample(connected,
+                                     int(len(connected) * args.flap))
+            for board in flapping:
+                board.session.disconnect()
+            yield task.deferLater(reactor, args.flap_down, lambda: None)
+            report['recovery'] = yield run_phase(
+                'recover', flapping, connect, args.concurrency)
+
+        connected = [b for b in registered if b.connected]
+        if args.plugin and connected:
+            report['actions'] = yield run_actions(args, connected)
+    finally:
+        if args.report:
+            with open(args.report, 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+        reactor.stop()
+
+
+def seed(args):
+    """Create the simulated boards through the API."""
+    failed = 0
+    start = time.time()
+    for i in range(args.start, args.start + args.count):
+        name = '%s-%d' % (args.prefix, i)
+        body = {'name': name, 'code': name, 'type': 'yun', 'mobile': False,
+                'location': [{'latitude': '38.2597708',
+                              'longitude': '15.5966863',
+                              'altitude': '70'}]}
+        try:
+            _api_request(args, 'POST', '/v1/boards', body)
+        except Exception as e:
+            failed += 1
+            print('%s: %s' % (name, e), file=sys.stderr)
+    print('%d boards created in %.1fs, %d failed'
+          % (args.count - failed, time.time() - start, failed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='command')
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--count', type=int, default=1000)
+    common.add_argument('--start', type=int, default=0,
+                        help='index of the first board')
+    common.add_argument('--prefix', default='sim')
+    common.add_argument('--api', default='http://localhost:1288')
+    common.add_argument('--token', help='keystone token for the API')
+    common.add_argument('--timeout', type=float, default=30.0)
+
+    sub.add_parser('seed', parents=[common])
+
+    p = sub.add_parser('run', parents=[common])
+    p.add_argument('--registration-url', default='ws://localhost:8181/')
+    p.add_argument('--realm', default=u's4t')
+    p.add_argument('--rate', type=float, default=0,
+                   help='registrations per second, 0 for no limit')
+    p.add_argument('--concurrency', type=int, default=500,
+                   help='boards registering or connecting at once')
+    p.add_argument('--retries', type=int, default=3)
+    p.add_argument('--board-delay', type=float, default=0.05,
+                   help='time (in seconds) a board takes to answer')
+    p.add_argument('--flap', type=float, default=0,
+                   help='fraction of the boards to disconnect')
+    p.add_argument('--flap-down', type=float, default=1.0,
+                   help='time (in seconds) the boards stay disconnected')
+    p.add_argument('--plugin', help='plugin uuid for the actions')
+    p.add_argument('--action', default='PluginCall')
+    p.add_argument('--actions', type=int, default=1000)
+    p.add_argument('--action-concurrency', type=int, default=20)
+    p.add_argument('--report', help='write the report to this JSON file')
+
+    args = parser.parse_args()
+    if args.command == 'seed':
+        seed(args)
+    elif args.command == 'run':
+        reactor.callWhenRunning(run, args)
+        reactor.run()
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
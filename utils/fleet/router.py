@@ -0,0 +1,251 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Local stand-in for the WAMP router, for load tests.
+
+A single-realm dealer and broker with what the wamp agents use: calls,
+registrations, exact, prefix and wildcard subscriptions, and the session
+meta API (wamp.session.list, wamp.session.count, wamp.session.on_join and
+wamp.session.on_leave). No authentication, no authorization.
+
+    python utils/fleet/router.py --port 8181
+"""
+
+from __future__ import print_function
+
+import argparse
+import itertools
+
+from autobahn.twisted import rawsocket
+from autobahn.twisted import websocket
+from autobahn.wamp import message
+from autobahn.wamp import role
+from autobahn.wamp import serializer
+from twisted.internet import reactor
+from twisted.internet import task
+
+
+def _serializers():
+    serializers = []
+    for name in ('MsgPackSerializer', 'CBORSerializer', 'JsonSerializer'):
+        cls = getattr(serializer, name, None)
+        if cls is not None:
+            serializers.append(cls())
+    return serializers
+
+
+def _matches(subscription, topic):
+    uri, match = subscription
+    if match == u'prefix':
+        return topic.startswith(uri)
+    if match == u'wildcard':
+        parts = uri.split(u'.')
+        topic_parts = topic.split(u'.')
+        return len(parts) == len(topic_parts) and all(
+            not p or p == t for p, t in zip(parts, topic_parts))
+    return topic == uri
+
+
+class Router(object):
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self.sessions = {}
+        # uri: (registration id, session)
+        self.procedures = {}
+        # (uri, match): (subscription id, set of sessions)
+        self.subscriptions = {}
+        # invocation id: (caller, call request id, callee)
+        self.invocations = {}
+        self.calls = 0
+        self.events = 0
+
+    def next_id(self):
+        return next(self._ids)
+
+    def join(self, session):
+        self.sessions[session.session_id] = session
+        self.publish(None, u'wamp.session.on_join',
+                     [{u'session': session.session_id}])
+
+    def leave(self, session):
+        if self.sessions.pop(session.session_id, None) is None:
+            return
+        for uri, (reg_id, callee) in list(self.procedures.items()):
+            if callee is session:
+                del self.procedures[uri]
+        for key, (sub_id, sessions) in list(self.subscriptions.items()):
+            sessions.discard(session)
+            if not sessions:
+                del self.subscriptions[key]
+        for inv_id, (caller, request, callee) in list(
+                self.invocations.items()):
+            if callee is session:
+                del self.invocations[inv_id]
+                caller.send(message.Error(message.Call.MESSAGE_TYPE, request,
+                                          u'wamp.error.canceled'))
+            elif caller is session:
+                del self.invocations[inv_id]
+        self.publish(None, u'wamp.session.on_leave', [session.session_id])
+
+    def call(self, caller, msg):
+        self.calls += 1
+        if msg.procedure == u'wamp.session.list':
+            caller.send(message.Result(msg.request,
+                                       args=[list(self.sessions)]))
+        elif msg.procedure == u'wamp.session.count':
+            caller.send(message.Result(msg.request,
+                                       args=[len(self.sessions)]))
+        elif msg.procedure in self.procedures:
+            reg_id, callee = self.procedures[msg.procedure]
+            inv_id = self.next_id()
+            self.invocations[inv_id] = (caller, msg.request, callee)
+            callee.send(message.Invocation(inv_id, reg_id, args=msg.args,
+                                           kwargs=msg.kwargs))
+        else:
+            caller.send(message.Error(message.Call.MESSAGE_TYPE, msg.request,
+                                      u'wamp.error.no_such_procedure'))
+
+    def reply(self, msg):
+        pending = self.invocations.pop(msg.request, None)
+        if pending is None:
+            return
+        caller, request, callee = pending
+        if isinstance(msg, message.Yield):
+            caller.send(message.Result(request, args=msg.args,
+                                       kwargs=msg.kwargs))
+        else:
+            caller.send(message.Error(message.Call.MESSAGE_TYPE, request,
+                                      msg.error, args=msg.args,
+                                      kwargs=msg.kwargs))
+
+    def publish(self, publisher, topic, args=None, kwargs=None):
+        pub_id = self.next_id()
+        for key, (sub_id, sessions) in list(self.subscriptions.items()):
+            if not _matches(key, topic):
+                continue
+            event = message.Event(sub_id, pub_id, args=args, kwargs=kwargs,
+                                  topic=topic if key[1] != u'exact' else None)
+            for session in list(sessions):
+                if session is not publisher:
+                    self.events += 1
+                    session.send(event)
+        return pub_id
+
+
+class RouterSession(object):
+    """One client of the router, driven by the autobahn transport."""
+
+    router = None
+
+    def onOpen(self, transport):
+        self._transport = transport
+        self.session_id = None
+
+    def send(self, msg):
+        if self._transport is not None:
+            self._transport.send(msg)
+
+    def onMessage(self, msg):
+        router = self.router
+        if isinstance(msg, message.Hello):
+            self.session_id = router.next_id()
+            roles = {
+                u'broker': role.RoleBrokerFeatures(
+                    publisher_exclusion=True,
+                    pattern_based_subscription=True),
+                u'dealer': role.RoleDealerFeatures(),
+            }
+            self.send(message.Welcome(self.session_id, roles))
+            router.join(self)
+        elif isinstance(msg, message.Call):
+            router.call(self, msg)
+        elif isinstance(msg, (message.Yield, message.Error)):
+            router.reply(msg)
+        elif isinstance(msg, message.Register):
+            if msg.procedure in router.procedures:
+                self.send(message.Error(
+                    message.Register.MESSAGE_TYPE, msg.request,
+                    u'wamp.error.procedure_already_exists'))
+                return
+            reg_id = router.next_id()
+            router.procedures[msg.procedure] = (reg_id, self)
+            self.send(message.Registered(msg.request, reg_id))
+        elif isinstance(msg, message.Unregister):
+            for uri, (reg_id, callee) in list(router.procedures.items()):
+                if reg_id == msg.registration and callee is self:
+                    del router.procedures[uri]
+            self.send(message.Unregistered(msg.request))
+        elif isinstance(msg, message.Subscribe):
+            key = (msg.topic, msg.match or u'exact')
+            if key not in router.subscriptions:
+                router.subscriptions[key] = (router.next_id(), set())
+            sub_id, sessions = router.subscriptions[key]
+            sessions.add(self)
+            self.send(message.Subscribed(msg.request, sub_id))
+        elif isinstance(msg, message.Unsubscribe):
+            for key, (sub_id, sessions) in list(
+                    router.subscriptions.items()):
+                if sub_id == msg.subscription:
+                    sessions.discard(self)
+            self.send(message.Unsubscribed(msg.request))
+        elif isinstance(msg, message.Publish):
+            pub_id = router.publish(self, msg.topic, msg.args, msg.kwargs)
+            if msg.acknowledge:
+                self.send(message.Published(msg.request, pub_id))
+        elif isinstance(msg, message.Goodbye):
+            self.send(message.Goodbye())
+            self._transport.close()
+
+    def onClose(self, wasClean):
+        self._transport = None
+        if self.session_id is not None:
+            self.router.leave(self)
+
+
+def listen(router, port, rawsocket_port=None, interface='0.0.0.0'):
+    session_class = type('BoundRouterSession', (RouterSession,),
+                         {'router': router})
+    factory = websocket.WampWebSocketServerFactory(
+        session_class, serializers=_serializers())
+    reactor.listenTCP(port, factory, interface=interface)
+    if rawsocket_port:
+        factory = rawsocket.WampRawSocketServerFactory(session_class,
+                                                       _serializers())
+        reactor.listenTCP(rawsocket_port, factory, interface=interface)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--interface', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8181,
+                        help='websocket port')
+    parser.add_argument('--rawsocket-port', type=int, default=0)
+    parser.add_argument('--stats-interval', type=float, default=10.0)
+    args = parser.parse_args()
+
+    router = Router()
+    listen(router, args.port, args.rawsocket_port, args.interface)
+
+    def stats():
+        print('sessions %d, procedures %d, calls %d, events %d'
+              % (len(router.sessions), len(router.procedures),
+                 router.calls, router.events))
+    task.LoopingCall(stats).start(args.stats_interval, now=False)
+    print('router listening on port %d' % args.port)
+    reactor.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -75,6 +75,7 @@ CREATE TABLE IF NOT EXISTS `iotronic`.`boards` (
   `mobile` TINYINT(1) NOT NULL DEFAULT '0',
   `config` TEXT NULL DEFAULT NULL,
   `extra` TEXT NULL DEFAULT NULL,
+  `revision` INT(11) NOT NULL DEFAULT 0,
   PRIMARY KEY (`id`),
   UNIQUE INDEX `uuid` (`uuid` ASC),
   UNIQUE INDEX `code` (`code` ASC))
@@ -150,6 +151,7 @@ CREATE TABLE IF NOT EXISTS `iotronic`.`plugins` (
   `parameters` TEXT NULL DEFAULT NULL,
   `extra` TEXT NULL DEFAULT NULL,
   `owner` VARCHAR(36) NOT NULL,
+  `revision` INT(11) NOT NULL DEFAULT 0,
   PRIMARY KEY (`id`),
   UNIQUE INDEX `uuid` (`uuid` ASC))
 ENGINE = InnoDB
@@ -186,6 +188,186 @@ ENGINE = InnoDB
 AUTO_INCREMENT = 132
 DEFAULT CHARACTER SET = utf8;
 
+-- -----------------------------------------------------
+-- Table `iotronic`.`injection_campaigns`
+-- -----------------------------------------------------
+DROP TABLE IF EXISTS `iotronic`.`injection_campaigns` ;
+
+CREATE TABLE IF NOT EXISTS `iotronic`.`injection_campaigns` (
+  `created_at` DATETIME NULL DEFAULT NULL,
+  `updated_at` DATETIME NULL DEFAULT NULL,
+  `id` INT(11) NOT NULL AUTO_INCREMENT,
+  `uuid` VARCHAR(36) NOT NULL,
+  `plugin_uuid` VARCHAR(36) NOT NULL,
+  `onboot` TINYINT(1) NOT NULL DEFAULT '0',
+  `owner` VARCHAR(36) NOT NULL,
+  `project` VARCHAR(36) NOT NULL,
+  `status` VARCHAR(15) NOT NULL DEFAULT 'pending',
+  `conductor` VARCHAR(255) NULL DEFAULT NULL,
+  `concurrency` INT(11) NULL DEFAULT NULL,
+  `selector` TEXT NULL DEFAULT NULL,
+  `total` INT(11) NOT NULL DEFAULT '0',
+  PRIMARY KEY (`id`),
+  UNIQUE INDEX `uuid` (`uuid` ASC),
+  INDEX `injection_campaigns_status_idx` (`status` ASC, `conductor` ASC),
+  CONSTRAINT `campaign_plugin_uuid`
+    FOREIGN KEY (`plugin_uuid`)
+    REFERENCES `iotronic`.`plugins` (`uuid`)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE)
+ENGINE = InnoDB
+DEFAULT CHARACTER SET = utf8;
+
+-- -----------------------------------------------------
+-- Table `iotronic`.`campaign_boards`
+-- -----------------------------------------------------
+DROP TABLE IF EXISTS `iotronic`.`campaign_boards` ;
+
+CREATE TABLE IF NOT EXISTS `iotronic`.`campaign_boards` (
+  `created_at` DATETIME NULL DEFAULT NULL,
+  `updated_at` DATETIME NULL DEFAULT NULL,
+  `id` INT(11) NOT NULL AUTO_INCREMENT,
+  `campaign_id` INT(11) NOT NULL,
+  `board_uuid` VARCHAR(36) NOT NULL,
+  `agent` VARCHAR(255) NULL DEFAULT NULL,
+  `status` VARCHAR(15) NOT NULL DEFAULT 'pending',
+  `error` TEXT NULL DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE INDEX `campaign_board` (`campaign_id` ASC, `board_uuid` ASC),
+  INDEX `campaign_boards_status_idx` (`campaign_id` ASC, `status` ASC),
+  CONSTRAINT `campaign_boards_campaign_id`
+    FOREIGN KEY (`campaign_id`)
+    REFERENCES `iotronic`.`injection_campaigns` (`id`)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE)
+ENGINE = InnoDB
+DEFAULT CHARACTER SET = utf8;
+
+
+-- -----------------------------------------------------
+-- Table `iotronic`.`board_tags`
+-- -----------------------------------------------------
+DROP TABLE IF EXISTS `iotronic`.`board_tags` ;
+
+CREATE TABLE IF NOT EXISTS `iotronic`.`board_tags` (
+  `created_at` DATETIME NULL DEFAULT NULL,
+  `updated_at` DATETIME NULL DEFAULT NULL,
+  `id` INT(11) NOT NULL AUTO_INCREMENT,
+  `board_id` INT(11) NOT NULL,
+  `tag` VARCHAR(255) NOT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE INDEX `uniq_board_tags0board_tag` (`board_id` ASC, `tag` ASC),
+  INDEX `board_tags_tag_idx` (`tag` ASC),
+  CONSTRAINT `board_tags_board_id`
+    FOREIGN KEY (`board_id`)
+    REFERENCES `iotronic`.`boards` (`id`)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE)
+ENGINE = InnoDB
+DEFAULT CHARACTER SET = utf8;
+
+
+-- -----------------------------------------------------
+-- Table `iotronic`.`board_groups`
+-- -----------------------------------------------------
+DROP TABLE IF EXISTS `iotronic`.`board_groups` ;
+
+CREATE TABLE IF NOT EXISTS `iotronic`.`board_groups` (
+  `created_at` DATETIME NULL DEFAULT NULL,
+  `updated_at` DATETIME NULL DEFAULT NULL,
+  `id` INT(11) NOT NULL AUTO_INCREMENT,
+  `uuid` VARCHAR(36) NOT NULL,
+  `name` VARCHAR(255) NOT NULL,
+  `description` VARCHAR(255) NULL DEFAULT NULL,
+  `owner` VARCHAR(36) NOT NULL,
+  `project` VARCHAR(36) NOT NULL,
+  `extra` TEXT NULL DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE INDEX `uniq_board_groups0uuid` (`uuid` ASC),
+  UNIQUE INDEX `uniq_board_groups0project_name` (`project` ASC, `name` ASC))
+ENGINE = InnoDB
+DEFAULT CHARACTER SET = utf8;
+
+
+-- -----------------------------------------------------
+-- Table `iotronic`.`board_group_members`
+-- -----------------------------------------------------
+DROP TABLE IF EXISTS `iotronic`.`board_group_members` ;
+
+CREATE TABLE IF NOT EXISTS `iotronic`.`board_group_members` (
+  `created_at` DATETIME NULL DEFAULT NULL,
+  `updated_at` DATETIME NULL DEFAULT NULL,
+  `id` INT(11) NOT NULL AUTO_INCREMENT,
+  `group_id` INT(11) NOT NULL,
+  `board_id` INT(11) NOT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE INDEX `uniq_board_group_members0group_board` (`group_id` ASC,
+                                                       `board_id` ASC),
+  INDEX `board_group_members_board_idx` (`board_id` ASC),
+  CONSTRAINT `board_group_members_group_id`
+    FOREIGN KEY (`group_id`)
+    REFERENCES `iotronic`.`board_groups` (`id`)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE,
+  CONSTRAINT `board_group_members_board_id`
+    FOREIGN KEY (`board_id`)
+    REFERENCES `iotronic`.`boards` (`id`)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE)
+ENGINE = InnoDB
+DEFAULT CHARACTER SET = utf8;
+
+
+-- -----------------------------------------------------
+-- Table `iotronic`.`schedules`
+-- -----------------------------------------------------
+DROP TABLE IF EXISTS `iotronic`.`schedules` ;
+
+CREATE TABLE IF NOT EXISTS `iotronic`.`schedules` (
+  `created_at` DATETIME NULL DEFAULT NULL,
+  `updated_at` DATETIME NULL DEFAULT NULL,
+  `id` INT(11) NOT NULL AUTO_INCREMENT,
+  `uuid` VARCHAR(36) NOT NULL,
+  `name` VARCHAR(255) NULL DEFAULT NULL,
+  `owner` VARCHAR(36) NOT NULL,
+  `project` VARCHAR(36) NOT NULL,
+  `plugin_uuid` VARCHAR(36) NOT NULL,
+  `action` VARCHAR(15) NOT NULL,
+  `parameters` TEXT NULL DEFAULT NULL,
+  `cron` VARCHAR(255) NOT NULL,
+  `selector` TEXT NULL DEFAULT NULL,
+  `enabled` TINYINT(1) NOT NULL DEFAULT '1',
+  `next_run` DATETIME NULL DEFAULT NULL,
+  `last_run` DATETIME NULL DEFAULT NULL,
+  `last_result` TEXT NULL DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE INDEX `uniq_schedules0uuid` (`uuid` ASC),
+  INDEX `schedules_next_run_idx` (`enabled` ASC, `next_run` ASC),
+  CONSTRAINT `schedule_plugin_uuid`
+    FOREIGN KEY (`plugin_uuid`)
+    REFERENCES `iotronic`.`plugins` (`uuid`)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE)
+ENGINE = InnoDB
+DEFAULT CHARACTER SET = utf8;
+
+
+-- -----------------------------------------------------
+-- Table `iotronic`.`generations`
+-- -----------------------------------------------------
+DROP TABLE IF EXISTS `iotronic`.`generations` ;
+
+CREATE TABLE IF NOT EXISTS `iotronic`.`generations` (
+  `created_at` DATETIME NULL DEFAULT NULL,
+  `updated_at` DATETIME NULL DEFAULT NULL,
+  `kind` VARCHAR(36) NOT NULL,
+  `value` INT(11) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`kind`))
+ENGINE = InnoDB
+DEFAULT CHARACTER SET = utf8;
+
+INSERT INTO `generations` (`kind`, `value`) VALUES ('events', 0);
+
 
 SET SQL_MODE=@OLD_SQL_MODE;
 SET FOREIGN_KEY_CHECKS=@OLD_FOREIGN_KEY_CHECKS;
@@ -194,10 +376,10 @@ SET UNIQUE_CHECKS=@OLD_UNIQUE_CHECKS;
 
 -- insert testing boards
 INSERT INTO `boards` VALUES
-  ('2017-02-20 10:38:26',NULL,'','f3961f7a-c937-4359-8848-fb64aa8eeaaa','12345','registered','laptop-14','server',NULL,'eee383360cc14c44b9bf21e1e003a4f3','4adfe95d49ad41398e00ecda80257d21',0,'{}','{}'),
-  ('2017-02-20 10:38:45',NULL,'','e9bee8d9-7270-5323-d3e9-9875ba9c5753','yunyun','registered','yun-22','yun',NULL,'13ae14174aa1424688a75253ef814261','3c1e2e2c4bac40da9b4b1d694da6e2a1',0,'{}','{}'),
-  ('2017-02-20 10:38:45',NULL,'','96b69f1f-0188-48cc-abdc-d10674144c68','567','registered','yun-30','yun',NULL,'13ae14174aa1424688a75253ef814261','3c1e2e2c4bac40da9b4b1d694da6e2a1',0,'{}','{}'),
-  ('2017-02-20 10:39:08',NULL,'','65f9db36-9786-4803-b66f-51dcdb60066e','test','registered','test','server',NULL,'eee383360cc14c44b9bf21e1e003a4f3','4adfe95d49ad41398e00ecda80257d21',0,'{}','{}');
+  ('2017-02-20 10:38:26',NULL,'','f3961f7a-c937-4359-8848-fb64aa8eeaaa','12345','registered','laptop-14','server',NULL,'eee383360cc14c44b9bf21e1e003a4f3','4adfe95d49ad41398e00ecda80257d21',0,'{}','{}',0),
+  ('2017-02-20 10:38:45',NULL,'','e9bee8d9-7270-5323-d3e9-9875ba9c5753','yunyun','registered','yun-22','yun',NULL,'13ae14174aa1424688a75253ef814261','3c1e2e2c4bac40da9b4b1d694da6e2a1',0,'{}','{}',0),
+  ('2017-02-20 10:38:45',NULL,'','96b69f1f-0188-48cc-abdc-d10674144c68','567','registered','yun-30','yun',NULL,'13ae14174aa1424688a75253ef814261','3c1e2e2c4bac40da9b4b1d694da6e2a1',0,'{}','{}',0),
+  ('2017-02-20 10:39:08',NULL,'','65f9db36-9786-4803-b66f-51dcdb60066e','test','registered','test','server',NULL,'eee383360cc14c44b9bf21e1e003a4f3','4adfe95d49ad41398e00ecda80257d21',0,'{}','{}',0);
 INSERT INTO `locations` VALUES
   ('2017-02-20 10:38:26',NULL,'','2','1','3',132),
   ('2017-02-20 10:38:45',NULL,'','15.5966863','38.2597708','70',133),
@@ -0,0 +1,90 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Stand-in for an OTLP/HTTP collector.
+
+Accepts the spans exported by the services with [tracing]exporter = otlp,
+appends them to a file as JSON lines and prints, for every trace, the time
+spent in each span.
+
+    python utils/trace_collector.py --port 4318 --output traces.jsonl
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+
+
+def _spans(payload):
+    for resource in payload.get('resourceSpans', []):
+        service = 'unknown'
+        for attr in resource.get('resource', {}).get('attributes', []):
+            if attr['key'] == 'service.name':
+                service = attr['value']['stringValue']
+        for scope in resource.get('scopeSpans', []):
+            for span in scope.get('spans', []):
+                yield service, span
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    output = None
+
+    def do_POST(self):
+        if self.path != '/v1/traces':
+            self.send_error(404)
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length).decode('utf-8'))
+        with open(self.output, 'a') as f:
+            for service, span in _spans(payload):
+                f.write(json.dumps(dict(span, service=service)) + '\n')
+                elapsed = (int(span['endTimeUnixNano']) -
+                           int(span['startTimeUnixNano'])) / 1e6
+                print('%s %-20s %-40s %9.3f ms'
+                      % (span['traceId'][:8], service, span['name'],
+                         elapsed))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4318)
+    parser.add_argument('--output', default='traces.jsonl')
+    args = parser.parse_args()
+
+    Handler.output = args.output
+    server = Server((args.host, args.port), Handler)
+    print('collecting on http://%s:%d/v1/traces' % (args.host, args.port))
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()